@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Campaign for Skyrim TTRPG
+
+Bundles the story, NPC and faction managers over one storage backend, one
+shared campaign state and one clock engine (clock_engine.py), and lets
+multi-step story beats run as a single transaction:
+
+    campaign = Campaign("../data", "../state")
+    with campaign.transaction():
+        campaign.story.record_branching_decision("civil_war_entry_contact", "Ralof")
+        campaign.story.track_faction_quest_progress("stormcloaks", "join", "started", 2)
+        campaign.story.advance_clock("civil_war", "stormcloak_momentum", 1)
+        campaign.npcs.update_loyalty("ralof", 10, "Sided with him at Helgen")
+        campaign.factions.update_faction_clock("stormcloaks", "war_effort", 1)
+
+Inside the block every mutation works on in-memory copies: campaign state
+changes stay in the shared state store, and data files (NPCs, clocks,
+factions) are buffered by the storage backend, and clock advances are
+batched in the clock engine. When the block exits each touched document is
+written once. If it raises, nothing is written and the
+in-memory state is dropped, so the next read sees what is on disk.
+
+When other tools (the GM dashboard, a player helper, the checkpoint script)
+edit the same files concurrently, a transaction fails with ConflictError
+rather than overwriting their changes. run() retries the whole story beat
+on fresh copies:
+
+    campaign.run(lambda c: c.npcs.update_loyalty("ralof", 10, "Helgen"))
+"""
+
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from clock_engine import get_clock_engine
+from faction_logic import FactionManager
+from npc_manager import NPCManager
+from state_store import get_state_store
+from storage import DEFAULT_RETRIES, ConflictError, get_storage
+from story_manager import StoryManager
+
+
+class Campaign:
+    """Story, NPC and faction managers sharing storage and campaign state."""
+
+    def __init__(self, data_dir="../data", state_dir="../state", storage=None):
+        """
+        Args:
+            data_dir: Path to data directory
+            state_dir: Path to state directory
+            storage: StorageBackend to use (default: get_storage())
+        """
+        self.data_dir = Path(data_dir)
+        self.state_dir = Path(state_dir)
+        self.storage = storage if storage is not None else get_storage(self.data_dir, self.state_dir)
+        self.state_store = get_state_store(self.storage)
+        self.clocks = get_clock_engine(self.storage, self.state_store)
+
+        self.story = StoryManager(str(self.data_dir), str(self.state_dir),
+                                  storage=self.storage, state_store=self.state_store)
+        self.npcs = NPCManager(str(self.data_dir), str(self.state_dir),
+                               storage=self.storage, state_store=self.state_store)
+        self.factions = FactionManager(str(self.data_dir), storage=self.storage)
+        self.npcs.watch_faction_clocks(self.clocks)
+        self._depth = 0
+
+    def state_stores(self):
+        """Every state store the managers write through."""
+        stores = [self.state_store]
+        dragonbreak = getattr(self.story, "dragonbreak_manager", None)
+        if dragonbreak is not None and dragonbreak.state_store is not self.state_store:
+            stores.append(dragonbreak.state_store)
+        return stores
+
+    @contextmanager
+    def transaction(self):
+        """
+        Apply every mutation made in the block together, or none of them.
+
+        Transactions nest; inner blocks join the outermost one, which is the
+        only one that commits or rolls back.
+        """
+        stores = self.state_stores()
+        self._depth += 1
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(self.storage.transaction())
+                for store in stores:
+                    stack.enter_context(store.batch())
+                # Clock advances (and their history rows) are saved once, as
+                # part of this transaction
+                stack.enter_context(self.clocks.batch())
+                yield self
+        except BaseException:
+            self._depth -= 1
+            if not self._depth:
+                # The stores flushed into a transaction that was rolled back
+                for store in stores:
+                    store.invalidate()
+                self.clocks.invalidate()
+            raise
+        self._depth -= 1
+        if not self._depth:
+            for store in stores:
+                store.resync()
+
+    def run(self, mutation, retries=DEFAULT_RETRIES):
+        """
+        Run mutation(campaign) in a transaction, retrying it on conflicts.
+
+        Args:
+            mutation: Callable taking this Campaign; it may run more than
+                      once, so it should only change campaign data
+            retries: Attempts after the first before giving up
+
+        Returns:
+            The mutation's return value
+
+        Raises:
+            ConflictError: If every attempt lost the race
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.transaction():
+                    return mutation(self)
+            except ConflictError:
+                if attempt == retries or self._depth:
+                    raise
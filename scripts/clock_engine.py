@@ -0,0 +1,1120 @@
+#!/usr/bin/env python3
+"""
+Clock Engine for Skyrim TTRPG
+
+Campaign clocks are stored in several shapes:
+
+- data/clocks/<file>.json            <section>.clocks.<id> or clocks.<id>, with
+                                     current_progress/total_segments,
+                                     current_trust/max_trust or current/max
+- data/factions.json                 major_factions.<faction>.clocks[] with
+                                     progress/segments
+- data/factions/<faction>.json       clock with progress/segments
+- data/thalmor_arcs.json             arcs[].phases[] with clock_progress/clock_max
+- state/campaign_state.json          scene_clocks.<id> with current/max
+
+The engine loads all of them into one registry of Clock objects keyed by a
+qualified id, so lookups are a dict access whatever the schema:
+
+    civil_war_clocks/battle_of_whiterun_countdown
+    faction_trust_clocks/companions_trust
+    factions/imperial_legion/military_dominance
+    faction_files/thieves_guild
+    thalmor_arcs/perpetual_war/phase_1
+    scene_clocks/saarthal_expedition_logistics
+
+Changes are written back to each source in its native shape:
+
+    engine = get_clock_engine(storage)
+    engine.advance("civil_war_clocks/battle_of_whiterun_countdown", 2)
+    with engine.batch():                  # one write per touched file
+        engine.advance("factions/thalmor/intelligence_network")
+        engine.advance("scene_clocks/saarthal_expedition_progress", -1)
+
+Every advance is clamped to 0..max. Writes go through storage.update(), so
+if another tool changed a file since it was loaded, the engine's advances
+are replayed on the fresh copy instead of overwriting it; scene clocks are
+saved through the shared StateStore. Call refresh() to pick up files edited
+outside the engine.
+
+Code that reacts to clocks subscribes to thresholds instead of polling:
+
+    engine.subscribe(on_filled)                                  # any clock fills
+    engine.subscribe(warn, "75%", group="factions/thalmor")
+    engine.subscribe(rally, "below:3", clock_id="factions/stormcloaks/nord_unity")
+
+Crossings are detected as each advance is applied, so a subscriber runs
+exactly once per crossing. Engines handed out by get_clock_engine() come
+with the campaign's own subscribers: every filled clock is recorded under
+world_consequences.clocks_filled in the engine's state store, and a filled
+Thalmor arc phase announces the next one.
+
+The engine also keeps the ten fullest clocks in a heap-backed view that is
+updated on every advance and persisted to state/hot_clocks.json (a cache,
+not campaign data) after each save, so read_hot_clocks(storage) answers
+"what is about to fire?" without parsing clock files. The cache records the
+(mtime, size) signature of every clock document it was built from; if one
+was edited by hand since, read_hot_clocks() rebuilds it. Scene clocks live
+in the campaign state and are not part of that check. `python
+clock_engine.py rebuild` forces a rescan.
+
+Every change is also appended to engine.history (clock_history.py), a
+time series of deltas by session and in-game day.
+"""
+
+import argparse
+import functools
+import heapq
+import itertools
+import math
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from clock_history import ClockHistory
+from state_store import get_state_store
+from storage import get_storage
+
+
+# (current, maximum) field pairs, in detection order
+FIELD_PAIRS = (
+    ("current_progress", "total_segments"),
+    ("current_trust", "max_trust"),
+    ("clock_progress", "clock_max"),
+    ("progress", "segments"),
+    ("current", "max"),
+)
+
+# Maximum assumed when a clock has no maximum field (as the managers did)
+DEFAULT_SEGMENTS = 10
+
+# Per-group overrides of DEFAULT_SEGMENTS, for groups whose manager assumed
+# a different maximum (story_progression treated faction files as 8)
+GROUP_DEFAULT_SEGMENTS = {"faction_files": 8}
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Hottest-clocks view: size, and where it is cached (state/hot_clocks.json)
+HOT_CLOCKS = 10
+HOT_CLOCKS_COLLECTION = "state"
+HOT_CLOCKS_KEY = "hot_clocks"
+
+
+class ClockError(ValueError):
+    """Raised for unknown clocks or invalid clock values."""
+
+
+def slug(text):
+    """Lowercase identifier form of a clock or faction name."""
+    return re.sub(r"[^a-z0-9_]+", "_", str(text).lower()).strip("_")
+
+
+def _fields(record, default=DEFAULT_SEGMENTS):
+    """
+    The (current, maximum, default) fields a clock record uses, or None.
+
+    default is the maximum assumed when the record has no maximum field.
+    """
+    if not isinstance(record, dict):
+        return None
+    for current, maximum in FIELD_PAIRS:
+        if current in record:
+            return current, maximum, default
+    return None
+
+
+def _as_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class Clock:
+    """
+    One clock, normalized across schemas.
+
+    current and maximum are read from (and written to) the underlying
+    record, so a Clock always reflects the document it was loaded from.
+    """
+
+    __slots__ = ("id", "key", "name", "source", "group", "group_name", "record", "fields", "path")
+
+    def __init__(self, clock_id, key, name, source, group, group_name, record, fields, path):
+        self.id = clock_id
+        self.key = key
+        self.name = name
+        self.source = source
+        self.group = group
+        self.group_name = group_name
+        self.record = record
+        self.fields = fields
+        self.path = path
+
+    @property
+    def current(self):
+        return _as_int(self.record.get(self.fields[0], 0))
+
+    @property
+    def maximum(self):
+        default = self.fields[2]
+        return _as_int(self.record.get(self.fields[1], default), default)
+
+    @property
+    def ratio(self):
+        """Fill ratio (0.0 for a clock with no segments)."""
+        maximum = self.maximum
+        return self.current / maximum if maximum > 0 else 0.0
+
+    @property
+    def filled(self):
+        return self.maximum > 0 and self.current >= self.maximum
+
+    def get(self, field, default=None):
+        """A field of the underlying record (e.g. "completion_effect")."""
+        return self.record.get(field, default)
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "source": self.source, "group": self.group,
+                "current": self.current, "max": self.maximum, "ratio": round(self.ratio, 4)}
+
+    def __repr__(self):
+        return f"Clock({self.id!r}, {self.current}/{self.maximum})"
+
+
+class Threshold:
+    """
+    A point on a clock that subscribers are told about when it is crossed.
+
+    Either a fixed segment ("3") or a fraction of the clock's maximum
+    ("75%", "fill"), crossed upward by default or downward ("below:3",
+    "below:50%"). A crossing is a single change that moves the clock from
+    one side of the threshold to the other.
+    """
+
+    __slots__ = ("level", "ratio", "direction", "label")
+
+    def __init__(self, level=None, ratio=None, direction="up", label=None):
+        if (level is None) == (ratio is None):
+            raise ClockError("A threshold needs exactly one of level or ratio")
+        if direction not in ("up", "down"):
+            raise ClockError(f"Threshold direction must be 'up' or 'down', got {direction!r}")
+        self.level = level
+        self.ratio = ratio
+        self.direction = direction
+        self.label = label or (f"{'below:' if direction == 'down' else ''}"
+                               f"{level if level is not None else f'{ratio * 100:g}%'}")
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Build a threshold from a spec.
+
+        Args:
+            spec: A Threshold, "fill", a segment number (int or "3"), a
+                  percentage ("75%"), or either prefixed with "below:"
+
+        Raises:
+            ClockError: If the spec is not understood
+        """
+        if isinstance(spec, Threshold):
+            return spec
+        if isinstance(spec, int) and not isinstance(spec, bool):
+            return cls(level=spec)
+        text = str(spec).strip().lower()
+        direction = "up"
+        if text.startswith("below:"):
+            direction, text = "down", text[len("below:"):]
+        try:
+            if text in ("fill", "filled"):
+                return cls(ratio=1.0, direction=direction, label=str(spec))
+            if text.endswith("%"):
+                return cls(ratio=float(text[:-1]) / 100, direction=direction)
+            return cls(level=int(text), direction=direction)
+        except ValueError:
+            raise ClockError(f"Invalid clock threshold: {spec!r}")
+
+    def segment(self, maximum):
+        """The segment this threshold sits at on a clock of the given size."""
+        if self.level is not None:
+            return self.level
+        return math.ceil(self.ratio * maximum - 1e-9)
+
+    def crossed(self, old, new, maximum):
+        """True if a change from old to new crosses this threshold."""
+        segment = self.segment(maximum)
+        if self.direction == "up":
+            return old < segment <= new
+        return new < segment <= old
+
+    def __repr__(self):
+        return f"Threshold({self.label!r})"
+
+
+class Subscription:
+    """A callback watching one threshold on a clock, group, source or every clock."""
+
+    __slots__ = ("handle", "callback", "threshold", "scope", "once")
+
+    def __init__(self, handle, callback, threshold, scope, once):
+        self.handle = handle
+        self.callback = callback
+        self.threshold = threshold
+        self.scope = scope
+        self.once = once
+
+
+class HotClocks:
+    """
+    The k fullest clocks, maintained incrementally as clocks change.
+
+    Clocks are ranked by (fill ratio, current segments), ties going to the
+    clock seen first. The top k sit in a min-heap (coldest on top, ready to
+    be evicted) and the rest in a max-heap (hottest on top, ready to be
+    promoted); superseded heap entries are skipped lazily. Updates cost
+    O(log n) and reading the view O(k log k).
+    """
+
+    def __init__(self, k=HOT_CLOCKS):
+        self.k = k
+        self._top = []
+        self._rest = []
+        self._entries = {}
+        self._ordinal = {}
+        self._top_size = 0
+        self._versions = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _push(self, clock_id, rank, in_top, info):
+        old = self._entries.get(clock_id)
+        if old is not None and old[2]:
+            self._top_size -= 1
+        version = next(self._versions)
+        self._entries[clock_id] = (rank, version, in_top, info)
+        if in_top:
+            self._top_size += 1
+            heapq.heappush(self._top, (rank, version, clock_id))
+        else:
+            heapq.heappush(self._rest, (tuple(-part for part in rank), version, clock_id))
+
+    def _peek(self, heap):
+        """The live entry on top of a heap, dropping superseded ones."""
+        while heap:
+            _, version, clock_id = heap[0]
+            entry = self._entries.get(clock_id)
+            if entry is not None and entry[1] == version:
+                return clock_id
+            heapq.heappop(heap)
+        return None
+
+    def _move(self, clock_id, in_top):
+        rank, _, _, info = self._entries[clock_id]
+        self._push(clock_id, rank, in_top, info)
+
+    def update(self, clock_id, ratio, current, info):
+        """
+        Insert or re-rank a clock.
+
+        Args:
+            clock_id: Qualified clock id
+            ratio: Fill ratio
+            current: Current segments (tie-breaker)
+            info: dict reported for the clock by top()
+        """
+        ordinal = self._ordinal.setdefault(clock_id, len(self._ordinal))
+        rank = (ratio, current, -ordinal)
+        entry = self._entries.get(clock_id)
+        if entry is not None and entry[0] == rank:
+            self._entries[clock_id] = entry[:3] + (info,)
+            return
+        self._push(clock_id, rank, entry is not None and entry[2], info)
+        self._rebalance()
+
+    def remove(self, clock_id):
+        """Forget a clock (no-op if unknown)."""
+        entry = self._entries.pop(clock_id, None)
+        if entry is not None:
+            if entry[2]:
+                self._top_size -= 1
+            self._rebalance()
+
+    def clear(self):
+        self.__init__(self.k)
+
+    def _rebalance(self):
+        while self._top_size > self.k:
+            self._move(self._peek(self._top), False)
+        while self._top_size < self.k:
+            best = self._peek(self._rest)
+            if best is None:
+                break
+            self._move(best, True)
+        while True:
+            best, worst = self._peek(self._rest), self._peek(self._top)
+            if best is None or worst is None or self._entries[best][0] <= self._entries[worst][0]:
+                break
+            self._move(best, True)
+            self._move(worst, False)
+        # Rebuild when superseded entries pile up
+        if len(self._top) + len(self._rest) > 4 * len(self._entries) + 32:
+            self._top = [(entry[0], entry[1], clock_id) for clock_id, entry in self._entries.items() if entry[2]]
+            self._rest = [(tuple(-part for part in entry[0]), entry[1], clock_id)
+                          for clock_id, entry in self._entries.items() if not entry[2]]
+            heapq.heapify(self._top)
+            heapq.heapify(self._rest)
+
+    def top(self, n=None):
+        """
+        The hottest clocks, hottest first.
+
+        Returns:
+            list: The info dicts passed to update()
+        """
+        ranked = sorted((entry for entry in self._entries.values() if entry[2]),
+                        key=lambda entry: entry[0], reverse=True)
+        return [entry[3] for entry in ranked[:n]]
+
+
+# ----------------------------------------------------------------------
+# Schema readers: yield (id, key, name, group, group_name, record, path)
+# ----------------------------------------------------------------------
+
+def _clock_file_clocks(source, doc):
+    """data/clocks/<source>.json: clocks under the file's section or at the top."""
+    sections = [((), doc)]
+    sections += [((name,), value) for name, value in doc.items()
+                 if isinstance(value, dict) and isinstance(value.get("clocks"), dict)]
+    for prefix, section in sections:
+        clocks = section.get("clocks")
+        if not isinstance(clocks, dict):
+            continue
+        for key, record in clocks.items():
+            if not isinstance(record, dict):
+                continue
+            name = record.get("name") or record.get("faction") or key
+            yield f"{source}/{key}", key, name, source, source, record, prefix + ("clocks", key)
+
+
+def _faction_clocks(source, doc):
+    """data/factions.json: major_factions.<id>.clocks[]."""
+    for faction_id, faction in (doc.get("major_factions") or {}).items():
+        if not isinstance(faction, dict) or not isinstance(faction.get("clocks"), list):
+            continue
+        for record in faction["clocks"]:
+            if not isinstance(record, dict) or "name" not in record:
+                continue
+            key = slug(record["name"])
+            yield (f"factions/{faction_id}/{key}", key, record["name"], f"factions/{faction_id}",
+                   faction.get("name", faction_id), record,
+                   ("major_factions", faction_id, "clocks", ("name", record["name"])))
+
+
+def _faction_file_clock(source, doc):
+    """data/factions/<id>.json: a single clock."""
+    record = doc.get("clock")
+    if isinstance(record, dict):
+        key = source.rsplit("/", 1)[-1]
+        yield (source, key, record.get("name", key), "faction_files", doc.get("name", key),
+               record, ("clock",))
+
+
+def _thalmor_clocks(source, doc):
+    """data/thalmor_arcs.json: one clock per arc phase."""
+    arcs = (doc.get("thalmor_overarching_arc") or {}).get("arcs") or []
+    for arc in arcs:
+        if not isinstance(arc, dict) or "arc_id" not in arc:
+            continue
+        for phase in arc.get("phases") or []:
+            if not isinstance(phase, dict) or "phase" not in phase:
+                continue
+            key = f"phase_{phase['phase']}"
+            yield (f"thalmor_arcs/{arc['arc_id']}/{key}", key, phase.get("name", key),
+                   f"thalmor_arcs/{arc['arc_id']}", arc.get("name", arc["arc_id"]), phase,
+                   ("thalmor_overarching_arc", "arcs", ("arc_id", arc["arc_id"]),
+                    "phases", ("phase", phase["phase"])))
+
+
+def _scene_clocks(source, doc):
+    """Campaign state: scene_clocks.<id>."""
+    for key, record in (doc.get("scene_clocks") or {}).items():
+        if isinstance(record, dict):
+            yield (f"scene_clocks/{key}", key, record.get("name", key), "scene_clocks",
+                   "Scene Clocks", record, ("scene_clocks", key))
+
+
+def _resolve(doc, path):
+    """
+    Follow a clock path into a document.
+
+    Path steps are dict keys, or (field, value) pairs selecting the list
+    element whose field equals value (so list reordering is harmless).
+    """
+    node = doc
+    for step in path:
+        if isinstance(step, tuple):
+            field, value = step
+            if not isinstance(node, list):
+                return None
+            node = next((item for item in node
+                         if isinstance(item, dict) and item.get(field) == value), None)
+        elif isinstance(node, dict):
+            node = node.get(step)
+        else:
+            return None
+        if node is None:
+            return None
+    return node
+
+
+def _apply(record, fields, operations):
+    """Replay ("add", n) / ("set", n) operations on a record, clamping each."""
+    current, maximum, default = fields
+    limit = _as_int(record.get(maximum, default), default)
+    value = _as_int(record.get(current, 0))
+    for op, amount in operations:
+        value = value + amount if op == "add" else amount
+        value = max(0, min(limit, value))
+    record[current] = value
+
+
+def source_specs(storage):
+    """(source name, collection, key, reader) for every clock document in storage."""
+    specs = [(key, "data/clocks", key, _clock_file_clocks)
+             for key in sorted(storage.keys("data/clocks")) if not key.startswith("_")]
+    specs.append(("factions", "data", "factions", _faction_clocks))
+    specs += [(f"faction_files/{key}", "data/factions", key, _faction_file_clock)
+              for key in sorted(storage.keys("data/factions"))]
+    specs.append(("thalmor_arcs", "data", "thalmor_arcs", _thalmor_clocks))
+    return specs
+
+
+def source_signatures(storage):
+    """
+    Current signature of every clock document, without parsing any.
+
+    Returns:
+        dict: source name -> JSON-ready signature (None if missing)
+    """
+    signatures = {}
+    for source, collection, key, _ in source_specs(storage):
+        signature = storage.signature(collection, key)
+        signatures[source] = list(signature) if isinstance(signature, tuple) else signature
+    return signatures
+
+
+class ClockEngine:
+    """Registry of every campaign clock with schema-preserving write-back."""
+
+    def __init__(self, storage, state_store=None, hot_clocks=HOT_CLOCKS):
+        """
+        Args:
+            storage: StorageBackend holding data/ (see storage.py)
+            state_store: StateStore for scene clocks (default: the shared one)
+            hot_clocks: Size of the persisted hottest-clocks view
+        """
+        self.storage = storage
+        self.state_store = state_store if state_store is not None else get_state_store(storage)
+        self._lock = threading.RLock()
+        self._clocks = {}
+        self._aliases = {}
+        self._sources = {}
+        self._pending = {}
+        self._batch_depth = 0
+        self._loaded = False
+        self._subscriptions = {}
+        self._watchers = {}
+        self._handles = itertools.count(1)
+        self.hot = HotClocks(hot_clocks)
+        self.history = ClockHistory(storage, self.state_store)
+        self._hot_saved = None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _source_specs(self):
+        """(source name, collection, key, reader) for every clock document."""
+        return source_specs(self.storage)
+
+    def _read(self, collection, key):
+        try:
+            return self.storage.get(collection, key)
+        except (IOError, ValueError) as e:
+            print(f"Warning: Error reading {collection}/{key}: {e}")
+            return None
+
+    def _index(self, source, doc, reader):
+        """Replace a source's clocks in the registry with those in doc."""
+        for clock_id in self._sources.get(source, {}).get("ids", ()):
+            clock = self._clocks.pop(clock_id, None)
+            self.hot.remove(clock_id)
+            if clock is not None:
+                for alias in {clock.key, slug(clock.key), slug(clock.name)}:
+                    self._aliases.get(alias, set()).discard(clock_id)
+        ids = []
+        if isinstance(doc, dict):
+            for clock_id, key, name, group, group_name, record, path in reader(source, doc):
+                fields = _fields(record, GROUP_DEFAULT_SEGMENTS.get(group, DEFAULT_SEGMENTS))
+                if fields is None:
+                    continue
+                clock = Clock(clock_id, key, str(name), source, group, group_name, record, fields, path)
+                self._clocks[clock_id] = clock
+                self.hot.update(clock_id, clock.ratio, clock.current, clock.to_dict())
+                ids.append(clock_id)
+                for alias in {key, slug(key), slug(name)}:
+                    self._aliases.setdefault(alias, set()).add(clock_id)
+        return ids
+
+    def _load_source(self, source, collection, key, reader):
+        doc = self._read(collection, key)
+        ids = self._index(source, doc, reader)
+        self._sources[source] = {"collection": collection, "key": key, "reader": reader,
+                                 "doc": doc, "ids": ids,
+                                 "token": self.storage.signature(collection, key)}
+
+    def refresh(self):
+        """
+        Load clocks, re-reading only documents that changed since last time.
+
+        Sources with unsaved advances are kept as they are.
+
+        Returns:
+            ClockEngine: self
+        """
+        with self._lock:
+            specs = self._source_specs()
+            wanted = {spec[0] for spec in specs}
+            for source in [s for s in self._sources if s != "scene_clocks" and s not in wanted]:
+                self._index(source, None, None)
+                del self._sources[source]
+            for source, collection, key, reader in specs:
+                known = self._sources.get(source)
+                if known is not None and (source in self._pending or
+                                          known["token"] == self.storage.signature(collection, key)):
+                    continue
+                self._load_source(source, collection, key, reader)
+            self._refresh_scene_clocks()
+            self._loaded = True
+            return self
+
+    def _refresh_scene_clocks(self):
+        """Scene clocks live in the shared state document: always re-index."""
+        state = self.state_store.load()
+        ids = self._index("scene_clocks", state, _scene_clocks)
+        self._sources["scene_clocks"] = {"collection": self.state_store.collection,
+                                         "key": self.state_store.key, "reader": _scene_clocks,
+                                         "doc": state, "ids": ids, "token": None}
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.refresh()
+
+    def invalidate(self):
+        """Drop everything loaded, including unsaved advances."""
+        with self._lock:
+            self._clocks.clear()
+            self._aliases.clear()
+            self._sources.clear()
+            self._pending.clear()
+            self.hot.clear()
+            self._hot_saved = None
+            self.history.invalidate()
+            self._loaded = False
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def get(self, clock_id):
+        """The Clock with a qualified id, or None."""
+        self._ensure_loaded()
+        return self._clocks.get(clock_id)
+
+    def __getitem__(self, clock_id):
+        clock = self.get(clock_id)
+        if clock is None:
+            raise ClockError(f"Unknown clock: {clock_id}")
+        return clock
+
+    def __contains__(self, clock_id):
+        return self.get(clock_id) is not None
+
+    def __iter__(self):
+        self._ensure_loaded()
+        return iter(list(self._clocks.values()))
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._clocks)
+
+    @property
+    def sources(self):
+        """Names of the loaded clock documents (e.g. "civil_war_clocks")."""
+        self._ensure_loaded()
+        return [source for source, info in self._sources.items() if info["doc"] is not None]
+
+    def clocks(self, source=None, group=None):
+        """
+        Clocks in document order, optionally limited to a source or group.
+
+        Args:
+            source: Source name ("civil_war_clocks", "factions", ...)
+            group: Group id ("factions/imperial_legion", "thalmor_arcs/perpetual_war")
+        """
+        self._ensure_loaded()
+        if source is not None:
+            ids = self._sources.get(source, {}).get("ids", ())
+            found = [self._clocks[clock_id] for clock_id in ids]
+        else:
+            found = list(self._clocks.values())
+        if group is not None:
+            found = [clock for clock in found if clock.group == group]
+        return found
+
+    def find(self, name):
+        """
+        Clocks matching an unqualified key or name ("companions_trust",
+        "Military Dominance").
+
+        Returns:
+            list: Matching clocks, sorted by id
+        """
+        self._ensure_loaded()
+        if name in self._clocks:
+            return [self._clocks[name]]
+        ids = self._aliases.get(name, set()) | self._aliases.get(slug(name), set())
+        return [self._clocks[clock_id] for clock_id in sorted(ids)]
+
+    # ------------------------------------------------------------------
+    # Hottest clocks
+    # ------------------------------------------------------------------
+
+    def hottest(self, n=None):
+        """
+        The fullest clocks, hottest first (from the incremental view).
+
+        Args:
+            n: Number of clocks (default: the view size)
+
+        Returns:
+            list: Clock dicts (id, name, source, group, current, max, ratio)
+        """
+        self._ensure_loaded()
+        return self.hot.top(n)
+
+    def _save_hot_clocks(self, force=False):
+        """
+        Cache the hottest-clocks view if it, or any clock document, changed
+        since it was last written. Call after clock documents are committed,
+        so the recorded signatures match the files on disk.
+        """
+        cached = (self.hot.top(), source_signatures(self.storage))
+        if self._hot_saved is None and not force:
+            try:
+                saved = self.storage.get(HOT_CLOCKS_COLLECTION, HOT_CLOCKS_KEY)
+            except (IOError, ValueError):
+                saved = None
+            if isinstance(saved, dict):
+                self._hot_saved = (saved.get("clocks"), saved.get("sources"))
+        if not force and cached == self._hot_saved:
+            return False
+        clocks, sources = cached
+        self.storage.put(HOT_CLOCKS_COLLECTION, HOT_CLOCKS_KEY, {
+            "description": "Hottest clocks by fill ratio, cached by clock_engine.py and rebuilt "
+                           "when a clock file changes. Rebuild with: python clock_engine.py rebuild",
+            "k": self.hot.k,
+            "last_updated": datetime.now().strftime(TIMESTAMP_FORMAT),
+            "sources": sources,
+            "clocks": clocks,
+        })
+        self._hot_saved = cached
+        return True
+
+    def rebuild_hot_clocks(self):
+        """
+        Rescan every clock document and rewrite the hottest-clocks view.
+
+        Returns:
+            list: The rebuilt view, hottest first
+        """
+        with self._lock:
+            if self._pending:
+                self.save()
+            self.invalidate()
+            self.refresh()
+            self._save_hot_clocks(force=True)
+            return self.hot.top()
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe(self, callback, threshold="fill", clock_id=None, group=None, source=None,
+                  once=False, name=None):
+        """
+        Call callback(event) each time a threshold is crossed.
+
+        Crossings are detected as clocks change, so a subscriber runs once
+        per crossing; a clock that drops back and fills again fires again.
+        When one change crosses several thresholds they fire in the order
+        they were crossed, narrower scopes first at the same segment.
+
+        Args:
+            callback: Called with the change dict of advance() plus
+                      "threshold" (the Threshold) and "direction"
+            threshold: Threshold or spec ("fill", "75%", 3, "below:2")
+            clock_id: Watch one clock
+            group: Watch a group ("factions/thalmor", "thalmor_arcs/perpetual_war")
+            source: Watch a source ("civil_war_clocks", "factions", ...)
+            once: Unsubscribe after the first crossing
+            name: Handle to use; subscribing again under the same name
+                  replaces the earlier subscription
+
+        Returns:
+            str: Handle for unsubscribe()
+        """
+        scopes = [scope for scope in (("clock", clock_id), ("group", group), ("source", source))
+                  if scope[1] is not None]
+        if len(scopes) > 1:
+            raise ClockError("Subscribe to one of clock_id, group or source")
+        scope = scopes[0] if scopes else ("all", None)
+        threshold = Threshold.parse(threshold)
+        with self._lock:
+            handle = name if name is not None else f"subscription-{next(self._handles)}"
+            self.unsubscribe(handle)
+            subscription = Subscription(handle, callback, threshold, scope, once)
+            self._subscriptions[handle] = subscription
+            self._watchers.setdefault(scope, []).append(subscription)
+            return handle
+
+    def unsubscribe(self, handle):
+        """
+        Remove a subscription.
+
+        Returns:
+            bool: True if it existed
+        """
+        with self._lock:
+            subscription = self._subscriptions.pop(handle, None)
+            if subscription is None:
+                return False
+            watchers = self._watchers[subscription.scope]
+            watchers.remove(subscription)
+            if not watchers:
+                del self._watchers[subscription.scope]
+            return True
+
+    def _notify(self, clock, old, new):
+        """Run the subscribers whose thresholds the change crossed."""
+        maximum = clock.maximum
+        direction = "up" if new > old else "down"
+        candidates = []
+        for scope in (("clock", clock.id), ("group", clock.group), ("source", clock.source), ("all", None)):
+            candidates.extend(self._watchers.get(scope, ()))
+        fired = [sub for sub in candidates
+                 if sub.threshold.direction == direction and sub.threshold.crossed(old, new, maximum)]
+        # Lower thresholds first on the way up, higher ones first on the way down
+        fired.sort(key=lambda sub: sub.threshold.segment(maximum), reverse=direction == "down")
+        for subscription in fired:
+            if subscription.once:
+                self.unsubscribe(subscription.handle)
+            event = {"id": clock.id, "old": old, "new": new, "max": maximum, "clock": clock,
+                     "threshold": subscription.threshold, "direction": direction}
+            try:
+                subscription.callback(event)
+            except Exception as e:
+                print(f"Warning: Clock subscriber {subscription.handle} failed on {clock.id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+
+    def _change(self, clock_id, op, amount, cause=None):
+        if isinstance(amount, bool) or not isinstance(amount, int):
+            raise ClockError(f"Clock change must be an integer, got {amount!r}")
+        with self._lock:
+            clock = self[clock_id]
+            old = clock.current
+            _apply(clock.record, clock.fields, [(op, amount)])
+            self.hot.update(clock.id, clock.ratio, clock.current, clock.to_dict())
+            change = {"id": clock.id, "old": old, "new": clock.current, "max": clock.maximum,
+                      "clock": clock}
+            if change["new"] != old:
+                self.history.record(clock.id, change["new"] - old, change["new"], cause)
+                pending = self._pending.setdefault(clock.source, {})
+                pending.setdefault(clock.id, (clock.path, clock.fields, []))[2].append((op, amount))
+            if not self._batch_depth:
+                self.save()
+                # Saving re-reads the source; hand out the live Clock
+                change["clock"] = clock = self._clocks.get(clock.id, clock)
+            if change["new"] != old and self._watchers:
+                self._notify(clock, old, change["new"])
+            return change
+
+    def advance(self, clock_id, segments=1, cause=None):
+        """
+        Advance (or, with a negative amount, set back) a clock.
+
+        Args:
+            clock_id: Qualified clock id
+            segments: Segments to add; the result is clamped to 0..max
+            cause: Label recorded in the clock history
+
+        Returns:
+            dict: {"id", "old", "new", "max", "clock"}
+
+        Raises:
+            ClockError: If the clock does not exist
+        """
+        return self._change(clock_id, "add", segments, cause)
+
+    def set(self, clock_id, value, cause=None):
+        """Set a clock to a value (clamped to 0..max); returns like advance()."""
+        return self._change(clock_id, "set", value, cause)
+
+    def advance_many(self, changes, cause=None):
+        """
+        Advance several clocks and write each touched document once.
+
+        Args:
+            changes: dict or iterable of (clock id, segments)
+            cause: Label recorded in the clock history
+
+        Returns:
+            list: One change dict per advance, in order
+
+        Raises:
+            ClockError: If any clock does not exist (nothing is changed)
+        """
+        changes = list(changes.items() if isinstance(changes, dict) else changes)
+        self._ensure_loaded()
+        unknown = [clock_id for clock_id, _ in changes if clock_id not in self._clocks]
+        if unknown:
+            raise ClockError(f"Unknown clock(s): {', '.join(unknown)}")
+        with self.batch():
+            return [self.advance(clock_id, segments, cause) for clock_id, segments in changes]
+
+    @contextmanager
+    def batch(self):
+        """Defer writing until the outermost batch() block exits."""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            if not self._batch_depth:
+                self.save()
+
+    @property
+    def dirty(self):
+        """True if some advances have not been written."""
+        return bool(self._pending)
+
+    def save(self):
+        """
+        Write pending advances, once per touched document.
+
+        Data files are written in one storage transaction with
+        storage.update(), replaying the advances on a fresh copy if another
+        writer got there first; scene clocks are saved via the state store.
+        The change log (see clock_history.py) is written in the same
+        transaction; the hottest-clocks cache is refreshed once it commits.
+
+        Returns:
+            int: Number of documents written
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            written = 0
+            try:
+                with self.storage.transaction():
+                    for source, clocks in pending.items():
+                        if source == "scene_clocks":
+                            continue
+                        if self._save_source(source, clocks):
+                            written += 1
+                    if self.history.save():
+                        written += 1
+                if "scene_clocks" in pending:
+                    self.state_store.save(sections=["scene_clocks"])
+                    written += 1
+                if self._save_hot_clocks():
+                    written += 1
+            except BaseException:
+                # Storage discarded the writes; forget the in-memory advances too
+                self.invalidate()
+                raise
+            return written
+
+    def _save_source(self, source, clocks):
+        info = self._sources[source]
+        stamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        result = {}
+
+        def _mutate(doc):
+            if not isinstance(doc, dict):
+                return None
+            for path, fields, operations in clocks.values():
+                record = _resolve(doc, path)
+                if isinstance(record, dict):
+                    _apply(record, fields, operations)
+                    # Stamp the section holding the clocks if it tracks updates
+                    parent = _resolve(doc, path[:-2]) if len(path) > 2 else doc
+                    if isinstance(parent, dict) and "last_updated" in parent:
+                        parent["last_updated"] = stamp
+            result["doc"] = doc
+            return True
+
+        if not self.storage.update(info["collection"], info["key"], _mutate):
+            return False
+        info["ids"] = self._index(source, result["doc"], info["reader"])
+        info["doc"] = result["doc"]
+        info["token"] = self.storage.signature(info["collection"], info["key"])
+        return True
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _record_filled_clock(engine, event):
+    """Record a filled clock as a world consequence (campaign subscriber)."""
+    clock = event["clock"]
+    state = engine.state_store.load()
+    if not state:
+        return
+    consequences = state.setdefault("world_consequences", {})
+    consequences.setdefault("clocks_filled", []).append({
+        "clock": clock.id,
+        "name": clock.name,
+        "effect": clock.get("completion_effect") or clock.get("effect"),
+        "timestamp": datetime.now().strftime(TIMESTAMP_FORMAT),
+    })
+    state["last_updated"] = datetime.now().strftime(TIMESTAMP_FORMAT)
+    engine.state_store.save(state, sections=["world_consequences", "last_updated"])
+
+
+def _announce_thalmor_phase(engine, event):
+    """Announce the next phase of a Thalmor arc when one fills (campaign subscriber)."""
+    clock = event["clock"]
+    phases = engine.clocks(group=clock.group)
+    position = next((i for i, phase in enumerate(phases) if phase.id == clock.id), None)
+    if position is None or position + 1 >= len(phases):
+        print(f"⚠️  THALMOR ARC COMPLETE: {clock.group_name}")
+        return
+    upcoming = phases[position + 1]
+    print(f"⚠️  THALMOR ESCALATION: {clock.group_name} enters Phase "
+          f"{upcoming.get('phase')}: {upcoming.name}")
+
+
+def _subscribe_campaign_effects(engine):
+    """Register the subscribers every shared engine carries."""
+    engine.subscribe(functools.partial(_record_filled_clock, engine), "fill",
+                     name="story.clock_consequences")
+    engine.subscribe(functools.partial(_announce_thalmor_phase, engine), "fill",
+                     source="thalmor_arcs", name="story.thalmor_escalation")
+
+
+def get_clock_engine(storage, state_store=None):
+    """
+    Get the process-wide ClockEngine for a storage backend.
+
+    Engines are shared by data location, like state stores, so every
+    manager sees the same clocks. A new engine is subscribed to the
+    campaign's fill effects (see _subscribe_campaign_effects).
+    """
+    cache_key = storage.location("data", "factions")
+    with _engines_lock:
+        engine = _engines.get(cache_key)
+        if engine is None:
+            engine = ClockEngine(storage, state_store)
+            _subscribe_campaign_effects(engine)
+            _engines[cache_key] = engine
+        return engine
+
+
+def read_hot_clocks(storage, rebuild=True):
+    """
+    The cached hottest-clocks view, without parsing any clock files.
+
+    The cache is only used if every clock document still has the signature
+    it was built from.
+
+    Args:
+        storage: StorageBackend holding data/ and state/
+        rebuild: Rebuild (and cache) the view if it is missing or stale
+
+    Returns:
+        list: Clock dicts, hottest first ([] if stale and rebuild is False)
+    """
+    try:
+        doc = storage.get(HOT_CLOCKS_COLLECTION, HOT_CLOCKS_KEY)
+    except (IOError, ValueError) as e:
+        print(f"Warning: Error reading {HOT_CLOCKS_KEY}.json: {e}")
+        doc = None
+    if (isinstance(doc, dict) and isinstance(doc.get("clocks"), list)
+            and doc.get("sources") == source_signatures(storage)):
+        return doc["clocks"]
+    if not rebuild:
+        return []
+    return get_clock_engine(storage).rebuild_hot_clocks()
+
+
+def main():
+    """List or advance clocks from the command line"""
+    root = Path(__file__).resolve().parent.parent
+    ap = argparse.ArgumentParser(description="Inspect and advance campaign clocks.")
+    ap.add_argument("--data-dir", default=str(root / "data"), help="Data directory")
+    ap.add_argument("--state-dir", default=str(root / "state"), help="State directory")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ls = sub.add_parser("list", help="List clocks")
+    ls.add_argument("--source", help="Only clocks from this source (e.g. civil_war_clocks)")
+    sub.add_parser("hot", help="Show the cached hottest clocks")
+    sub.add_parser("rebuild", help="Rescan all clocks and rewrite the hottest-clocks cache")
+    adv = sub.add_parser("advance", help="Advance clocks by id")
+    adv.add_argument("changes", nargs="+", metavar="ID=N", help="Clock id and segments, e.g. factions/thalmor/intelligence_network=1")
+    args = ap.parse_args()
+
+    storage = get_storage(args.data_dir, args.state_dir)
+    if args.command in ("hot", "rebuild"):
+        if args.command == "hot":
+            clocks = read_hot_clocks(storage)
+        else:
+            clocks = get_clock_engine(storage).rebuild_hot_clocks()
+        for clock in clocks:
+            print(f"{clock['id']:<60} {clock['current']:>3}/{clock['max']:<3} {clock['ratio'] * 100:>4.0f}%")
+        return 0
+
+    engine = get_clock_engine(storage).refresh()
+    if args.command == "list":
+        for clock in engine.clocks(source=args.source):
+            print(f"{clock.id:<60} {clock.current:>3}/{clock.maximum:<3} {clock.name}")
+        return 0
+
+    changes = []
+    for item in args.changes:
+        clock_id, _, amount = item.partition("=")
+        try:
+            changes.append((clock_id, int(amount or 1)))
+        except ValueError:
+            print(f"Error: Invalid change: {item}")
+            return 1
+    try:
+        for change in engine.advance_many(changes, cause="cli"):
+            print(f"{change['id']}: {change['old']} -> {change['new']}/{change['max']}")
+    except ClockError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Clock Forecaster for Skyrim TTRPG
+
+Answers "what fills first in the next few turns?" by simulating thousands
+of futures for the world clocks (faction clocks, the active Thalmor arc
+phases and the civil-war and Thalmor-influence clocks) in one pass:
+
+    engine = get_clock_engine(storage)
+    report = forecast(engine, turns=3, trials=5000, seed=1)
+    print(format_forecast(report))
+
+Each turn a clock advances by a number of segments drawn from its advance
+distribution, unless a hostile faction interferes. Distributions come from
+a model dict, most specific entry first:
+
+    {
+        "default":  {"advance": {"0": 0.25, "1": 0.5, "2": 0.25}},
+        "sources":  {"thalmor_arcs": {"advance": {"0": 0.5, "1": 0.5}}},
+        "clocks":   {"factions/thalmor/intelligence_network": {"advance": {"1": 1}}},
+        "interference": {"hostility": -50, "chance": 0.15}
+    }
+
+Interference: for a faction clock, each faction whose relationship toward
+the owner is at or below `hostility` independently cancels that turn's
+advance with probability `chance`.
+
+The report gives, per clock, the chance it fills within the horizon, its
+fill-turn distribution and the chance it is the first to fill, plus the
+pairs of clocks likely to fill on the same turn. NumPy is used when it is
+installed (every clock and trial is drawn as one array); otherwise the same
+model runs in pure Python.
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import random
+import sys
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # Pure-Python fallback; same model, slower
+    np = None
+
+from clock_engine import ClockError, get_clock_engine
+from storage import get_storage
+
+
+# Clock sources (first part of the clock id) that advance on world turns
+DEFAULT_SOURCES = ("factions", "faction_files", "thalmor_arcs",
+                   "civil_war_clocks", "thalmor_influence_clocks")
+
+DEFAULT_MODEL = {
+    "default": {"advance": {"0": 0.25, "1": 0.5, "2": 0.25}},
+    "interference": {"hostility": -50, "chance": 0.15},
+}
+
+# Pairs that fill on the same turn at least this often are reported
+COLLISION_THRESHOLD = 0.05
+
+
+def _distribution(spec, clock_id):
+    """Validate an advance distribution into (values, probabilities)."""
+    try:
+        pairs = sorted((int(value), float(weight)) for value, weight in spec.items())
+    except (AttributeError, TypeError, ValueError):
+        raise ClockError(f"{clock_id}: advance must map segments to weights, got {spec!r}") from None
+    total = sum(weight for _, weight in pairs)
+    if not pairs or total <= 0 or any(value < 0 or weight < 0 for value, weight in pairs):
+        raise ClockError(f"{clock_id}: advance segments and weights must be non-negative "
+                         f"and the weights not all zero")
+    return [value for value, _ in pairs], [weight / total for _, weight in pairs]
+
+
+def _hostiles(storage, threshold):
+    """Faction id -> number of factions hostile toward it (from factions.json)."""
+    try:
+        data = storage.get("data", "factions") or {}
+    except (IOError, ValueError) as e:
+        print(f"Warning: Error reading factions.json: {e}")
+        return {}
+    counts = {}
+    for faction in (data.get("major_factions") or {}).values():
+        if not isinstance(faction, dict):
+            continue
+        for target, value in (faction.get("relationships") or {}).items():
+            if isinstance(value, (int, float)) and value <= threshold:
+                counts[target] = counts.get(target, 0) + 1
+    return counts
+
+
+def plan(engine, model=None, sources=DEFAULT_SOURCES):
+    """
+    Collect the clocks to simulate and their advance models.
+
+    Full clocks are skipped, and only the first unfilled phase of each
+    Thalmor arc is simulated (later phases wait for it).
+
+    Args:
+        engine: ClockEngine
+        model: Model dict (see module docstring; default: DEFAULT_MODEL)
+        sources: Clock id prefixes to include
+
+    Returns:
+        list: dicts with id, name, current, max, values, probs, block
+    """
+    model = model or DEFAULT_MODEL
+    default = (model.get("default") or DEFAULT_MODEL["default"])["advance"]
+    by_source = model.get("sources") or {}
+    by_clock = model.get("clocks") or {}
+    interference = dict(DEFAULT_MODEL["interference"], **(model.get("interference") or {}))
+    hostiles = _hostiles(engine.storage, interference["hostility"])
+
+    clocks = []
+    active_arcs = set()
+    for clock in engine.refresh():
+        source = clock.id.split("/", 1)[0]
+        if source not in sources or clock.filled:
+            continue
+        if source == "thalmor_arcs":
+            if clock.group in active_arcs:
+                continue
+            active_arcs.add(clock.group)
+        spec = (by_clock.get(clock.id) or by_source.get(source) or {}).get("advance", default)
+        values, probs = _distribution(spec, clock.id)
+        block = 0.0
+        if source == "factions":
+            hostile = hostiles.get(clock.group.split("/", 1)[1], 0)
+            block = 1 - (1 - interference["chance"]) ** hostile
+        clocks.append({"id": clock.id, "name": clock.name, "current": clock.current,
+                       "max": clock.maximum, "values": values, "probs": probs, "block": block})
+    return clocks
+
+
+def _fill_turns_numpy(clocks, turns, trials, seed):
+    """(trials x clocks) array of fill turns; turns + 1 means not filled."""
+    rng = np.random.default_rng(seed)
+    fill = np.full((trials, len(clocks)), turns + 1, dtype=np.int64)
+    for index, clock in enumerate(clocks):
+        steps = rng.choice(clock["values"], size=(trials, turns), p=clock["probs"])
+        if clock["block"]:
+            steps[rng.random((trials, turns)) < clock["block"]] = 0
+        filled = clock["current"] + np.cumsum(steps, axis=1) >= clock["max"]
+        hit = filled.any(axis=1)
+        fill[hit, index] = filled[hit].argmax(axis=1) + 1
+    return fill
+
+
+def _fill_turns_python(clocks, turns, trials, seed):
+    rng = random.Random(seed)
+    draw = rng.random
+    cumulative = [list(itertools.accumulate(clock["probs"])) for clock in clocks]
+    rows = []
+    for _ in range(trials):
+        row = []
+        for clock, cum in zip(clocks, cumulative):
+            values, block, last = clock["values"], clock["block"], len(cum) - 1
+            progress, turn = clock["current"], turns + 1
+            for step in range(1, turns + 1):
+                if not (block and draw() < block):
+                    progress += values[min(bisect.bisect(cum, draw()), last)]
+                if progress >= clock["max"]:
+                    turn = step
+                    break
+            row.append(turn)
+        rows.append(row)
+    return rows
+
+
+def _summarize_numpy(clocks, fill, turns, trials):
+    counts = [np.bincount(fill[:, index], minlength=turns + 2) for index in range(len(clocks))]
+    first = fill.min(axis=1, keepdims=True)
+    winners = (fill == first) & (first <= turns)
+    share = (winners / np.maximum(winners.sum(axis=1, keepdims=True), 1)).sum(axis=0)
+    together = np.zeros((len(clocks), len(clocks)))
+    for turn in range(1, turns + 1):
+        at = (fill == turn).astype(np.float64)
+        together += at.T @ at
+    return [count.tolist() for count in counts], share.tolist(), together.tolist()
+
+
+def _summarize_python(clocks, rows, turns, trials):
+    size = len(clocks)
+    counts = [[0] * (turns + 2) for _ in range(size)]
+    share = [0.0] * size
+    together = [[0] * size for _ in range(size)]
+    for row in rows:
+        by_turn = {}
+        for index, turn in enumerate(row):
+            counts[index][turn] += 1
+            if turn <= turns:
+                by_turn.setdefault(turn, []).append(index)
+        if by_turn:
+            winners = by_turn[min(by_turn)]
+            for index in winners:
+                share[index] += 1 / len(winners)
+        for group in by_turn.values():
+            for a in group:
+                for b in group:
+                    together[a][b] += 1
+    return counts, share, together
+
+
+def forecast(engine, turns=3, trials=5000, seed=None, model=None, sources=DEFAULT_SOURCES,
+             use_numpy=None):
+    """
+    Simulate the world clocks over the next turns.
+
+    Args:
+        engine: ClockEngine
+        turns: Horizon in turns
+        trials: Number of simulated futures
+        seed: RNG seed for reproducible runs
+        model: Model dict (see module docstring)
+        sources: Clock id prefixes to simulate
+        use_numpy: Force (True) or disable (False) NumPy; default: if installed
+
+    Returns:
+        dict: {"turns", "trials", "backend", "clocks": [...], "collisions": [...]},
+              clocks sorted by chance to fill, highest first
+    """
+    if turns < 1 or trials < 1:
+        raise ClockError("turns and trials must be positive")
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise ClockError("NumPy is not installed")
+    clocks = plan(engine, model, sources)
+
+    if not clocks:
+        counts, share, together = [], [], []
+    elif use_numpy:
+        fill = _fill_turns_numpy(clocks, turns, trials, seed)
+        counts, share, together = _summarize_numpy(clocks, fill, turns, trials)
+    else:
+        rows = _fill_turns_python(clocks, turns, trials, seed)
+        counts, share, together = _summarize_python(clocks, rows, turns, trials)
+
+    results = []
+    for index, clock in enumerate(clocks):
+        filled = sum(counts[index][1:turns + 1])
+        by_turn = {turn: counts[index][turn] / trials for turn in range(1, turns + 1)}
+        mean = (sum(turn * counts[index][turn] for turn in range(1, turns + 1)) / filled
+                if filled else None)
+        results.append({
+            "id": clock["id"], "name": clock["name"], "current": clock["current"], "max": clock["max"],
+            "p_fill": filled / trials,
+            "p_first": share[index] / trials,
+            "fill_turns": by_turn,
+            "mean_fill_turn": mean,
+        })
+
+    collisions = []
+    for a in range(len(clocks)):
+        for b in range(a + 1, len(clocks)):
+            probability = together[a][b] / trials
+            if probability >= COLLISION_THRESHOLD:
+                collisions.append({"clocks": [clocks[a]["id"], clocks[b]["id"]],
+                                   "probability": probability})
+    collisions.sort(key=lambda item: -item["probability"])
+    results.sort(key=lambda item: (-item["p_fill"], -item["p_first"], item["id"]))
+    return {"turns": turns, "trials": trials, "backend": "numpy" if use_numpy else "python",
+            "clocks": results, "collisions": collisions}
+
+
+def format_forecast(report, top=10):
+    """Render a forecast report as a text table."""
+    turns = report["turns"]
+    lines = [f"Clock forecast: {report['trials']} futures over {turns} turn(s) ({report['backend']})",
+             f"{'clock':<55} {'now':>7} {'fills':>6} {'first':>6}  by turn"]
+    for clock in report["clocks"][:top]:
+        by_turn = " ".join(f"{clock['fill_turns'][turn] * 100:>3.0f}%" for turn in range(1, turns + 1))
+        lines.append(f"{clock['id']:<55} {clock['current']:>3}/{clock['max']:<3} "
+                     f"{clock['p_fill'] * 100:>5.1f}% {clock['p_first'] * 100:>5.1f}%  {by_turn}")
+    if report["collisions"]:
+        lines.append("Likely to fill on the same turn:")
+        for collision in report["collisions"][:top]:
+            lines.append(f"  {collision['probability'] * 100:>5.1f}%  {' + '.join(collision['clocks'])}")
+    return "\n".join(lines)
+
+
+def main():
+    """Forecast clock fills from the command line"""
+    root = Path(__file__).resolve().parent.parent
+    ap = argparse.ArgumentParser(description="Monte Carlo forecast of campaign clock fills.")
+    ap.add_argument("--data-dir", default=str(root / "data"), help="Data directory")
+    ap.add_argument("--state-dir", default=str(root / "state"), help="State directory")
+    ap.add_argument("--turns", type=int, default=3, help="Turns to look ahead (default: 3)")
+    ap.add_argument("--trials", type=int, default=5000, help="Simulated futures (default: 5000)")
+    ap.add_argument("--seed", type=int, help="RNG seed")
+    ap.add_argument("--model", help="JSON file with advance distributions (see module docstring)")
+    ap.add_argument("--source", action="append", help="Clock source to include (repeatable)")
+    ap.add_argument("--top", type=int, default=10, help="Rows to show (default: 10)")
+    ap.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    ap.add_argument("--pure-python", action="store_true", help="Do not use NumPy")
+    args = ap.parse_args()
+
+    model = None
+    if args.model:
+        try:
+            model = json.loads(Path(args.model).read_text(encoding="utf-8"))
+        except (IOError, ValueError) as e:
+            print(f"Error: Cannot read model {args.model}: {e}")
+            return 1
+    engine = get_clock_engine(get_storage(args.data_dir, args.state_dir))
+    try:
+        report = forecast(engine, args.turns, args.trials, args.seed, model,
+                          tuple(args.source) if args.source else DEFAULT_SOURCES,
+                          use_numpy=False if args.pure_python else None)
+    except ClockError as e:
+        print(f"Error: {e}")
+        return 1
+    print(json.dumps(report, indent=2) if args.json else format_forecast(report, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+Clock History for Skyrim TTRPG
+
+Clock files only hold each clock's current value. The clock engine also
+appends every change to a time series stored in state/clock_history.json,
+one row per change:
+
+    time     when the change was made (epoch seconds)
+    clock    qualified clock id (see clock_engine.py)
+    delta    segments added (negative for setbacks)
+    value    the clock's value afterwards
+    session  campaign session_count at the time (-1 if unknown)
+    day      in-game day (world_state in_game_days_passed, -1 if unknown)
+    cause    free-form label ("world_turn", "story", ...)
+    count    number of changes folded into the row by compaction
+
+Rows are held column by column in typed arrays and written as one list per
+column, with clock ids and causes interned, so a long campaign costs a few
+numbers per change instead of snapshots of every clock file.
+
+Each save appends the new rows as a segment document in
+state/clock_history/, so concurrent writers never overwrite each other's
+rows and a save costs only what it adds. Segments are folded into
+state/clock_history.json (with compare-and-swap) once there are
+MAX_SEGMENTS of them or on compaction; the base lists the segments it
+absorbed, so a fold interrupted before deleting them is not counted twice.
+
+    history = get_clock_engine(storage).history
+    history.query(prefix="thalmor_influence_clocks", sessions=(10, 20))
+    history.aggregate("session", prefix="thalmor_influence_clocks")    # net change per session
+    history.aggregate("session", prefix="thalmor_influence_clocks",
+                      metric="value")                                 # total at each session's end
+
+Session, day and cause default to the campaign state and world state; code
+that knows better sets them for a block:
+
+    with history.context(cause="world_turn", day=42):
+        engine.advance("factions/thalmor/intelligence_network")
+
+Compaction downsamples old rows: every session before the most recent
+KEEP_SESSIONS is reduced to one row per clock (deltas summed, last value
+kept). It runs when segments are folded once the log passes MAX_ROWS rows,
+or on demand.
+"""
+
+import argparse
+import os
+import secrets
+import sys
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from storage import DEFAULT_RETRIES, ConflictError, get_storage
+
+
+HISTORY_COLLECTION = "state"
+HISTORY_KEY = "clock_history"
+SEGMENT_COLLECTION = f"{HISTORY_COLLECTION}/{HISTORY_KEY}"
+
+# (column, array typecode), in storage order
+COLUMNS = (
+    ("time", "d"),
+    ("clock", "q"),
+    ("delta", "q"),
+    ("value", "q"),
+    ("session", "q"),
+    ("day", "q"),
+    ("cause", "q"),
+    ("count", "q"),
+)
+
+# Sessions kept at full resolution by compaction
+KEEP_SESSIONS = 10
+
+# Row count past which folding segments also compacts
+MAX_ROWS = 5000
+
+# Unfolded segments past which save() folds them into the base document
+MAX_SEGMENTS = 20
+
+CONTEXT_FIELDS = ("session", "day", "cause")
+BUCKETS = ("session", "day", "clock", "cause")
+METRICS = ("delta", "value", "changes")
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return value.timestamp()
+
+
+class ClockHistory:
+    """
+    Append-only, columnar log of clock changes.
+
+    Loaded lazily from storage; save() appends the rows recorded since the
+    last save as a new segment (the clock engine calls it inside its save
+    transaction).
+    """
+
+    def __init__(self, storage, state_store=None, keep_sessions=KEEP_SESSIONS, max_rows=MAX_ROWS):
+        """
+        Args:
+            storage: StorageBackend holding state/ and data/
+            state_store: StateStore for the session number (optional)
+            keep_sessions: Recent sessions compaction leaves untouched
+            max_rows: Row count that triggers compaction on save
+        """
+        self.storage = storage
+        self.state_store = state_store
+        self.keep_sessions = keep_sessions
+        self.max_rows = max_rows
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._defaults = None
+        self._overrides = []
+        self._reset()
+
+    def _reset(self):
+        self.columns = {name: array(code) for name, code in COLUMNS}
+        self.clock_ids = []
+        self.causes = [""]
+        self._clock_index = {}
+        self._cause_index = {"": 0}
+        self._pending = []
+        self._segments = 0
+        self._compact_keep = None
+        self._dirty = False
+
+    def __len__(self):
+        self._load()
+        return len(self.columns["time"])
+
+    # ------------------------------------------------------------------
+    # Loading and saving
+    # ------------------------------------------------------------------
+
+    def _extend(self, doc, name):
+        """Append the rows of a stored base or segment document."""
+        if not isinstance(doc, dict):
+            return
+        columns = doc.get("columns") or {}
+        if len({len(columns.get(column) or ()) for column, _ in COLUMNS}) != 1:
+            print(f"Warning: Error reading {name}.json: columns differ in length")
+            return
+        clocks = [self._intern_clock(clock_id) for clock_id in doc.get("clocks") or []]
+        causes = [self._intern_cause(cause) for cause in doc.get("causes") or [""]]
+        try:
+            columns = dict(columns,
+                           clock=[clocks[i] for i in columns["clock"]],
+                           cause=[causes[i] for i in columns["cause"]])
+        except (IndexError, TypeError) as e:
+            print(f"Warning: Error reading {name}.json: {e}")
+            return
+        for column, _ in COLUMNS:
+            self.columns[column].extend(columns[column])
+
+    def _read(self):
+        """
+        Replace the in-memory log with the stored base and its segments.
+
+        Returns:
+            tuple: (base document, its version, segment keys read)
+        """
+        self._reset()
+        try:
+            base, version = self.storage.get_versioned(HISTORY_COLLECTION, HISTORY_KEY)
+        except (IOError, ValueError) as e:
+            print(f"Warning: Error reading {HISTORY_KEY}.json: {e}")
+            base, version = None, None
+        self._extend(base, HISTORY_KEY)
+        folded = set(base.get("segments") or []) if isinstance(base, dict) else set()
+        keys = sorted(key for key in self.storage.keys(SEGMENT_COLLECTION) if key not in folded)
+        for key in keys:
+            try:
+                self._extend(self.storage.get(SEGMENT_COLLECTION, key), key)
+            except (IOError, ValueError) as e:
+                print(f"Warning: Error reading {key}.json: {e}")
+        self._segments = len(keys)
+        return base, version, keys
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            self._read()
+            self._loaded = True
+
+    def _document(self, rows):
+        """Serialize rows (in-memory interning) with their own interned ids."""
+        clocks, causes = {}, {"": 0}
+        columns = {name: [] for name, _ in COLUMNS}
+        for row in rows:
+            row = list(row)
+            row[1] = clocks.setdefault(self.clock_ids[row[1]], len(clocks))
+            row[6] = causes.setdefault(self.causes[row[6]], len(causes))
+            for (name, _), value in zip(COLUMNS, row):
+                columns[name].append(value)
+        return {"clocks": list(clocks), "causes": list(causes), "columns": columns}
+
+    def _write_segment(self):
+        """Store the rows recorded since the last save as a new segment."""
+        key = f"{time.time_ns():020d}-{os.getpid()}-{secrets.token_hex(4)}"
+        self.storage.compare_and_put(SEGMENT_COLLECTION, key, self._document(self._pending), None)
+        self._pending = []
+        self._segments += 1
+
+    def _fold(self, keep_sessions=None):
+        """
+        Merge the stored base and every segment into a new base document.
+
+        Re-reads storage, so rows saved by other writers are kept; the base
+        is replaced with compare-and-swap and the folded segments deleted.
+        """
+        for attempt in range(DEFAULT_RETRIES + 1):
+            base, version, keys = self._read()
+            keep = keep_sessions
+            if keep is None and len(self) > self.max_rows:
+                keep = self.keep_sessions
+            if keep is not None:
+                self._downsample(keep)
+            existing = set(self.storage.keys(SEGMENT_COLLECTION))
+            stale = [key for key in (base or {}).get("segments") or [] if key in existing]
+            doc = self._document(zip(*(self.columns[name] for name, _ in COLUMNS)))
+            doc = {
+                "description": "Clock change log, maintained by clock_engine.py (see clock_history.py)",
+                "last_updated": datetime.now().strftime(TIMESTAMP_FORMAT),
+                "segments": stale + keys,
+                **doc,
+            }
+            try:
+                self.storage.compare_and_put(HISTORY_COLLECTION, HISTORY_KEY, doc, version)
+            except ConflictError:
+                if attempt == DEFAULT_RETRIES:
+                    raise
+                continue
+            for key in stale + keys:
+                self.storage.delete(SEGMENT_COLLECTION, key)
+            self._segments = 0
+            return
+
+    def save(self):
+        """
+        Append the rows recorded since the last save, folding segments into
+        the base document when there are too many or after compact().
+
+        Returns:
+            bool: True if anything was written
+        """
+        with self._lock:
+            if not self._loaded or not self._dirty:
+                return False
+            if self._pending:
+                self._write_segment()
+            fold = (self._compact_keep is not None or self._segments >= MAX_SEGMENTS
+                    or (len(self) > self.max_rows and self._can_downsample(self.keep_sessions)))
+            if fold:
+                self._fold(self._compact_keep)
+            self._compact_keep = None
+            self._dirty = False
+            self._defaults = None
+            return True
+
+    def invalidate(self):
+        """Drop the in-memory log (and unsaved rows); reloaded on next use."""
+        with self._lock:
+            self._loaded = False
+            self._defaults = None
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def context(self, **values):
+        """
+        Set session, day and/or cause for changes recorded in the block.
+
+        Raises:
+            TypeError: For any other keyword
+        """
+        unknown = set(values) - set(CONTEXT_FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown history context: {', '.join(sorted(unknown))}")
+        self._overrides.append(values)
+        try:
+            yield self
+        finally:
+            self._overrides.pop()
+
+    def _default_context(self):
+        """Session and day from the campaign and world state (cached until saved)."""
+        if self._defaults is None:
+            session = day = None
+            try:
+                state = self.state_store.load() if self.state_store is not None else None
+                if isinstance(state, dict):
+                    session = state.get("session_count")
+                world = self.storage.get("data/world_state", "current_state")
+                if isinstance(world, dict):
+                    day = world.get("in_game_days_passed")
+            except (IOError, ValueError) as e:
+                print(f"Warning: Error reading clock history context: {e}")
+            self._defaults = {"session": session, "day": day, "cause": None}
+        context = dict(self._defaults)
+        for values in self._overrides:
+            context.update(values)
+        return context
+
+    def _intern_cause(self, cause):
+        cause = cause or ""
+        index = self._cause_index.get(cause)
+        if index is None:
+            index = self._cause_index[cause] = len(self.causes)
+            self.causes.append(cause)
+        return index
+
+    def _intern_clock(self, clock_id):
+        index = self._clock_index.get(clock_id)
+        if index is None:
+            index = self._clock_index[clock_id] = len(self.clock_ids)
+            self.clock_ids.append(clock_id)
+        return index
+
+    def _append(self, row):
+        for (name, _), value in zip(COLUMNS, row):
+            self.columns[name].append(value)
+        return row
+
+    def record(self, clock_id, delta, value, cause=None, session=None, day=None):
+        """
+        Append one change.
+
+        Args:
+            clock_id: Qualified clock id
+            delta: Segments added
+            value: Value after the change
+            cause: Label for the change (default: the active context)
+            session: Session number (default: context, then campaign state)
+            day: In-game day (default: context, then world state)
+        """
+        with self._lock:
+            self._load()
+            context = self._default_context()
+            session = context["session"] if session is None else session
+            day = context["day"] if day is None else day
+            cause = context["cause"] if cause is None else cause
+            self._pending.append(self._append((
+                time.time(), self._intern_clock(clock_id), int(delta), int(value),
+                -1 if session is None else int(session), -1 if day is None else int(day),
+                self._intern_cause(cause), 1)))
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def compact(self, keep_sessions=None):
+        """
+        Downsample sessions older than the most recent keep_sessions to one
+        row per clock per session. The next save() rewrites the stored log.
+
+        Args:
+            keep_sessions: Recent sessions to keep intact (default: self.keep_sessions)
+
+        Returns:
+            int: Rows removed
+        """
+        keep = self.keep_sessions if keep_sessions is None else keep_sessions
+        with self._lock:
+            self._load()
+            removed = self._downsample(keep)
+            if removed:
+                self._compact_keep = keep
+                self._dirty = True
+            return removed
+
+    def _can_downsample(self, keep):
+        """True if _downsample(keep) would remove rows; changes nothing."""
+        with self._lock:
+            sessions = [s for s in set(self.columns["session"]) if s >= 0]
+            if not sessions:
+                return False
+            cutoff = max(sessions) - keep + 1
+            seen = set()
+            for session, clock in zip(self.columns["session"], self.columns["clock"]):
+                if 0 <= session < cutoff:
+                    if (session, clock) in seen:
+                        return True
+                    seen.add((session, clock))
+            return False
+
+    def _downsample(self, keep):
+        """Compact the in-memory columns; returns rows removed."""
+        with self._lock:
+            sessions = [s for s in set(self.columns["session"]) if s >= 0]
+            if not sessions:
+                return 0
+            cutoff = max(sessions) - keep + 1
+            cols = self.columns
+            merged = {}
+            recent = []
+            for i in range(len(cols["time"])):
+                session = cols["session"][i]
+                if session < 0 or session >= cutoff:
+                    recent.append(i)
+                    continue
+                row = merged.get((session, cols["clock"][i]))
+                if row is None:
+                    merged[(session, cols["clock"][i])] = [cols[name][i] for name, _ in COLUMNS]
+                    continue
+                row[0] = cols["time"][i]
+                row[2] += cols["delta"][i]
+                row[3] = cols["value"][i]
+                row[5] = cols["day"][i]
+                if row[6] != cols["cause"][i]:
+                    row[6] = 0
+                row[7] += cols["count"][i]
+            removed = len(cols["time"]) - len(merged) - len(recent)
+            if not removed:
+                return 0
+            old = cols
+            self.columns = {name: array(code) for name, code in COLUMNS}
+            for row in merged.values():
+                self._append(row)
+            for i in recent:
+                self._append([old[name][i] for name, _ in COLUMNS])
+            return removed
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _clock_filter(self, clock, prefix):
+        if clock is None and prefix is None:
+            return None
+        prefix = prefix.rstrip("/") + "/" if prefix else None
+        return {i for i, clock_id in enumerate(self.clock_ids)
+                if (clock is None or clock_id == clock)
+                and (prefix is None or clock_id.startswith(prefix) or clock_id + "/" == prefix)}
+
+    def _rows(self, clock=None, prefix=None, sessions=None, days=None, since=None, until=None):
+        """Indices of matching rows, in log order."""
+        self._load()
+        cols = self.columns
+        wanted = self._clock_filter(clock, prefix)
+        since, until = _timestamp(since), _timestamp(until)
+        ranges = []
+        for name, bounds in (("session", sessions), ("day", days)):
+            if bounds is not None:
+                low, high = bounds
+                ranges.append((cols[name], low, high))
+        for i in range(len(cols["time"])):
+            if wanted is not None and cols["clock"][i] not in wanted:
+                continue
+            if since is not None and cols["time"][i] < since:
+                continue
+            if until is not None and cols["time"][i] > until:
+                continue
+            if any((low is not None and column[i] < low) or (high is not None and column[i] > high)
+                   for column, low, high in ranges):
+                continue
+            yield i
+
+    def query(self, clock=None, prefix=None, sessions=None, days=None, since=None, until=None):
+        """
+        Changes matching every given filter, oldest first.
+
+        Args:
+            clock: Exact clock id
+            prefix: Source or group id ("thalmor_influence_clocks", "factions/thalmor")
+            sessions: (first, last) session, inclusive; either may be None
+            days: (first, last) in-game day, inclusive; either may be None
+            since: Earliest time (datetime or epoch seconds)
+            until: Latest time (datetime or epoch seconds)
+
+        Returns:
+            list: Row dicts (time as a timestamp string; unknown session/day as None)
+        """
+        with self._lock:
+            self._load()
+            cols = self.columns
+            return [{
+                "time": datetime.fromtimestamp(cols["time"][i]).strftime(TIMESTAMP_FORMAT),
+                "clock": self.clock_ids[cols["clock"][i]],
+                "delta": cols["delta"][i],
+                "value": cols["value"][i],
+                "session": cols["session"][i] if cols["session"][i] >= 0 else None,
+                "day": cols["day"][i] if cols["day"][i] >= 0 else None,
+                "cause": self.causes[cols["cause"][i]] or None,
+                "count": cols["count"][i],
+            } for i in self._rows(clock, prefix, sessions, days, since, until)]
+
+    def aggregate(self, by="session", metric="delta", clock=None, prefix=None, sessions=None,
+                  days=None, since=None, until=None):
+        """
+        Aggregate matching changes into buckets.
+
+        Args:
+            by: "session", "day", "clock" or "cause"
+            metric: "delta" (net change), "changes" (number of changes) or
+                    "value" (sum of the matching clocks' values at the end
+                    of each bucket, carrying forward clocks that did not
+                    change; by session or day only)
+            clock, prefix, sessions, days, since, until: Filters as for query()
+
+        Returns:
+            dict: bucket -> number, in bucket order (unknown session/day is None)
+
+        Raises:
+            ValueError: For an unknown bucket or metric
+        """
+        if by not in BUCKETS or metric not in METRICS:
+            raise ValueError(f"Cannot aggregate {metric!r} by {by!r}")
+        if metric == "value" and by not in ("session", "day"):
+            raise ValueError("metric='value' needs by='session' or by='day'")
+        with self._lock:
+            self._load()
+            cols = self.columns
+
+            def _bucket(i):
+                if by == "clock":
+                    return self.clock_ids[cols["clock"][i]]
+                if by == "cause":
+                    return self.causes[cols["cause"][i]] or None
+                return cols[by][i] if cols[by][i] >= 0 else None
+
+            def _order(bucket):
+                return (bucket is not None, bucket)
+
+            if metric != "value":
+                result = {}
+                for i in self._rows(clock, prefix, sessions, days, since, until):
+                    bucket = _bucket(i)
+                    amount = cols["delta"][i] if metric == "delta" else cols["count"][i]
+                    result[bucket] = result.get(bucket, 0) + amount
+                return {bucket: result[bucket] for bucket in sorted(result, key=_order)}
+
+            # Values carry forward, so replay every change to the clocks,
+            # then report only the buckets inside the range filters
+            grouped = {}
+            for i in self._rows(clock, prefix):
+                grouped.setdefault(_bucket(i), []).append(i)
+            shown = set(_bucket(i) for i in self._rows(clock, prefix, sessions, days, since, until))
+            values = {}
+            result = {}
+            for bucket in sorted(grouped, key=_order):
+                for i in grouped[bucket]:
+                    values[cols["clock"][i]] = cols["value"][i]
+                if bucket in shown:
+                    result[bucket] = sum(values.values())
+            return result
+
+
+def _bounds(text):
+    """Parse "A:B", "A:" or ":B" into an inclusive (low, high) pair."""
+    if text is None:
+        return None
+    low, separator, high = text.partition(":")
+    if not separator:
+        high = low
+    return (int(low) if low else None, int(high) if high else None)
+
+
+def main():
+    """Query the clock history from the command line"""
+    from clock_engine import get_clock_engine
+
+    root = Path(__file__).resolve().parent.parent
+    ap = argparse.ArgumentParser(description="Query the clock change history.")
+    ap.add_argument("--data-dir", default=str(root / "data"), help="Data directory")
+    ap.add_argument("--state-dir", default=str(root / "state"), help="State directory")
+    ap.add_argument("--clock", help="Exact clock id")
+    ap.add_argument("--prefix", help="Clock source or group, e.g. thalmor_influence_clocks")
+    ap.add_argument("--sessions", help="Session range, e.g. 10:20 or 15:")
+    ap.add_argument("--days", help="In-game day range, e.g. 30:60")
+    ap.add_argument("--by", choices=BUCKETS, help="Aggregate by this bucket instead of listing changes")
+    ap.add_argument("--metric", choices=METRICS, default="delta", help="Aggregate metric (default: delta)")
+    ap.add_argument("--compact", action="store_true", help="Downsample old sessions and save")
+    args = ap.parse_args()
+
+    engine = get_clock_engine(get_storage(args.data_dir, args.state_dir))
+    history = engine.history
+    if args.compact:
+        removed = history.compact()
+        history.save()
+        print(f"Compacted {removed} row(s); {len(history)} remain")
+        return 0
+    try:
+        filters = {"clock": args.clock, "prefix": args.prefix,
+                   "sessions": _bounds(args.sessions), "days": _bounds(args.days)}
+    except ValueError as e:
+        print(f"Error: Invalid range: {e}")
+        return 1
+    if args.by:
+        for bucket, amount in history.aggregate(args.by, args.metric, **filters).items():
+            print(f"{'?' if bucket is None else bucket!s:<50} {amount:>6}")
+        return 0
+    for row in history.query(**filters):
+        session = "?" if row["session"] is None else row["session"]
+        day = "?" if row["day"] is None else row["day"]
+        print(f"{row['time']}  s{session!s:<4} d{day!s:<5} "
+              f"{row['clock']:<55} {row['delta']:>+4} -> {row['value']:<3} {row['cause'] or ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
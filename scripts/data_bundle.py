@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Data Bundle for Skyrim TTRPG
+
+Compiles every JSON file under data/ (including standing_stones.json,
+racial_traits.json and pdf_index.json) into one binary bundle so CLI
+entry points do not have to parse the whole corpus on every start.
+
+The bundle holds, per file, the parsed data plus the (mtime, size) the
+file had when it was compiled. Loading it seeds the process-wide data
+catalog (data_catalog.py): a file whose mtime and size still match is
+served from the bundle, and any file edited since the build is re-parsed
+from source the first time it is read. A stale bundle therefore only
+costs speed, never correctness.
+
+Bundle layout (state/data_bundle.bin):
+    8 bytes   magic "SKYBNDL\\0"
+    4 bytes   bundle format version (big-endian)
+    4 bytes   Python bytecode magic (marshal format is version specific)
+    32 bytes  SHA-256 of the payload
+    ...       marshal payload: {"content_hash", "built", "files"}
+
+The content hash covers the source files' paths and bytes, so two builds
+of the same data have the same hash.
+
+Usage:
+    python data_bundle.py build
+    python data_bundle.py check
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+
+from data_catalog import get_catalog
+
+
+BUNDLE_MAGIC = b"SKYBNDL\0"
+BUNDLE_VERSION = 1
+_HEADER = struct.Struct(">8sI4s32s")
+
+
+def default_repo_root():
+    """Repository root (the parent of the scripts directory)."""
+    return Path(__file__).resolve().parent.parent
+
+
+def default_bundle_path(repo_root=None):
+    """Default bundle location: <repo_root>/state/data_bundle.bin."""
+    repo_root = Path(repo_root) if repo_root is not None else default_repo_root()
+    return repo_root / "state" / "data_bundle.bin"
+
+
+def _source_files(repo_root):
+    data_dir = Path(repo_root) / "data"
+    if not data_dir.is_dir():
+        return []
+    return sorted(p for p in data_dir.rglob("*.json") if not p.name.startswith("."))
+
+
+def build_bundle(repo_root=None, bundle_path=None):
+    """
+    Compile the data directory into a bundle.
+
+    Files that fail to parse are left out (they are read, and reported, from
+    source as before).
+
+    Args:
+        repo_root: Repository root (default: parent of scripts/)
+        bundle_path: Output path (default: state/data_bundle.bin)
+
+    Returns:
+        dict: Summary with path, files, skipped and content_hash
+    """
+    repo_root = Path(repo_root).resolve() if repo_root is not None else default_repo_root()
+    bundle_path = Path(bundle_path) if bundle_path is not None else default_bundle_path(repo_root)
+
+    digest = hashlib.sha256()
+    files = {}
+    skipped = []
+    for path in _source_files(repo_root):
+        rel = path.relative_to(repo_root).as_posix()
+        try:
+            st = path.stat()
+            raw = path.read_bytes()
+            data = json.loads(raw.decode('utf-8'))
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            print(f"Warning: Error reading {rel}: {e}")
+            skipped.append(rel)
+            continue
+        digest.update(rel.encode('utf-8') + b"\0" + raw + b"\0")
+        files[rel] = (st.st_mtime_ns, st.st_size, data)
+
+    content_hash = digest.hexdigest()
+    payload = marshal.dumps({
+        "content_hash": content_hash,
+        "built": datetime.now().isoformat(),
+        "files": files,
+    })
+    header = _HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, importlib.util.MAGIC_NUMBER,
+                          hashlib.sha256(payload).digest())
+
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = bundle_path.with_name(bundle_path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, bundle_path)
+
+    return {"path": str(bundle_path), "files": len(files), "skipped": skipped,
+            "content_hash": content_hash}
+
+
+def read_bundle(bundle_path):
+    """
+    Read and verify a bundle.
+
+    Returns:
+        dict: The bundle payload, or None if the file is missing, was built
+        by another bundle format or Python version, or is corrupt
+    """
+    try:
+        with open(bundle_path, 'rb') as f:
+            blob = f.read()
+    except OSError:
+        return None
+    if len(blob) < _HEADER.size:
+        return None
+    magic, version, py_magic, checksum = _HEADER.unpack_from(blob)
+    if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION \
+            or py_magic != importlib.util.MAGIC_NUMBER:
+        return None
+    payload = blob[_HEADER.size:]
+    if hashlib.sha256(payload).digest() != checksum:
+        return None
+    try:
+        return marshal.loads(payload)
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def load_bundle(catalog=None, repo_root=None, bundle_path=None):
+    """
+    Seed a data catalog from a bundle.
+
+    Only files whose current (mtime, size) match the bundle are served
+    from it later; the catalog re-parses the rest from source.
+
+    Args:
+        catalog: DataCatalog to seed (default: the process-wide catalog)
+        repo_root: Repository root the bundle's paths are relative to
+        bundle_path: Bundle file (default: state/data_bundle.bin)
+
+    Returns:
+        int: Number of files seeded (0 if there is no usable bundle)
+    """
+    repo_root = Path(repo_root).resolve() if repo_root is not None else default_repo_root()
+    bundle_path = Path(bundle_path) if bundle_path is not None else default_bundle_path(repo_root)
+    bundle = read_bundle(bundle_path)
+    if bundle is None:
+        return 0
+    catalog = catalog if catalog is not None else get_catalog()
+    seeded = 0
+    for rel, (mtime_ns, size, data) in bundle["files"].items():
+        if catalog.seed(repo_root / rel, data, (mtime_ns, size)):
+            seeded += 1
+    return seeded
+
+
+def bundle_status(repo_root=None, bundle_path=None):
+    """
+    Compare a bundle against the current source files (stat only).
+
+    Returns:
+        dict: usable (bool), content_hash, and lists of changed, added
+        and removed files (relative paths)
+    """
+    repo_root = Path(repo_root).resolve() if repo_root is not None else default_repo_root()
+    bundle_path = Path(bundle_path) if bundle_path is not None else default_bundle_path(repo_root)
+    bundle = read_bundle(bundle_path)
+    status = {"usable": bundle is not None, "content_hash": None,
+              "changed": [], "added": [], "removed": []}
+    if bundle is None:
+        return status
+    status["content_hash"] = bundle["content_hash"]
+
+    files = bundle["files"]
+    current = {p.relative_to(repo_root).as_posix(): p for p in _source_files(repo_root)}
+    for rel, path in current.items():
+        if rel not in files:
+            status["added"].append(rel)
+            continue
+        st = path.stat()
+        if (st.st_mtime_ns, st.st_size) != tuple(files[rel][:2]):
+            status["changed"].append(rel)
+    status["removed"] = sorted(rel for rel in files if rel not in current)
+    return status
+
+
+def main():
+    """Build or check the compiled data bundle"""
+    ap = argparse.ArgumentParser(description="Compile data/ into a fast-loading binary bundle.")
+    ap.add_argument("command", choices=["build", "check"], help="build the bundle or report staleness")
+    ap.add_argument("--repo", default=str(default_repo_root()), help="Repository root")
+    ap.add_argument("--out", help="Bundle path (default: state/data_bundle.bin)")
+    args = ap.parse_args()
+
+    if args.command == "build":
+        summary = build_bundle(args.repo, args.out)
+        print(f"Built {summary['path']}: {summary['files']} files, "
+              f"content hash {summary['content_hash'][:16]}")
+        if summary["skipped"]:
+            print(f"Skipped {len(summary['skipped'])} unreadable files")
+        return 0
+
+    status = bundle_status(args.repo, args.out)
+    if not status["usable"]:
+        print("No usable bundle (missing, corrupt or built by another Python version).")
+        return 1
+    stale = status["changed"] + status["added"] + status["removed"]
+    print(f"Bundle content hash {status['content_hash'][:16]}")
+    if not stale:
+        print("Bundle is fresh.")
+        return 0
+    for label in ("changed", "added", "removed"):
+        for rel in status[label]:
+            print(f"  {label}: {rel}")
+    print(f"{len(stale)} files differ; they are read from source until the next build.")
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Data Catalog for Skyrim TTRPG
+
+Process-wide, in-memory cache of parsed JSON data files.
+
+Each data directory is parsed once; subsequent lookups only stat the files
+and re-parse the ones whose mtime or size changed since the last load.
+Files that disappear are dropped, new files are picked up on the next call.
+
+A directory can also be marked as watched (see data_watcher.py). While a
+watcher reports every change under it, cached files and directory listings
+there are served without touching the filesystem; the watcher invalidates
+exactly the files that changed.
+
+Records handed out by the catalog are shared between callers. Treat them as
+read-only and copy them (see clone_json) before returning them to code that
+may mutate the result.
+"""
+
+import json
+import threading
+from pathlib import Path
+
+
+def clone_json(value):
+    """
+    Copy a parsed JSON value (dicts, lists and scalars).
+
+    Faster than copy.deepcopy for plain JSON data because it skips the memo
+    bookkeeping and dispatch that arbitrary objects need.
+    """
+    if isinstance(value, dict):
+        return {key: clone_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone_json(item) for item in value]
+    return value
+
+
+class CatalogEntry:
+    """A single cached file: its path, parsed data and any load error."""
+
+    __slots__ = ("path", "data", "error", "signature")
+
+    def __init__(self, path, data=None, error=None, signature=None):
+        self.path = path
+        self.data = data
+        self.error = error
+        self.signature = signature
+
+    @property
+    def ok(self):
+        """True when the file parsed successfully."""
+        return self.error is None
+
+
+class DataCatalog:
+    """
+    Cache of parsed JSON files keyed by absolute path.
+
+    Invalidation is driven by (st_mtime_ns, st_size): a file is only re-read
+    when either value changes. Directory listings are refreshed on every
+    lookup, which costs one stat per file instead of one parse per file.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._generations = {}
+        self._watched = set()
+        self._listings = {}
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "loads": 0}
+
+    @staticmethod
+    def _signature(path):
+        st = path.stat()
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_entry(self, path, signature):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entry = CatalogEntry(path, data=data, signature=signature)
+        except (IOError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            entry = CatalogEntry(path, error=e, signature=signature)
+        self._entries[path] = entry
+        self._bump(path.parent)
+        self.stats["loads"] += 1
+        return entry
+
+    def _bump(self, directory):
+        self._generations[directory] = self._generations.get(directory, 0) + 1
+
+    def _refresh(self, path):
+        try:
+            signature = self._signature(path)
+        except OSError:
+            if self._entries.pop(path, None) is not None:
+                self._bump(path.parent)
+            return None
+        entry = self._entries.get(path)
+        if entry is not None and entry.signature == signature:
+            self.stats["hits"] += 1
+            return entry
+        return self._load_entry(path, signature)
+
+    def _is_watched(self, directory):
+        if directory in self._watched:
+            return True
+        return any(parent in self._watched for parent in directory.parents)
+
+    def load_file(self, path):
+        """
+        Get the cached entry for a single JSON file.
+
+        Args:
+            path: Path to the JSON file
+
+        Returns:
+            CatalogEntry, or None if the file does not exist
+        """
+        path = Path(path).resolve()
+        with self._lock:
+            if self._watched and self._is_watched(path.parent):
+                entry = self._entries.get(path)
+                if entry is not None:
+                    self.stats["hits"] += 1
+                    return entry
+            return self._refresh(path)
+
+    def load_dir(self, directory, pattern="*.json"):
+        """
+        Get cached entries for every file in a directory matching pattern.
+
+        Entries are returned in the same order as Path.glob so callers see
+        results in the order they did before caching.
+
+        Args:
+            directory: Directory to scan
+            pattern: Glob pattern (default: "*.json")
+
+        Returns:
+            list: CatalogEntry objects (including ones that failed to parse)
+        """
+        directory = Path(directory).resolve()
+        with self._lock:
+            watched = bool(self._watched) and self._is_watched(directory)
+            listing = self._listings.get((directory, pattern)) if watched else None
+            if listing is not None:
+                entries = []
+                for path in listing:
+                    entry = self._entries.get(path)
+                    if entry is None:
+                        entry = self._refresh(path)
+                    else:
+                        self.stats["hits"] += 1
+                    if entry is not None:
+                        entries.append(entry)
+                return entries
+
+        if not directory.is_dir():
+            return []
+
+        with self._lock:
+            entries = []
+            seen = set()
+            for path in directory.glob(pattern):
+                seen.add(path)
+                entry = self._refresh(path)
+                if entry is not None:
+                    entries.append(entry)
+
+            # Drop cached files that were deleted from this directory
+            for path in [p for p in self._entries if p.parent == directory]:
+                if path not in seen and path.match(pattern) and not path.exists():
+                    del self._entries[path]
+                    self._bump(directory)
+
+            if watched:
+                self._listings[(directory, pattern)] = [entry.path for entry in entries]
+            return entries
+
+    def seed(self, path, data, signature):
+        """
+        Pre-populate the cache with data parsed elsewhere (see data_bundle.py).
+
+        The entry is only used while the file's (mtime, size) still equals
+        signature; otherwise the file is re-parsed on its next lookup.
+        Paths that already have a cached entry are left alone.
+
+        Args:
+            path: File the data was parsed from
+            data: Parsed JSON data
+            signature: (st_mtime_ns, st_size) of the file when it was parsed
+
+        Returns:
+            bool: True if the entry was added
+        """
+        path = Path(path).resolve()
+        with self._lock:
+            if path in self._entries:
+                return False
+            self._entries[path] = CatalogEntry(path, data=data, signature=tuple(signature))
+            self._bump(path.parent)
+            return True
+
+    def generation(self, directory):
+        """
+        Get a counter that changes whenever a file in directory is
+        (re)loaded or dropped.
+
+        Derived structures (such as indexes) can compare generations to
+        decide whether they need rebuilding after a load_dir call.
+        """
+        return self._generations.get(Path(directory).resolve(), 0)
+
+    def watch(self, directory):
+        """
+        Trust a watcher to report every change under directory.
+
+        Until unwatch() is called, cached files and listings under the
+        directory are returned without stat calls, so whoever calls this
+        must invalidate() each path that changes.
+        """
+        with self._lock:
+            self._watched.add(Path(directory).resolve())
+
+    def unwatch(self, directory):
+        """Go back to stat-based validation for directory."""
+        directory = Path(directory).resolve()
+        with self._lock:
+            self._watched.discard(directory)
+            for key in list(self._listings):
+                if key[0] == directory or directory in key[0].parents:
+                    del self._listings[key]
+
+    def invalidate(self, path=None):
+        """
+        Forget cached data.
+
+        Args:
+            path: File or directory to forget, or None to clear everything
+        """
+        with self._lock:
+            if path is None:
+                for cached in self._entries:
+                    self._bump(cached.parent)
+                self._entries.clear()
+                self._listings.clear()
+                return
+            path = Path(path).resolve()
+            for cached in list(self._entries):
+                if cached == path or path in cached.parents:
+                    del self._entries[cached]
+                    self._bump(cached.parent)
+            for key, listing in list(self._listings.items()):
+                directory = key[0]
+                if directory == path or path in directory.parents:
+                    del self._listings[key]
+                elif directory == path.parent and (path not in listing or not path.exists()):
+                    # A file was added or removed: the listing must be re-globbed
+                    del self._listings[key]
+
+
+_default_catalog = DataCatalog()
+_bundle_checked = False
+
+
+def get_catalog():
+    """
+    Return the process-wide DataCatalog shared by all managers.
+
+    On first use the catalog is seeded from the compiled data bundle
+    (state/data_bundle.bin) if one has been built.
+    """
+    global _bundle_checked
+    if not _bundle_checked:
+        _bundle_checked = True
+        from data_bundle import load_bundle
+        load_bundle(_default_catalog)
+    return _default_catalog
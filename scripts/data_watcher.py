@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Data Watcher for Skyrim TTRPG
+
+Optional hot reload for long-running tools (the GM tools menu, dashboards)
+while the GM edits NPC, clock and quest JSON during play.
+
+A DataWatcher follows data/ (recursively) and feeds every change into the
+data catalog (data_catalog.py) that DataQueryManager, StoryManager and
+GMTools read through:
+
+- the changed file is invalidated, so only it is re-parsed on next use;
+- derived indexes (stat_sheet_index.py) notice the new generation and
+  patch just the reloaded records in place;
+- while the watcher runs the catalog trusts it, so repeated lookups skip
+  the per-file stat calls entirely.
+
+Changes are picked up with inotify on Linux (through ctypes, no extra
+packages) and by polling file signatures everywhere else. Events are
+applied by a background thread, so an edit becomes visible within one
+polling interval at most (immediately with inotify).
+
+Usage:
+    python data_watcher.py            # print changes as they happen
+    python gm_tools.py --watch        # GM tools with hot reload
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from data_catalog import get_catalog
+
+
+# inotify event bits (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+               | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+
+
+def _walk_dirs(root):
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".") and d != "__pycache__"]
+        yield Path(dirpath)
+
+
+class PollingSource:
+    """Detects changes by comparing (mtime, size) snapshots of the tree."""
+
+    name = "polling"
+
+    def __init__(self, roots, interval=1.0):
+        self.roots = roots
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for root in self.roots:
+            for directory in _walk_dirs(root):
+                try:
+                    names = os.listdir(directory)
+                except OSError:
+                    continue
+                for name in names:
+                    if not name.endswith(".json"):
+                        continue
+                    path = directory / name
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout):
+        """
+        Wait up to timeout seconds and return the paths that changed.
+
+        Returns:
+            tuple: (changed paths, overflowed) - overflowed is always False
+        """
+        if timeout:
+            time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        old = self._snapshot
+        self._snapshot = snapshot
+        changed = {path for path, sig in snapshot.items() if old.get(path) != sig}
+        changed.update(path for path in old if path not in snapshot)
+        return changed, False
+
+    def close(self):
+        pass
+
+
+class InotifySource:
+    """Linux inotify watches on every directory of the tree."""
+
+    name = "inotify"
+
+    def __init__(self, roots):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        try:
+            for root in roots:
+                for directory in _walk_dirs(root):
+                    self._add(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self._dirs[wd] = directory
+
+    def read(self, timeout):
+        """
+        Wait up to timeout seconds and return the paths that changed.
+
+        Returns:
+            tuple: (changed paths, overflowed) - after an overflow the kernel
+            dropped events, so callers must assume anything changed
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set(), False
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set(), False
+
+        changed = set()
+        overflowed = False
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._dirs[wd]
+                continue
+            path = directory / os.fsdecode(name) if name else directory
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    for sub in _walk_dirs(path):
+                        self._add(sub)
+                except OSError:
+                    overflowed = True
+            changed.add(path)
+        return changed, overflowed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class DataWatcher:
+    """
+    Keeps a DataCatalog current by applying filesystem change events.
+    """
+
+    def __init__(self, directories, catalog=None, interval=1.0, use_inotify=True):
+        """
+        Args:
+            directories: Directory or list of directories to watch recursively
+            catalog: DataCatalog to keep current (default: process-wide)
+            interval: Polling interval in seconds (also the longest time the
+                      background thread waits before checking for stop())
+            use_inotify: Use inotify when available (default: True)
+        """
+        if isinstance(directories, (str, Path)):
+            directories = [directories]
+        self.directories = [Path(d).resolve() for d in directories]
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.source = None
+        self.stats = {"events": 0, "overflows": 0}
+
+        self._listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        """True between start() and stop()."""
+        return self.source is not None
+
+    def add_listener(self, callback):
+        """Call callback(paths) with each batch of changed paths."""
+        self._listeners.append(callback)
+
+    def _open_source(self):
+        roots = [d for d in self.directories if d.is_dir()]
+        if self.use_inotify and sys.platform.startswith("linux"):
+            try:
+                return InotifySource(roots)
+            except (OSError, AttributeError) as e:
+                print(f"Warning: inotify unavailable, polling instead: {e}")
+        return PollingSource(roots, self.interval)
+
+    def start(self, background=True):
+        """
+        Begin watching.
+
+        Args:
+            background: Apply events from a daemon thread. With False,
+                        call poll() yourself (e.g. once per menu loop).
+
+        Returns:
+            self
+        """
+        with self._lock:
+            if self.source is not None:
+                return self
+            # Watches must exist before the catalog starts trusting them
+            self.source = self._open_source()
+            for directory in self.directories:
+                self.catalog.watch(directory)
+            if background:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching; the catalog goes back to stat-based checks."""
+        with self._lock:
+            if self.source is None:
+                return
+            for directory in self.directories:
+                self.catalog.unwatch(directory)
+            self._stop.set()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self.source.close()
+            self.source = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll(self.interval)
+            except OSError as e:
+                print(f"Warning: Data watcher stopped: {e}")
+                for directory in self.directories:
+                    self.catalog.unwatch(directory)
+                return
+
+    def poll(self, timeout=0):
+        """
+        Apply pending change events.
+
+        Args:
+            timeout: Seconds to wait for events (0 = just check)
+
+        Returns:
+            list: Paths that changed (sorted)
+        """
+        source = self.source
+        if source is None:
+            return []
+        changed, overflowed = source.read(timeout)
+        if overflowed:
+            # Events were lost: fall back to re-validating everything once
+            self.stats["overflows"] += 1
+            for directory in self.directories:
+                self.catalog.invalidate(directory)
+        for path in changed:
+            self.catalog.invalidate(path)
+        if not changed:
+            return []
+        self.stats["events"] += len(changed)
+        paths = sorted(changed)
+        for callback in self._listeners:
+            callback(paths)
+        return paths
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def start_data_watcher(data_dir="../data", catalog=None, interval=1.0):
+    """
+    Start (once per directory and catalog) a background watcher.
+
+    Returns:
+        DataWatcher: The running watcher
+    """
+    catalog = catalog if catalog is not None else get_catalog()
+    key = (Path(data_dir).resolve(), id(catalog))
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None or not watcher.running:
+            watcher = DataWatcher(data_dir, catalog=catalog, interval=interval).start()
+            _watchers[key] = watcher
+        return watcher
+
+
+def main():
+    """Print data file changes as they are detected"""
+    ap = argparse.ArgumentParser(description="Watch data/ and report changed files.")
+    ap.add_argument("--data-dir", default=str(Path(__file__).resolve().parent.parent / "data"),
+                    help="Directory to watch")
+    ap.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    ap.add_argument("--interval", type=float, default=1.0, help="Polling interval (seconds)")
+    args = ap.parse_args()
+
+    def _report(paths):
+        for path in paths:
+            print(f"changed: {path}")
+
+    watcher = DataWatcher(args.data_dir, interval=args.interval, use_inotify=not args.poll)
+    watcher.add_listener(_report)
+    watcher.start(background=False)
+    print(f"Watching {args.data_dir} ({watcher.source.name}); Ctrl+C to stop")
+    try:
+        while True:
+            watcher.poll(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,26 +8,42 @@ This script manages:
 - Faction states across timeline branches
 - Quest outcomes across timeline branches
 - Consequences for different in-game paths triggered dynamically
+
+Timeline branches are copy-on-write: a branch's npcs, factions, quests and
+world_state hold only what differs from its parent timeline, and reads fall
+through the parent chain. Forking stores an empty branch. When a timeline
+changes an entry that its child branches have not overridden, the old value
+is first copied into those children, so every branch keeps the state it was
+forked with. An entry set to null hides the parent's entry.
 """
 
-import json
 import os
 from pathlib import Path
 from datetime import datetime
 
+from data_catalog import clone_json
+from state_store import get_state_store
+from storage import get_storage
+
+
+# Per-branch maps stored as overrides of the parent timeline
+TIMELINE_SECTIONS = ("npcs", "factions", "quests", "world_state")
+
 
 class DragonbreakManager:
-    def __init__(self, data_dir="../data", state_dir="../state"):
+    def __init__(self, data_dir="../data", state_dir="../state", storage=None):
         self.data_dir = Path(data_dir)
         self.state_dir = Path(state_dir)
+        self.storage = storage if storage is not None else get_storage(self.data_dir, self.state_dir)
+        self.state_store = get_state_store(self.storage, key="dragonbreak_state")
         self.dragonbreak_state_path = self.state_dir / "dragonbreak_state.json"
         self.dragonbreak_log_path = Path("../logs") / "dragonbreak_log.md"
         
     def load_dragonbreak_state(self):
         """Load current dragonbreak state"""
-        if self.dragonbreak_state_path.exists():
-            with open(self.dragonbreak_state_path, 'r') as f:
-                return json.load(f)
+        state = self.state_store.load()
+        if state is not None:
+            return state
         return self._initialize_dragonbreak_state()
     
     def _initialize_dragonbreak_state(self):
@@ -54,8 +70,7 @@ class DragonbreakManager:
         """Save dragonbreak state"""
         self.state_dir.mkdir(exist_ok=True)
         state['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.dragonbreak_state_path, 'w') as f:
-            json.dump(state, f, indent=2)
+        self.state_store.save(state)
     
     def create_timeline_fracture(self, fracture_name, description, trigger_event):
         """
@@ -73,9 +88,8 @@ class DragonbreakManager:
         
         # Create new timeline branch
         branch_id = f"branch_{len(state['timeline_branches'])}"
-        current_timeline = state['timeline_branches'][state['current_timeline']]
         
-        # Copy current timeline state to new branch
+        # Copy-on-write: the branch starts empty and reads through its parent
         new_branch = {
             "id": branch_id,
             "name": fracture_name,
@@ -83,10 +97,10 @@ class DragonbreakManager:
             "parent_timeline": state['current_timeline'],
             "description": description,
             "trigger_event": trigger_event,
-            "npcs": dict(current_timeline['npcs']),
-            "factions": dict(current_timeline['factions']),
-            "quests": dict(current_timeline['quests']),
-            "world_state": dict(current_timeline['world_state'])
+            "npcs": {},
+            "factions": {},
+            "quests": {},
+            "world_state": {}
         }
         
         state['timeline_branches'][branch_id] = new_branch
@@ -137,11 +151,11 @@ class DragonbreakManager:
         
         for branch_id, npc_state in branch_states.items():
             if branch_id in state['timeline_branches']:
-                state['timeline_branches'][branch_id]['npcs'][npc_id] = {
+                self._set_branch_entry(state, branch_id, 'npcs', npc_id, {
                     "name": npc_name,
                     "state": npc_state,
                     "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+                })
         
         self.save_dragonbreak_state(state)
         print(f"NPC '{npc_name}' tracked across {len(branch_states)} timeline branches")
@@ -159,11 +173,11 @@ class DragonbreakManager:
         
         for branch_id, faction_state in branch_states.items():
             if branch_id in state['timeline_branches']:
-                state['timeline_branches'][branch_id]['factions'][faction_id] = {
+                self._set_branch_entry(state, branch_id, 'factions', faction_id, {
                     "name": faction_name,
                     "state": faction_state,
                     "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+                })
         
         self.save_dragonbreak_state(state)
         print(f"Faction '{faction_name}' tracked across {len(branch_states)} timeline branches")
@@ -181,11 +195,11 @@ class DragonbreakManager:
         
         for branch_id, outcome in branch_outcomes.items():
             if branch_id in state['timeline_branches']:
-                state['timeline_branches'][branch_id]['quests'][quest_id] = {
+                self._set_branch_entry(state, branch_id, 'quests', quest_id, {
                     "name": quest_name,
                     "outcome": outcome,
                     "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+                })
         
         self.save_dragonbreak_state(state)
         print(f"Quest '{quest_name}' tracked across {len(branch_outcomes)} timeline branches")
@@ -319,7 +333,7 @@ class DragonbreakManager:
         if branch_id not in state['timeline_branches']:
             return None
         
-        branch = state['timeline_branches'][branch_id]
+        branch = self._resolve_branch(state, branch_id)
         
         print(f"\n=== Timeline: {branch['name']} ({branch_id}) ===")
         print(f"Created: {branch['created']}")
@@ -359,19 +373,126 @@ class DragonbreakManager:
         return active
     
     def list_all_timelines(self):
-        """List all timeline branches"""
+        """
+        List all timeline branches
+        
+        Returns:
+            dict: branch_id -> standalone copy of the branch as seen from it
+                  (inherited entries filled in)
+        """
         state = self.load_dragonbreak_state()
+        branches = {branch_id: self._resolve_branch(state, branch_id)
+                    for branch_id in state['timeline_branches']}
         
-        print(f"\n=== Timeline Branches ({len(state['timeline_branches'])}) ===")
+        print(f"\n=== Timeline Branches ({len(branches)}) ===")
         print(f"Current Timeline: {state['current_timeline']}\n")
         
-        for branch_id, branch in state['timeline_branches'].items():
+        for branch_id, branch in branches.items():
             marker = "→ " if branch_id == state['current_timeline'] else "  "
             print(f"{marker}{branch_id}: {branch['name']}")
             print(f"   Created: {branch['created']}")
-            print(f"   NPCs: {len(branch['npcs'])}, Factions: {len(branch['factions'])}, Quests: {len(branch['quests'])}")
+            print(f"   NPCs: {len(branch['npcs'])}, Factions: {len(branch['factions'])}, "
+                  f"Quests: {len(branch['quests'])}")
+        
+        return branches
+    
+    def get_branch_entry(self, section, key, branch_id=None):
+        """
+        Look up one NPC, faction, quest or world-state entry in a timeline
+        
+        Args:
+            section: 'npcs', 'factions', 'quests' or 'world_state'
+            key: Entry id
+            branch_id: Timeline branch (defaults to current)
+        
+        Returns:
+            A copy of the entry as seen from the branch, or None
+        """
+        state = self.load_dragonbreak_state()
+        if branch_id is None:
+            branch_id = state['current_timeline']
+        return clone_json(self._lookup(state, branch_id, section, key))
+    
+    def compact_timeline_branches(self):
+        """
+        Drop branch entries that only repeat what the parent timeline shows
+        
+        Branches saved before copy-on-write held full copies of their parent;
+        this shrinks them to their real overrides without changing any reads.
         
-        return state['timeline_branches']
+        Returns:
+            Number of entries removed
+        """
+        state = self.load_dragonbreak_state()
+        branches = state['timeline_branches']
+        removed = 0
+        for branch_id, branch in branches.items():
+            parent_id = branch.get('parent_timeline')
+            if parent_id not in branches:
+                continue
+            for section in TIMELINE_SECTIONS:
+                overrides = branch.get(section) or {}
+                for key in list(overrides):
+                    if overrides[key] == self._lookup(state, parent_id, section, key):
+                        del overrides[key]
+                        removed += 1
+        if removed:
+            self.save_dragonbreak_state(state)
+        return removed
+    
+    def _chain(self, state, branch_id):
+        """The branch and its ancestors, nearest first."""
+        branches = state['timeline_branches']
+        chain = []
+        while branch_id in branches and branch_id not in chain:
+            chain.append(branch_id)
+            branch_id = branches[branch_id].get('parent_timeline')
+        return [branches[b] for b in chain]
+    
+    def _lookup(self, state, branch_id, section, key):
+        """An entry as seen from a branch (None if absent), without copying."""
+        for branch in self._chain(state, branch_id):
+            overrides = branch.get(section) or {}
+            if key in overrides:
+                return overrides[key]
+        return None
+    
+    def _resolve_section(self, state, branch_id, section):
+        """All entries of a section as seen from a branch (not copied)."""
+        merged = {}
+        for branch in reversed(self._chain(state, branch_id)):
+            for key, value in (branch.get(section) or {}).items():
+                if value is None:
+                    merged.pop(key, None)
+                else:
+                    merged[key] = value
+        return merged
+    
+    def _resolve_branch(self, state, branch_id):
+        """A standalone copy of a branch with every section filled in."""
+        branch = {key: value for key, value in state['timeline_branches'][branch_id].items()
+                  if key not in TIMELINE_SECTIONS}
+        for section in TIMELINE_SECTIONS:
+            branch[section] = clone_json(self._resolve_section(state, branch_id, section))
+        return clone_json(branch)
+    
+    def _set_branch_entry(self, state, branch_id, section, key, value):
+        """
+        Set an entry in one branch, copying the old value into child branches
+        that have not overridden it so they keep seeing their fork-time state
+        """
+        branches = state['timeline_branches']
+        old = self._lookup(state, branch_id, section, key)
+        for child in branches.values():
+            if child.get('parent_timeline') == branch_id:
+                overrides = child.setdefault(section, {})
+                if key not in overrides:
+                    overrides[key] = clone_json(old)
+        overrides = branches[branch_id].setdefault(section, {})
+        if value is None and branches[branch_id].get('parent_timeline') not in branches:
+            overrides.pop(key, None)
+        else:
+            overrides[key] = value
     
     def _log_dragonbreak_event(self, name, description, trigger, branch_id):
         """Log a dragonbreak event to the markdown log file"""
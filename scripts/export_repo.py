@@ -13,6 +13,8 @@ import zipfile
 from datetime import datetime
 from pathlib import Path
 
+from state_writer import JOURNAL_SUFFIX, recover_state
+
 
 def load_json_safely(path):
     """
@@ -197,6 +199,12 @@ class RepositoryExporter:
         for key, value in stats.items():
             print(f"  {key}: {value}")
         
+        # Fold any pending state deltas into the snapshot files being exported
+        state_dir = self.repo_dir / "state"
+        if state_dir.exists():
+            for journal in state_dir.glob("*.json" + JOURNAL_SUFFIX):
+                recover_state(journal.with_name(journal.name[:-len(JOURNAL_SUFFIX)]))
+        
         # Create zip file
         try:
             with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
@@ -222,6 +230,12 @@ class RepositoryExporter:
                                     # Skip __pycache__ and .pyc files
                                     if '__pycache__' in file_path.parts or file_path.suffix == '.pyc':
                                         continue
+                                    # Pending state deltas were compacted above
+                                    if file_path.suffix in ('.journal', '.tmp'):
+                                        continue
+                                    # The compiled data bundle is rebuilt from data/
+                                    if file_path.name == 'data_bundle.bin':
+                                        continue
                                     arcname = file_path.relative_to(self.repo_dir)
                                     zipf.write(file_path, arcname)
                                     print(f"  Added: {arcname}")
@@ -7,39 +7,36 @@ This script manages:
 - Faction progression and ranks
 - Faction relationships
 - Faction rewards and consequences
+- Background world turns (simulate_world_turn)
 """
 
-import json
 import os
 from pathlib import Path
 from datetime import datetime
 
+from clock_engine import get_clock_engine
+from storage import get_storage
+
 
 class FactionManager:
-    def __init__(self, data_dir="../data"):
+    def __init__(self, data_dir="../data", storage=None):
         self.data_dir = Path(data_dir)
+        self.storage = storage if storage is not None else get_storage(self.data_dir)
+        self.clocks = get_clock_engine(self.storage)
         self.factions_path = self.data_dir / "factions.json"
         self.factions_dir = self.data_dir / "factions"
         
     def load_factions_data(self):
         """Load comprehensive factions data"""
-        if self.factions_path.exists():
-            with open(self.factions_path, 'r') as f:
-                return json.load(f)
-        return None
+        return self.storage.get("data", "factions")
     
     def save_factions_data(self, data):
         """Save factions data"""
-        with open(self.factions_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        self.storage.put("data", "factions", data)
     
     def load_individual_faction(self, faction_id):
         """Load individual faction file if it exists"""
-        faction_file = self.factions_dir / f"{faction_id}.json"
-        if faction_file.exists():
-            with open(faction_file, 'r') as f:
-                return json.load(f)
-        return None
+        return self.storage.get("data/factions", faction_id)
     
     def update_faction_clock(self, faction_id, clock_name, progress_change):
         """
@@ -50,38 +47,28 @@ class FactionManager:
             clock_name: Name of the clock to update
             progress_change: Amount to change (+/-)
         """
-        data = self.load_factions_data()
-        if not data:
+        engine = self.clocks.refresh()
+        faction_clocks = engine.clocks(group=f"factions/{faction_id}")
+        if not faction_clocks:
+            if "factions" in engine.sources:
+                print(f"Faction '{faction_id}' or its clocks not found")
             return False
-        
-        # Find faction
-        faction = None
-        if faction_id in data.get('major_factions', {}):
-            faction = data['major_factions'][faction_id]
-        
-        if not faction or 'clocks' not in faction:
-            print(f"Faction '{faction_id}' or its clocks not found")
+
+        clock = next((c for c in faction_clocks if c.name == clock_name), None)
+        if clock is None:
+            print(f"Clock '{clock_name}' not found in faction '{faction_id}'")
             return False
-        
-        # Update the clock
-        for clock in faction['clocks']:
-            if clock['name'] == clock_name:
-                old_progress = clock['progress']
-                clock['progress'] = max(0, min(clock['segments'], 
-                                              clock['progress'] + progress_change))
-                
-                print(f"\n{faction['name']} - {clock_name}")
-                print(f"Progress: {old_progress} -> {clock['progress']}/{clock['segments']}")
-                
-                # Check if clock is filled
-                if clock['progress'] >= clock['segments']:
-                    print(f"⚠️  Clock filled! Effect: {clock['effect']}")
-                
-                self.save_factions_data(data)
-                return True
-        
-        print(f"Clock '{clock_name}' not found in faction '{faction_id}'")
-        return False
+
+        # Written back to factions.json; replayed if another process saved it first
+        change = engine.advance(clock.id, progress_change)
+
+        print(f"\n{clock.group_name} - {clock_name}")
+        print(f"Progress: {change['old']} -> {change['new']}/{change['max']}")
+
+        # Check if clock is filled
+        if change['new'] >= change['max']:
+            print(f"⚠️  Clock filled! Effect: {clock.get('effect')}")
+        return True
     
     def update_faction_relationship(self, faction_id, other_faction, change):
         """
@@ -267,24 +254,99 @@ class FactionManager:
         print(f"\n=== {faction['name']} Turn ===")
         
         # Advance clocks by default amount (1 per turn unless interfered with)
+        engine = self.clocks.refresh()
         changes_made = False
-        for clock in faction.get('clocks', []):
-            if clock['progress'] < clock['segments']:
-                old_progress = clock['progress']
-                clock['progress'] = min(clock['segments'], clock['progress'] + 1)
-                print(f"{clock['name']}: {old_progress} -> {clock['progress']}/{clock['segments']}")
-                changes_made = True
-                
-                if clock['progress'] >= clock['segments']:
-                    print(f"⚠️  {clock['name']} completed! {clock['effect']}")
-        
-        if changes_made:
-            self.save_factions_data(data)
-        else:
+        with engine.batch():
+            for clock in engine.clocks(group=f"factions/{faction_id}"):
+                if not clock.filled:
+                    change = engine.advance(clock.id, 1, cause="faction_turn")
+                    print(f"{clock.name}: {change['old']} -> {change['new']}/{change['max']}")
+                    changes_made = True
+                    
+                    if change['new'] >= change['max']:
+                        print(f"⚠️  {clock.name} completed! {clock.get('effect', '')}".rstrip())
+        
+        if not changes_made:
             print("No clock changes this turn")
         
         return changes_made
     
+    def simulate_world_turn(self, n_turns=1, days_per_turn=1):
+        """
+        Advance every faction for several background turns at once
+        
+        Each turn advances every unfilled clock in factions.json and in
+        the individual faction files by one segment (as simulate_faction_turn
+        does), in a fixed order: factions.json order, then faction files by
+        id. Clock subscribers (world consequences, Thalmor escalation) fire
+        in that same order. Everything is loaded once and written once, in
+        a single storage transaction, along with the in-game day count.
+        
+        Args:
+            n_turns: Number of turns to simulate
+            days_per_turn: In-game days that pass per turn
+        
+        Returns:
+            dict: Turn report with "turns", "days", "clocks" (id -> old/new/max)
+                  and "completed" (in firing order), or None if n_turns or
+                  days_per_turn is not a positive integer
+        """
+        for name, value in (("n_turns", n_turns), ("days_per_turn", days_per_turn)):
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                print(f"Error: {name} must be a positive integer, got {value!r}")
+                return None
+        
+        engine = self.clocks
+        report = {"turns": n_turns, "days": None, "clocks": {}, "completed": []}
+        try:
+            with self.storage.transaction():
+                world = self.storage.get("data/world_state", "current_state")
+                start_day = world.get("in_game_days_passed", 0) if isinstance(world, dict) else None
+                with engine.batch():
+                    engine.refresh()
+                    world_clocks = engine.clocks(source="factions") + sorted(
+                        engine.clocks(group="faction_files"), key=lambda clock: clock.id)
+                    for turn in range(1, n_turns + 1):
+                        # History rows carry the in-game day each turn ends on
+                        day = None if start_day is None else start_day + turn * days_per_turn
+                        for clock in world_clocks:
+                            if clock.filled:
+                                continue
+                            with engine.history.context(day=day):
+                                change = engine.advance(clock.id, 1, cause="world_turn")
+                            summary = report["clocks"].setdefault(
+                                clock.id, {"old": change["old"], "max": change["max"]})
+                            summary["new"] = change["new"]
+                            if change["new"] >= change["max"]:
+                                report["completed"].append({
+                                    "turn": turn,
+                                    "clock": clock.id,
+                                    "faction": clock.group_name,
+                                    "name": clock.name,
+                                    "effect": clock.get("effect"),
+                                })
+                
+                if isinstance(world, dict):
+                    old_days = world.get("in_game_days_passed", 0)
+                    world["in_game_days_passed"] = old_days + n_turns * days_per_turn
+                    report["days"] = {"old": old_days, "new": world["in_game_days_passed"]}
+                    self.storage.put("data/world_state", "current_state", world)
+        except BaseException:
+            # Nothing was written; drop the in-memory advances and the
+            # campaign state changes made by fill subscribers
+            engine.invalidate()
+            engine.state_store.invalidate()
+            raise
+        
+        print(f"\n=== World Turn x{n_turns} ===")
+        print(f"Clocks advanced: {len(report['clocks'])}")
+        for event in report["completed"]:
+            print(f"⚠️  Turn {event['turn']}: {event['faction']} - {event['name']} completed! "
+                  f"{event['effect'] or ''}".rstrip())
+        if report["days"]:
+            print(f"In-game days passed: {report['days']['old']} -> {report['days']['new']}")
+        return report
+    
     def faction_conflict_resolution(self, faction1_id, faction2_id):
         """
         Resolve conflict between two factions
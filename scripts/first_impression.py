@@ -5,6 +5,9 @@ from pathlib import Path
 from datetime import datetime
 import argparse
 
+from state_store import get_state_store_for_path
+from state_writer import save_state
+
 
 def load_json(path):
     """
@@ -22,7 +25,8 @@ def load_json(path):
 
 
 def save_json(path, data):
-    Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    """Crash-safe save through state_writer (delta log + atomic snapshots)."""
+    save_state(path, data, ensure_ascii=False)
 
 
 def resolve_active_pc_id(state: dict) -> str | None:
@@ -161,13 +165,17 @@ def select_impression_lines(appearance: dict, disposition: str, npc_id: str, npc
     return lines, "default"
 
 
-def maybe_first_impression(state_path, appearance_path, npc_id, disposition="neutral", force=False):
+def maybe_first_impression(state_path, appearance_path, npc_id, disposition="neutral", force=False, store=None):
     """
     Records first impressions so NPCs can comment once, then recognize later.
     disposition: neutral|positive|negative (GM decides based on context)
     force: if True, overwrites an existing first impression for this npc->pc
+    store: shared StateStore for the campaign state (default: the store for state_path)
     """
-    state = load_json(state_path)
+    store = store if store is not None else get_state_store_for_path(state_path)
+    state = store.load()
+    if state is None:
+        raise FileNotFoundError(f"Missing campaign state: {state_path}")
     appearance = load_json(appearance_path)
 
     state.setdefault("npc_first_impressions", {})
@@ -195,7 +203,7 @@ def maybe_first_impression(state_path, appearance_path, npc_id, disposition="neu
         "recognition_tags": appearance.get("recognition_tags", [])
     }
 
-    save_json(state_path, state)
+    store.save(state, sections=["npc_first_impressions"])
     return line
 
 
@@ -213,7 +221,8 @@ def auto_first_impression(repo_root, npc_id, disposition=None, force=False, quie
     if not state_path.exists():
         raise FileNotFoundError(f"Missing campaign state: {state_path}")
 
-    state = load_json(state_path)
+    store = get_state_store_for_path(state_path)
+    state = store.load()
     pc_id = resolve_active_pc_id(state)
     if not pc_id:
         if not quiet:
@@ -228,7 +237,7 @@ def auto_first_impression(repo_root, npc_id, disposition=None, force=False, quie
         return None
 
     disp = disposition or infer_disposition(repo_root, npc_id, state)
-    line = maybe_first_impression(state_path, appearance_path, npc_id, disposition=disp, force=force)
+    line = maybe_first_impression(state_path, appearance_path, npc_id, disposition=disp, force=force, store=store)
 
     if (line is not None) and (not quiet):
         print(f"[First Impression:{disp}] {npc_id} -> {pc_id}: {line}")
@@ -12,23 +12,38 @@ This script provides Game Master tools for:
 
 import json
 import os
+import sys
 from pathlib import Path
 from datetime import datetime
-from utils import location_matches
+from clock_engine import get_clock_engine
+from data_catalog import clone_json, get_catalog
+from data_watcher import start_data_watcher
+from stat_sheet_index import get_stat_sheet_index
+from state_store import get_state_store
+from storage import get_storage
 
 
 class GMTools:
-    def __init__(self, data_dir="../data", state_dir="../state"):
+    def __init__(self, data_dir="../data", state_dir="../state", storage=None, state_store=None):
         self.data_dir = Path(data_dir)
         self.state_dir = Path(state_dir)
         self.npc_stat_sheets_dir = self.data_dir / "npc_stat_sheets"
+        self.storage = storage if storage is not None else get_storage(self.data_dir, self.state_dir)
+        self.state_store = state_store if state_store is not None else get_state_store(self.storage)
+        self.clocks = get_clock_engine(self.storage, self.state_store)
         
     def load_json(self, filepath):
-        """Helper to load JSON file"""
-        if filepath.exists():
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        return None
+        """Helper to load JSON file (through the shared data catalog)"""
+        entry = get_catalog().load_file(filepath)
+        if entry is None:
+            return None
+        if not entry.ok:
+            raise entry.error
+        return clone_json(entry.data)
+    
+    def load_campaign_state(self):
+        """Load the shared campaign state (read-only here)"""
+        return self.state_store.load()
     
     def view_all_clocks(self):
         """Display all active clocks in the campaign"""
@@ -36,48 +51,47 @@ class GMTools:
         print("ACTIVE CLOCKS OVERVIEW")
         print("="*70)
         
+        engine = self.clocks.refresh()
+
         # Faction clocks
-        factions_data = self.load_json(self.data_dir / "factions.json")
-        if factions_data:
+        if "factions" in engine.sources:
             print("\n=== FACTION CLOCKS ===\n")
             
-            for faction_id, faction in factions_data.get('major_factions', {}).items():
-                if 'clocks' in faction:
-                    print(f"{faction['name']}:")
-                    for clock in faction['clocks']:
-                        progress = clock['progress']
-                        segments = clock['segments']
-                        bar = '█' * progress + '░' * (segments - progress)
-                        percentage = (progress / segments * 100) if segments > 0 else 0
-                        
-                        print(f"  {clock['name']}: [{bar}] {progress}/{segments} ({percentage:.0f}%)")
-                        print(f"    Effect: {clock['effect']}")
-                        
-                        # Warnings
-                        if progress >= segments:
-                            print(f"    ⚠️  CLOCK FILLED!")
-                        elif progress >= segments * 0.75:
-                            print(f"    ⚠️  Almost full - {segments - progress} segments remaining")
-                    print()
+            for faction_name, clocks in self._clock_groups(engine.clocks(source="factions")):
+                print(f"{faction_name}:")
+                for clock in clocks:
+                    progress = clock.current
+                    segments = clock.maximum
+                    bar = '█' * progress + '░' * (segments - progress)
+                    percentage = clock.ratio * 100
+                    
+                    print(f"  {clock.name}: [{bar}] {progress}/{segments} ({percentage:.0f}%)")
+                    print(f"    Effect: {clock.get('effect')}")
+                    
+                    # Warnings
+                    if progress >= segments:
+                        print(f"    ⚠️  CLOCK FILLED!")
+                    elif progress >= segments * 0.75:
+                        print(f"    ⚠️  Almost full - {segments - progress} segments remaining")
+                print()
         
         # Thalmor arcs
-        thalmor_data = self.load_json(self.data_dir / "thalmor_arcs.json")
-        if thalmor_data:
+        if "thalmor_arcs" in engine.sources:
             print("\n=== THALMOR PLOTS ===\n")
             
-            for arc in thalmor_data.get('thalmor_overarching_arc', {}).get('arcs', []):
-                print(f"{arc['name']}:")
-                for phase in arc.get('phases', []):
-                    progress = phase.get('clock_progress', 0)
-                    segments = phase.get('clock_max', 10)
+            for arc_name, clocks in self._clock_groups(engine.clocks(source="thalmor_arcs")):
+                print(f"{arc_name}:")
+                for clock in clocks:
+                    progress = clock.current
+                    segments = clock.maximum
                     bar = '█' * progress + '░' * (segments - progress)
                     
-                    print(f"  Phase {phase['phase']}: {phase['name']}")
+                    print(f"  Phase {clock.get('phase')}: {clock.name}")
                     print(f"    [{bar}] {progress}/{segments}")
                 print()
         
         # Campaign state arcs
-        campaign_state = self.load_json(self.state_dir / "campaign_state.json")
+        campaign_state = self.load_campaign_state()
         if campaign_state:
             print("\n=== STORY ARCS ===\n")
             
@@ -87,6 +101,14 @@ class GMTools:
                 print(f"  Next: {arc['next_milestone']}")
                 print()
     
+    @staticmethod
+    def _clock_groups(clocks):
+        """Group clocks by their faction / arc, keeping document order"""
+        groups = {}
+        for clock in clocks:
+            groups.setdefault(clock.group, (clock.group_name, []))[1].append(clock)
+        return groups.values()
+    
     def get_faction_hooks(self, faction_id=None):
         """Get plot hooks and current objectives for factions"""
         factions_data = self.load_json(self.data_dir / "factions.json")
@@ -167,7 +189,7 @@ class GMTools:
         print("CAMPAIGN OVERVIEW")
         print("="*70)
         
-        campaign_state = self.load_json(self.state_dir / "campaign_state.json")
+        campaign_state = self.load_campaign_state()
         if not campaign_state:
             print("Campaign state not found")
             return
@@ -231,7 +253,7 @@ class GMTools:
         print("NEXT SESSION SUGGESTIONS")
         print("="*70)
         
-        campaign_state = self.load_json(self.state_dir / "campaign_state.json")
+        campaign_state = self.load_campaign_state()
         if not campaign_state:
             print("Campaign state not found")
             return
@@ -412,31 +434,22 @@ NPC attitudes:
             'recommended': []
         }
         
-        # Load all stat sheets
-        for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-            try:
-                with open(stat_file, 'r') as f:
-                    stat_sheet = json.load(f)
-                
-                # Filter by location if provided (partial match in either direction)
-                if location:
-                    sheet_location = stat_sheet.get('location', '')
-                    if not location_matches(location, sheet_location):
-                        continue
-                
-                suggestions['available'].append(stat_sheet)
-                
-                # Check scene triggers for recommendations
-                scene_triggers = stat_sheet.get('scene_triggers', [])
-                if scene_type:
-                    for trigger in scene_triggers:
-                        if scene_type.lower() in trigger.lower():
-                            suggestions['recommended'].append(stat_sheet)
-                            break
+        # Look up stat sheets through the shared index
+        index = get_stat_sheet_index(self.npc_stat_sheets_dir)
+        for entry in index.errors:
+            print(f"Warning: Error reading {entry.path.name}: {entry.error}")
+        
+        # Filter by location if provided (partial match in either direction)
+        for stat_sheet in index.find(location=location):
+            suggestions['available'].append(stat_sheet)
             
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Error reading {stat_file.name}: {e}")
-                continue
+            # Check scene triggers for recommendations
+            scene_triggers = stat_sheet.get('scene_triggers', [])
+            if scene_type:
+                for trigger in scene_triggers:
+                    if scene_type.lower() in trigger.lower():
+                        suggestions['recommended'].append(stat_sheet)
+                        break
         
         # Display results
         print(f"\nLocation: {location or 'Any'}")
@@ -496,10 +509,11 @@ NPC attitudes:
         encounter_enemies = []
         seen_ids = set()
         
-        for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
+        for entry in get_catalog().load_dir(self.npc_stat_sheets_dir):
             try:
-                with open(stat_file, 'r') as f:
-                    stat_sheet = json.load(f)
+                if not entry.ok:
+                    raise entry.error
+                stat_sheet = entry.data
                 
                 stat_id = stat_sheet.get('id')
                 
@@ -508,12 +522,12 @@ NPC attitudes:
                     for enemy_type in enemy_types:
                         if (enemy_type.lower() in stat_sheet.get('name', '').lower() or
                             enemy_type.lower() in stat_sheet.get('type', '').lower()):
-                            encounter_enemies.append(stat_sheet)
+                            encounter_enemies.append(clone_json(stat_sheet))
                             seen_ids.add(stat_id)
                             break
             
             except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Error reading {stat_file.name}: {e}")
+                print(f"Warning: Error reading {entry.path.name}: {e}")
                 continue
         
         # Display encounter
@@ -561,16 +575,10 @@ NPC attitudes:
         # Try to find NPC in stat sheets
         npc_data = None
         if self.npc_stat_sheets_dir.exists():
-            for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-                try:
-                    with open(stat_file, 'r') as f:
-                        stat_sheet = json.load(f)
-                    
-                    if npc_name.lower() in stat_sheet.get('name', '').lower():
-                        npc_data = stat_sheet
-                        break
-                except (json.JSONDecodeError, IOError):
-                    continue
+            for entry in get_catalog().load_dir(self.npc_stat_sheets_dir):
+                if entry.ok and npc_name.lower() in entry.data.get('name', '').lower():
+                    npc_data = clone_json(entry.data)
+                    break
         
         if npc_data:
             print(f"\nNPC: {npc_data['name']}")
@@ -643,7 +651,7 @@ NPC attitudes:
         """
         Review active companions' loyalty and suggest narrative consequences or unlocks.
         """
-        campaign_state = self.load_json(self.state_dir / "campaign_state.json")
+        campaign_state = self.load_campaign_state()
         if not campaign_state or "companions" not in campaign_state:
             print("No companions data found in campaign state.")
             return
@@ -671,15 +679,10 @@ NPC attitudes:
             stat = self.load_json(self.npc_stat_sheets_dir / f"{npc_id}.json")
             if not stat and self.npc_stat_sheets_dir.exists():
                 # If file not found by npc_id, search all stat sheets for matching ID
-                for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-                    try:
-                        with open(stat_file, 'r') as f:
-                            stat_sheet = json.load(f)
-                        if stat_sheet.get('id') == npc_id:
-                            stat = stat_sheet
-                            break
-                    except (json.JSONDecodeError, IOError):
-                        continue
+                for entry in get_catalog().load_dir(self.npc_stat_sheets_dir):
+                    if entry.ok and entry.data.get('id') == npc_id:
+                        stat = clone_json(entry.data)
+                        break
             
             threshold_desc = None
             if stat and "companion_mechanics" in stat:
@@ -722,6 +725,10 @@ NPC attitudes:
 def main():
     """Main function"""
     tools = GMTools()
+    if "--watch" in sys.argv[1:]:
+        # Pick up data/ edits made during play without restarting
+        watcher = start_data_watcher(tools.data_dir)
+        print(f"Watching {tools.data_dir} for changes ({watcher.source.name})")
     
     print("Skyrim GM Tools")
     print("===============\n")
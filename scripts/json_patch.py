@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+JSON Patch helpers for Skyrim TTRPG
+
+A small RFC 6902 implementation used by the incremental state persistence
+in state_writer.py. Supports the add, remove, replace and test operations.
+
+make_patch() produces compact patches for the way campaign state usually
+changes: nested dict updates and lists that grow at the end (decisions,
+consequences, first impressions) become per-key and append operations
+instead of whole-section replacements.
+"""
+
+from data_catalog import clone_json
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch cannot be applied to a document."""
+
+
+def escape_pointer_token(token):
+    """Escape a key for use in a JSON pointer (RFC 6901)."""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def unescape_pointer_token(token):
+    """Reverse escape_pointer_token."""
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _split_pointer(pointer):
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [unescape_pointer_token(t) for t in pointer[1:].split("/")]
+
+
+def _diff(old, new, path, ops):
+    if type(old) is not type(new):
+        ops.append({"op": "replace", "path": path, "value": clone_json(new)})
+        return
+
+    if isinstance(old, dict):
+        for key, old_value in old.items():
+            child = f"{path}/{escape_pointer_token(key)}"
+            if key not in new:
+                ops.append({"op": "remove", "path": child})
+            elif old_value != new[key]:
+                _diff(old_value, new[key], child, ops)
+        for key, new_value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{escape_pointer_token(key)}",
+                            "value": clone_json(new_value)})
+        return
+
+    if isinstance(old, list):
+        if len(new) >= len(old) and new[:len(old)] == old:
+            # Grew at the end: append only the new items
+            for item in new[len(old):]:
+                ops.append({"op": "add", "path": f"{path}/-", "value": clone_json(item)})
+        elif len(new) == len(old):
+            for i, (old_item, new_item) in enumerate(zip(old, new)):
+                if old_item != new_item:
+                    _diff(old_item, new_item, f"{path}/{i}", ops)
+        else:
+            ops.append({"op": "replace", "path": path, "value": clone_json(new)})
+        return
+
+    if old != new:
+        ops.append({"op": "replace", "path": path, "value": clone_json(new)})
+
+
+def make_patch(old, new):
+    """
+    Compute a JSON Patch that transforms old into new.
+
+    Args:
+        old: Source document
+        new: Target document
+
+    Returns:
+        list: RFC 6902 operations (empty if the documents are equal)
+    """
+    ops = []
+    if old != new:
+        _diff(old, new, "", ops)
+    return ops
+
+
+def _resolve_parent(doc, tokens, pointer):
+    target = doc
+    for token in tokens[:-1]:
+        if isinstance(target, dict):
+            if token not in target:
+                raise JsonPatchError(f"Path not found: {pointer}")
+            target = target[token]
+        elif isinstance(target, list):
+            try:
+                target = target[int(token)]
+            except (ValueError, IndexError):
+                raise JsonPatchError(f"Path not found: {pointer}")
+        else:
+            raise JsonPatchError(f"Path not found: {pointer}")
+    return target
+
+
+def _list_index(target, token, pointer, allow_end=False):
+    if allow_end and token == "-":
+        return len(target)
+    try:
+        index = int(token)
+    except ValueError:
+        raise JsonPatchError(f"Invalid list index in {pointer}")
+    upper = len(target) if allow_end else len(target) - 1
+    if index < 0 or index > upper:
+        raise JsonPatchError(f"List index out of range in {pointer}")
+    return index
+
+
+def apply_patch(doc, patch):
+    """
+    Apply a JSON Patch to a document.
+
+    The document is modified in place where possible; always use the
+    return value, since a patch on the root path replaces the document.
+
+    Args:
+        doc: Document to patch
+        patch: List of RFC 6902 operations
+
+    Returns:
+        The patched document
+
+    Raises:
+        JsonPatchError: If an operation does not fit the document
+    """
+    for op in patch:
+        name = op.get("op")
+        pointer = op.get("path", "")
+        tokens = _split_pointer(pointer)
+
+        if not tokens:
+            if name in ("add", "replace"):
+                doc = clone_json(op["value"])
+                continue
+            if name == "test":
+                if doc != op.get("value"):
+                    raise JsonPatchError("Test failed at document root")
+                continue
+            raise JsonPatchError(f"Cannot {name} the document root")
+
+        parent = _resolve_parent(doc, tokens, pointer)
+        token = tokens[-1]
+
+        if isinstance(parent, dict):
+            if name == "add":
+                parent[token] = clone_json(op["value"])
+            elif name == "replace":
+                if token not in parent:
+                    raise JsonPatchError(f"Path not found: {pointer}")
+                parent[token] = clone_json(op["value"])
+            elif name == "remove":
+                if token not in parent:
+                    raise JsonPatchError(f"Path not found: {pointer}")
+                del parent[token]
+            elif name == "test":
+                if parent.get(token) != op.get("value"):
+                    raise JsonPatchError(f"Test failed at {pointer}")
+            else:
+                raise JsonPatchError(f"Unsupported operation: {name}")
+        elif isinstance(parent, list):
+            if name == "add":
+                parent.insert(_list_index(parent, token, pointer, allow_end=True),
+                              clone_json(op["value"]))
+            elif name == "replace":
+                parent[_list_index(parent, token, pointer)] = clone_json(op["value"])
+            elif name == "remove":
+                del parent[_list_index(parent, token, pointer)]
+            elif name == "test":
+                if parent[_list_index(parent, token, pointer)] != op.get("value"):
+                    raise JsonPatchError(f"Test failed at {pointer}")
+            else:
+                raise JsonPatchError(f"Unsupported operation: {name}")
+        else:
+            raise JsonPatchError(f"Path not found: {pointer}")
+
+    return doc
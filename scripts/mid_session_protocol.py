@@ -10,6 +10,11 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from clock_engine import get_clock_engine, read_hot_clocks
+from data_catalog import clone_json, get_catalog
+from state_store import get_state_store_for_path
+from storage import get_storage
+
 # ---------------------------
 # Utilities
 # ---------------------------
@@ -27,6 +32,14 @@ def read_json_safely(path: Path) -> Any:
     txt = read_text_safely(path)
     return json.loads(txt)
 
+def read_data_json(path: Path) -> Any:
+    """Read a data file through the shared catalog (and compiled bundle), falling
+    back to read_json_safely's encoding detection if the fast path cannot parse it."""
+    entry = get_catalog().load_file(path)
+    if entry is not None and entry.ok:
+        return clone_json(entry.data)
+    return read_json_safely(path)
+
 def find_repo_root(start: Path) -> Path:
     cur = start.resolve()
     for p in [cur] + list(cur.parents):
@@ -61,44 +74,6 @@ def _as_int(x: Any, default: int = 0) -> int:
     except Exception:
         return default
 
-def extract_clocks(obj: Any, source: str, prefix: str = "") -> List[ClockView]:
-    clocks: List[ClockView] = []
-
-    # Common patterns:
-    # { "clocks": { "<id>": { "name": "...", "current": 2, "max": 8 } } }
-    # { "clock": { "current": 1, "max": 4 } }
-    # { "current_progress": 4, "max_progress": 8 }
-    # etc.
-    if isinstance(obj, dict):
-        # direct clock-like dict
-        has_current = any(k in obj for k in ("current", "current_progress", "filled", "progress"))
-        has_max = any(k in obj for k in ("max", "maximum", "max_progress", "max_segments", "total_segments"))
-        has_name = "name" in obj or "title" in obj
-
-        if has_current and has_max and has_name:
-            name = str(obj.get("name") or obj.get("title") or prefix or "Unnamed Clock")
-            cur = _as_int(obj.get("current", obj.get("current_progress", obj.get("filled", obj.get("progress", 0)))), 0)
-            mx = _as_int(obj.get("max", obj.get("maximum", obj.get("max_progress", obj.get("max_segments", obj.get("total_segments", 0))))), 0)
-            if mx > 0:
-                clocks.append(ClockView(
-                    name=name,
-                    current=cur,
-                    maximum=mx,
-                    ratio=cur / mx,
-                    source=source
-                ))
-
-        # recurse
-        for k, v in obj.items():
-            new_prefix = f"{prefix}.{k}" if prefix else str(k)
-            clocks.extend(extract_clocks(v, source, new_prefix))
-
-    elif isinstance(obj, list):
-        for i, v in enumerate(obj):
-            clocks.extend(extract_clocks(v, source, f"{prefix}[{i}]"))
-
-    return clocks
-
 # ---------------------------
 # PC parsing helpers
 # ---------------------------
@@ -167,7 +142,7 @@ def compute_effective_skills(repo: Path, pc: Dict[str, Any]) -> Dict[str, Any]:
         for candidate in (repo / "data" / "races.json", repo / "data" / "racial_traits.json"):
             if candidate.exists():
                 try:
-                    data = read_json_safely(candidate)
+                    data = read_data_json(candidate)
                     races = data.get("races") if isinstance(data, dict) else None
                     if isinstance(races, list):
                         for r in races:
@@ -185,7 +160,7 @@ def compute_effective_skills(repo: Path, pc: Dict[str, Any]) -> Dict[str, Any]:
     stones_path = repo / "data" / "standing_stones.json"
     if stone_name and stones_path.exists():
         try:
-            stones = read_json_safely(stones_path)
+            stones = read_data_json(stones_path)
             for s in stones.get("standing_stones", []):
                 if isinstance(s, dict) and s.get("name") == stone_name:
                     gm = ((s.get("effect") or {}).get("game_mechanic")) or ""
@@ -239,39 +214,20 @@ def summarize_relationships(state: Dict[str, Any]) -> List[Tuple[str, Any]]:
         return items[:6]
     return []
 
-def top_clocks(repo: Path) -> List[ClockView]:
-    clock_sources: List[Tuple[str, Path]] = []
-
-    for folder in ("clocks",):
-        d = repo / folder
-        if d.exists():
-            for p in d.rglob("*.json"):
-                clock_sources.append((str(p.relative_to(repo)), p))
-
-    # Some repos keep clocks under data/clocks
-    d2 = repo / "data" / "clocks"
-    if d2.exists():
-        for p in d2.rglob("*.json"):
-            clock_sources.append((str(p.relative_to(repo)), p))
-
-    all_clocks: List[ClockView] = []
-    for label, p in clock_sources:
-        try:
-            obj = read_json_safely(p)
-            all_clocks.extend(extract_clocks(obj, source=label))
-        except Exception:
-            continue
-
-    # De-dup loosely by (name, source)
-    uniq: Dict[Tuple[str, str], ClockView] = {}
-    for c in all_clocks:
-        key = (c.name, c.source)
-        if key not in uniq or uniq[key].ratio < c.ratio:
-            uniq[key] = c
-
-    clocks = list(uniq.values())
-    clocks.sort(key=lambda c: (c.ratio, c.current), reverse=True)
-    return clocks[:10]
+def top_clocks(repo: Path, rebuild: bool = False) -> List[ClockView]:
+    # The clock engine caches the hottest clocks in state/hot_clocks.json;
+    # reading it avoids parsing every clock file (it is rebuilt when stale).
+    storage = get_storage(repo / "data", repo / "state")
+    if rebuild:
+        hot = get_clock_engine(storage).rebuild_hot_clocks()
+    else:
+        hot = read_hot_clocks(storage)
+    return [ClockView(name=str(c.get("name") or c["id"]),
+                      current=_as_int(c.get("current")),
+                      maximum=_as_int(c.get("max")),
+                      ratio=float(c.get("ratio", 0.0)),
+                      source=c["id"])
+            for c in hot if isinstance(c, dict) and "id" in c]
 
 def latest_log(repo: Path) -> Optional[Path]:
     logs_dir = repo / "logs"
@@ -387,6 +343,7 @@ def build_options(state: Dict[str, Any], pc: Dict[str, Any], eff: Dict[str, Any]
 def main() -> int:
     ap = argparse.ArgumentParser(description="Mid-session protocol: recap + clocks + options + checkpoint.")
     ap.add_argument("--checkpoint", default="", help="If provided, appends a Mid-Session Checkpoint block to the latest log.")
+    ap.add_argument("--rebuild-clocks", action="store_true", help="Rescan all clock files and rewrite the hottest-clocks view first.")
     args = ap.parse_args()
 
     repo = find_repo_root(Path.cwd())
@@ -396,7 +353,7 @@ def main() -> int:
     state: Dict[str, Any] = {}
     if state_path.exists():
         try:
-            state = read_json_safely(state_path)
+            state = get_state_store_for_path(state_path).load() or {}
         except Exception as e:
             print(f"[WARN] Could not parse {state_path}: {e}")
     else:
@@ -409,7 +366,7 @@ def main() -> int:
         print("[WARN] No primary PC found. Run Session Zero to create a character in data/pcs/ and set state.active_pc_id.")
     elif pc_path.exists():
         try:
-            pc = read_json_safely(pc_path)
+            pc = read_data_json(pc_path)
         except Exception as e:
             print(f"[WARN] Could not parse {pc_path}: {e}")
     else:
@@ -419,7 +376,7 @@ def main() -> int:
     eff = compute_effective_skills(repo, pc)
 
     # Clocks
-    clocks = top_clocks(repo)
+    clocks = top_clocks(repo, rebuild=args.rebuild_clocks)
 
     # Latest log
     log_path = latest_log(repo)
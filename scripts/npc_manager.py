@@ -9,18 +9,21 @@ This script manages:
 - Companion management
 """
 
-import json
 import os
 from pathlib import Path
 from datetime import datetime
 
 from first_impression import auto_first_impression
+from state_store import get_state_store
+from storage import get_storage
 
 
 class NPCManager:
-    def __init__(self, data_dir="../data", state_dir="../state"):
+    def __init__(self, data_dir="../data", state_dir="../state", storage=None, state_store=None):
         self.data_dir = Path(data_dir)
         self.state_dir = Path(state_dir)
+        self.storage = storage if storage is not None else get_storage(self.data_dir, self.state_dir)
+        self.state_store = state_store if state_store is not None else get_state_store(self.storage)
         self.npcs_dir = self.data_dir / "npcs"
         self.relationships_path = self.data_dir / "npc_relationships.json"
         self.campaign_state_path = self.state_dir / "campaign_state.json"
@@ -28,11 +31,7 @@ class NPCManager:
         
     def load_npc(self, npc_id):
         """Load an NPC file"""
-        npc_file = self.npcs_dir / f"{npc_id}.json"
-        if npc_file.exists():
-            with open(npc_file, 'r') as f:
-                return json.load(f)
-        return None
+        return self.storage.get("data/npcs", npc_id)
     
     def save_npc(self, npc_data):
         """Save NPC data"""
@@ -41,26 +40,18 @@ class NPCManager:
             print("Error: NPC must have an 'id' field")
             return False
         
-        self.npcs_dir.mkdir(exist_ok=True)
-        npc_file = self.npcs_dir / f"{npc_id}.json"
-        
-        with open(npc_file, 'w') as f:
-            json.dump(npc_data, f, indent=2)
+        self.storage.put("data/npcs", npc_id, npc_data)
         
         print(f"Saved NPC: {npc_data.get('name', npc_id)}")
         return True
     
     def load_relationships(self):
         """Load NPC relationships data"""
-        if self.relationships_path.exists():
-            with open(self.relationships_path, 'r') as f:
-                return json.load(f)
-        return None
+        return self.storage.get("data", "npc_relationships")
     
     def save_relationships(self, data):
         """Save relationships data"""
-        with open(self.relationships_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        self.storage.put("data", "npc_relationships", data)
     
     def update_loyalty(self, npc_id, change, reason=""):
         """
@@ -71,20 +62,38 @@ class NPCManager:
             change: Amount to change loyalty (+/-)
             reason: Why loyalty changed
         """
-        npc = self.load_npc(npc_id)
-        if not npc:
-            print(f"NPC '{npc_id}' not found")
+        def _apply(npc):
+            if not npc:
+                print(f"NPC '{npc_id}' not found")
+                return None
+
+            # Initialize loyalty if not present
+            if 'loyalty' not in npc:
+                npc['loyalty'] = 50
+
+            old_loyalty = npc['loyalty']
+            npc['loyalty'] = max(0, min(100, npc['loyalty'] + change))
+
+            # Record the change
+            if 'loyalty_history' not in npc:
+                npc['loyalty_history'] = []
+
+            npc['loyalty_history'].append({
+                'change': change,
+                'reason': reason,
+                'new_loyalty': npc['loyalty'],
+                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
+            return {"npc": npc, "old": old_loyalty}
+
+        # Read-modify-write; re-applied if another process saved the NPC first
+        result = self.storage.update("data/npcs", npc_id, _apply)
+        if not result:
             return False
-        
-        # Initialize loyalty if not present
-        if 'loyalty' not in npc:
-            npc['loyalty'] = 50
-        
-        old_loyalty = npc['loyalty']
-        npc['loyalty'] = max(0, min(100, npc['loyalty'] + change))
-        
+        npc = result["npc"]
+
         print(f"\n{npc['name']} - Loyalty Update")
-        print(f"Loyalty: {old_loyalty} -> {npc['loyalty']}")
+        print(f"Loyalty: {result['old']} -> {npc['loyalty']}")
         if reason:
             print(f"Reason: {reason}")
         
@@ -101,19 +110,7 @@ class NPCManager:
             status = "⚠️ At risk of leaving!"
         
         print(f"Status: {status}")
-        
-        # Record the change
-        if 'loyalty_history' not in npc:
-            npc['loyalty_history'] = []
-        
-        npc['loyalty_history'].append({
-            'change': change,
-            'reason': reason,
-            'new_loyalty': npc['loyalty'],
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        
-        self.save_npc(npc)
+        print(f"Saved NPC: {npc.get('name', npc_id)}")
         return True
     
     def update_relationship(self, npc1_id, npc2_id, change, reason=""):
@@ -252,18 +249,17 @@ class NPCManager:
     
     def list_npcs(self):
         """List all NPCs in the system"""
-        if not self.npcs_dir.exists():
-            print("No NPCs directory found")
+        npc_keys = sorted(self.storage.keys("data/npcs"))
+        if not npc_keys:
+            print("No NPCs found")
             return []
         
-        npc_files = list(self.npcs_dir.glob("*.json"))
-        
-        print(f"\n=== NPCs ({len(npc_files)}) ===\n")
+        print(f"\n=== NPCs ({len(npc_keys)}) ===\n")
         
         npcs = []
-        for npc_file in sorted(npc_files):
-            with open(npc_file, 'r') as f:
-                npc = json.load(f)
+        for npc_key in npc_keys:
+            npc = self.storage.get("data/npcs", npc_key)
+            if npc is not None:
                 print(f"{npc['id']}: {npc['name']}")
                 print(f"  Role: {npc.get('role', 'Unknown')}")
                 if 'loyalty' in npc:
@@ -315,17 +311,13 @@ class NPCManager:
         return will_comply
     
     def load_campaign_state(self):
-        """Load campaign state data"""
-        if self.campaign_state_path.exists():
-            with open(self.campaign_state_path, 'r') as f:
-                return json.load(f)
-        return None
+        """Load the shared campaign state (call save_campaign_state after changing it)"""
+        return self.state_store.load()
     
     def save_campaign_state(self, state):
-        """Save campaign state data"""
+        """Save campaign state data (through the shared state store)"""
         self.state_dir.mkdir(exist_ok=True)
-        with open(self.campaign_state_path, 'w') as f:
-            json.dump(state, f, indent=2)
+        self.state_store.save(state)
         return True
     
     def get_active_companions(self):
@@ -814,6 +806,28 @@ class NPCManager:
         
         return affected
     
+    def watch_faction_clocks(self, clocks, threshold="70%"):
+        """
+        React to faction clocks as they cross a threshold.
+
+        Subscribes update_companion_based_on_faction_clock to every clock in
+        factions.json, so companions react once each time a faction's clock
+        reaches the threshold instead of on every check.
+
+        Args:
+            clocks: ClockEngine (see clock_engine.py)
+            threshold: Threshold spec (default "70%", i.e. 7 on a 0-10 scale)
+
+        Returns:
+            str: The subscription handle
+        """
+        def _react(event):
+            faction = event['clock'].group.split('/', 1)[1]
+            clock_value = round(event['new'] / event['max'] * 10) if event['max'] else 0
+            self.update_companion_based_on_faction_clock(faction, clock_value)
+
+        return clocks.subscribe(_react, threshold, source="factions", name="npcs.companion_reactions")
+    
     def load_faction_leader_npc(self, faction):
         """
         Load the stat sheet for a neutral faction leader
@@ -840,10 +854,9 @@ class NPCManager:
             return None
         
         # Try loading from npc_stat_sheets directory
-        stat_sheet_path = self.data_dir / "npc_stat_sheets" / f"{npc_id}.json"
-        if stat_sheet_path.exists():
-            with open(stat_sheet_path, 'r') as f:
-                return json.load(f)
+        stat_sheet = self.storage.get("data/npc_stat_sheets", npc_id)
+        if stat_sheet is not None:
+            return stat_sheet
         
         # Fallback to npcs directory
         return self.load_npc(npc_id)
@@ -863,11 +876,8 @@ class NPCManager:
         npc = self.load_npc(npc_id)
         if not npc:
             # Try loading from stat sheets
-            stat_sheet_path = self.data_dir / "npc_stat_sheets" / f"{npc_id}.json"
-            if stat_sheet_path.exists():
-                with open(stat_sheet_path, 'r') as f:
-                    npc = json.load(f)
-            else:
+            npc = self.storage.get("data/npc_stat_sheets", npc_id)
+            if npc is None:
                 print(f"Error: NPC {npc_id} not found")
                 return False
         
@@ -936,11 +946,8 @@ class NPCManager:
         npc = self.load_npc(npc_id)
         if not npc:
             # Try loading from stat sheets
-            stat_sheet_path = self.data_dir / "npc_stat_sheets" / f"{npc_id}.json"
-            if stat_sheet_path.exists():
-                with open(stat_sheet_path, 'r') as f:
-                    npc = json.load(f)
-            else:
+            npc = self.storage.get("data/npc_stat_sheets", npc_id)
+            if npc is None:
                 return {"success": False, "error": "NPC not found"}
         
         state = self.load_campaign_state()
@@ -13,19 +13,26 @@ This script provides querying capabilities for:
 import json
 import os
 from pathlib import Path
-from utils import location_matches
+from data_catalog import clone_json
+from stat_sheet_index import get_storage_stat_sheet_index
+from storage import get_storage
+from text_search import get_search_index, default_sources
 
 
 class DataQueryManager:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", catalog=None, storage=None):
         """
         Initialize the DataQueryManager.
         
         Args:
             data_dir: Path to the data directory (default: "data")
+            catalog: DataCatalog the JSON backend reads files through
+                     (default: the process-wide catalog)
+            storage: StorageBackend to query (default: get_storage(data_dir))
         """
         self.data_dir = Path(data_dir)
         self.npc_stat_sheets_dir = self.data_dir / "npc_stat_sheets"
+        self.storage = storage if storage is not None else get_storage(self.data_dir, catalog=catalog)
         
         # Ensure directories exist
         (self.data_dir / "npcs").mkdir(parents=True, exist_ok=True)
@@ -35,6 +42,104 @@ class DataQueryManager:
         (self.data_dir / "sessions").mkdir(parents=True, exist_ok=True)
         (self.data_dir / "world_state").mkdir(parents=True, exist_ok=True)
         (self.data_dir / "rules").mkdir(parents=True, exist_ok=True)
+    
+    def _load_records(self, collection, warn=True):
+        """
+        Load parsed records for a storage collection.
+        
+        Records are shared with the backend's cache; clone them before
+        handing them to callers.
+        
+        Args:
+            collection: Collection name (e.g. "data/npcs")
+            warn: Print a warning for documents that fail to parse
+            
+        Returns:
+            list: Parsed JSON records, in collection order
+        """
+        records = []
+        for entry in self.storage.entries(collection):
+            if not entry.ok:
+                if warn:
+                    print(f"Warning: Error reading {entry.path.name}: {entry.error}")
+                continue
+            records.append(entry.data)
+        return records
+    
+    def _load_document(self, collection, key):
+        """
+        Load one document from storage.
+        
+        Returns:
+            tuple: (data, error) where data is None if the document is
+            missing or unreadable, and error is the parse error if any
+        """
+        try:
+            return self.storage.get(collection, key), None
+        except (IOError, ValueError) as e:
+            return None, e
+    
+    def _stat_sheet_index(self, warn=True):
+        """
+        Get the inverted index over the NPC stat sheet directory.
+        
+        Args:
+            warn: Print a warning for stat sheets that fail to parse
+            
+        Returns:
+            StatSheetIndex: Index over the current stat sheets
+        """
+        index = get_storage_stat_sheet_index(self.storage, "data/npc_stat_sheets")
+        if warn:
+            for entry in index.errors:
+                print(f"Warning: Error reading {entry.path.name}: {entry.error}")
+        return index
+    
+    def _search_index(self):
+        """
+        Get the ranked text search index for this data directory.
+        
+        Rules come from this data directory; converted PDFs and session
+        logs are resolved relative to its parent (the repository root).
+        
+        Returns:
+            TextSearchIndex: Refreshed index over rules, converted PDFs and logs
+        """
+        repo_root = self.data_dir.parent
+        sources = default_sources(repo_root)
+        sources["rules"] = (self.data_dir / "rules", "*.md")
+        return get_search_index(repo_root, sources=sources)
+    
+    def search_text(self, query, limit=10, sources=None):
+        """
+        Ranked full-text search over rules, converted PDFs and session logs.
+        
+        Args:
+            query: Search terms; "quoted phrases" must match verbatim
+            limit: Maximum number of hits to return
+            sources: Optional list of sources ('rules', 'converted_pdfs', 'logs')
+            
+        Returns:
+            list: Section-level hits with file, heading, line, score and context
+        """
+        if not query or not isinstance(query, str):
+            print("Error: query must be a non-empty string")
+            return []
+        return self._search_index().search(query, limit=limit, sources=sources)
+    
+    def _load_factions_file(self):
+        """
+        Load factions.json from storage.
+        
+        Returns:
+            tuple: (data, error_dict) where exactly one is None
+        """
+        data, error = self._load_document("data", "factions")
+        if error is not None:
+            return None, {"error": f"Error reading factions file: {error}"}
+        if data is None:
+            return None, {"error": "Factions file not found"}
+        return data, None
         
     def query_npcs(self, name=None, location=None, faction=None):
         """
@@ -48,20 +153,9 @@ class DataQueryManager:
         Returns:
             list: List of matching NPC dictionaries
         """
-        npcs_dir = self.data_dir / "npcs"
-        if not npcs_dir.exists():
-            return []
-            
         results = []
         
-        for npc_file in npcs_dir.glob("*.json"):
-            try:
-                with open(npc_file, 'r', encoding='utf-8') as f:
-                    npc = json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Warning: Error reading {npc_file.name}: {e}")
-                continue
-            
+        for npc in self._load_records("data/npcs"):
             match = True
             if name and isinstance(name, str):
                 npc_name = npc.get('name', '')
@@ -77,7 +171,7 @@ class DataQueryManager:
                     match = False
             
             if match:
-                results.append(npc)
+                results.append(clone_json(npc))
         
         return results
     
@@ -92,20 +186,9 @@ class DataQueryManager:
         Returns:
             list: List of matching PC dictionaries
         """
-        pcs_dir = self.data_dir / "pcs"
-        if not pcs_dir.exists():
-            return []
-            
         results = []
         
-        for pc_file in pcs_dir.glob("*.json"):
-            try:
-                with open(pc_file, 'r', encoding='utf-8') as f:
-                    pc = json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Warning: Error reading {pc_file.name}: {e}")
-                continue
-            
+        for pc in self._load_records("data/pcs"):
             match = True
             if name and isinstance(name, str):
                 pc_name = pc.get('name', '')
@@ -117,7 +200,7 @@ class DataQueryManager:
                     match = False
             
             if match:
-                results.append(pc)
+                results.append(clone_json(pc))
         
         return results
     
@@ -133,20 +216,9 @@ class DataQueryManager:
         Returns:
             list: List of matching quest dictionaries
         """
-        quests_dir = self.data_dir / "quests"
-        if not quests_dir.exists():
-            return []
-            
         results = []
         
-        for quest_file in quests_dir.glob("*.json"):
-            try:
-                with open(quest_file, 'r', encoding='utf-8') as f:
-                    quest = json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Warning: Error reading {quest_file.name}: {e}")
-                continue
-            
+        for quest in self._load_records("data/quests"):
             match = True
             if status and isinstance(status, str):
                 quest_status = quest.get('status', '')
@@ -162,7 +234,7 @@ class DataQueryManager:
                     match = False
             
             if match:
-                results.append(quest)
+                results.append(clone_json(quest))
         
         return results
     
@@ -177,20 +249,9 @@ class DataQueryManager:
         Returns:
             list: List of matching faction dictionaries
         """
-        factions_dir = self.data_dir / "factions"
-        if not factions_dir.exists():
-            return []
-            
         results = []
         
-        for faction_file in factions_dir.glob("*.json"):
-            try:
-                with open(faction_file, 'r', encoding='utf-8') as f:
-                    faction = json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Warning: Error reading {faction_file.name}: {e}")
-                continue
-            
+        for faction in self._load_records("data/factions"):
             match = True
             if name and isinstance(name, str):
                 faction_name = faction.get('name', '')
@@ -202,7 +263,7 @@ class DataQueryManager:
                     match = False
             
             if match:
-                results.append(faction)
+                results.append(clone_json(faction))
         
         return results
     
@@ -218,16 +279,9 @@ class DataQueryManager:
         Returns:
             dict: Faction quest information, or error dict if file not found
         """
-        factions_file = self.data_dir / "factions.json"
-        
-        if not factions_file.exists():
-            return {"error": "Factions file not found"}
-        
-        try:
-            with open(factions_file, 'r', encoding='utf-8') as f:
-                factions_data = json.load(f)
-        except (IOError, json.JSONDecodeError) as e:
-            return {"error": f"Error reading factions file: {e}"}
+        factions_data, error = self._load_factions_file()
+        if error:
+            return error
         
         faction_quests = factions_data.get('faction_quests', {})
         results = {}
@@ -258,8 +312,8 @@ class DataQueryManager:
             if filtered_quests or not quest_id:
                 results[faction] = {
                     'questline': quest_data.get('questline'),
-                    'quests': filtered_quests,
-                    'side_quests': quest_data.get('side_quests', [])
+                    'quests': clone_json(filtered_quests),
+                    'side_quests': clone_json(quest_data.get('side_quests', []))
                 }
         
         return results
@@ -271,18 +325,11 @@ class DataQueryManager:
         Returns:
             dict: Trust mechanics data, or error dict if file not found
         """
-        factions_file = self.data_dir / "factions.json"
-        
-        if not factions_file.exists():
-            return {"error": "Factions file not found"}
-        
-        try:
-            with open(factions_file, 'r', encoding='utf-8') as f:
-                factions_data = json.load(f)
-        except (IOError, json.JSONDecodeError) as e:
-            return {"error": f"Error reading factions file: {e}"}
+        factions_data, error = self._load_factions_file()
+        if error:
+            return error
         
-        return factions_data.get('trust_mechanics', {})
+        return clone_json(factions_data.get('trust_mechanics', {}))
     
     def get_main_story_integration(self):
         """
@@ -291,18 +338,11 @@ class DataQueryManager:
         Returns:
             dict: Main story integration data, or error dict if file not found
         """
-        factions_file = self.data_dir / "factions.json"
-        
-        if not factions_file.exists():
-            return {"error": "Factions file not found"}
-        
-        try:
-            with open(factions_file, 'r', encoding='utf-8') as f:
-                factions_data = json.load(f)
-        except (IOError, json.JSONDecodeError) as e:
-            return {"error": f"Error reading factions file: {e}"}
+        factions_data, error = self._load_factions_file()
+        if error:
+            return error
         
-        return factions_data.get('main_story_integration', {})
+        return clone_json(factions_data.get('main_story_integration', {}))
     
     def get_world_state(self):
         """
@@ -311,15 +351,10 @@ class DataQueryManager:
         Returns:
             dict: World state data if successful, None otherwise
         """
-        world_state_file = self.data_dir / "world_state" / "current_state.json"
-        if world_state_file.exists():
-            try:
-                with open(world_state_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Error reading world state: {e}")
-                return None
-        return None
+        world_state, error = self._load_document("data/world_state", "current_state")
+        if error is not None:
+            print(f"Error reading world state: {error}")
+        return world_state
     
     def search_rules(self, keyword):
         """
@@ -340,21 +375,23 @@ class DataQueryManager:
             return []
             
         results = []
+        keyword_lower = keyword.lower()
+        
+        # File contents come from the search index, which only re-reads
+        # rules files that changed since the last lookup
+        index = self._search_index()
         
         for rules_file in rules_dir.glob("*.md"):
-            try:
-                with open(rules_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except (IOError, UnicodeDecodeError) as e:
-                print(f"Warning: Error reading {rules_file.name}: {e}")
+            lines, error = index.file_lines(rules_file)
+            if error or lines is None:
+                print(f"Warning: Error reading {rules_file.name}: {error or 'not indexed'}")
                 continue
             
-            if keyword.lower() in content.lower():
+            if any(keyword_lower in line.lower() for line in lines):
                 # Find relevant sections
-                lines = content.split('\n')
                 relevant_lines = []
                 for line_index, line in enumerate(lines):
-                    if keyword.lower() in line.lower():
+                    if keyword_lower in line.lower():
                         # Get context (2 lines before and after)
                         context_start = max(0, line_index - 2)
                         context_end = min(len(lines), line_index + 3)
@@ -377,10 +414,6 @@ class DataQueryManager:
         Returns:
             list: List of session data dictionaries
         """
-        sessions_dir = self.data_dir / "sessions"
-        if not sessions_dir.exists():
-            return []
-            
         results = []
         
         if session_number:
@@ -388,23 +421,24 @@ class DataQueryManager:
                 print("Error: session_number must be a positive integer")
                 return []
                 
-            session_file = sessions_dir / f"session_{session_number:03d}.json"
-            if session_file.exists():
-                try:
-                    with open(session_file, 'r', encoding='utf-8') as f:
-                        return [json.load(f)]
-                except (IOError, json.JSONDecodeError) as e:
-                    print(f"Error reading session file: {e}")
-                    return []
+            session, error = self._load_document("data/sessions", f"session_{session_number:03d}")
+            if error is not None:
+                print(f"Error reading session file: {error}")
+                return []
+            if session is not None:
+                return [session]
         else:
             # Return all sessions
-            for session_file in sorted(sessions_dir.glob("session_*.json")):
-                try:
-                    with open(session_file, 'r', encoding='utf-8') as f:
-                        results.append(json.load(f))
-                except (IOError, json.JSONDecodeError) as e:
-                    print(f"Warning: Error reading {session_file.name}: {e}")
+            entries = sorted(
+                (entry for entry in self.storage.entries("data/sessions")
+                 if entry.path.stem.startswith("session_")),
+                key=lambda entry: entry.path.stem
+            )
+            for entry in entries:
+                if not entry.ok:
+                    print(f"Warning: Error reading {entry.path.name}: {entry.error}")
                     continue
+                results.append(clone_json(entry.data))
         
         return results
     
@@ -443,12 +477,14 @@ class DataQueryManager:
         
         return {}
     
-    def query_pdf_topics(self, topic):
+    def query_pdf_topics(self, topic, sections=False):
         """
         Query PDF index for topic and return relevant files.
         
         Args:
             topic: Topic to search for in PDF index
+            sections: Also run a ranked search of the converted PDFs and
+                      return the best-matching sections under 'sections'
             
         Returns:
             dict: Query results with files and details, or error dict
@@ -456,17 +492,12 @@ class DataQueryManager:
         if not topic or not isinstance(topic, str):
             return {"error": "Topic must be a non-empty string", "files": [], "details": []}
             
-        pdf_index_file = self.data_dir / "pdf_index.json"
-        
-        if not pdf_index_file.exists():
+        pdf_index, error = self._load_document("data", "pdf_index")
+        if error is not None:
+            return {"error": f"Error reading PDF index: {error}", "files": [], "details": []}
+        if pdf_index is None:
             return {"error": "PDF index not found", "files": [], "details": []}
         
-        try:
-            with open(pdf_index_file, 'r', encoding='utf-8') as f:
-                pdf_index = json.load(f)
-        except (IOError, json.JSONDecodeError) as e:
-            return {"error": f"Error reading PDF index: {e}", "files": [], "details": []}
-        
         # Search query mappings
         query_mappings = pdf_index.get('query_mappings', {})
         topic_lower = topic.lower()
@@ -474,7 +505,7 @@ class DataQueryManager:
         # Find matching files
         matching_files = []
         if topic_lower in query_mappings:
-            matching_files = query_mappings[topic_lower]
+            matching_files = clone_json(query_mappings[topic_lower])
         
         # Search in topics structure for more detailed info
         results = []
@@ -495,11 +526,14 @@ class DataQueryManager:
                                         'source_pdf': item_data.get('source_pdf', 'Unknown')
                                     })
         
-        return {
+        result = {
             'query': topic,
             'files': matching_files,
             'details': results
         }
+        if sections:
+            result['sections'] = self.search_text(topic, limit=5, sources=['converted_pdfs'])
+        return result
     
     def get_pdf_content(self, topic):
         """
@@ -568,63 +602,19 @@ class DataQueryManager:
         Returns:
             List of matching stat sheets
         """
-        if not self.npc_stat_sheets_dir.exists():
-            return []
-        
-        results = []
-        
-        for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-            try:
-                with open(stat_file, 'r') as f:
-                    stat_sheet = json.load(f)
-                
-                match = True
-                
-                # Name filter (partial, case-insensitive)
-                if name and name.lower() not in stat_sheet.get('name', '').lower():
-                    match = False
-                
-                # Type filter (exact match, case-insensitive)
-                if entity_type and entity_type.lower() != stat_sheet.get('type', '').lower():
-                    match = False
-                
-                # Category filter (exact match, case-insensitive)
-                if category and category.lower() != stat_sheet.get('category', '').lower():
-                    match = False
-                
-                # Location filter (partial match in either direction, case-insensitive)
-                if location:
-                    sheet_location = stat_sheet.get('location', '')
-                    if not location_matches(location, sheet_location):
-                        match = False
-                
-                if match:
-                    results.append(stat_sheet)
-            
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Error reading {stat_file.name}: {e}")
-                continue
-        
-        return results
+        index = self._stat_sheet_index()
+        matches = index.find(
+            name=name,
+            entity_type=entity_type,
+            category=category,
+            location=location
+        )
+        return [clone_json(stat_sheet) for stat_sheet in matches]
     
     def get_npc_enemy_stat_by_id(self, stat_id):
         """Get a specific NPC/enemy stat sheet by ID"""
-        if not self.npc_stat_sheets_dir.exists():
-            return None
-        
-        for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-            try:
-                with open(stat_file, 'r') as f:
-                    stat_sheet = json.load(f)
-                
-                if stat_sheet.get('id') == stat_id:
-                    return stat_sheet
-            
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Error reading {stat_file.name}: {e}")
-                continue
-        
-        return None
+        stat_sheet = self._stat_sheet_index().get(stat_id)
+        return clone_json(stat_sheet) if stat_sheet is not None else None
     
     def get_enemies_by_location(self, location):
         """Get all enemies that can appear in a specific location"""
@@ -640,46 +630,11 @@ class DataQueryManager:
         Returns:
             Dict with primary, contested, and rare enemies for the hold
         """
-        if not self.npc_stat_sheets_dir.exists():
-            return {"primary": [], "contested": [], "rare": []}
-        
-        results = {
-            "primary": [],
-            "contested": [],
-            "rare": []
+        tiers = self._stat_sheet_index().enemies_by_hold(hold_name)
+        return {
+            tier: [clone_json(stat_sheet) for stat_sheet in sheets]
+            for tier, sheets in tiers.items()
         }
-        
-        for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-            try:
-                with open(stat_file, 'r') as f:
-                    stat_sheet = json.load(f)
-                
-                # Only consider enemies
-                if stat_sheet.get('category') != 'Enemy':
-                    continue
-                
-                hold_context = stat_sheet.get('hold_context', {})
-                
-                # Check if hold is in primary list
-                if hold_name in hold_context.get('primary', []):
-                    results['primary'].append(stat_sheet)
-                # Check if hold is in contested list
-                elif hold_name in hold_context.get('contested', []):
-                    results['contested'].append(stat_sheet)
-                # Check if hold is in rare list
-                elif hold_name in hold_context.get('rare', []):
-                    results['rare'].append(stat_sheet)
-                # Also check location field for general matches
-                elif location_matches(hold_name, stat_sheet.get('location', '')):
-                    # Add to primary if no hold_context specified
-                    if not hold_context:
-                        results['primary'].append(stat_sheet)
-            
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Error reading {stat_file.name}: {e}")
-                continue
-        
-        return results
     
     def get_enemies_by_act(self, act):
         """
@@ -691,29 +646,8 @@ class DataQueryManager:
         Returns:
             List of enemy stat sheets appropriate for the act
         """
-        if not self.npc_stat_sheets_dir.exists():
-            return []
-        
-        results = []
-        
-        for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-            try:
-                with open(stat_file, 'r') as f:
-                    stat_sheet = json.load(f)
-                
-                # Only consider enemies
-                if stat_sheet.get('category') != 'Enemy':
-                    continue
-                
-                # Check if act is in act_context
-                if act in stat_sheet.get('act_context', []):
-                    results.append(stat_sheet)
-            
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Error reading {stat_file.name}: {e}")
-                continue
-        
-        return results
+        enemies = self._stat_sheet_index().enemies_by_act(act)
+        return [clone_json(stat_sheet) for stat_sheet in enemies]
     
     def get_npcs_for_scene(self, location=None, scene_type=None):
         """
@@ -733,45 +667,32 @@ class DataQueryManager:
         }
         
         if location:
-            # Get friendly NPCs at location
-            result['friendly'] = self.query_npc_enemy_stats(
-                location=location, 
-                category="Friendly NPC"
-            )
-            
-            # Get hostile NPCs at location
-            result['hostile'] = self.query_npc_enemy_stats(
-                location=location, 
-                category="Hostile NPC"
-            )
-            
-            # Get enemies at location
-            result['enemies'] = self.query_npc_enemy_stats(
-                location=location, 
-                category="Enemy"
-            )
+            # One index refresh serves all three buckets
+            index = self._stat_sheet_index()
+            
+            for bucket, category in (
+                ('friendly', "Friendly NPC"),
+                ('hostile', "Hostile NPC"),
+                ('enemies', "Enemy"),
+            ):
+                result[bucket] = [
+                    clone_json(stat_sheet)
+                    for stat_sheet in index.find(category=category, location=location)
+                ]
         
         return result
     
     def list_all_stat_sheets(self):
         """List all available NPC/enemy stat sheets"""
-        if not self.npc_stat_sheets_dir.exists():
-            return []
-        
         results = []
-        for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-            try:
-                with open(stat_file, 'r') as f:
-                    stat_sheet = json.load(f)
-                    results.append({
-                        'id': stat_sheet.get('id'),
-                        'name': stat_sheet.get('name'),
-                        'type': stat_sheet.get('type'),
-                        'category': stat_sheet.get('category'),
-                        'location': stat_sheet.get('location')
-                    })
-            except (json.JSONDecodeError, IOError):
-                continue
+        for stat_sheet in self._load_records("data/npc_stat_sheets", warn=False):
+            results.append({
+                'id': stat_sheet.get('id'),
+                'name': stat_sheet.get('name'),
+                'type': stat_sheet.get('type'),
+                'category': stat_sheet.get('category'),
+                'location': stat_sheet.get('location')
+            })
         
         return results
 
@@ -867,6 +788,11 @@ def main():
         for line in result['matches'][:5]:  # Show first 5 lines
             print(f"  {line}")
     
+    # Example: Ranked full-text search
+    print("\n3b. Ranked search for '\"create advantage\"'...")
+    for hit in manager.search_text('"create advantage"', limit=3):
+        print(f"  [{hit['score']:.2f}] {hit['file']}:{hit['line']} - {hit['heading']}")
+    
     # Example: Get World State
     print("\n4. Getting World State...")
     world_state = manager.get_world_state()
@@ -13,6 +13,8 @@ import json
 import os
 from pathlib import Path
 
+from state_store import get_state_store_for_path
+
 
 # ---------------------------------------------------------------------------
 # NPC inference rules
@@ -174,8 +176,8 @@ def apply_inference_to_state(state_path, pc_path, npc_ids):
     if not pc_path.exists():
         raise FileNotFoundError(f"PC file not found: {pc_path}")
 
-    with open(state_path, "r", encoding="utf-8") as f:
-        state = json.load(f)
+    store = get_state_store_for_path(state_path)
+    state = store.load()
 
     with open(pc_path, "r", encoding="utf-8") as f:
         pc_data = json.load(f)
@@ -202,8 +204,7 @@ def apply_inference_to_state(state_path, pc_path, npc_ids):
         if new_results:
             written[npc_id] = new_results
 
-    with open(state_path, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2)
+    store.save(state, sections=["relationship_inference"])
 
     return written
 
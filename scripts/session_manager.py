@@ -14,16 +14,21 @@ import os
 from datetime import datetime
 from pathlib import Path
 
+from storage import get_storage
+
 
 class SessionContextManager:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", storage=None):
         """
         Initialize the SessionContextManager.
         
         Args:
             data_dir: Path to the data directory (default: "data")
+            storage: StorageBackend for sessions and characters
+                     (default: get_storage(data_dir))
         """
         self.data_dir = Path(data_dir)
+        self.storage = storage if storage is not None else get_storage(self.data_dir)
         self.sessions_dir = self.data_dir / "sessions"
         self.pcs_dir = self.data_dir / "pcs"
         self.npcs_dir = self.data_dir / "npcs"
@@ -33,6 +38,11 @@ class SessionContextManager:
         self.pcs_dir.mkdir(parents=True, exist_ok=True)
         self.npcs_dir.mkdir(parents=True, exist_ok=True)
         
+    def _session_keys(self):
+        """Sorted storage keys of the session logs (session_NNN)."""
+        return sorted(key for key in self.storage.keys("data/sessions")
+                      if key.startswith("session_"))
+        
     def create_session(self, session_number, title, gm, players_present):
         """
         Create a new session log.
@@ -79,10 +89,8 @@ class SessionContextManager:
             "next_session_prep": []
         }
         
-        session_file = self.sessions_dir / f"session_{session_number:03d}.json"
         try:
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, indent=2)
+            self.storage.put("data/sessions", f"session_{session_number:03d}", session_data)
             print(f"Created session {session_number}: {title}")
             return session_data
         except (IOError, OSError) as e:
@@ -107,19 +115,18 @@ class SessionContextManager:
             print("Error: updates must be a dictionary")
             return False
             
-        session_file = self.sessions_dir / f"session_{session_number:03d}.json"
-        
-        if not session_file.exists():
-            print(f"Session {session_number} not found!")
-            return False
+        session_key = f"session_{session_number:03d}"
         
         try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
+            session_data = self.storage.get("data/sessions", session_key)
         except (IOError, json.JSONDecodeError) as e:
             print(f"Error reading session file: {e}")
             return False
         
+        if session_data is None:
+            print(f"Session {session_number} not found!")
+            return False
+        
         # Update fields
         for key, value in updates.items():
             if key in session_data:
@@ -131,8 +138,7 @@ class SessionContextManager:
                     session_data[key] = value
         
         try:
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, indent=2)
+            self.storage.put("data/sessions", session_key, session_data)
             print(f"Updated session {session_number}")
             return True
         except (IOError, OSError) as e:
@@ -153,16 +159,11 @@ class SessionContextManager:
             print(f"Error: session_number must be a positive integer")
             return None
             
-        session_file = self.sessions_dir / f"session_{session_number:03d}.json"
-        
-        if session_file.exists():
-            try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Error reading session {session_number}: {e}")
-                return None
-        return None
+        try:
+            return self.storage.get("data/sessions", f"session_{session_number:03d}")
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Error reading session {session_number}: {e}")
+            return None
     
     def get_latest_session(self):
         """
@@ -172,10 +173,9 @@ class SessionContextManager:
             dict: Latest session data if found, None otherwise
         """
         try:
-            session_files = sorted(self.sessions_dir.glob("session_*.json"))
-            if session_files:
-                with open(session_files[-1], 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            session_keys = self._session_keys()
+            if session_keys:
+                return self.storage.get("data/sessions", session_keys[-1])
         except (IOError, json.JSONDecodeError) as e:
             print(f"Error reading latest session: {e}")
         return None
@@ -196,13 +196,13 @@ class SessionContextManager:
         
         # Update PCs with experience and fate points
         for char_id in session.get('characters_present', []):
-            pc_files = list(self.pcs_dir.glob("*.json"))
-            for pc_file in pc_files:
+            for pc_key in self.storage.keys("data/pcs"):
                 try:
-                    with open(pc_file, 'r', encoding='utf-8') as f:
-                        pc = json.load(f)
+                    pc = self.storage.get("data/pcs", pc_key)
                 except (IOError, json.JSONDecodeError) as e:
-                    print(f"Error reading PC file {pc_file}: {e}")
+                    print(f"Error reading PC file {pc_key}.json: {e}")
+                    continue
+                if pc is None:
                     continue
                 
                 if pc.get('id') == char_id:
@@ -230,11 +230,10 @@ class SessionContextManager:
                             pc['consequences']['mild'] = None
                     
                     try:
-                        with open(pc_file, 'w', encoding='utf-8') as f:
-                            json.dump(pc, f, indent=2)
+                        self.storage.put("data/pcs", pc_key, pc)
                         print(f"Updated {pc.get('name', 'Unknown')} from session {session_number}")
                     except (IOError, OSError) as e:
-                        print(f"Error writing PC file {pc_file}: {e}")
+                        print(f"Error writing PC file {pc_key}.json: {e}")
                         continue
         
         return True
@@ -304,10 +303,9 @@ class SessionContextManager:
             list: List of session summaries with key information
         """
         sessions = []
-        for session_file in sorted(self.sessions_dir.glob("session_*.json")):
+        for session_key in self._session_keys():
             try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    session = json.load(f)
+                session = self.storage.get("data/sessions", session_key)
                 sessions.append({
                     'number': session.get('session_number', 0),
                     'date': session.get('date', 'Unknown'),
@@ -315,7 +313,7 @@ class SessionContextManager:
                     'key_events': session.get('key_events', [])
                 })
             except (IOError, json.JSONDecodeError) as e:
-                print(f"Error reading session file {session_file}: {e}")
+                print(f"Error reading session file {session_key}.json: {e}")
                 continue
         return sessions
     
@@ -334,14 +332,13 @@ class SessionContextManager:
             return []
             
         sessions = []
-        for session_file in sorted(self.sessions_dir.glob("session_*.json")):
+        for session_key in self._session_keys():
             try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    session = json.load(f)
+                session = self.storage.get("data/sessions", session_key)
                 if character_id in session.get('characters_present', []):
                     sessions.append(session)
             except (IOError, json.JSONDecodeError) as e:
-                print(f"Error reading session file {session_file}: {e}")
+                print(f"Error reading session file {session_key}.json: {e}")
                 continue
         return sessions
 
@@ -16,6 +16,7 @@ import os
 from pathlib import Path
 from datetime import datetime
 from character_creation import get_backstory_tags
+from state_store import get_state_store_for_path
 
 
 # Faction name mapping for consistency
@@ -715,12 +716,12 @@ class SessionZeroManager:
     def update_campaign_state(self, faction_alignment, characters, neutral_subfaction=None):
         """Update campaign_state.json with session zero results"""
         campaign_state_file = self.state_dir / "campaign_state.json"
+        campaign_state_file.parent.mkdir(exist_ok=True)
+        store = get_state_store_for_path(campaign_state_file)
         
         # Load existing campaign state
-        if campaign_state_file.exists():
-            with open(campaign_state_file, 'r') as f:
-                campaign_state = json.load(f)
-        else:
+        campaign_state = store.load()
+        if campaign_state is None:
             # Create default campaign state if it doesn't exist
             campaign_state = {
                 "campaign_id": "skyrim_fate_core_001",
@@ -996,10 +997,8 @@ class SessionZeroManager:
         # Update last updated timestamp
         campaign_state["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Save updated campaign state
-        campaign_state_file.parent.mkdir(exist_ok=True)
-        with open(campaign_state_file, 'w') as f:
-            json.dump(campaign_state, f, indent=2)
+        # Save updated campaign state (changed sections are found by diffing)
+        store.save(campaign_state)
         
         print(f"\nCampaign state updated: {campaign_state_file}")
         print(f"Starting location: Whiterun")
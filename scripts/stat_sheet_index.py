@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Stat Sheet Index for Skyrim TTRPG
+
+Inverted index over data/npc_stat_sheets so scene and encounter queries do
+not have to run utils.location_matches against every sheet.
+
+Indexed fields:
+- location (distinct location strings plus a trigram index over them)
+- category, type and faction (case-insensitive)
+- act_context entries
+- hold_context tiers (primary / contested / rare)
+
+Location lookups keep the bidirectional partial-match semantics of
+utils.location_matches: candidates come from the index and are then
+confirmed with the same substring tests, so results are identical to a
+linear scan. Combined filters are set intersections over sheet positions,
+and results are always returned in directory glob order.
+
+The index is refreshed lazily whenever the DataCatalog reports that a file
+in the stat sheet directory was reloaded, added or removed: reloaded sheets
+are patched in place, and only a change to the set of files rebuilds it.
+"""
+
+import threading
+from pathlib import Path
+
+from data_catalog import get_catalog
+
+
+HOLD_TIERS = ("primary", "contested", "rare")
+
+# Search strings up to this length are matched against sheet locations by
+# enumerating their substrings; longer ones fall back to scanning the
+# (usually small) set of distinct locations.
+_MAX_SUBSTRING_SCAN = 64
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else ""
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class StatSheetIndex:
+    """
+    Index over one snapshot of a stat sheet directory.
+
+    Positions refer to the order sheets were returned by the catalog, which
+    is the same order the old glob-based loops produced. patch() swaps in
+    reloaded sheets without changing positions.
+    """
+
+    def __init__(self, entries):
+        self.sheets = []
+        self.errors = []
+        self.all_positions = set()
+        self._sources = []
+
+        self.by_category = {}
+        self.by_category_lower = {}
+        self.by_type_lower = {}
+        self.by_faction_lower = {}
+        self.by_id = {}
+        self._id_positions = {}
+        self.by_act = {}
+        self.by_hold = {tier: {} for tier in HOLD_TIERS}
+        self.without_hold_context = set()
+
+        # act_context stored as a plain string keeps substring semantics
+        self._act_text = {}
+
+        # distinct lowercase location -> positions, plus trigram lookup
+        self._locations = {}
+        self._location_trigrams = {}
+        self._location_cache = {}
+
+        for entry in entries:
+            if not entry.ok:
+                self.errors.append(entry)
+                continue
+            if isinstance(entry.data, dict):
+                self._add(entry)
+
+        self._lock = threading.Lock()
+
+    def _add(self, entry):
+        pos = len(self.sheets)
+        self.sheets.append(entry.data)
+        self._sources.append(entry)
+        self.all_positions.add(pos)
+        self._index(pos, entry.data)
+
+    def _index(self, pos, sheet):
+        category = sheet.get('category', '')
+        if isinstance(category, str):
+            self.by_category.setdefault(category, set()).add(pos)
+        self.by_category_lower.setdefault(_lower(category), set()).add(pos)
+        self.by_type_lower.setdefault(_lower(sheet.get('type', '')), set()).add(pos)
+        self.by_faction_lower.setdefault(_lower(sheet.get('faction', '')), set()).add(pos)
+
+        sheet_id = sheet.get('id')
+        if isinstance(sheet_id, str):
+            positions = self._id_positions.setdefault(sheet_id, set())
+            positions.add(pos)
+            self.by_id[sheet_id] = min(positions)
+
+        act_context = sheet.get('act_context', [])
+        if isinstance(act_context, str):
+            self._act_text[pos] = act_context
+        elif isinstance(act_context, list):
+            for act in act_context:
+                if isinstance(act, str):
+                    self.by_act.setdefault(act, set()).add(pos)
+
+        hold_context = sheet.get('hold_context', {})
+        if not hold_context:
+            self.without_hold_context.add(pos)
+        elif isinstance(hold_context, dict):
+            for tier in HOLD_TIERS:
+                holds = hold_context.get(tier, [])
+                if isinstance(holds, list):
+                    for hold in holds:
+                        if isinstance(hold, str):
+                            self.by_hold[tier].setdefault(hold, set()).add(pos)
+
+        location = sheet.get('location', '')
+        if location and isinstance(location, str):
+            location_lower = location.lower()
+            if location_lower not in self._locations:
+                self._locations[location_lower] = set()
+                for gram in _trigrams(location_lower):
+                    self._location_trigrams.setdefault(gram, set()).add(location_lower)
+            self._locations[location_lower].add(pos)
+
+    @staticmethod
+    def _discard(mapping, key, pos):
+        positions = mapping.get(key)
+        if positions is not None:
+            positions.discard(pos)
+            if not positions:
+                del mapping[key]
+
+    def _unindex(self, pos, sheet):
+        """Remove one sheet's postings (the inverse of _index)."""
+        category = sheet.get('category', '')
+        if isinstance(category, str):
+            self._discard(self.by_category, category, pos)
+        self._discard(self.by_category_lower, _lower(category), pos)
+        self._discard(self.by_type_lower, _lower(sheet.get('type', '')), pos)
+        self._discard(self.by_faction_lower, _lower(sheet.get('faction', '')), pos)
+
+        sheet_id = sheet.get('id')
+        if isinstance(sheet_id, str):
+            self._discard(self._id_positions, sheet_id, pos)
+            positions = self._id_positions.get(sheet_id)
+            if positions:
+                self.by_id[sheet_id] = min(positions)
+            else:
+                self.by_id.pop(sheet_id, None)
+
+        self._act_text.pop(pos, None)
+        act_context = sheet.get('act_context', [])
+        if isinstance(act_context, list):
+            for act in act_context:
+                if isinstance(act, str):
+                    self._discard(self.by_act, act, pos)
+
+        self.without_hold_context.discard(pos)
+        hold_context = sheet.get('hold_context', {})
+        if isinstance(hold_context, dict):
+            for tier in HOLD_TIERS:
+                holds = hold_context.get(tier, [])
+                if isinstance(holds, list):
+                    for hold in holds:
+                        if isinstance(hold, str):
+                            self._discard(self.by_hold[tier], hold, pos)
+
+        location = sheet.get('location', '')
+        if location and isinstance(location, str):
+            location_lower = location.lower()
+            self._discard(self._locations, location_lower, pos)
+            if location_lower not in self._locations:
+                for gram in _trigrams(location_lower):
+                    self._discard(self._location_trigrams, gram, location_lower)
+
+    def patch(self, entries):
+        """
+        Bring the index up to date with a newer listing of the directory.
+
+        Sheets whose entry was reloaded are re-indexed in place. If files
+        were added, removed or started/stopped parsing, positions would
+        shift, so nothing is changed and the caller should rebuild.
+
+        Args:
+            entries: Current CatalogEntry list for the directory
+
+        Returns:
+            bool: True if the index was patched
+        """
+        usable = [entry for entry in entries if entry.ok and isinstance(entry.data, dict)]
+        if len(usable) != len(self._sources) or any(
+                entry.path != source.path for entry, source in zip(usable, self._sources)):
+            return False
+        with self._lock:
+            for pos, entry in enumerate(usable):
+                if entry is self._sources[pos]:
+                    continue
+                self._unindex(pos, self.sheets[pos])
+                self.sheets[pos] = entry.data
+                self._sources[pos] = entry
+                self._index(pos, entry.data)
+            self.errors = [entry for entry in entries if not entry.ok]
+            self._location_cache.clear()
+        return True
+
+    # ------------------------------------------------------------------
+    # Field lookups
+    # ------------------------------------------------------------------
+
+    def _matching_locations(self, search_lower):
+        """Distinct sheet locations that location_matches search_lower."""
+        matched = set()
+
+        # search term inside sheet location
+        if len(search_lower) >= 3:
+            postings = sorted(
+                (self._location_trigrams.get(gram, set()) for gram in _trigrams(search_lower)),
+                key=len,
+            )
+            candidates = set(postings[0]).intersection(*postings[1:]) if postings else set()
+            matched.update(loc for loc in candidates if search_lower in loc)
+        else:
+            matched.update(loc for loc in self._locations if search_lower in loc)
+
+        # sheet location inside search term
+        if len(search_lower) <= _MAX_SUBSTRING_SCAN:
+            length = len(search_lower)
+            for start in range(length):
+                for end in range(start + 1, length + 1):
+                    piece = search_lower[start:end]
+                    if piece in self._locations:
+                        matched.add(piece)
+        else:
+            matched.update(loc for loc in self._locations if loc in search_lower)
+
+        return matched
+
+    def positions_for_location(self, location):
+        """
+        Positions of sheets whose location matches, as in location_matches.
+
+        Results are memoised per search string for the lifetime of the index.
+        """
+        if not location or not isinstance(location, str):
+            return set()
+        search_lower = location.lower()
+        with self._lock:
+            cached = self._location_cache.get(search_lower)
+            if cached is not None:
+                return cached
+        positions = set()
+        for loc in self._matching_locations(search_lower):
+            positions |= self._locations[loc]
+        with self._lock:
+            self._location_cache[search_lower] = positions
+        return positions
+
+    def positions_for_act(self, act):
+        """Positions of sheets whose act_context contains act."""
+        positions = set(self.by_act.get(act, ()))
+        if isinstance(act, str):
+            positions.update(pos for pos, text in self._act_text.items() if act in text)
+        return positions
+
+    def positions_for_hold(self, hold_name, tier):
+        """Positions of sheets listing hold_name in the given hold_context tier."""
+        return self.by_hold[tier].get(hold_name, set())
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def find(self, name=None, entity_type=None, category=None, location=None, faction=None):
+        """
+        Find sheets matching every provided filter.
+
+        Filters follow DataQueryManager.query_npc_enemy_stats: name is a
+        partial match, type/category/faction are case-insensitive exact
+        matches and location uses location_matches semantics.
+
+        Returns:
+            list: Matching sheets (shared, not copied) in glob order
+        """
+        sets = []
+        if entity_type:
+            sets.append(self.by_type_lower.get(entity_type.lower(), set()))
+        if category:
+            sets.append(self.by_category_lower.get(category.lower(), set()))
+        if faction:
+            sets.append(self.by_faction_lower.get(faction.lower(), set()))
+        if location:
+            sets.append(self.positions_for_location(location))
+
+        if sets:
+            sets.sort(key=len)
+            positions = set(sets[0]).intersection(*sets[1:])
+        else:
+            positions = self.all_positions
+
+        if name:
+            name_lower = name.lower()
+            positions = {
+                pos for pos in positions
+                if name_lower in _lower(self.sheets[pos].get('name', ''))
+            }
+
+        return self.sheets_at(positions)
+
+    def sheets_at(self, positions):
+        """Return the sheets at positions, in glob order."""
+        return [self.sheets[pos] for pos in sorted(positions)]
+
+    def get(self, sheet_id):
+        """Return the first sheet with the given id, or None."""
+        pos = self.by_id.get(sheet_id)
+        return self.sheets[pos] if pos is not None else None
+
+    def enemies_by_hold(self, hold_name):
+        """
+        Split enemies into primary/contested/rare tiers for a hold.
+
+        Mirrors DataQueryManager.get_enemies_by_hold: a sheet lands in the
+        first tier that lists the hold, and enemies without any hold_context
+        fall back to a location match and count as primary.
+
+        Returns:
+            dict: tier -> list of shared sheets
+        """
+        enemies = self.by_category.get('Enemy', set())
+        primary = enemies & self.positions_for_hold(hold_name, 'primary')
+        contested = (enemies & self.positions_for_hold(hold_name, 'contested')) - primary
+        rare = (enemies & self.positions_for_hold(hold_name, 'rare')) - primary - contested
+
+        fallback = enemies & self.without_hold_context
+        if fallback and isinstance(hold_name, str):
+            fallback = fallback & self.positions_for_location(hold_name)
+            primary = primary | fallback
+
+        return {
+            "primary": self.sheets_at(primary),
+            "contested": self.sheets_at(contested),
+            "rare": self.sheets_at(rare),
+        }
+
+    def enemies_by_act(self, act):
+        """Enemies whose act_context contains act, in glob order."""
+        enemies = self.by_category.get('Enemy', set())
+        return self.sheets_at(enemies & self.positions_for_act(act))
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _cached_index(key, owner, generation, entries):
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached[0] is owner:
+            if cached[1] == generation:
+                return cached[2]
+            if cached[2].patch(entries):
+                _indexes[key] = (owner, generation, cached[2])
+                return cached[2]
+
+    index = StatSheetIndex(entries)
+    with _indexes_lock:
+        _indexes[key] = (owner, generation, index)
+    return index
+
+
+def get_stat_sheet_index(directory, catalog=None):
+    """
+    Get an up-to-date StatSheetIndex for a stat sheet directory.
+
+    The directory is refreshed through the catalog (one stat per file) and
+    the index is only rebuilt when the catalog saw a change.
+
+    Args:
+        directory: Path to the npc_stat_sheets directory
+        catalog: DataCatalog to use (default: the process-wide catalog)
+
+    Returns:
+        StatSheetIndex (empty if the directory does not exist)
+    """
+    catalog = catalog if catalog is not None else get_catalog()
+    directory = Path(directory).resolve()
+    entries = catalog.load_dir(directory)
+    generation = catalog.generation(directory)
+    return _cached_index((id(catalog), directory), catalog, generation, entries)
+
+
+def get_storage_stat_sheet_index(storage, collection="data/npc_stat_sheets"):
+    """
+    Get an up-to-date StatSheetIndex for a stat sheet collection in a
+    storage backend (see storage.py).
+
+    Args:
+        storage: StorageBackend holding the stat sheets
+        collection: Collection name (default: "data/npc_stat_sheets")
+
+    Returns:
+        StatSheetIndex, rebuilt only when the collection's generation changed
+    """
+    entries = storage.entries(collection)
+    generation = storage.generation(collection)
+    return _cached_index((id(storage), collection), storage, generation, entries)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+State Store for Skyrim TTRPG
+
+One shared, parsed copy of a state document (normally
+state/campaign_state.json) per process, handed to every manager that needs
+it instead of each one loading and saving the file on its own.
+
+- load() returns the live document. It is only re-read from storage when
+  the stored copy changed underneath the store (another process or script
+  wrote it) and there are no unsaved changes.
+- save() records which top-level sections changed and writes them.
+- Inside batch() writes are deferred: any number of save() calls inside the
+  block are flushed once, when the outermost block exits normally. If it
+  raises, the changes are dropped instead.
+- Flushes are compare-and-swap writes against the version that was loaded.
+  If another process saved the document in the meantime, the store reloads
+  it, re-applies its own changes to the dirty sections as a JSON Patch and
+  tries again, so concurrent tools do not silently overwrite each other.
+
+Because the document is shared, code that changes it must call save() (or
+mark_dirty()) afterwards; code that only wants to experiment with the state
+should copy it first.
+"""
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from data_catalog import clone_json
+from json_patch import JsonPatchError, apply_patch, make_patch
+from storage import DEFAULT_RETRIES, ConflictError, get_storage
+
+
+class StateStore:
+    """Shared in-memory copy of one state document with dirty tracking."""
+
+    def __init__(self, storage, key="campaign_state", collection="state",
+                 retries=DEFAULT_RETRIES):
+        """
+        Args:
+            storage: StorageBackend holding the document (see storage.py)
+            key: Document key (default: "campaign_state")
+            collection: Collection name (default: "state")
+            retries: Conflicting flushes to rebase before giving up
+        """
+        self.storage = storage
+        self.collection = collection
+        self.key = key
+        self.retries = retries
+
+        self._doc = None
+        self._flushed = {}
+        self._token = None
+        self._version = None
+        self._dirty = set()
+        self._replace = False
+        self._batch_depth = 0
+        self._lock = threading.RLock()
+        self.stats = {"loads": 0, "flushes": 0, "conflicts": 0}
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _stored_token(self):
+        return self.storage.signature(self.collection, self.key)
+
+    def load(self):
+        """
+        Get the shared document.
+
+        Returns:
+            The live document (not a copy), or None if it does not exist
+        """
+        with self._lock:
+            if self.dirty:
+                return self._doc
+            token = self._stored_token()
+            if self._doc is None or token != self._token:
+                self._doc, self._version = self.storage.get_versioned(self.collection, self.key)
+                self._flushed = clone_json(self._doc) if isinstance(self._doc, dict) else {}
+                self._token = token
+                self.stats["loads"] += 1
+            return self._doc
+
+    def section(self, name, default=None):
+        """Get one top-level section of the document (live, not a copy)."""
+        doc = self.load()
+        if not isinstance(doc, dict):
+            return default
+        return doc.get(name, default)
+
+    @property
+    def dirty(self):
+        """True if there are changes that have not been flushed."""
+        return bool(self._dirty) or self._replace
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def mark_dirty(self, *sections):
+        """Record that the named top-level sections were changed in place."""
+        with self._lock:
+            self._dirty.update(sections)
+
+    def _changed_sections(self, doc):
+        changed = {name for name, value in doc.items()
+                   if name not in self._flushed or self._flushed[name] != value}
+        changed.update(name for name in self._flushed if name not in doc)
+        return changed
+
+    def save(self, doc=None, sections=None):
+        """
+        Record changes and flush them (deferred inside batch()).
+
+        Args:
+            doc: The document to store. Defaults to the live document; a
+                 different object replaces it.
+            sections: Names of the changed top-level sections. If omitted
+                      they are found by comparing against the last flush.
+        """
+        with self._lock:
+            if doc is not None and doc is not self._doc:
+                self._doc = doc
+                self._replace = True
+            if self._doc is None:
+                return
+            if sections is not None:
+                self._dirty.update(sections)
+            elif isinstance(self._doc, dict):
+                self._dirty.update(self._changed_sections(self._doc))
+            else:
+                self._replace = True
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self):
+        """
+        Write pending changes to storage once.
+
+        Returns:
+            bool: True if anything was written
+        """
+        with self._lock:
+            if not self.dirty or self._doc is None:
+                return False
+            for attempt in range(self.retries + 1):
+                try:
+                    self._version = self.storage.compare_and_put(
+                        self.collection, self.key, self._doc, self._version)
+                    break
+                except ConflictError:
+                    self.stats["conflicts"] += 1
+                    if attempt == self.retries:
+                        raise
+                    self._rebase()
+            if isinstance(self._doc, dict):
+                for name in self._dirty:
+                    if name in self._doc:
+                        self._flushed[name] = clone_json(self._doc[name])
+                    else:
+                        self._flushed.pop(name, None)
+                if self._replace:
+                    self._flushed = clone_json(self._doc)
+            self._dirty.clear()
+            self._replace = False
+            self._token = self._stored_token()
+            self.stats["flushes"] += 1
+            return True
+
+    def _rebase(self):
+        """Re-apply unflushed changes on top of the newly stored document."""
+        stored, self._version = self.storage.get_versioned(self.collection, self.key)
+        if self._replace or not isinstance(self._doc, dict) or not isinstance(stored, dict):
+            # Whole-document replacement: ours wins
+            return
+        merged = clone_json(stored)
+        for name in self._dirty:
+            if name not in self._doc:
+                merged.pop(name, None)
+            elif name in self._flushed and name in merged:
+                patch = make_patch(self._flushed[name], self._doc[name])
+                try:
+                    merged[name] = apply_patch(merged[name], patch)
+                except JsonPatchError:
+                    merged[name] = clone_json(self._doc[name])
+            else:
+                merged[name] = clone_json(self._doc[name])
+        # Keep the live object: managers may still hold a reference to it
+        self._doc.clear()
+        self._doc.update(merged)
+        self._flushed = stored
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer flushing until the outermost batch() block exits.
+
+        If the outermost block raises, nothing is flushed and the cached
+        document is dropped, so the next load() re-reads storage.
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.invalidate()
+                raise
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def resync(self):
+        """
+        Adopt the stored copy's current signature without re-reading it.
+
+        Call after an enclosing storage transaction committed this store's
+        flushed changes, so the next load() does not re-parse them.
+        """
+        with self._lock:
+            if self._doc is not None and not self.dirty:
+                self._token = self._stored_token()
+
+    def invalidate(self):
+        """Drop the cached document (unsaved changes are lost)."""
+        with self._lock:
+            self._doc = None
+            self._flushed = {}
+            self._token = None
+            self._version = None
+            self._dirty.clear()
+            self._replace = False
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(storage, key="campaign_state", collection="state"):
+    """
+    Get the process-wide StateStore for a document in a storage backend.
+
+    Stores are shared by document location, so managers built on different
+    backend instances over the same files still share one copy.
+    """
+    cache_key = storage.location(collection, key)
+    with _stores_lock:
+        store = _stores.get(cache_key)
+        if store is None:
+            store = StateStore(storage, key=key, collection=collection)
+            _stores[cache_key] = store
+        return store
+
+
+def get_state_store_for_path(state_path):
+    """
+    Get the shared StateStore for a state file given by path, e.g.
+    <repo>/state/campaign_state.json (for code that is handed paths).
+    """
+    state_path = Path(state_path).resolve()
+    storage = get_storage(state_path.parent.parent / "data", state_path.parent)
+    return get_state_store(storage, key=state_path.stem)
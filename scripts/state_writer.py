@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+State Writer for Skyrim TTRPG
+
+Crash-safe, incremental persistence for state/campaign_state.json (and any
+other JSON document that must never be left half-written).
+
+A document is stored as two files:
+- the snapshot (e.g. campaign_state.json), always written atomically
+  (temp file, fsync, rename), and
+- an append-only delta log next to it (campaign_state.json.journal) holding
+  RFC 6902 JSON Patches for every save since the last snapshot.
+
+A save only appends the patch for what changed and fsyncs the log, so its
+cost scales with the size of the change rather than the size of the
+campaign. Once the log grows past a few dozen entries, or past half the
+snapshot's size, it is compacted: the full document is written as a new
+snapshot and the log is removed.
+
+Loading reads the snapshot and replays the log on top of it. The first log
+line records the snapshot it applies to; if the snapshot was rewritten by
+something else in the meantime (a hand edit, an older script) the pending
+deltas are replayed onto the new snapshot, which is then compacted, and the
+original log is kept in campaign_state.json.journal.orphaned with a warning.
+If a delta no longer applies, the log is cut at that entry (the deltas
+before it are kept). A torn last line from a crash mid-append is dropped,
+since the save it describes never completed.
+
+Code that reads the snapshot directly instead of calling load_state()
+should call recover_state() first so pending deltas are compacted into it.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from data_catalog import clone_json
+from json_patch import JsonPatchError, apply_patch, make_patch
+
+
+JOURNAL_SUFFIX = ".journal"
+ORPHANED_SUFFIX = ".orphaned"
+
+# Compact after this many logged saves...
+COMPACT_EVERY = 50
+# ...or once the log is larger than this fraction of the snapshot
+COMPACT_RATIO = 0.5
+
+
+def _fsync_directory(directory):
+    """Flush a directory entry so a rename survives power loss (POSIX only)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(str(directory), os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path, text, encoding="utf-8"):
+    """
+    Replace a file's contents atomically.
+
+    The text is written to a temporary file in the same directory, flushed
+    to disk and renamed over the target, so readers see either the old or
+    the new contents.
+
+    Args:
+        path: Destination file
+        text: New contents
+        encoding: Text encoding (default: utf-8)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    _fsync_directory(path.parent)
+
+
+def atomic_write_json(path, data, indent=2, ensure_ascii=True):
+    """
+    Serialize data and write it atomically (see atomic_write_text).
+
+    Args:
+        path: Destination file
+        data: JSON-serializable data
+        indent: json.dumps indent (default: 2, matching the repo's files)
+        ensure_ascii: json.dumps ensure_ascii flag
+    """
+    atomic_write_text(path, json.dumps(data, indent=indent, ensure_ascii=ensure_ascii))
+
+
+def _file_signature(path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class JournaledStateFile:
+    """
+    A JSON document persisted as an atomic snapshot plus a JSON Patch log.
+
+    Instances keep the current document in memory and only re-read the
+    files when their (mtime, size) changed, e.g. because another process
+    saved in the meantime.
+    """
+
+    def __init__(self, path, indent=2, ensure_ascii=True,
+                 compact_every=COMPACT_EVERY, compact_ratio=COMPACT_RATIO):
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(self.path.name + JOURNAL_SUFFIX)
+        self.orphaned_path = self.journal_path.with_name(self.journal_path.name + ORPHANED_SUFFIX)
+        self.indent = indent
+        self.ensure_ascii = ensure_ascii
+        self.compact_every = compact_every
+        self.compact_ratio = compact_ratio
+
+        self._doc = None
+        self._seen = None
+        self._log_entries = 0
+        self._log_bytes = 0
+        self._snapshot_bytes = 0
+        self._seq = 0
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _disk_signatures(self):
+        return (_file_signature(self.path), _file_signature(self.journal_path))
+
+    def disk_signature(self):
+        """(mtime, size) of the snapshot and of the log; changes on every save."""
+        return self._disk_signatures()
+
+    def _read_snapshot(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _read_log(self):
+        """
+        Parse the delta log.
+
+        Returns:
+            tuple: (base_signature, entries, offsets, good_bytes, total_bytes),
+                   offsets[i] being the byte offset where entries[i] starts
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None, [], [], 0, 0
+
+        base = None
+        entries = []
+        offsets = []
+        good_bytes = 0
+        for line in raw.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # crash mid-append: the save never completed
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                break
+            if "base" in record and base is None and not entries:
+                base = tuple(record["base"]) if record["base"] else None
+            else:
+                entries.append(record)
+                offsets.append(good_bytes)
+            good_bytes += len(line)
+        return base, entries, offsets, good_bytes, len(raw)
+
+    def _replay(self, doc, entries):
+        """
+        Apply logged patches in order, stopping at the first that fails.
+
+        Returns:
+            tuple: (document, number of entries applied)
+        """
+        for applied, entry in enumerate(entries):
+            try:
+                doc = apply_patch(doc, entry.get("patch", []))
+            except JsonPatchError as e:
+                print(f"Warning: Error replaying {self.journal_path.name} entry "
+                      f"{entry.get('seq', applied + 1)}: {e}")
+                # apply_patch works in place; rebuild from the entries that fit
+                doc = self._read_snapshot()
+                for good in entries[:applied]:
+                    doc = apply_patch(doc, good.get("patch", []))
+                return doc, applied
+        return doc, len(entries)
+
+    def _orphan_log(self):
+        """Keep a copy of the current log next to it for manual recovery."""
+        with open(self.journal_path, 'rb') as src, open(self.orphaned_path, 'ab') as dst:
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+
+    def _refresh(self):
+        """Re-read snapshot and log if either changed on disk."""
+        signatures = self._disk_signatures()
+        if self._seen == signatures and (self._doc is not None or signatures[0] is None):
+            return
+
+        snapshot_sig, log_sig = signatures
+        if snapshot_sig is None:
+            self._doc = None
+            self._snapshot_bytes = 0
+            if log_sig is not None:
+                # Nothing to replay onto; set the deltas aside
+                self._orphan_log()
+                self._discard_log()
+                print(f"Warning: {self.path.name} is missing; its pending saves "
+                      f"were moved to {self.orphaned_path.name}")
+            self._reset_log_counters()
+            self._seen = self._disk_signatures()
+            return
+
+        doc = self._read_snapshot()
+        self._snapshot_bytes = snapshot_sig[1]
+        self._reset_log_counters()
+
+        if log_sig is not None:
+            base, entries, offsets, good_bytes, total_bytes = self._read_log()
+            if base != snapshot_sig:
+                # Snapshot was rewritten (e.g. by hand) after this log was
+                # started: carry the pending saves over onto it
+                self._orphan_log()
+                doc, applied = self._replay(doc, entries)
+                print(f"Warning: {self.path.name} changed outside the journal; merged "
+                      f"{applied} of {len(entries)} pending save(s) onto it "
+                      f"(original log kept in {self.orphaned_path.name})")
+                if applied:
+                    self._write_snapshot(doc)
+                    return
+                self._discard_log()
+            else:
+                doc, applied = self._replay(doc, entries)
+                if applied < len(entries):
+                    # Keep the deltas that fit; the rest is set aside
+                    self._orphan_log()
+                    good_bytes = offsets[applied]
+                    print(f"Warning: Dropped {len(entries) - applied} save(s) from "
+                          f"{self.journal_path.name} (kept in {self.orphaned_path.name})")
+                if good_bytes < total_bytes:
+                    os.truncate(self.journal_path, good_bytes)
+                self._log_entries = applied
+                self._log_bytes = good_bytes
+                self._seq = max([e.get("seq", 0) for e in entries[:applied]] + [self._seq])
+
+        self._doc = doc
+        self._seen = self._disk_signatures()
+
+    def _reset_log_counters(self):
+        self._log_entries = 0
+        self._log_bytes = 0
+
+    def _discard_log(self):
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def _append_log(self, patch):
+        lines = []
+        if not self.journal_path.exists():
+            lines.append(json.dumps({"base": list(_file_signature(self.path))}))
+            self._reset_log_counters()
+        self._seq += 1
+        lines.append(json.dumps({
+            "seq": self._seq,
+            "timestamp": datetime.now().isoformat(),
+            "patch": patch,
+        }, ensure_ascii=self.ensure_ascii))
+        payload = ("\n".join(lines) + "\n").encode('utf-8')
+        with open(self.journal_path, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_entries += 1
+        self._log_bytes += len(payload)
+
+    def _write_snapshot(self, data):
+        atomic_write_json(self.path, data, indent=self.indent, ensure_ascii=self.ensure_ascii)
+        self._discard_log()
+        self._reset_log_counters()
+        self._doc = clone_json(data)
+        self._snapshot_bytes = _file_signature(self.path)[1]
+        self._seen = self._disk_signatures()
+
+    def _compaction_due(self):
+        if self._log_entries >= self.compact_every:
+            return True
+        return self._log_bytes > self._snapshot_bytes * self.compact_ratio
+
+    def needs_recovery(self):
+        """True if deltas are pending in the log (snapshot is not current)."""
+        return self.journal_path.exists()
+
+    def compact(self):
+        """
+        Fold pending deltas into a new snapshot and remove the log.
+
+        Returns:
+            bool: True if a log was compacted
+        """
+        with self._lock:
+            self._refresh()
+            if not self.journal_path.exists():
+                return False
+            if self._doc is None:
+                self._discard_log()
+                return False
+            self._write_snapshot(self._doc)
+            return True
+
+    # Older name: replaying the journal after an unclean shutdown
+    recover = compact
+
+    def load(self):
+        """
+        Load the document (snapshot plus replayed deltas).
+
+        Returns:
+            A private copy of the document, or None if it does not exist
+        """
+        with self._lock:
+            self._refresh()
+            return clone_json(self._doc) if self._doc is not None else None
+
+    def save(self, data):
+        """
+        Persist a new version of the document.
+
+        Appends a JSON Patch of the changes to the log, compacting into a
+        full snapshot when the log has grown large enough.
+
+        Args:
+            data: The full document to persist
+        """
+        with self._lock:
+            self._refresh()
+            if self._doc is None:
+                self._write_snapshot(data)
+                return
+
+            patch = make_patch(self._doc, data)
+            if not patch:
+                return
+
+            self._append_log(patch)
+            self._doc = clone_json(data)
+            if self._compaction_due():
+                self._write_snapshot(self._doc)
+            else:
+                self._seen = self._disk_signatures()
+
+
+_state_files = {}
+_state_files_lock = threading.Lock()
+
+
+def get_state_file(path, indent=2, ensure_ascii=True):
+    """Return the process-wide JournaledStateFile for path."""
+    key = Path(path).resolve()
+    with _state_files_lock:
+        state_file = _state_files.get(key)
+        if state_file is None:
+            state_file = JournaledStateFile(key, indent=indent, ensure_ascii=ensure_ascii)
+            _state_files[key] = state_file
+        return state_file
+
+
+def load_state(path):
+    """Load a journaled JSON document (None if it does not exist)."""
+    return get_state_file(path).load()
+
+
+def save_state(path, data, ensure_ascii=True):
+    """Crash-safely save a journaled JSON document."""
+    state_file = get_state_file(path)
+    state_file.ensure_ascii = ensure_ascii
+    state_file.save(data)
+
+
+def compact_state(path):
+    """Fold pending deltas for path into its snapshot. Returns True if any."""
+    return get_state_file(path).compact()
+
+
+def recover_state(path):
+    """
+    Make the on-disk snapshot for path current before reading it directly.
+
+    Returns:
+        bool: True if pending deltas were compacted
+    """
+    state_file = get_state_file(path)
+    return state_file.needs_recovery() and state_file.compact()
@@ -0,0 +1,887 @@
+#!/usr/bin/env python3
+"""
+Storage Backends for Skyrim TTRPG
+
+A small document-store abstraction used by the managers instead of opening
+JSON files directly. Documents are addressed by a collection and a key:
+
+- "data/npcs", "lydia"           -> data/npcs/lydia.json
+- "data", "factions"             -> data/factions.json
+- "state", "campaign_state"      -> state/campaign_state.json
+
+Two backends are provided:
+
+- JsonDirectoryBackend keeps today's layout of loose JSON files. Reads go
+  through the data catalog (data_catalog.py) and state/ documents are
+  journaled through state_writer.py.
+- SQLiteBackend stores every document in one SQLite database with indexed
+  id, location, faction and status columns, so filtered queries do not
+  have to parse every document, and multi-document updates commit
+  atomically inside transaction().
+
+Every document has a version (a hash of its content, see
+document_version). Writers that may race with other processes (the GM
+dashboard, player helpers and the checkpoint script all share state/ and
+data/clocks/) use compare_and_put() or update(): the write only succeeds if
+the document is still at the version that was read, and update() re-runs
+its mutation on a fresh copy when it is not.
+
+get_storage() returns the JSON backend unless the SKYRIM_TTRPG_STORAGE
+environment variable points at an SQLite database. Scripts that still read
+files by path only see the JSON layout; use the migrate command to move a
+campaign between backends:
+
+Usage:
+    python storage.py migrate --to sqlite --db ../state/campaign.sqlite3
+    python storage.py migrate --to json --db ../state/campaign.sqlite3
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within a process
+    fcntl = None
+
+from data_catalog import CatalogEntry, clone_json, get_catalog
+from state_writer import atomic_write_json, get_state_file
+
+
+STORAGE_ENV = "SKYRIM_TTRPG_STORAGE"
+
+# Top-level document fields that can be filtered on with find()
+INDEXED_FIELDS = ("id", "location", "faction", "status")
+
+# Attempts update() makes before giving up on a contended document
+DEFAULT_RETRIES = 5
+
+_DELETED = object()
+
+
+class StorageError(ValueError):
+    """Raised for invalid collections, keys or documents."""
+
+
+class ConflictError(StorageError):
+    """Raised when a compare-and-swap write finds the document has changed."""
+
+
+def document_version(doc):
+    """
+    Version token of a document: a hash of its canonical JSON.
+
+    Returns:
+        str, or None for a missing document
+    """
+    if doc is None:
+        return None
+    canonical = json.dumps(doc, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:20]
+
+
+def index_value(doc, field):
+    """
+    Normalized value of an indexed field.
+
+    Returns:
+        Lowercased string, '' if the field is missing, or None if it holds
+        a non-string value (such documents are never excluded by a filter
+        on that field, matching the managers' historical filter loops)
+    """
+    if not isinstance(doc, dict):
+        return None
+    value = doc.get(field, '')
+    if isinstance(value, str):
+        return value.lower()
+    return None
+
+
+def matches_filters(doc, filters):
+    """True if doc passes every (field, value) filter (case-insensitive)."""
+    for field, wanted in filters.items():
+        value = index_value(doc, field)
+        if value is not None and value != wanted.lower():
+            return False
+    return True
+
+
+class StorageBackend:
+    """
+    Interface shared by the storage backends.
+
+    Subclasses implement _read, _write, _remove, _signature, _location,
+    _entries, keys, generation, collections and the transaction hooks
+    (_begin, _commit, _rollback); transaction() handles nesting. _version
+    and _expect can be overridden for cheaper or deferred version checks.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    # -- helpers --------------------------------------------------------
+
+    @staticmethod
+    def _check_key(collection, key):
+        if not collection or not isinstance(collection, str):
+            raise StorageError(f"Invalid collection: {collection!r}")
+        if not key or not isinstance(key, str) or "/" in key or "\\" in key \
+                or key.startswith("."):
+            raise StorageError(f"Invalid document key: {key!r}")
+
+    @staticmethod
+    def _check_filters(filters):
+        unknown = [field for field in filters if field not in INDEXED_FIELDS]
+        if unknown:
+            raise StorageError(
+                f"Cannot filter on {', '.join(unknown)}; indexed fields are "
+                f"{', '.join(INDEXED_FIELDS)}"
+            )
+        return {field: value for field, value in filters.items()
+                if isinstance(value, str) and value}
+
+    # -- public API -----------------------------------------------------
+
+    def get(self, collection, key):
+        """
+        Load a document.
+
+        Returns:
+            A private copy of the document, or None if it does not exist
+
+        Raises:
+            The underlying parse error if the stored document is unreadable
+        """
+        self._check_key(collection, key)
+        with self._lock:
+            return self._read(collection, key)
+
+    def put(self, collection, key, doc):
+        """Store (create or replace) a document."""
+        self._check_key(collection, key)
+        with self._lock:
+            self._write(collection, key, doc)
+
+    def get_versioned(self, collection, key):
+        """
+        Load a document together with its version.
+
+        Returns:
+            tuple: (private copy or None, version token or None)
+        """
+        self._check_key(collection, key)
+        with self._lock:
+            doc = self._read(collection, key)
+            return doc, document_version(doc)
+
+    def compare_and_put(self, collection, key, doc, expected_version):
+        """
+        Store a document only if it is still at expected_version.
+
+        Args:
+            collection: Collection name
+            key: Document key
+            doc: The new document
+            expected_version: Version returned by get_versioned() (None if
+                              the document must not exist yet)
+
+        Returns:
+            str: The new version
+
+        Raises:
+            ConflictError: If another writer changed the document first
+        """
+        self._check_key(collection, key)
+        with self._lock, self.transaction():
+            self._expect(collection, key, expected_version)
+            self._write(collection, key, doc)
+        return document_version(doc)
+
+    def update(self, collection, key, mutate, retries=DEFAULT_RETRIES):
+        """
+        Read-modify-write a document with compare-and-swap.
+
+        mutate(doc) changes the document in place (doc is None if it does
+        not exist) and returns a result; a falsy result means "nothing to
+        write". On a conflict mutate is re-applied to a fresh copy.
+
+        Returns:
+            The result of the last mutate call
+
+        Raises:
+            ConflictError: If every attempt lost the race
+        """
+        for attempt in range(retries + 1):
+            doc, version = self.get_versioned(collection, key)
+            result = mutate(doc)
+            if not result:
+                return result
+            try:
+                self.compare_and_put(collection, key, doc, version)
+                return result
+            except ConflictError:
+                if attempt == retries:
+                    raise
+
+    def delete(self, collection, key):
+        """
+        Remove a document.
+
+        Returns:
+            bool: True if the document existed
+        """
+        self._check_key(collection, key)
+        with self._lock:
+            return self._remove(collection, key)
+
+    def signature(self, collection, key):
+        """
+        Cheap token that changes whenever the stored document changes.
+
+        Lets in-memory caches (see state_store.py) notice writes made by
+        other processes without re-reading the document.
+        """
+        self._check_key(collection, key)
+        with self._lock:
+            return self._signature(collection, key)
+
+    def location(self, collection, key):
+        """
+        Identity of where a document is stored, equal for every backend
+        instance that reads and writes the same underlying document.
+        """
+        self._check_key(collection, key)
+        return self._location(collection, key)
+
+    def entries(self, collection):
+        """
+        Every document in a collection, including unreadable ones.
+
+        Returns:
+            list: CatalogEntry objects; entry.path.stem is the document key.
+            Entry data is shared; clone it before handing it out.
+        """
+        with self._lock:
+            return self._entries(collection)
+
+    def items(self, collection):
+        """
+        Readable documents in a collection.
+
+        Returns:
+            list: (key, document) pairs; documents are private copies
+        """
+        return [(entry.path.stem, clone_json(entry.data))
+                for entry in self.entries(collection) if entry.ok]
+
+    def find(self, collection, **filters):
+        """
+        Documents whose indexed fields match the given values.
+
+        Matching is exact and case-insensitive; a document whose field is
+        not a string is not excluded by a filter on that field.
+
+        Args:
+            collection: Collection to search
+            **filters: Any of id, location, faction, status
+
+        Returns:
+            list: (key, document) pairs; documents are private copies
+        """
+        filters = self._check_filters(filters)
+        return [(key, doc) for key, doc in self.items(collection)
+                if matches_filters(doc, filters)]
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group writes so they are applied together or not at all.
+
+        Transactions nest; only the outermost one commits. If the block
+        raises, every write made inside it is discarded.
+        """
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self._begin()
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._rollback()
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._commit()
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+    # -- version checks -------------------------------------------------
+
+    def _version(self, collection, key):
+        return document_version(self._read(collection, key))
+
+    def _expect(self, collection, key, expected_version):
+        current = self._version(collection, key)
+        if current != expected_version:
+            raise ConflictError(
+                f"{collection}/{key} changed (expected version {expected_version}, "
+                f"found {current})"
+            )
+
+
+class JsonDirectoryBackend(StorageBackend):
+    """
+    Documents as loose JSON files (the repository's native layout).
+
+    Collections are "<namespace>" or "<namespace>/<subdirectory>", where
+    each namespace maps to a root directory (normally "data" and "state").
+
+    Writes are atomic per file. Inside transaction() writes are buffered
+    and flushed when the outermost block exits, so a failing block leaves
+    every file untouched. Before a multi-document flush the whole batch is
+    written to a commit record (.storage_commit.pending in the state root);
+    if the process dies mid-flush, the next backend opened on the same
+    directories finishes the commit (see recover()).
+
+    Flushes from every process are serialized with an advisory lock on
+    .storage.lock in the state root, and compare-and-swap writes made
+    inside a transaction are re-checked against the files under that lock
+    when the transaction commits.
+    """
+
+    COMMIT_RECORD = ".storage_commit.pending"
+    LOCK_FILE = ".storage.lock"
+
+    def __init__(self, roots, catalog=None):
+        """
+        Args:
+            roots: dict of namespace -> directory
+            catalog: DataCatalog for reads (default: the process-wide one)
+        """
+        super().__init__()
+        self.roots = {name: Path(path) for name, path in roots.items()}
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self._pending = {}
+        self._expected = {}
+        self._versions = {}
+        self._writes = {}
+        self._flock_depth = 0
+        self.recover()
+
+    def directory(self, collection):
+        """Directory holding a collection's files."""
+        namespace, _, subdir = collection.partition("/")
+        if namespace not in self.roots:
+            raise StorageError(f"Unknown storage namespace: {namespace!r}")
+        root = self.roots[namespace]
+        return root / subdir if subdir else root
+
+    def path(self, collection, key):
+        """File path of a document."""
+        return self.directory(collection) / f"{key}.json"
+
+    @staticmethod
+    def _journaled(collection):
+        return collection.partition("/")[0] == "state"
+
+    def _read(self, collection, key):
+        pending = self._pending.get((collection, key))
+        if pending is not None:
+            return None if pending is _DELETED else clone_json(pending)
+        return self._read_stored(collection, key)
+
+    def _read_stored(self, collection, key):
+        path = self.path(collection, key)
+        if self._journaled(collection):
+            if not path.exists():
+                return None
+            return get_state_file(path).load()
+
+        entry = self.catalog.load_file(path)
+        if entry is None:
+            return None
+        if not entry.ok:
+            raise entry.error
+        return clone_json(entry.data)
+
+    def _location(self, collection, key):
+        return ("json", str(self.path(collection, key).resolve()))
+
+    def _signature(self, collection, key):
+        path = self.path(collection, key)
+        if self._journaled(collection):
+            return get_state_file(path).disk_signature()
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _stored_version(self, collection, key):
+        signature = self._signature(collection, key)
+        cached = self._versions.get((collection, key))
+        if cached is not None and signature is not None and cached[0] == signature:
+            return cached[1]
+        version = document_version(self._read_stored(collection, key))
+        self._versions[(collection, key)] = (signature, version)
+        return version
+
+    def _version(self, collection, key):
+        pending = self._pending.get((collection, key))
+        if pending is not None:
+            return None if pending is _DELETED else document_version(pending)
+        return self._stored_version(collection, key)
+
+    def _expect(self, collection, key, expected_version):
+        super()._expect(collection, key, expected_version)
+        # The first write in a transaction is re-checked against the file
+        # when it commits; later ones build on the buffered copy.
+        if (collection, key) not in self._pending:
+            self._expected.setdefault((collection, key), expected_version)
+
+    @contextmanager
+    def _file_lock(self):
+        """Advisory lock shared by every process writing these directories."""
+        with self._lock:
+            if fcntl is None or self._flock_depth:
+                self._flock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth -= 1
+                return
+            path = self.commit_record_path().with_name(self.LOCK_FILE)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._flock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth = 0
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write(self, collection, key, doc):
+        if self._depth:
+            self._pending[(collection, key)] = clone_json(doc)
+        else:
+            with self._file_lock():
+                self._flush_one(collection, key, doc)
+
+    def _remove(self, collection, key):
+        existed = self._read(collection, key) is not None
+        if self._depth:
+            self._pending[(collection, key)] = _DELETED
+        else:
+            with self._file_lock():
+                self._flush_one(collection, key, _DELETED)
+        return existed
+
+    def _flush_one(self, collection, key, doc):
+        path = self.path(collection, key)
+        if doc is _DELETED:
+            path.unlink(missing_ok=True)
+            if self._journaled(collection):
+                get_state_file(path).journal_path.unlink(missing_ok=True)
+        elif self._journaled(collection):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            get_state_file(path).save(doc)
+        else:
+            atomic_write_json(path, doc)
+        self.catalog.invalidate(path)
+        self._versions.pop((collection, key), None)
+        self._writes[collection] = self._writes.get(collection, 0) + 1
+
+    def _entries(self, collection):
+        directory = self.directory(collection)
+        if self._journaled(collection):
+            entries = []
+            if directory.is_dir():
+                for path in directory.glob("*.json"):
+                    try:
+                        entries.append(CatalogEntry(path, data=get_state_file(path).load()))
+                    except (IOError, ValueError) as e:
+                        entries.append(CatalogEntry(path, error=e))
+        else:
+            entries = self.catalog.load_dir(directory)
+
+        pending = {key: doc for (coll, key), doc in self._pending.items() if coll == collection}
+        if not pending:
+            return entries
+        merged = []
+        for entry in entries:
+            doc = pending.pop(entry.path.stem, None)
+            if doc is None:
+                merged.append(entry)
+            elif doc is not _DELETED:
+                merged.append(CatalogEntry(entry.path, data=doc))
+        for key, doc in pending.items():
+            if doc is not _DELETED:
+                merged.append(CatalogEntry(directory / f"{key}.json", data=doc))
+        return merged
+
+    def keys(self, collection):
+        """Document keys in a collection (directory glob order)."""
+        return [entry.path.stem for entry in self.entries(collection)]
+
+    def generation(self, collection):
+        """
+        Counter that changes whenever the collection's files change.
+
+        Changes made by other processes are noticed by the catalog, so call
+        this after entries() to compare against a fresh listing.
+        """
+        with self._lock:
+            return (self.catalog.generation(self.directory(collection))
+                    + self._writes.get(collection, 0))
+
+    def collections(self):
+        """Every directory under the namespace roots that holds JSON files."""
+        found = []
+        for namespace, root in self.roots.items():
+            if not root.is_dir():
+                continue
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = sorted(d for d in dirnames
+                                     if not d.startswith(".") and d != "__pycache__")
+                if not any(name.endswith(".json") and not name.startswith(".")
+                           for name in filenames):
+                    continue
+                rel = Path(dirpath).relative_to(root).as_posix()
+                found.append(namespace if rel == "." else f"{namespace}/{rel}")
+        return found
+
+    def _begin(self):
+        self._pending = {}
+        self._expected = {}
+
+    def commit_record_path(self):
+        """Where an in-progress multi-document commit is recorded."""
+        root = self.roots.get("state") or next(iter(self.roots.values()))
+        return root / self.COMMIT_RECORD
+
+    def _commit(self):
+        pending, self._pending = self._pending, {}
+        expected, self._expected = self._expected, {}
+        if not pending:
+            return
+        with self._file_lock():
+            for (collection, key), version in expected.items():
+                current = self._stored_version(collection, key)
+                if current != version:
+                    raise ConflictError(
+                        f"{collection}/{key} was changed by another writer; "
+                        f"transaction discarded"
+                    )
+            if len(pending) < 2:
+                for (collection, key), doc in pending.items():
+                    self._flush_one(collection, key, doc)
+                return
+            record = self.commit_record_path()
+            record.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(record, [
+                {"collection": collection, "key": key,
+                 "deleted": doc is _DELETED, "doc": None if doc is _DELETED else doc}
+                for (collection, key), doc in pending.items()
+            ], indent=None)
+            for (collection, key), doc in pending.items():
+                self._flush_one(collection, key, doc)
+            record.unlink(missing_ok=True)
+
+    def recover(self):
+        """
+        Finish a multi-document commit that was interrupted by a crash.
+
+        Returns:
+            int: Number of documents rewritten from the commit record
+        """
+        record = self.commit_record_path()
+        if not record.exists():
+            return 0
+        with self._file_lock():
+            # Another process may have been mid-commit; it is done now
+            try:
+                with open(record, 'r') as f:
+                    writes = json.load(f)
+            except FileNotFoundError:
+                return 0
+            except (IOError, ValueError) as e:
+                # The record is written atomically, so this is not a torn write
+                print(f"Warning: Error reading {record}: {e}")
+                return 0
+            for write in writes:
+                doc = _DELETED if write.get("deleted") else write.get("doc")
+                self._flush_one(write["collection"], write["key"], doc)
+            record.unlink(missing_ok=True)
+        return len(writes)
+
+    def _rollback(self):
+        self._pending = {}
+        self._expected = {}
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Documents stored in a single SQLite database.
+
+    Each row holds the document body as JSON plus lowercased copies of its
+    indexed fields (see index_value), so find() runs as an indexed query.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            collection TEXT NOT NULL,
+            key TEXT NOT NULL,
+            body TEXT NOT NULL,
+            doc_id TEXT,
+            location TEXT,
+            faction TEXT,
+            status TEXT,
+            PRIMARY KEY (collection, key)
+        );
+        CREATE INDEX IF NOT EXISTS documents_doc_id ON documents (collection, doc_id);
+        CREATE INDEX IF NOT EXISTS documents_location ON documents (collection, location);
+        CREATE INDEX IF NOT EXISTS documents_faction ON documents (collection, faction);
+        CREATE INDEX IF NOT EXISTS documents_status ON documents (collection, status);
+        CREATE TABLE IF NOT EXISTS generations (
+            collection TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL
+        );
+    """
+
+    # Indexed field -> column
+    COLUMNS = {"id": "doc_id", "location": "location", "faction": "faction", "status": "status"}
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path: SQLite database file (created if missing)
+        """
+        super().__init__()
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+
+    def _virtual_path(self, collection, key):
+        return Path(collection) / f"{key}.json"
+
+    def _read(self, collection, key):
+        row = self._conn.execute(
+            "SELECT body FROM documents WHERE collection = ? AND key = ?",
+            (collection, key),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _location(self, collection, key):
+        return ("sqlite", str(self.db_path.resolve()), collection, key)
+
+    def _signature(self, collection, key):
+        return self.generation(collection)
+
+    def _bump(self, collection):
+        self._conn.execute(
+            "INSERT INTO generations (collection, generation) VALUES (?, 1) "
+            "ON CONFLICT(collection) DO UPDATE SET generation = generation + 1",
+            (collection,),
+        )
+
+    def _write(self, collection, key, doc):
+        try:
+            body = json.dumps(doc)
+        except (TypeError, ValueError) as e:
+            raise StorageError(f"Document {collection}/{key} is not JSON-serializable: {e}")
+        values = [index_value(doc, field) for field in INDEXED_FIELDS]
+        with self.transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(collection, key, body, doc_id, location, faction, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [collection, key, body] + values,
+            )
+            self._bump(collection)
+
+    def _remove(self, collection, key):
+        with self.transaction():
+            cursor = self._conn.execute(
+                "DELETE FROM documents WHERE collection = ? AND key = ?",
+                (collection, key),
+            )
+            if cursor.rowcount:
+                self._bump(collection)
+        return cursor.rowcount > 0
+
+    def _entries(self, collection):
+        rows = self._conn.execute(
+            "SELECT key, body FROM documents WHERE collection = ? ORDER BY key",
+            (collection,),
+        ).fetchall()
+        return [CatalogEntry(self._virtual_path(collection, key), data=json.loads(body))
+                for key, body in rows]
+
+    def find(self, collection, **filters):
+        filters = self._check_filters(filters)
+        sql = "SELECT key, body FROM documents WHERE collection = ?"
+        params = [collection]
+        for field, value in filters.items():
+            column = self.COLUMNS[field]
+            sql += f" AND ({column} = ? OR {column} IS NULL)"
+            params.append(value.lower())
+        sql += " ORDER BY key"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(key, json.loads(body)) for key, body in rows]
+
+    def keys(self, collection):
+        """Document keys in a collection (sorted)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM documents WHERE collection = ? ORDER BY key",
+                (collection,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def generation(self, collection):
+        """Counter that changes whenever a document in collection changes."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generation FROM generations WHERE collection = ?",
+                (collection,),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def collections(self):
+        """Every collection holding at least one document."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT collection FROM documents ORDER BY collection"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _begin(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def _commit(self):
+        self._conn.execute("COMMIT")
+
+    def _rollback(self):
+        self._conn.execute("ROLLBACK")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_storage(data_dir="../data", state_dir=None, catalog=None):
+    """
+    Get the storage backend for a campaign.
+
+    If the SKYRIM_TTRPG_STORAGE environment variable names an SQLite
+    database, that database is used; otherwise documents are read from and
+    written to the JSON files under data_dir and state_dir.
+
+    Args:
+        data_dir: Path to the data directory
+        state_dir: Path to the state directory (default: sibling "state")
+        catalog: DataCatalog for the JSON backend (default: process-wide)
+
+    Returns:
+        StorageBackend (shared per database / directory pair)
+    """
+    data_dir = Path(data_dir).resolve()
+    state_dir = Path(state_dir).resolve() if state_dir is not None else data_dir.parent / "state"
+
+    db_path = os.environ.get(STORAGE_ENV)
+    if db_path:
+        key = ("sqlite", Path(db_path).resolve())
+    else:
+        catalog = catalog if catalog is not None else get_catalog()
+        key = ("json", data_dir, state_dir, id(catalog))
+
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            if db_path:
+                backend = SQLiteBackend(db_path)
+            else:
+                backend = JsonDirectoryBackend({"data": data_dir, "state": state_dir},
+                                               catalog=catalog)
+            _backends[key] = backend
+        return backend
+
+
+def migrate(source, target, collections=None):
+    """
+    Copy every document from one backend to another.
+
+    Existing documents in the target are replaced; documents that only
+    exist in the target are left alone. Each collection is copied in one
+    target transaction.
+
+    Args:
+        source: StorageBackend to read from
+        target: StorageBackend to write to
+        collections: Optional list of collections (default: all in source)
+
+    Returns:
+        dict: Counts of collections, documents and skipped (unreadable) files
+    """
+    counts = {"collections": 0, "documents": 0, "skipped": 0}
+    for collection in (collections if collections is not None else source.collections()):
+        counts["collections"] += 1
+        with target.transaction():
+            for entry in source.entries(collection):
+                if not entry.ok:
+                    print(f"Warning: Skipping {collection}/{entry.path.name}: {entry.error}")
+                    counts["skipped"] += 1
+                    continue
+                target.put(collection, entry.path.stem, entry.data)
+                counts["documents"] += 1
+    return counts
+
+
+def main():
+    """Command-line migration between the JSON and SQLite backends"""
+    scripts_dir = Path(__file__).resolve().parent
+    ap = argparse.ArgumentParser(description="Move campaign data between storage backends.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    mig = sub.add_parser("migrate", help="Copy all documents to the other backend")
+    mig.add_argument("--to", choices=["sqlite", "json"], required=True, help="Target backend")
+    mig.add_argument("--db", default=str(scripts_dir.parent / "state" / "campaign.sqlite3"),
+                     help="SQLite database path")
+    mig.add_argument("--data-dir", default=str(scripts_dir.parent / "data"), help="JSON data directory")
+    mig.add_argument("--state-dir", default=str(scripts_dir.parent / "state"), help="JSON state directory")
+    args = ap.parse_args()
+
+    json_backend = JsonDirectoryBackend({"data": args.data_dir, "state": args.state_dir})
+    sqlite_backend = SQLiteBackend(args.db)
+    try:
+        if args.to == "sqlite":
+            counts = migrate(json_backend, sqlite_backend)
+        else:
+            counts = migrate(sqlite_backend, json_backend)
+    finally:
+        sqlite_backend.close()
+
+    print(f"Migrated {counts['documents']} documents in {counts['collections']} collections "
+          f"to {args.to} ({counts['skipped']} skipped)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
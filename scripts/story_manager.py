@@ -16,9 +16,11 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
-from utils import location_matches
 from query_data import DataQueryManager
+from clock_engine import get_clock_engine
 from first_impression import maybe_first_impression
+from state_store import get_state_store
+from storage import get_storage
 
 # Import DragonbreakManager if available
 try:
@@ -52,9 +54,12 @@ COMPANIONS_CHAIN = {
 
 
 class StoryManager:
-    def __init__(self, data_dir="../data", state_dir="../state"):
+    def __init__(self, data_dir="../data", state_dir="../state", storage=None, state_store=None):
         self.data_dir = Path(data_dir)
         self.state_dir = Path(state_dir)
+        self.storage = storage if storage is not None else get_storage(self.data_dir, self.state_dir)
+        self.state_store = state_store if state_store is not None else get_state_store(self.storage)
+        self.clocks = get_clock_engine(self.storage, self.state_store)
         self.campaign_state_path = self.state_dir / "campaign_state.json"
         self.main_quests_path = self.data_dir / "quests" / "main_quests.json"
         self.civil_war_path = self.data_dir / "quests" / "civil_war_quests.json"
@@ -62,56 +67,43 @@ class StoryManager:
         self.companions_path = self.data_dir / "quests" / "companions_questline.json"
         self.thalmor_path = self.data_dir / "thalmor_arcs.json"
         self.npc_stat_sheets_dir = self.data_dir / "npc_stat_sheets"
-        self.query_manager = DataQueryManager(str(self.data_dir))
+        self.query_manager = DataQueryManager(str(self.data_dir), storage=self.storage)
         self.college_quests = self.load_college_quests()
         self.companions_quests = self.load_companions_quests()
 
         # Initialize Dragonbreak Manager if available
         if DRAGONBREAK_AVAILABLE:
-            self.dragonbreak_manager = DragonbreakManager(str(self.data_dir), str(self.state_dir))
+            self.dragonbreak_manager = DragonbreakManager(str(self.data_dir), str(self.state_dir),
+                                                          storage=self.storage)
         else:
             self.dragonbreak_manager = None
         
     def load_campaign_state(self):
-        """Load current campaign state"""
-        if self.campaign_state_path.exists():
-            with open(self.campaign_state_path, 'r') as f:
-                return json.load(f)
-        return None
+        """Load current campaign state (the shared copy; call save_campaign_state after changing it)"""
+        return self.state_store.load()
     
     def save_campaign_state(self, state):
-        """Save campaign state"""
+        """Save campaign state (flushed once per batch, journaled)"""
         self.state_dir.mkdir(exist_ok=True)
         state['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.campaign_state_path, 'w') as f:
-            json.dump(state, f, indent=2)
+        self.state_store.save(state)
     
     def load_main_quests(self):
         """Load main quest data"""
-        if self.main_quests_path.exists():
-            with open(self.main_quests_path, 'r') as f:
-                return json.load(f)
-        return None
+        return self.storage.get("data/quests", "main_quests")
     
     def load_civil_war_quests(self):
         """Load civil war quest data"""
-        if self.civil_war_path.exists():
-            with open(self.civil_war_path, 'r') as f:
-                return json.load(f)
-        return None
+        return self.storage.get("data/quests", "civil_war_quests")
 
     def load_college_quests(self):
         """Load College of Winterhold quest data"""
-        if self.college_path.exists():
-            with open(self.college_path, 'r') as f:
-                return json.load(f)
-        return {}
+        return self.storage.get("data/quests", "college_of_winterhold_quests") or {}
 
     def load_companions_quests(self):
         """Load Companions questline data"""
-        if self.companions_path.exists():
-            with open(self.companions_path, 'r') as f:
-                data = json.load(f)
+        data = self.storage.get("data/quests", "companions_questline")
+        if data is not None:
             return data.get("companions_questline", {}).get("quests", {})
         return {}
 
@@ -473,8 +465,7 @@ class StoryManager:
                             print(f"Unlocked quest: {next_quest['name']}")
                 
                 # Save updated data
-                with open(self.main_quests_path, 'w') as f:
-                    json.dump(main_quests_data, f, indent=2)
+                self.storage.put("data/quests", "main_quests", main_quests_data)
                 
                 print(f"Quest '{quest['name']}' status: {old_status} -> {new_status}")
                 return True
@@ -578,28 +569,10 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
         if not self.npc_stat_sheets_dir.exists():
             return result
         
-        # Load all stat sheets and filter by location
-        for stat_file in self.npc_stat_sheets_dir.glob("*.json"):
-            try:
-                with open(stat_file, 'r') as f:
-                    stat_sheet = json.load(f)
-                
-                # Check if location matches (case-insensitive partial match)
-                sheet_location = stat_sheet.get('location', '')
-                
-                if location_matches(location, sheet_location):
-                    category = stat_sheet.get('category', '')
-                    
-                    if category == "Friendly NPC":
-                        result['friendly'].append(stat_sheet)
-                    elif category == "Hostile NPC":
-                        result['hostile'].append(stat_sheet)
-                    elif category == "Enemy":
-                        result['enemies'].append(stat_sheet)
-            
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Error reading {stat_file.name}: {e}")
-                continue
+        # Look up stat sheets matching the location (case-insensitive partial match)
+        buckets = self.query_manager.get_npcs_for_scene(location=location)
+        for bucket in ('friendly', 'hostile', 'enemies'):
+            result[bucket] = buckets[bucket]
         
         # Add scene-specific suggestions
         if scene_type == "combat":
@@ -665,10 +638,7 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
             # Normalize common forms
             if not pc_id.startswith("pc_"):
                 pc_id = f"pc_{pc_id}"
-            pc_path = self.data_dir / "pcs" / f"{pc_id}.json"
-            if pc_path.exists():
-                with open(pc_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            return self.storage.get("data/pcs", pc_id)
         return None
 
     def _get_pc_compel_hooks(self, max_items=5):
@@ -708,6 +678,13 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
         Returns:
             Complete scene setup with NPCs/enemies
         """
+        # Every read below shares one state copy, and the first impressions
+        # recorded for each NPC are written in a single flush
+        with self.state_store.batch():
+            return self._setup_scene(scene_data)
+    
+    def _setup_scene(self, scene_data):
+        """Build the scene for trigger_scene_event (runs inside a state batch)"""
         location = scene_data.get('location', 'Unknown')
         scene_type = scene_data.get('type', 'general')
         
@@ -721,8 +698,8 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
         
         # Try to determine PC ID from campaign state
         try:
-            with open(self.campaign_state_path, 'r') as f:
-                state = json.load(f)
+            state = self.load_campaign_state()
+            if state is not None:
                 pc_id = state.get("active_pc_id") or state.get("active_pc")
                 if not pc_id and state.get("player_characters"):
                     # Fallback to first PC in player_characters list
@@ -761,7 +738,8 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
                             state_path,
                             appearance_path,
                             npc_id,
-                            disposition=bucket_disposition
+                            disposition=bucket_disposition,
+                            store=self.state_store
                         )
                         if line:
                             npc.setdefault("gm_barks", [])
@@ -1552,26 +1530,17 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
         Args:
             clock_type: "civil_war", "thalmor", "faction_trust", or "all"
         """
-        clocks_dir = self.data_dir / "clocks"
         clocks = {}
         
-        if clock_type in ["civil_war", "all"]:
-            civil_war_path = clocks_dir / "civil_war_clocks.json"
-            if civil_war_path.exists():
-                with open(civil_war_path, 'r') as f:
-                    clocks['civil_war'] = json.load(f)
-        
-        if clock_type in ["thalmor", "all"]:
-            thalmor_path = clocks_dir / "thalmor_influence_clocks.json"
-            if thalmor_path.exists():
-                with open(thalmor_path, 'r') as f:
-                    clocks['thalmor'] = json.load(f)
-        
-        if clock_type in ["faction_trust", "all"]:
-            trust_path = clocks_dir / "faction_trust_clocks.json"
-            if trust_path.exists():
-                with open(trust_path, 'r') as f:
-                    clocks['faction_trust'] = json.load(f)
+        for category, key in (
+            ("civil_war", "civil_war_clocks"),
+            ("thalmor", "thalmor_influence_clocks"),
+            ("faction_trust", "faction_trust_clocks"),
+        ):
+            if clock_type in [category, "all"]:
+                data = self.storage.get("data/clocks", key)
+                if data is not None:
+                    clocks[category] = data
         
         return clocks
     
@@ -1598,52 +1567,26 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
             return False
         
         file_path = clocks_dir / file_map[clock_category]
-        if not file_path.exists():
+        clock_key = Path(file_map[clock_category]).stem
+
+        engine = self.clocks.refresh()
+        if clock_key not in engine.sources:
             print(f"Error: Clock file not found: {file_path}")
             return False
-        
-        # Load clocks
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
-        # Find and update the clock
-        if clock_category == "civil_war":
-            clocks = data.get('civil_war_clocks', {}).get('clocks', {})
-        elif clock_category == "thalmor":
-            clocks = data.get('thalmor_influence_clocks', {}).get('clocks', {})
-        elif clock_category == "faction_trust":
-            clocks = data.get('faction_trust_clocks', {}).get('clocks', {})
-        
-        if clock_name not in clocks:
+        clock_id = f"{clock_key}/{clock_name}"
+        if clock_id not in engine:
             print(f"Error: Clock not found: {clock_name}")
-            print(f"Available clocks: {', '.join(clocks.keys())}")
+            print(f"Available clocks: {', '.join(clock.key for clock in engine.clocks(source=clock_key))}")
             return False
-        
-        clock = clocks[clock_name]
-        old_progress = clock['current_progress'] if 'current_progress' in clock else clock.get('current_trust', 0)
-        max_value = clock['total_segments'] if 'total_segments' in clock else clock.get('max_trust', 10)
-        
-        # Update progress
-        if 'current_progress' in clock:
-            clock['current_progress'] = max(0, min(max_value, clock['current_progress'] + segments))
-            new_progress = clock['current_progress']
-        elif 'current_trust' in clock:
-            clock['current_trust'] = max(0, min(max_value, clock['current_trust'] + segments))
-            new_progress = clock['current_trust']
-        
-        # Update last_updated timestamp
-        if clock_category in ["civil_war", "thalmor"]:
-            data[f'{clock_category}_clocks']['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Save updated clocks
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        
+
+        # Written back in the file's own schema; replayed if another process saved it first
+        change = engine.advance(clock_id, segments)
+
         print(f"\n{'='*50}")
         print(f"Clock Updated: {clock_name}")
-        print(f"Progress: {old_progress} -> {new_progress} / {max_value}")
-        if new_progress >= max_value:
-            print(f"⚠️  CLOCK FILLED! Effect: {clock.get('completion_effect', 'See clock data')}")
+        print(f"Progress: {change['old']} -> {change['new']} / {change['max']}")
+        if change['new'] >= change['max']:
+            print(f"⚠️  CLOCK FILLED! Effect: {change['clock'].get('completion_effect', 'See clock data')}")
         print(f"{'='*50}\n")
         
         return True
@@ -1659,28 +1602,24 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
         clocks_dir = self.data_dir / "clocks"
         file_path = clocks_dir / "whiterun_jobs.json"
         
-        if not file_path.exists():
+        # Load clocks
+        engine = self.clocks.refresh()
+        if "whiterun_jobs" not in engine.sources:
             print(f"Error: whiterun_jobs.json not found at {file_path}")
             return False
         
-        # Load clocks
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
-        clocks = data.get('whiterun_jobs', {}).get('clocks', {})
-        
-        if clock_name not in clocks:
+        clock = engine.get(f"whiterun_jobs/{clock_name}")
+        if clock is None:
             print(f"Error: Clock not found: {clock_name}")
             return False
         
-        clock = clocks[clock_name]
-        old_progress = clock.get('current', 0)
-        max_value = clock.get('max', 10)
+        old_progress = clock.current
+        max_value = clock.maximum
         new_progress = old_progress + segments
         
         # Check for gating
-        if 'gate' in clock:
-            gate = clock['gate']
+        gate = clock.get('gate')
+        if gate:
             cap = gate.get('cap_until_condition_met', max_value)
             
             if new_progress >= cap:
@@ -1710,20 +1649,13 @@ Schemes Discovered: {len(state['thalmor_arc']['thalmor_schemes_discovered'])}
                     # Don't advance beyond cap
                     new_progress = min(new_progress, cap)
         
-        # Update progress
-        clock['current'] = max(0, min(max_value, new_progress))
-        
-        # Update timestamp
-        data['whiterun_jobs']['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Save updated clocks
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Update progress (the engine clamps and stamps last_updated)
+        change = engine.advance(clock.id, new_progress - old_progress)
         
         print(f"\n{'='*50}")
         print(f"Clock Updated: {clock_name}")
-        print(f"Progress: {old_progress} -> {clock['current']} / {max_value}")
-        if clock['current'] >= max_value:
+        print(f"Progress: {old_progress} -> {change['new']} / {max_value}")
+        if change['new'] >= max_value:
             print(f"⚠️  CLOCK FILLED! Effect: {clock.get('completion_effect', 'See clock data')}")
         print(f"{'='*50}\n")
         
@@ -14,14 +14,18 @@ import os
 from datetime import datetime
 from pathlib import Path
 
+from clock_engine import get_clock_engine
+from storage import get_storage
+
 
 class StoryProgressionManager:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", storage=None):
         """
         Initialize the StoryProgressionManager.
         
         Args:
             data_dir: Path to the data directory (default: "data")
+            storage: StorageBackend to use (default: JSON files under data_dir)
         """
         self.data_dir = Path(data_dir)
         self.world_state_path = self.data_dir / "world_state" / "current_state.json"
@@ -32,6 +36,9 @@ class StoryProgressionManager:
         (self.data_dir / "world_state").mkdir(parents=True, exist_ok=True)
         self.factions_dir.mkdir(parents=True, exist_ok=True)
         self.quests_dir.mkdir(parents=True, exist_ok=True)
+
+        self.storage = storage if storage is not None else get_storage(self.data_dir)
+        self.clocks = get_clock_engine(self.storage)
         
     def load_world_state(self):
         """
@@ -111,46 +118,27 @@ class StoryProgressionManager:
         if not isinstance(progress_change, (int, float)):
             print("Error: progress_change must be a number")
             return False
-            
-        faction_path = self.factions_dir / f"{faction_id}.json"
-        if faction_path.exists():
-            try:
-                with open(faction_path, 'r', encoding='utf-8') as f:
-                    faction = json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Error reading faction file: {e}")
-                return False
-            
-            if 'clock' in faction and isinstance(faction['clock'], dict):
-                old_progress = faction['clock'].get('progress', 0)
-                segments = faction['clock'].get('segments', 8)
-                
-                # Clamp progress between 0 and segments
-                faction['clock']['progress'] = min(
-                    segments,
-                    max(0, old_progress + progress_change)
-                )
-                
-                try:
-                    with open(faction_path, 'w', encoding='utf-8') as f:
-                        json.dump(faction, f, indent=2)
-                except (IOError, OSError) as e:
-                    print(f"Error writing faction file: {e}")
-                    return False
-                
-                faction_name = faction.get('name', faction_id)
-                print(f"Updated {faction_name} clock: {old_progress} -> {faction['clock']['progress']}/{segments}")
-                
-                if faction['clock']['progress'] >= segments:
-                    clock_name = faction['clock'].get('name', 'goal')
-                    print(f"WARNING: {faction_name} has completed their clock: {clock_name}")
-                
-                return True
-            else:
+
+        engine = self.clocks.refresh()
+        clock = engine.get(f"faction_files/{faction_id}")
+        if clock is None:
+            if (self.factions_dir / f"{faction_id}.json").exists():
                 print(f"Faction {faction_id} does not have a valid clock")
-        else:
-            print(f"Faction {faction_id} not found")
-        return False
+            else:
+                print(f"Faction {faction_id} not found")
+            return False
+
+        # Clocks count whole segments, so fractional changes are rounded.
+        # Clamped to 0..segments (8 when unset); replayed if another process
+        # saved first
+        change = engine.advance(clock.id, int(round(progress_change)))
+        print(f"Updated {clock.group_name} clock: {change['old']} -> {change['new']}/{change['max']}")
+
+        if change['new'] >= change['max']:
+            clock_name = clock.get('name', 'goal')
+            print(f"WARNING: {clock.group_name} has completed their clock: {clock_name}")
+
+        return True
     
     def generate_story_events(self):
         """
@@ -297,21 +285,9 @@ class StoryProgressionManager:
                 rumors.append("General Tullius is planning a major offensive.")
         
         # Faction-based rumors
-        faction_files = list(self.factions_dir.glob("*.json"))
-        for faction_file in faction_files:
-            try:
-                with open(faction_file, 'r', encoding='utf-8') as f:
-                    faction = json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Error reading faction file {faction_file}: {e}")
-                continue
-                
-            if 'clock' in faction and isinstance(faction['clock'], dict):
-                progress = faction['clock'].get('progress', 0)
-                segments = faction['clock'].get('segments', 8)
-                if progress > segments * 0.5:
-                    faction_name = faction.get('name', 'Unknown')
-                    rumors.append(f"The {faction_name} are up to something...")
+        for clock in self.clocks.refresh().clocks(group="faction_files"):
+            if clock.current > clock.maximum * 0.5:
+                rumors.append(f"The {clock.group_name} are up to something...")
         
         return rumors
 
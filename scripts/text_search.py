@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Text Search for Skyrim TTRPG
+
+Persistent, incrementally updated BM25 index over the campaign's markdown:
+- data/rules/*.md
+- source_material/converted_pdfs/*.md
+- logs/*.md
+
+Documents are split into sections at markdown headings, so hits point at
+the relevant part of a file instead of the whole file. Queries support
+multiple terms and "quoted phrases"; phrases must appear verbatim (by
+token) in a section for it to match.
+
+The index is saved to state/search_index.json (state/search_index.<hash>.json
+for other source sets, so each set keeps its own file). The file records
+the sources it was built from and is ignored if they differ. On every
+refresh the source files are stat'ed and only new or changed files are
+re-tokenized.
+
+Usage:
+    python text_search.py "create advantage"
+    python text_search.py '"standing stone" warrior' --source converted_pdfs
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from pathlib import Path
+
+
+INDEX_VERSION = 1
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+PHRASE_RE = re.compile(r'"([^"]*)"')
+HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$")
+
+# BM25 tuning (standard defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text):
+    """Lowercase word tokens used for indexing and querying."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def default_sources(repo_root):
+    """
+    Default source directories, keyed by source name.
+
+    Args:
+        repo_root: Repository root (the directory containing data/)
+
+    Returns:
+        dict: source name -> (directory, glob pattern)
+    """
+    repo_root = Path(repo_root)
+    return {
+        "rules": (repo_root / "data" / "rules", "*.md"),
+        "converted_pdfs": (repo_root / "source_material" / "converted_pdfs", "*.md"),
+        "logs": (repo_root / "logs", "*.md"),
+    }
+
+
+def _source_key(sources):
+    """Sources as sorted [name, resolved directory, pattern] lists."""
+    return [[name, str(Path(directory).resolve()), pattern]
+            for name, (directory, pattern) in sorted(sources.items())]
+
+
+def _default_index_path(repo_root, sources):
+    """state/search_index.json for the default sources, else a per-sources file."""
+    key = _source_key(sources)
+    if key == _source_key(default_sources(repo_root)):
+        return repo_root / "state" / "search_index.json"
+    digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()[:12]
+    return repo_root / "state" / f"search_index.{digest}.json"
+
+
+def split_sections(lines):
+    """
+    Split markdown lines into heading-delimited sections.
+
+    Returns:
+        list: dicts with 'heading', 'start' and 'end' (line indexes, end exclusive)
+    """
+    sections = []
+    heading = ""
+    start = 0
+    for i, line in enumerate(lines):
+        match = HEADING_RE.match(line)
+        if match and i > start:
+            sections.append({"heading": heading, "start": start, "end": i})
+            start = i
+        if match:
+            heading = match.group(1)
+    if start < len(lines) or not sections:
+        sections.append({"heading": heading, "start": start, "end": len(lines)})
+    return sections
+
+
+class TextSearchIndex:
+    """
+    BM25 index over heading-level sections of markdown files.
+
+    Postings map term -> {(file, section_index): [token positions]}; token
+    positions are kept so phrase queries can be verified without reading
+    the files again.
+    """
+
+    def __init__(self, repo_root, sources=None, index_path=None):
+        """
+        Initialize the index and load any persisted copy.
+
+        Args:
+            repo_root: Repository root; file keys are stored relative to it
+            sources: dict of source name -> (directory, pattern)
+                     (default: default_sources(repo_root))
+            index_path: Where to persist the index
+                        (default: <repo_root>/state/search_index.json, or
+                        search_index.<hash>.json for non-default sources)
+        """
+        self.repo_root = Path(repo_root).resolve()
+        self.sources = sources if sources is not None else default_sources(self.repo_root)
+        self.source_key = _source_key(self.sources)
+        self.index_path = (
+            Path(index_path) if index_path is not None
+            else _default_index_path(self.repo_root, self.sources)
+        )
+
+        self._files = {}
+        self._postings = {}
+        self._section_lengths = {}
+        self._total_length = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (IOError, json.JSONDecodeError, UnicodeDecodeError):
+            return
+        if saved.get("version") != INDEX_VERSION or saved.get("sources") != self.source_key:
+            # Another format, or built from other sources: start over
+            return
+        for rel, record in saved.get("files", {}).items():
+            record["signature"] = tuple(record.get("signature") or ())
+            self._add_file(rel, record)
+
+    def save(self):
+        """Persist the index if it changed since it was loaded."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": INDEX_VERSION, "sources": self.source_key,
+                           "files": self._files}, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+            return True
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+
+    def _relpath(self, path):
+        path = Path(path).resolve()
+        try:
+            return path.relative_to(self.repo_root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def _build_record(self, source, path, signature):
+        try:
+            text = Path(path).read_text(encoding='utf-8')
+        except (IOError, UnicodeDecodeError) as e:
+            return {"source": source, "signature": signature, "error": str(e),
+                    "lines": [], "sections": []}
+
+        lines = text.split('\n')
+        sections = []
+        for section in split_sections(lines):
+            terms = {}
+            position = 0
+            for line in lines[section["start"]:section["end"]]:
+                for token in tokenize(line):
+                    terms.setdefault(token, []).append(position)
+                    position += 1
+            section["length"] = position
+            section["terms"] = terms
+            sections.append(section)
+
+        return {"source": source, "signature": signature, "lines": lines,
+                "sections": sections}
+
+    def _add_file(self, rel, record):
+        self._files[rel] = record
+        for idx, section in enumerate(record.get("sections", [])):
+            key = (rel, idx)
+            self._section_lengths[key] = section["length"]
+            self._total_length += section["length"]
+            for term, positions in section["terms"].items():
+                self._postings.setdefault(term, {})[key] = positions
+
+    def _remove_file(self, rel):
+        record = self._files.pop(rel, None)
+        if record is None:
+            return
+        for idx, section in enumerate(record.get("sections", [])):
+            key = (rel, idx)
+            self._total_length -= self._section_lengths.pop(key, 0)
+            for term in section["terms"]:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def refresh(self):
+        """
+        Bring the index up to date with the source directories.
+
+        Only files whose (mtime, size) changed are re-tokenized.
+
+        Returns:
+            bool: True if anything changed
+        """
+        with self._lock:
+            seen = set()
+            changed = False
+            for source, (directory, pattern) in self.sources.items():
+                directory = Path(directory)
+                if not directory.is_dir():
+                    continue
+                for path in directory.glob(pattern):
+                    rel = self._relpath(path)
+                    seen.add(rel)
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    signature = (st.st_mtime_ns, st.st_size)
+                    existing = self._files.get(rel)
+                    if existing is not None and existing["signature"] == signature \
+                            and existing["source"] == source:
+                        continue
+                    self._remove_file(rel)
+                    self._add_file(rel, self._build_record(source, path, signature))
+                    changed = True
+
+            for rel in [r for r in self._files if r not in seen]:
+                self._remove_file(rel)
+                changed = True
+
+            if changed:
+                self._dirty = True
+            return changed
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def file_lines(self, path):
+        """
+        Get the indexed lines of a file.
+
+        Returns:
+            tuple: (lines, error) where lines is None if the file is not indexed
+        """
+        record = self._files.get(self._relpath(path))
+        if record is None:
+            return None, None
+        return record["lines"], record.get("error")
+
+    @staticmethod
+    def parse_query(query):
+        """
+        Split a query into free terms and quoted phrases.
+
+        Returns:
+            tuple: (terms, phrases) where phrases is a list of token lists
+        """
+        phrases = [tokenize(p) for p in PHRASE_RE.findall(query)]
+        phrases = [p for p in phrases if p]
+        free_text = PHRASE_RE.sub(" ", query)
+        terms = tokenize(free_text)
+        for phrase in phrases:
+            terms.extend(phrase)
+        # de-duplicate while keeping order
+        return list(dict.fromkeys(terms)), phrases
+
+    def _has_phrase(self, key, phrase):
+        first = self._postings.get(phrase[0], {}).get(key)
+        if not first:
+            return False
+        rest = [set(self._postings.get(t, {}).get(key, ())) for t in phrase[1:]]
+        return any(
+            all(start + offset + 1 in positions for offset, positions in enumerate(rest))
+            for start in first
+        )
+
+    def _context(self, record, section, terms, context_lines, max_lines):
+        lines = record["lines"][section["start"]:section["end"]]
+        wanted = set(terms)
+        keep = set()
+        for i, line in enumerate(lines):
+            if wanted.intersection(tokenize(line)):
+                keep.update(range(max(0, i - context_lines), min(len(lines), i + context_lines + 1)))
+        return [lines[i] for i in sorted(keep)][:max_lines]
+
+    def search(self, query, limit=10, sources=None, context_lines=2, max_context=8):
+        """
+        Ranked section-level search.
+
+        Args:
+            query: Free text; "quoted phrases" must match verbatim
+            limit: Maximum number of hits
+            sources: Optional iterable of source names to restrict to
+            context_lines: Lines of context around each matching line
+            max_context: Maximum context lines per hit
+
+        Returns:
+            list: Hit dicts with file, source, heading, line, score, context
+        """
+        terms, phrases = self.parse_query(query or "")
+        if not terms:
+            return []
+
+        with self._lock:
+            if sources is not None:
+                sources = set(sources)
+            section_count = len(self._section_lengths)
+            if not section_count:
+                return []
+            avg_length = (self._total_length / section_count) or 1.0
+
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (section_count - df + 0.5) / (df + 0.5))
+                for key, positions in postings.items():
+                    tf = len(positions)
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._section_lengths[key] / avg_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            ranked = []
+            for key, score in scores.items():
+                record = self._files[key[0]]
+                if sources is not None and record["source"] not in sources:
+                    continue
+                if phrases and not all(self._has_phrase(key, p) for p in phrases):
+                    continue
+                ranked.append((score, key))
+            ranked.sort(key=lambda item: (-item[0], item[1]))
+
+            hits = []
+            for score, (rel, idx) in ranked[:limit]:
+                record = self._files[rel]
+                section = record["sections"][idx]
+                hits.append({
+                    'file': rel,
+                    'source': record["source"],
+                    'heading': section["heading"],
+                    'line': section["start"] + 1,
+                    'score': round(score, 4),
+                    'context': self._context(record, section, terms, context_lines, max_context),
+                })
+            return hits
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(repo_root, sources=None, index_path=None):
+    """
+    Get a refreshed, process-wide TextSearchIndex for a repository root.
+
+    The index is loaded from disk on first use, refreshed incrementally on
+    every call and saved back when something changed. Indexes are shared
+    per (repo_root, sources, index_path) and each source set is saved to
+    its own file; omitted sources mean default_sources(repo_root).
+    """
+    repo_root = Path(repo_root).resolve()
+    source_key = tuple(map(tuple, _source_key(sources if sources is not None
+                                              else default_sources(repo_root))))
+    key = (repo_root, source_key, str(index_path) if index_path else None)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = TextSearchIndex(repo_root, sources=sources, index_path=index_path)
+            _indexes[key] = index
+    if index.refresh():
+        try:
+            index.save()
+        except OSError as e:
+            print(f"Warning: Could not save search index: {e}")
+    return index
+
+
+def main():
+    """Command-line search over rules, converted PDFs and session logs"""
+    ap = argparse.ArgumentParser(description="Ranked search over rules, converted PDFs and logs.")
+    ap.add_argument("query", help='Search terms; use "quotes" for phrases')
+    ap.add_argument("--source", action="append", help="Restrict to a source (rules, converted_pdfs, logs)")
+    ap.add_argument("--limit", type=int, default=10, help="Maximum number of hits")
+    ap.add_argument("--repo", default=str(Path(__file__).resolve().parent.parent), help="Repository root")
+    args = ap.parse_args()
+
+    index = get_search_index(args.repo)
+    hits = index.search(args.query, limit=args.limit, sources=args.source)
+    if not hits:
+        print("No matches.")
+        return 0
+
+    for hit in hits:
+        heading = hit['heading'] or "(top)"
+        print(f"\n[{hit['score']:.2f}] {hit['file']}:{hit['line']} - {heading}")
+        for line in hit['context']:
+            print(f"    {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
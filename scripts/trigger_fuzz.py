@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Trigger Fuzz & Benchmark Harness for Skyrim TTRPG
+
+Generates seeded, randomized corpora of location strings and campaign
+states (siege stages, companion mixes, times of day, faction alignments,
+quest logs, scene flags) and runs every hold's location triggers over them.
+Locations are built from the dispatcher's hold keywords, the location
+literals the hold modules and rule files test for, and random fragments
+that match nothing:
+
+- fuzz: flags handlers that raise, that return different events or leave a
+  different state when run twice on the same input, and dispatcher output
+  that differs from running every hold directly;
+- bench: measures evaluations per second per hold and for the dispatcher,
+  so a refactor can be compared against a saved baseline.
+
+Usage:
+    python trigger_fuzz.py                                # fuzz + bench
+    python trigger_fuzz.py --locations 5000 --states 200 --seed 7
+    python trigger_fuzz.py --save-baseline baseline.json
+    python trigger_fuzz.py --compare baseline.json        # after a refactor
+
+The same seed always produces the same corpus, so runs are comparable.
+"""
+
+import argparse
+import ast
+import copy
+import inspect
+import json
+import random
+import string
+import sys
+import time
+import traceback
+
+from triggers import (
+    hjaalmarch_location_triggers, markarth_location_triggers, rift_location_triggers,
+    solitude_location_triggers, whiterun_location_triggers, windhelm_location_triggers,
+    winterhold_location_triggers,
+)
+from triggers.dispatcher import build_default_registry
+from triggers.rules import RULES_DIR
+
+
+HANDLERS = {
+    "whiterun": whiterun_location_triggers,
+    "windhelm": windhelm_location_triggers,
+    "solitude": solitude_location_triggers,
+    "markarth": markarth_location_triggers,
+    "rift": rift_location_triggers,
+    "hjaalmarch": hjaalmarch_location_triggers,
+    "winterhold": winterhold_location_triggers,
+}
+
+# Fragments combined with the dispatcher's hold keywords
+DISTRICTS = [
+    "plains", "wind", "cloud", "district", "market", "marketplace", "ratway", "ragged", "flagon",
+    "temple", "mistveil", "keep", "graveyard", "gray_quarter", "stone_quarter", "docks", "palace",
+    "of_the_kings", "forest", "lake", "fishery", "college", "bridge", "courtyard", "hall_of_elements",
+    "arcanaeum", "midden", "inn", "house", "burned", "abandoned", "mine", "understone", "treasury",
+    "hot_springs", "dunmeth", "excavation", "lair", "road", "gate", "outskirts",
+]
+UNRELATED = [
+    "riverwood", "helgen", "falkreath", "dawnstar", "ivarstead", "bleak falls barrow",
+    "high hrothgar", "rorikstead", "kynesgrove", "shor's stone", "darkwater crossing", "",
+]
+SEPARATORS = ["_", " ", "-", ""]
+
+COMPANIONS = ["Lydia", "Hadvar", "Ralof", "Marcurio", "Iona", "Benor", "Stenvar", "Uthgerd",
+              "Illisif", "Mjoll", "Aela", "Farkas", "J'zargo", "Serana"]
+TIMES_OF_DAY = ["day", "morning", "evening", "night", "midnight", "dusk", 0, 3, 6, 12, 19, 20, 23]
+FACTIONS = ["imperial", "stormcloak", "", "neutral"]
+STARTING_FACTIONS = ["companions", "college_of_winterhold", "thieves_guild", "imperial_legion",
+                     "stormcloaks", ""]
+QUESTS = ["blood_on_the_ice", "the_white_phial", "laid_to_rest", "rising_at_dawn",
+          "companions_proving_honor", "college_staff_of_magnus", "the_forsworn_conspiracy"]
+COLLEGE_QUESTS = ["college_first_lessons", "college_under_saarthal", "college_hitting_the_books",
+                  "college_revealing_the_unseen", "college_staff_of_magnus", "college_eye_of_magnus",
+                  None]
+COMPANIONS_QUESTS = ["companions_proving_honor", "companions_inner_circle_rites",
+                     "companions_kodlak_cure_or_sacrifice", None]
+SCENE_FLAGS = ["winterhold_first_arrival", "college_bridge_first_time",
+               "jorrvaskr_proving_honor_briefing_done", "college_farengar_tie_in_triggered",
+               "companions_whiterun_deployment_triggered", "farengar_college_mission_complete",
+               "saarthal_eye_of_magnus_hook"]
+
+
+def _pattern_literals(pattern):
+    """Strings in a rule's location pattern (see triggers/rules.py)."""
+    if isinstance(pattern, str):
+        yield pattern
+    elif isinstance(pattern, dict):
+        for value in pattern.values():
+            yield from _pattern_literals(value)
+    elif isinstance(pattern, list):
+        for value in pattern:
+            yield from _pattern_literals(value)
+
+
+def location_literals(handlers=None, rules_dir=None):
+    """
+    Location substrings the triggers test for.
+
+    Collects the string literals hold modules check with `"x" in loc` and
+    the strings in every rule file's location patterns.
+
+    Args:
+        handlers: Hold handlers whose modules are scanned (default: HANDLERS)
+        rules_dir: Directory of JSON rule files (default: data/triggers)
+
+    Returns:
+        list: Sorted, lowercased literals
+    """
+    literals = set()
+    for handler in (handlers if handlers is not None else HANDLERS).values():
+        try:
+            tree = ast.parse(inspect.getsource(inspect.getmodule(handler)))
+        except (OSError, TypeError, SyntaxError) as e:
+            print(f"Warning: Error reading {getattr(handler, '__module__', handler)}: {e}")
+            continue
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Compare) and isinstance(node.left, ast.Constant)
+                    and isinstance(node.left.value, str)
+                    and any(isinstance(op, (ast.In, ast.NotIn)) for op in node.ops)):
+                literals.add(node.left.value.lower())
+    for path in sorted((rules_dir if rules_dir is not None else RULES_DIR).glob("*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Error reading {path.name}: {e}")
+            continue
+        rules = doc.get("rules", []) if isinstance(doc, dict) else doc
+        for rule in rules if isinstance(rules, list) else []:
+            if isinstance(rule, dict):
+                literals.update(text.lower() for text in _pattern_literals(rule.get("location")))
+    literals.discard("")
+    return sorted(literals)
+
+
+def random_fragment(rng):
+    """A short random word that is unlikely to be any trigger keyword."""
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9)))
+
+
+def generate_locations(rng, count, keywords, literals=()):
+    """
+    Random location strings built from hold keywords, the literals the
+    triggers test for, district words and random fragments.
+
+    Args:
+        rng: random.Random instance
+        count: Number of locations
+        keywords: Iterable of hold keywords (e.g. registry.keywords values)
+        literals: Location literals (e.g. location_literals())
+
+    Returns:
+        list: Location strings (mixed case, separators, noise)
+    """
+    keywords = sorted({k for group in keywords for k in group})
+    words = sorted(set(DISTRICTS) | set(literals))
+    locations = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.1:
+            loc = rng.choice(UNRELATED)
+        elif roll < 0.15:
+            loc = rng.choice(SEPARATORS).join(random_fragment(rng) for _ in range(rng.randint(1, 3)))
+        else:
+            parts = [rng.choice(keywords) if roll < 0.7 or not literals else rng.choice(literals)]
+            for _ in range(rng.randint(0, 2)):
+                word = random_fragment(rng) if rng.random() < 0.15 else rng.choice(words)
+                parts.insert(rng.randint(0, len(parts)), word)
+            if roll > 0.9:
+                parts.insert(0, "the")
+            loc = rng.choice(SEPARATORS).join(parts)
+        if rng.random() < 0.3:
+            loc = loc.title() if rng.random() < 0.5 else loc.upper()
+        locations.append(loc)
+    return locations
+
+
+def _companion(rng, name):
+    style = rng.random()
+    if style < 0.6:
+        return name
+    if style < 0.8:
+        return {"name": f"{name} ({rng.choice(['Housecarl', 'Follower', 'Mercenary'])})"}
+    return {"npc_id": name.lower().replace("'", ""), "name": name}
+
+
+def generate_state(rng):
+    """
+    A random campaign state covering the fields hold triggers read.
+
+    Returns:
+        dict: Campaign state
+    """
+    state = {}
+    if rng.random() < 0.8:
+        state["companions"] = {"active_companions": [
+            _companion(rng, name) for name in rng.sample(COMPANIONS, rng.randint(0, 4))]}
+    if rng.random() < 0.8:
+        state["time_of_day"] = rng.choice(TIMES_OF_DAY)
+    if rng.random() < 0.6:
+        state["civil_war_state"] = {
+            "battle_of_whiterun_status": rng.choice(["active", "active", "pending", "resolved", ""]),
+            "battle_of_whiterun_stage": rng.randint(0, 5),
+            "battle_of_whiterun_faction": rng.choice(FACTIONS),
+            "player_alliance": rng.choice(FACTIONS),
+        }
+    if rng.random() < 0.5:
+        state["quests"] = {"active": rng.sample(QUESTS, rng.randint(0, 3)),
+                           "completed": [{"id": quest} for quest in rng.sample(QUESTS, rng.randint(0, 2))]}
+    state["starting_faction"] = rng.choice(STARTING_FACTIONS)
+    if rng.random() < 0.5:
+        state["college_state"] = {"active_quest": rng.choice(COLLEGE_QUESTS)}
+    if rng.random() < 0.5:
+        state["companions_state"] = {"active_quest": rng.choice(COMPANIONS_QUESTS)}
+    if rng.random() < 0.6:
+        state["player"] = {
+            "college_member": rng.random() < 0.5,
+            "thieves_guild_member": rng.random() < 0.3,
+            "college_rank": rng.choice(["Apprentice", "Adept", "Expert", None]),
+            "artifacts": ["staff_of_cinders"] if rng.random() < 0.2 else [],
+        }
+    if rng.random() < 0.5:
+        state["scene_flags"] = {flag: True for flag in rng.sample(SCENE_FLAGS, rng.randint(0, 3))}
+    for key, values in (("whiterun_control", ["stormcloak", "imperial", None]),
+                        ("jarl_hjaalmarch", ["idgrod", "sorli", None]),
+                        ("civil_war_phase", ["early", "imperial_victory", "stormcloak_victory"])):
+        if rng.random() < 0.4:
+            state[key] = rng.choice(values)
+    for key in ("truce_active", "battle_for_windhelm_started"):
+        if rng.random() < 0.2:
+            state[key] = True
+    if rng.random() < 0.2:
+        state["daedric_princes"] = {"molag": "completed"}
+    return state
+
+
+def build_corpus(seed=0, locations=2000, states=100):
+    """
+    Seeded corpus of locations and states.
+
+    Returns:
+        tuple: (locations, states)
+    """
+    rng = random.Random(seed)
+    keywords = build_default_registry().keywords.values()
+    corpus = generate_locations(rng, locations, keywords, location_literals())
+    return corpus, [generate_state(rng) for _ in range(states)]
+
+
+def fuzz(locations, states, pairs=None, rng=None):
+    """
+    Check handlers for exceptions, non-determinism and dispatcher drift.
+
+    Args:
+        locations: Location strings
+        states: Campaign states (not modified)
+        pairs: Number of random (location, state) pairs (default: all)
+        rng: random.Random used to pick pairs
+
+    Returns:
+        list: Problem dicts {"kind", "hold", "location", "state", "detail"}
+    """
+    if pairs is None:
+        combos = [(loc, state) for state in states for loc in locations]
+    else:
+        rng = rng or random.Random(0)
+        combos = [(rng.choice(locations), rng.choice(states)) for _ in range(pairs)]
+
+    problems = []
+    registry = build_default_registry()
+    for loc, state in combos:
+        expected_events = []
+        expected_state = copy.deepcopy(state)
+        for name, handler in HANDLERS.items():
+            runs = []
+            for _ in range(2):
+                run_state = copy.deepcopy(expected_state)
+                try:
+                    runs.append((handler(loc, run_state), run_state))
+                except Exception:
+                    problems.append({"kind": "exception", "hold": name, "location": loc,
+                                     "state": state, "detail": traceback.format_exc(limit=3)})
+                    break
+            if len(runs) < 2:
+                continue
+            if runs[0] != runs[1]:
+                problems.append({"kind": "nondeterministic", "hold": name, "location": loc,
+                                 "state": state, "detail": [runs[0][0], runs[1][0]]})
+            expected_events.extend(runs[0][0])
+            expected_state = runs[0][1]
+
+        try:
+            dispatched = registry.dispatch(loc, copy.deepcopy(state))
+        except Exception:
+            problems.append({"kind": "exception", "hold": "dispatch", "location": loc,
+                             "state": state, "detail": traceback.format_exc(limit=3)})
+            continue
+        if dispatched != expected_events:
+            problems.append({"kind": "dispatch_mismatch", "hold": "dispatch", "location": loc,
+                             "state": state, "detail": [expected_events, dispatched]})
+    return problems
+
+
+def bench(locations, states, pairs=20000, seed=0):
+    """
+    Throughput of each hold handler and of the dispatcher.
+
+    States are copied before timing, so only trigger evaluation is measured.
+
+    Args:
+        locations: Location strings
+        states: Campaign states
+        pairs: Evaluations per measurement
+        seed: Seed for the (location, state) sequence
+
+    Returns:
+        dict: name -> {"evaluations", "seconds", "per_second"}
+    """
+    rng = random.Random(seed)
+    combos = [(rng.choice(locations), rng.randrange(len(states))) for _ in range(pairs)]
+    results = {}
+
+    def measure(name, run):
+        copies = [copy.deepcopy(states[index]) for _, index in combos]
+        start = time.perf_counter()
+        for (loc, _), state in zip(combos, copies):
+            run(loc, state)
+        elapsed = time.perf_counter() - start
+        results[name] = {"evaluations": pairs, "seconds": round(elapsed, 6),
+                         "per_second": round(pairs / elapsed, 1) if elapsed else 0.0}
+
+    for name, handler in HANDLERS.items():
+        measure(name, handler)
+    measure("dispatch", build_default_registry().dispatch)
+    return results
+
+
+def format_bench(results, baseline=None):
+    """Render bench results, with the change against a baseline if given."""
+    lines = [f"{'trigger':<12}  {'evals/s':>12}" + (f"  {'baseline':>12}  {'change':>8}" if baseline else "")]
+    lines.append("-" * len(lines[0]))
+    for name, row in results.items():
+        line = f"{name:<12}  {row['per_second']:>12,.0f}"
+        if baseline:
+            before = baseline.get(name, {}).get("per_second")
+            if before:
+                line += f"  {before:>12,.0f}  {(row['per_second'] / before - 1) * 100:>+7.1f}%"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    """Run the fuzz checks and the benchmark"""
+    ap = argparse.ArgumentParser(description="Fuzz and benchmark the location triggers.")
+    ap.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    ap.add_argument("--locations", type=int, default=2000, help="Locations in the corpus")
+    ap.add_argument("--states", type=int, default=100, help="Campaign states in the corpus")
+    ap.add_argument("--fuzz-pairs", type=int, default=5000, help="Random pairs to fuzz (0 = skip)")
+    ap.add_argument("--bench-pairs", type=int, default=20000, help="Evaluations per benchmark (0 = skip)")
+    ap.add_argument("--save-baseline", help="Write benchmark results to this JSON file")
+    ap.add_argument("--compare", help="Compare against a saved baseline JSON file")
+    args = ap.parse_args()
+
+    locations, states = build_corpus(args.seed, args.locations, args.states)
+    print(f"Corpus: {len(locations)} locations x {len(states)} states (seed {args.seed})")
+
+    status = 0
+    if args.fuzz_pairs:
+        problems = fuzz(locations, states, pairs=args.fuzz_pairs, rng=random.Random(args.seed))
+        print(f"\nFuzz: {args.fuzz_pairs} pairs, {len(problems)} problem(s)")
+        for problem in problems[:10]:
+            print(f"  [{problem['kind']}] {problem['hold']} @ {problem['location']!r}")
+            detail = problem["detail"]
+            print("    " + (detail.strip().splitlines()[-1] if isinstance(detail, str) else str(detail)[:200]))
+        if problems:
+            status = 1
+
+    if args.bench_pairs:
+        results = bench(locations, states, pairs=args.bench_pairs, seed=args.seed)
+        baseline = None
+        if args.compare:
+            try:
+                with open(args.compare, "r", encoding="utf-8") as f:
+                    baseline = json.load(f).get("results")
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Warning: Error reading {args.compare}: {e}")
+        print()
+        print(format_bench(results, baseline))
+        if args.save_baseline:
+            with open(args.save_baseline, "w", encoding="utf-8") as f:
+                json.dump({"seed": args.seed, "locations": args.locations, "states": args.states,
+                           "results": results}, f, indent=2)
+            print(f"\nBaseline written to {args.save_baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
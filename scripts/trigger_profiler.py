@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Trigger Profiler for Skyrim TTRPG
+
+Replays the locations of recorded sessions through the location trigger
+dispatcher with profiling enabled, then prints which hold handlers and
+declarative rules are slow, never fire, or fire constantly.
+
+Usage:
+    python trigger_profiler.py                      # replay data/sessions
+    python trigger_profiler.py --locations whiterun riften_marketplace
+    python trigger_profiler.py --repeat 50 --json trigger_profile.json
+    python trigger_profiler.py --no-cache --sort p95_us
+
+Each session's "locations_visited" is evaluated as one route against a
+copy of state/campaign_state.json, so one-shot scene flags behave as they
+did at the table. Memoized holds are served from their cache on repeat
+visits; --no-cache clears it before every stop to profile the handlers and
+rules themselves.
+"""
+
+import argparse
+import copy
+import json
+import sys
+from pathlib import Path
+
+import state_writer
+from triggers.dispatcher import get_registry
+from triggers.profiling import TriggerProfiler, profiling
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SORT_COLUMNS = ("total_ms", "calls", "hits", "hit_rate", "events", "mean_us", "p95_us")
+
+
+def load_routes(sessions_dir):
+    """
+    Locations visited in each recorded session.
+
+    Args:
+        sessions_dir: Directory of session_*.json files
+
+    Returns:
+        list: (session name, [locations]) in session order
+    """
+    routes = []
+    for path in sorted(Path(sessions_dir).glob("*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                session = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Error reading {path.name}: {e}")
+            continue
+        locations = session.get("locations_visited") or []
+        if locations:
+            routes.append((path.stem, [str(loc) for loc in locations]))
+    return routes
+
+
+def load_state(state_path):
+    """Campaign state to replay against, with journaled deltas ({} if missing)."""
+    try:
+        return state_writer.load_state(state_path) or {}
+    except (OSError, ValueError) as e:
+        print(f"Warning: Error reading {state_path}: {e}")
+        return {}
+
+
+def replay(routes, campaign_state, repeat=1, use_cache=True, registry=None):
+    """
+    Evaluate routes under a profiler.
+
+    Args:
+        routes: List of (name, [locations])
+        campaign_state: State to start each pass from (not modified)
+        repeat: Number of passes over all routes
+        use_cache: Keep memoized hold results between stops
+        registry: TriggerRegistry to profile (default: the shared one)
+
+    Returns:
+        TriggerProfiler: The recorded statistics
+    """
+    registry = registry if registry is not None else get_registry()
+    profiler = TriggerProfiler()
+    with profiling(profiler, registry):
+        for _ in range(repeat):
+            state = copy.deepcopy(campaign_state)
+            for _, locations in routes:
+                if use_cache:
+                    registry.evaluate_route(locations, state)
+                    continue
+                for loc in locations:
+                    registry.clear_cache()
+                    registry.evaluate_route([loc], state)
+    return profiler
+
+
+def main():
+    """Replay session locations and report trigger costs"""
+    ap = argparse.ArgumentParser(description="Profile location triggers over session replays.")
+    ap.add_argument("--sessions-dir", default=str(ROOT / "data" / "sessions"),
+                    help="Directory of recorded session JSON files")
+    ap.add_argument("--state", default=str(ROOT / "state" / "campaign_state.json"),
+                    help="Campaign state to replay against")
+    ap.add_argument("--locations", nargs="+", help="Replay these locations instead of sessions")
+    ap.add_argument("--repeat", type=int, default=1, help="Number of replay passes")
+    ap.add_argument("--no-cache", action="store_true", help="Clear memoized results before every stop")
+    ap.add_argument("--sort", choices=SORT_COLUMNS, default="total_ms", help="Table sort column")
+    ap.add_argument("--top", type=int, default=25, help="Rows to show (0 = all)")
+    ap.add_argument("--json", dest="json_path", help="Write the full report to this file")
+    args = ap.parse_args()
+
+    if args.locations:
+        routes = [("command line", args.locations)]
+    else:
+        routes = load_routes(args.sessions_dir)
+    if not routes:
+        print("No locations to replay.")
+        return 1
+
+    registry = get_registry()
+    profiler = replay(routes, load_state(args.state), repeat=max(1, args.repeat),
+                      use_cache=not args.no_cache, registry=registry)
+    report = profiler.report()
+    report["replay"] = {
+        "routes": [{"name": name, "locations": locations} for name, locations in routes],
+        "repeat": max(1, args.repeat),
+        "cache": not args.no_cache,
+        "cache_stats": registry.cache_stats(),
+    }
+
+    stops = sum(len(locations) for _, locations in routes) * max(1, args.repeat)
+    print(f"Replayed {stops} stops from {len(routes)} route(s)\n")
+    print(profiler.format_table(top=args.top, sort=args.sort))
+    if report["dead"]:
+        print(f"\nNever fired ({len(report['dead'])}):")
+        for name in report["dead"]:
+            print(f"  {name}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
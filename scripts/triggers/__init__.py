@@ -3,6 +3,10 @@
 Triggers Module
 
 This module contains location-based triggers for various regions in Skyrim.
+Use dispatch(loc, campaign_state) to run every hold's triggers that can
+react to a location, or evaluate_route(locations, campaign_state) for a
+whole journey (see dispatcher.py). Triggers written as data live in
+data/triggers/<hold>.json and are compiled by rules.py.
 """
 
 from .whiterun_triggers import whiterun_location_triggers
@@ -10,5 +14,10 @@ from .windhelm_triggers import windhelm_location_triggers
 from .markarth_triggers import markarth_location_triggers
 from .winterhold_triggers import winterhold_location_triggers
 from .solitude_triggers import solitude_location_triggers
+from .rift_triggers import rift_location_triggers
+from .hjaalmarch_triggers import hjaalmarch_location_triggers
+from .dispatcher import TriggerRegistry, dispatch, evaluate_route, get_registry
+from .rules import RuleError, RuleSet, get_ruleset
+from .memo import MemoizedTrigger, depends_on
 
-__all__ = ['whiterun_location_triggers', 'windhelm_location_triggers', 'markarth_location_triggers', 'winterhold_location_triggers', 'solitude_location_triggers']
+__all__ = ['whiterun_location_triggers', 'windhelm_location_triggers', 'markarth_location_triggers', 'winterhold_location_triggers', 'solitude_location_triggers', 'rift_location_triggers', 'hjaalmarch_location_triggers', 'TriggerRegistry', 'dispatch', 'evaluate_route', 'get_registry', 'RuleError', 'RuleSet', 'get_ruleset', 'MemoizedTrigger', 'depends_on']
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Keyword Automaton
+
+Aho-Corasick matching shared by the trigger dispatcher (which hold can react
+to a location) and the rule compiler (which rules can fire there): one pass
+over the location string finds every registered keyword it contains.
+"""
+
+from collections import deque
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton mapping keywords to payload sets."""
+
+    def __init__(self, keywords):
+        """
+        Args:
+            keywords: Iterable of (keyword, payload) pairs
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [frozenset()]
+
+        outputs = [set()]
+        for keyword, payload in keywords:
+            node = 0
+            for char in keyword:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                node = nxt
+            outputs[node].add(payload)
+
+        # Breadth-first: fail links point at the longest proper suffix that
+        # is also a trie path; outputs inherit along the fail chain.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                outputs[nxt] |= outputs[self._fail[nxt]]
+                queue.append(nxt)
+        self._out = [frozenset(out) for out in outputs]
+
+    def search(self, text):
+        """Return the set of payloads whose keyword occurs in text."""
+        found = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found |= out[node]
+        return found
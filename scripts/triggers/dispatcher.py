@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Location Trigger Dispatcher
+
+One entry point for every hold's location triggers:
+
+    from triggers import dispatch
+    events = dispatch("riften_marketplace", campaign_state)
+
+Each hold handler is registered with the keywords that must appear in a
+location for it to fire (for example "riften" or "honrich" for The Rift).
+All keywords are compiled into a single Aho-Corasick automaton, so one pass
+over the location string finds every hold that can react, and only those
+handlers run. The handler set for a location is cached, so revisiting a
+location costs a dictionary lookup.
+
+Triggers that fire regardless of location (the Whiterun siege header, for
+example) are registered with a state predicate instead; the handler runs
+whenever the predicate is true.
+
+Holds whose triggers are declarative rules (rules.py) also register every
+keyword their rule file requires, so a new rule with a new place name is
+dispatched without touching this module.
+
+Handlers that declare their state dependencies (@depends_on in memo.py, or
+a rule file) are memoized: re-dispatching the same location with the same
+relevant state returns the cached events without running the handler.
+
+evaluate_route() runs a whole journey (Riverwood -> Whiterun -> Morthal)
+at once and returns the events per stop plus a merged, de-duplicated list.
+
+Handlers receive a TriggerContext (trigger_utils.py) rather than the raw
+state: one per dispatch or route, so companion and quest checks across all
+holds share the same indexes.
+
+Falkreath and The Pale expose scene functions (print-based, called by
+quest logic) rather than location handlers, so they are not dispatched.
+"""
+
+from .automaton import KeywordAutomaton
+from .memo import MemoizedTrigger
+from .rules import get_ruleset
+from .trigger_utils import TriggerContext
+from .hjaalmarch_triggers import hjaalmarch_location_triggers
+from .markarth_triggers import markarth_location_triggers
+from .rift_triggers import rift_location_triggers
+from .solitude_triggers import solitude_location_triggers
+from .whiterun_triggers import whiterun_location_triggers
+from .windhelm_triggers import windhelm_location_triggers
+from .winterhold_triggers import winterhold_location_triggers
+
+
+# Locations whose handler sets are remembered (cleared when full)
+_CACHE_LIMIT = 4096
+
+
+class TriggerRegistry:
+    """Location trigger handlers compiled into one dispatch structure."""
+
+    def __init__(self):
+        self._holds = []
+        self._automaton = None
+        self._cache = {}
+        # TriggerProfiler while profiling is enabled (see profiling.py)
+        self.profiler = None
+
+    def register(self, name, handler, keywords=(), when=None, rules=None, memoize=True):
+        """
+        Add a hold's location handler.
+
+        Args:
+            name: Hold name (for debugging and introspection)
+            handler: Callable (loc, campaign_state) -> list of event strings
+            keywords: Lowercase substrings; the handler only runs for
+                      locations containing at least one of them, so every
+                      trigger in it must require one of these
+            when: Optional predicate(campaign_state) for triggers that do not
+                  depend on location; the handler also runs when it is true
+            rules: Name of the rule file the handler evaluates, if any
+            memoize: Cache results on the handler's state dependencies
+                     (only handlers with @depends_on or a rule file)
+        """
+        if memoize and (rules is not None or hasattr(handler, "trigger_dependencies")):
+            handler = MemoizedTrigger(handler, rules=rules)
+        self._holds.append((name, handler, tuple(k.lower() for k in keywords), when))
+        self._automaton = None
+        self._cache.clear()
+
+    @property
+    def holds(self):
+        """Registered hold names, in dispatch order."""
+        return [name for name, _, _, _ in self._holds]
+
+    @property
+    def keywords(self):
+        """Hold name -> the location keywords it is dispatched on."""
+        return {name: keywords for name, _, keywords, _ in self._holds}
+
+    def cache_stats(self):
+        """
+        Memoization counters per hold.
+
+        Returns:
+            dict: hold name -> {"hits", "misses", "uncacheable"}
+        """
+        return {name: dict(handler.stats) for name, handler, _, _ in self._holds
+                if isinstance(handler, MemoizedTrigger)}
+
+    def clear_cache(self):
+        """Drop memoized handler results and cached location lookups."""
+        self._cache.clear()
+        for _, handler, _, _ in self._holds:
+            if isinstance(handler, MemoizedTrigger):
+                handler.cache_clear()
+
+    def _compile(self):
+        self._automaton = KeywordAutomaton(
+            (keyword, position)
+            for position, (_, _, keywords, _) in enumerate(self._holds)
+            for keyword in keywords
+        )
+        self._cache.clear()
+
+    def candidates(self, loc):
+        """
+        Positions of the handlers whose keywords occur in loc.
+
+        Returns:
+            frozenset of registration positions
+        """
+        if self._automaton is None:
+            self._compile()
+        loc_lower = str(loc).lower()
+        found = self._cache.get(loc_lower)
+        if found is None:
+            if len(self._cache) >= _CACHE_LIMIT:
+                self._cache.clear()
+            found = frozenset(self._automaton.search(loc_lower))
+            self._cache[loc_lower] = found
+        return found
+
+    def dispatch(self, loc, campaign_state):
+        """
+        Run every handler that can react to loc.
+
+        Args:
+            loc: Current location string
+            campaign_state: Campaign state (handlers may set scene flags)
+
+        Returns:
+            list: Event strings from all matching holds, in registration order
+        """
+        found = self.candidates(loc)
+        campaign_state = TriggerContext.of(campaign_state)
+        events = []
+        for position, (name, handler, _, when) in enumerate(self._holds):
+            if position in found or (when is not None and when(campaign_state)):
+                events.extend(self._run(name, handler, loc, campaign_state))
+        return events
+
+    def _run(self, name, handler, loc, campaign_state):
+        profiler = self.profiler
+        if profiler is None:
+            return handler(loc, campaign_state)
+        profiler.declared_once(self, (f"hold:{hold}" for hold in self.holds))
+        return profiler.call(f"hold:{name}", handler, loc, campaign_state)
+
+    def evaluate_route(self, locations, campaign_state):
+        """
+        Run the triggers for every stop of a journey in one pass.
+
+        Location-independent context (each hold's `when` predicate, such as
+        "is the Whiterun siege on", and the TriggerContext party and quest
+        indexes) is computed once for the whole route and candidate holds
+        come from the location cache. Stops are evaluated in
+        travel order against the same state, so a one-shot scene flag set at
+        one stop keeps it from firing again further along the route.
+
+        Args:
+            locations: Waypoints in travel order
+            campaign_state: Campaign state (one-shot flags are set in place)
+
+        Returns:
+            dict: {"stops": [{"location", "events"}, ...] in route order,
+                   "events": every event once, in first-seen order}
+        """
+        campaign_state = TriggerContext.of(campaign_state)
+        state_driven = {
+            position for position, (_, _, _, when) in enumerate(self._holds)
+            if when is not None and when(campaign_state)
+        }
+        stops = []
+        merged = []
+        seen = set()
+        for loc in locations:
+            found = self.candidates(loc) | state_driven
+            events = []
+            for position, (name, handler, _, _) in enumerate(self._holds):
+                if position in found:
+                    events.extend(self._run(name, handler, loc, campaign_state))
+            stops.append({"location": loc, "events": events})
+            for event in events:
+                if event not in seen:
+                    seen.add(event)
+                    merged.append(event)
+        return {"stops": stops, "events": merged}
+
+
+def _whiterun_siege_active(campaign_state):
+    cw_state = campaign_state.get("civil_war_state", {})
+    return cw_state.get("battle_of_whiterun_status", "") == "active"
+
+
+def _register_with_rules(registry, name, handler, keywords=(), when=None):
+    # Rules without a location pattern are found by state, not keywords
+    ruleset = get_ruleset(name)
+
+    def _when(campaign_state):
+        return bool((when is not None and when(campaign_state))
+                    or get_ruleset(name).fires_anywhere(campaign_state))
+
+    registry.register(name, handler, sorted(set(keywords) | ruleset.keywords),
+                      when=_when, rules=name)
+
+
+def build_default_registry():
+    """Registry with every hold that has a location handler."""
+    registry = TriggerRegistry()
+    _register_with_rules(registry, "whiterun", whiterun_location_triggers,
+                         ["whiterun", "jorrvaskr"], when=_whiterun_siege_active)
+    registry.register("windhelm", windhelm_location_triggers, ["windhelm"])
+    _register_with_rules(registry, "solitude", solitude_location_triggers)
+    registry.register("markarth", markarth_location_triggers,
+                      ["markarth", "karthspire", "hag", "druadach", "valley",
+                       "nchuand-zel", "abandoned house", "nepos", "cidhna"])
+    _register_with_rules(registry, "rift", rift_location_triggers)
+    registry.register("hjaalmarch", hjaalmarch_location_triggers, ["morthal", "movarth"])
+    registry.register("winterhold", winterhold_location_triggers,
+                      ["winterhold", "frozen_hearth", "jarls_longhouse", "jarl_korir_court",
+                       "college_bridge", "hall_of_elements", "hall_of_attainment",
+                       "arcanaeum", "college_library", "midden", "arch_mage_quarters",
+                       "saarthal", "college_courtyard", "labyrinthian"])
+    return registry
+
+
+_default_registry = None
+
+
+def get_registry():
+    """The shared registry used by dispatch()."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = build_default_registry()
+    return _default_registry
+
+
+def dispatch(loc, campaign_state):
+    """
+    Location triggers from every hold for loc (see TriggerRegistry.dispatch).
+    """
+    return get_registry().dispatch(loc, campaign_state)
+
+
+def evaluate_route(locations, campaign_state):
+    """
+    Location triggers for a whole journey (see TriggerRegistry.evaluate_route).
+    """
+    return get_registry().evaluate_route(locations, campaign_state)
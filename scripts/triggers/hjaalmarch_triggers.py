@@ -7,8 +7,13 @@ It provides contextual events, NPC interactions, and dynamic quest hooks specifi
 Key quest integrations include the vampire investigation "Laid to Rest" and Falion's secret ritual for curing vampirism.
 Faction alignment is subtle here, but shifts (Imperial vs. Stormcloak control of the hold) can alter the Jarl and local atmosphere.
 """
-from .trigger_utils import is_companion_present, is_quest_active, is_night_time
+from .memo import depends_on
+from .trigger_utils import active_companions, is_companion_present, is_quest_active, is_night_time
 
+@depends_on(
+    "companions.active_companions", "quests", "time_of_day", "jarl_hjaalmarch",
+    "morthal_stormcloak_banner", "civil_war_phase", "morthal_imperial_restored"
+)
 def hjaalmarch_location_triggers(loc, campaign_state):
     """
     Generate location-specific triggers for Morthal and Hjaalmarch locations.
@@ -22,7 +27,7 @@ def hjaalmarch_location_triggers(loc, campaign_state):
     """
     events = []
     loc_lower = str(loc).lower()
-    active_companions = campaign_state.get("companions", {}).get("active_companions", [])
+    party = active_companions(campaign_state)
     
     # District-specific triggers for Morthal
     if ("highmoon" in loc_lower or ("jarl" in loc_lower and "longhouse" in loc_lower)) and "morthal" in loc_lower:
@@ -64,7 +69,7 @@ def hjaalmarch_location_triggers(loc, campaign_state):
         events.append("A blanket of mist covers the quiet town of Morthal as you arrive. The wooden structures seem to emerge from the fog only when you're nearly upon them. A few residents bundled in cloaks pause on their porches to watch you warily. The whole settlement feels distant from the rest of Skyrim, isolated by its marshy surroundings and the weight of unspoken troubles.")
     
     # Companion commentary for any Morthal-native follower (e.g., Benor)
-    if is_companion_present(active_companions, "benor") and "morthal" in loc_lower:
+    if is_companion_present(party, "benor") and "morthal" in loc_lower:
         events.append("Benor scans the dimly lit village and grips his weapon hilt. \"Not much has changed,\" he mutters. \"Morthal may be quiet, but don't let your guard down. These marshes breed odd troubles.\"")
     
     # Civil War impact triggers (Jarl change if hold switches sides)
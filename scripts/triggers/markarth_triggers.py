@@ -6,8 +6,10 @@ This module handles location-based triggers for Markarth (city) and various loca
 It provides contextual events, quest hooks, and companion commentary specific to Markarth and the surrounding Reach.
 """
 
-from .trigger_utils import is_companion_present
+from .memo import depends_on
+from .trigger_utils import active_companions, is_companion_present
 
+@depends_on("companions.active_companions", "daedric_princes")
 def markarth_location_triggers(loc, campaign_state):
     """
     Generate location-specific triggers for Markarth city and The Reach locations.
@@ -21,7 +23,7 @@ def markarth_location_triggers(loc, campaign_state):
     """
     events = []
     loc_lower = str(loc).lower()
-    active_companions = campaign_state.get("companions", {}).get("active_companions", [])
+    party = active_companions(campaign_state)
 
     # Markarth City – District triggers
     if ("understone" in loc_lower or "keep" in loc_lower) and "markarth" in loc_lower:
@@ -69,7 +71,7 @@ def markarth_location_triggers(loc, campaign_state):
 
     # Companion commentary (for any Reach-native or Markarth-related companions, placeholder examples)
     # Example: If a Reach-native companion (e.g., a Forsworn ally or Markarth native) is present, they might comment on returning home or the state of the Reach.
-    if is_companion_present(active_companions, "illisif") and loc_lower.startswith("markarth"):
+    if is_companion_present(party, "illisif") and loc_lower.startswith("markarth"):
         # (Note: 'Illisif' is a placeholder name for a Reach-native follower for demonstration)
         events.append('Illisif pauses as you enter Markarth. "Home," she whispers, eyes scanning the stone city warily. "Every carving on these walls, I grew up with... and every shadow hides a memory." She grips her weapon. "Be on guard. The Reach doesn\'t forgive."')
     # Lydia or other vanilla companions might also react if appropriate, but none are Markarth natives. This is just an example structure.
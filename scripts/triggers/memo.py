@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Memoized Trigger Evaluation
+
+Location handlers only read a few campaign state fields (the Whiterun
+battle fields, the active companions, scene flags, time of day), yet the
+dashboard and "where are we" queries re-run them for the same location over
+and over. A MemoizedTrigger caches a handler's events on
+
+    (location, the values of the state paths the handler depends on)
+
+so a repeat call with unchanged inputs is a dictionary lookup, and a change
+to any of those paths is a cache miss without explicit invalidation.
+
+Handlers declare their paths with @depends_on; rule-backed holds get them
+from the compiled rule file (RuleSet.dependencies). trace_dependencies()
+runs a handler on a recording copy of the state and reports the paths it
+actually touched, which is how declarations are checked in tests.
+
+Calls that change the state they depend on (a one-shot scene flag being
+set, for example) are never cached, so side effects are not skipped: the
+next call sees the flag and is cached from then on.
+"""
+
+import copy
+
+from .rules import get_ruleset
+
+
+# Cached (location, state slice) results per handler (cleared when full)
+_CACHE_LIMIT = 4096
+
+
+def depends_on(*paths):
+    """
+    Declare the campaign state paths a location handler reads or writes.
+
+    Args:
+        *paths: Dotted paths ("civil_war_state.battle_of_whiterun_stage");
+                a path covers everything below it
+
+    Returns:
+        Decorator that records the paths on the handler
+    """
+    def decorate(handler):
+        handler.trigger_dependencies = tuple(paths)
+        return handler
+    return decorate
+
+
+def _slicer(paths):
+    """
+    Compile paths into slice(campaign_state) -> list of their values.
+
+    Paths are grouped by top-level key so each branch is fetched once and
+    its direct children are read with one map() call.
+    """
+    groups = {}
+    for path in paths:
+        top, _, rest = path.partition(".")
+        groups.setdefault(top, []).append(rest)
+    plan = []
+    for top, rests in groups.items():
+        if "" in rests:
+            plan.append((top, None, ()))
+            continue
+        children = tuple(rest for rest in rests if "." not in rest)
+        deeper = tuple(tuple(rest.split(".")) for rest in rests if "." in rest)
+        plan.append((top, children, deeper))
+
+    def read(value, keys):
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    def slice_state(campaign_state):
+        values = []
+        for top, children, deeper in plan:
+            value = campaign_state.get(top)
+            if children is None:
+                values.append(value)
+            elif not isinstance(value, dict):
+                values.append(None)
+            else:
+                values.extend(map(value.get, children))
+                for keys in deeper:
+                    values.append(read(value, keys))
+        return values
+    return slice_state
+
+
+class MemoizedTrigger:
+    """A location handler whose results are cached on its state slice."""
+
+    def __init__(self, handler, depends_on=None, rules=None):
+        """
+        Args:
+            handler: Callable (loc, campaign_state) -> list of event strings
+            depends_on: State paths the handler uses (default: the paths
+                        declared with @depends_on)
+            rules: Name of a rule file the handler evaluates; its paths are
+                   added and the cache is dropped when the file is recompiled
+        """
+        if depends_on is None:
+            depends_on = getattr(handler, "trigger_dependencies", ())
+        self.handler = handler
+        self.rules = rules
+        self._declared = tuple(depends_on)
+        self._ruleset = None
+        self._slicer = None
+        self._cache = {}
+        self.stats = {"hits": 0, "misses": 0, "uncacheable": 0}
+        self._refresh()
+
+    def _refresh(self):
+        paths = set(self._declared)
+        if self.rules is not None:
+            self._ruleset = get_ruleset(self.rules)
+            paths |= self._ruleset.dependencies
+        # A path already covers everything below it
+        self.paths = tuple(sorted(p for p in paths if not covered(p, paths - {p})))
+        self._slicer = _slicer(self.paths)
+        self._cache.clear()
+
+    def _slice(self, campaign_state):
+        # repr is exact for JSON-like state; equal dicts built in a different
+        # key order only cost a cache miss
+        return repr(self._slicer(campaign_state))
+
+    def cache_clear(self):
+        """Forget every cached result."""
+        self._cache.clear()
+
+    def __call__(self, loc, campaign_state):
+        if self.rules is not None and get_ruleset(self.rules) is not self._ruleset:
+            self._refresh()
+        before = self._slice(campaign_state)
+        key = (str(loc).lower(), before)
+        events = self._cache.get(key)
+        if events is not None:
+            self.stats["hits"] += 1
+            return list(events)
+
+        self.stats["misses"] += 1
+        events = self.handler(loc, campaign_state)
+        if self._slice(campaign_state) != before:
+            # The handler changed its own inputs (a one-shot fired)
+            self.stats["uncacheable"] += 1
+            return events
+        if len(self._cache) >= _CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[key] = tuple(events)
+        return events
+
+
+class _TracingDict(dict):
+    """dict copy that records which keys are read and written."""
+
+    def __init__(self, data, prefix, reads, writes):
+        super().__init__(data)
+        self._prefix = prefix
+        self._reads = reads
+        self._writes = writes
+
+    def _path(self, key):
+        return f"{self._prefix}{key}"
+
+    def _whole(self):
+        # Iterating or testing the size depends on every key
+        self._reads[self._prefix[:-1]] = "whole"
+
+    def _wrap(self, key, value):
+        if isinstance(value, dict) and not isinstance(value, _TracingDict):
+            value = _TracingDict(value, self._path(key) + ".", self._reads, self._writes)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def _read(self, key):
+        self._reads.setdefault(self._path(key), "key")
+
+    def __getitem__(self, key):
+        self._read(key)
+        return self._wrap(key, dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        self._read(key)
+        if dict.__contains__(self, key):
+            return self._wrap(key, dict.__getitem__(self, key))
+        if isinstance(default, dict):
+            # Follow reads through a missing branch: .get("companions", {})
+            # then .get("active_companions") depends on the deeper path
+            return _TracingDict(default, self._path(key) + ".", self._reads, self._writes)
+        return default
+
+    def setdefault(self, key, default=None):
+        self._read(key)
+        if not dict.__contains__(self, key):
+            self._writes.add(self._path(key))
+            dict.__setitem__(self, key, default)
+        return self._wrap(key, dict.__getitem__(self, key))
+
+    def __contains__(self, key):
+        self._read(key)
+        return dict.__contains__(self, key)
+
+    def __setitem__(self, key, value):
+        self._writes.add(self._path(key))
+        dict.__setitem__(self, key, value)
+
+    def __len__(self):
+        self._whole()
+        return dict.__len__(self)
+
+    def __iter__(self):
+        self._whole()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self._whole()
+        return dict.keys(self)
+
+    def values(self):
+        self._whole()
+        return dict.values(self)
+
+    def items(self):
+        self._whole()
+        return dict.items(self)
+
+
+def trace_dependencies(handler, loc, campaign_state):
+    """
+    Run a handler on a copy of the state and report the paths it used.
+
+    Args:
+        handler: Callable (loc, campaign_state) -> list of event strings
+        loc: Location to evaluate
+        campaign_state: State to evaluate against (not modified)
+
+    Returns:
+        tuple: (reads, writes) - sets of dotted paths. Intermediate keys that
+        were only traversed on the way to a deeper read are left out.
+    """
+    reads, writes = {}, set()
+    handler(loc, _TracingDict(copy.deepcopy(campaign_state), "", reads, writes))
+    leaves = set()
+    for path, kind in reads.items():
+        deeper = path + "."
+        if kind == "key" and any(other.startswith(deeper) for other in reads):
+            continue
+        leaves.add(path)
+    return leaves, writes
+
+
+def covered(path, declared):
+    """True if path equals or lies below one of the declared paths."""
+    return any(path == d or path.startswith(d + ".") for d in declared)
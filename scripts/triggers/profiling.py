@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Trigger Profiling
+
+Opt-in instrumentation for location triggers. While a profiler is enabled,
+every hold handler run by the dispatcher and every declarative rule tested
+by a RuleSet is timed and counted:
+
+    from triggers.profiling import profiling
+
+    with profiling() as profiler:
+        for loc in session_locations:
+            dispatch(loc, campaign_state)
+    print(profiler.format_table())
+    report = profiler.report()         # JSON-ready dict
+
+For each trigger ("hold:<name>" or "rule:<hold>/<rule id>") the report has
+call and hit counts (a hit is a call that emitted at least one event),
+events emitted, cumulative and p95 latency, and events per location.
+Triggers that were registered but never fired are listed as dead.
+
+Nothing is recorded, and no timing overhead is added, unless a profiler is
+enabled. See trigger_profiler.py for the session replay CLI.
+"""
+
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from . import rules
+from .dispatcher import get_registry
+
+
+# Latency samples kept per trigger (reservoir-sampled beyond this)
+MAX_SAMPLES = 10000
+
+
+class TriggerStats:
+    """Counters and latency samples for one trigger."""
+
+    __slots__ = ("calls", "hits", "events", "total", "samples", "locations")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.events = 0
+        self.total = 0.0
+        self.samples = []
+        self.locations = Counter()
+
+    def p95(self):
+        """95th percentile latency in seconds (nearest rank)."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[max(0, -(-len(ordered) * 95 // 100) - 1)]
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.calls, 4) if self.calls else 0.0,
+            "events": self.events,
+            "total_ms": round(self.total * 1000, 4),
+            "mean_us": round(self.total / self.calls * 1e6, 2) if self.calls else 0.0,
+            "p95_us": round(self.p95() * 1e6, 2),
+            "events_by_location": dict(self.locations.most_common()),
+        }
+
+
+class TriggerProfiler:
+    """Collects per-trigger call, hit and latency statistics."""
+
+    def __init__(self, max_samples=MAX_SAMPLES, seed=0):
+        """
+        Args:
+            max_samples: Latency samples kept per trigger for percentiles
+            seed: Seed for reservoir sampling (reports are reproducible)
+        """
+        self.max_samples = max_samples
+        self.stats = {}
+        self._rng = random.Random(seed)
+        self._declared = set()
+
+    def declare(self, names):
+        """Register triggers so ones that never run show up as dead."""
+        for name in names:
+            if name not in self.stats:
+                self.stats[name] = TriggerStats()
+
+    def declared_once(self, owner, names):
+        """declare() the names of owner (a registry or rule set) once."""
+        if id(owner) not in self._declared:
+            self._declared.add(id(owner))
+            self.declare(names)
+
+    def record(self, name, loc, elapsed, emitted):
+        """
+        Record one trigger call.
+
+        Args:
+            name: Trigger name ("hold:rift", "rule:rift/riften_marketplace")
+            loc: Location evaluated
+            elapsed: Seconds spent
+            emitted: Number of events produced
+        """
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = TriggerStats()
+        stats.calls += 1
+        stats.total += elapsed
+        if emitted:
+            stats.hits += 1
+            stats.events += emitted
+            stats.locations[str(loc).lower()] += emitted
+        if len(stats.samples) < self.max_samples:
+            stats.samples.append(elapsed)
+        else:
+            slot = self._rng.randrange(stats.calls)
+            if slot < self.max_samples:
+                stats.samples[slot] = elapsed
+
+    def call(self, name, handler, loc, campaign_state):
+        """Run handler(loc, campaign_state), recording it under name."""
+        start = time.perf_counter()
+        events = handler(loc, campaign_state)
+        self.record(name, loc, time.perf_counter() - start, len(events))
+        return events
+
+    def reset(self):
+        """Drop all recorded statistics."""
+        self.stats.clear()
+        self._declared.clear()
+
+    def report(self):
+        """
+        Statistics for every trigger.
+
+        Returns:
+            dict: {"triggers": {name: stats}, "dead": names never fired,
+                   "locations": {location: events emitted}}
+        """
+        locations = Counter()
+        for stats in self.stats.values():
+            locations.update(stats.locations)
+        return {
+            "triggers": {name: stats.to_dict() for name, stats in sorted(self.stats.items())},
+            "dead": sorted(name for name, stats in self.stats.items() if not stats.hits),
+            "locations": dict(locations.most_common()),
+        }
+
+    def format_table(self, top=25, sort="total_ms"):
+        """
+        Render the hottest triggers as a text table.
+
+        Args:
+            top: Number of rows (0 = all)
+            sort: Report column to sort by, descending
+
+        Returns:
+            str: The table
+        """
+        rows = sorted(self.report()["triggers"].items(), key=lambda item: item[1][sort], reverse=True)
+        if top:
+            rows = rows[:top]
+        width = max([len("trigger")] + [len(name) for name, _ in rows])
+        lines = [f"{'trigger':<{width}}  {'calls':>7}  {'hits':>7}  {'hit%':>6}  "
+                 f"{'events':>7}  {'total ms':>9}  {'p95 us':>8}"]
+        lines.append("-" * len(lines[0]))
+        for name, row in rows:
+            lines.append(f"{name:<{width}}  {row['calls']:>7}  {row['hits']:>7}  "
+                         f"{row['hit_rate'] * 100:>5.1f}%  {row['events']:>7}  "
+                         f"{row['total_ms']:>9.3f}  {row['p95_us']:>8.1f}")
+        return "\n".join(lines)
+
+
+def enable_profiling(profiler=None, registry=None):
+    """
+    Start profiling the dispatcher's holds and every rule set.
+
+    Args:
+        profiler: TriggerProfiler to record into (default: a new one)
+        registry: TriggerRegistry to instrument (default: the shared one)
+
+    Returns:
+        TriggerProfiler: The active profiler
+    """
+    profiler = profiler if profiler is not None else TriggerProfiler()
+    registry = registry if registry is not None else get_registry()
+    registry.profiler = profiler
+    rules.set_profiler(profiler)
+    profiler.declared_once(registry, (f"hold:{name}" for name in registry.holds))
+    for ruleset in rules.loaded_rulesets():
+        profiler.declared_once(ruleset, (f"rule:{ruleset.name}/{rule_id}" for rule_id in ruleset.rule_ids))
+    return profiler
+
+
+def disable_profiling(registry=None):
+    """Stop profiling; dispatch goes back to the uninstrumented path."""
+    registry = registry if registry is not None else get_registry()
+    registry.profiler = None
+    rules.set_profiler(None)
+
+
+@contextmanager
+def profiling(profiler=None, registry=None):
+    """Profile trigger evaluation inside a with block."""
+    profiler = enable_profiling(profiler, registry)
+    try:
+        yield profiler
+    finally:
+        disable_profiling(registry)
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+Declarative Trigger Rules
+
+Location triggers written as data instead of Python. A rule file lives in
+data/triggers/<hold>.json (or .yaml when PyYAML is installed):
+
+    {
+      "hold": "rift",
+      "rules": [
+        {
+          "id": "riften_market",
+          "group": "riften_district",
+          "location": {"all": ["riften", "market"]},
+          "text": "You step into Riften's marketplace..."
+        },
+        {
+          "id": "brynjolf_recruits",
+          "location": {"all": ["riften", "market"]},
+          "when": {"not": {"path": "player.thieves_guild_member"}},
+          "companion": "iona",
+          "once": "scene_flags.brynjolf_met",
+          "text": "Brynjolf sizes you up..."
+        }
+      ]
+    }
+
+Rule fields:
+    id        Unique name (required)
+    location  Pattern on the lowercased location: a string (substring) or
+              {"contains"|"startswith"|"equals": str}, {"all"|"any": [...]},
+              {"not": pattern}. Omit to match every location.
+    when      State predicate: {"path": "a.b", <op>: value} with op one of
+              eq, ne, gt, gte, lt, lte, in, contains, exists (no op: truthy);
+              {"quest": id}, {"night": bool}, {"companion": name},
+              {"flag": name} (a scene flag), and all/any/not combinators.
+    companion Name or list of names that must all be in the active party.
+    once      Dotted state path set to True when the rule fires; the rule
+              is skipped while it is set (e.g. "scene_flags.rolff_scene").
+    group     Rules sharing a group form an if/elif chain: only the first
+              one that fires (in file order) produces text.
+    text      Template; {a.b} inserts a state value, with optional filters
+              {a.b|capitalize|default:Unknown} (upper, lower, capitalize,
+              title, int, default:X). Write {{ and }} for literal braces.
+
+Each file compiles once into a RuleSet. Every location pattern yields the
+keywords it cannot match without; those go into an Aho-Corasick automaton,
+so evaluating a location scans the string once and only tests the rules
+whose keywords occur in it. Identical predicates are compiled once and
+shared. Hold modules migrate rule by rule: move a trigger into the hold's
+file and call get_ruleset(hold).evaluate() alongside the remaining Python.
+"""
+
+import json
+import operator
+import os
+import re
+import time
+from pathlib import Path
+
+from .automaton import KeywordAutomaton
+from .trigger_utils import active_companions, is_companion_present, is_night_time, is_quest_active
+
+
+RULES_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "triggers"
+
+# Locations whose candidate rules are remembered (cleared when full)
+_CACHE_LIMIT = 4096
+
+# Rule files are checked for edits at most this often (seconds)
+RELOAD_CHECK_SECONDS = 1.0
+
+# TriggerProfiler recording every rule test (see profiling.py)
+_profiler = None
+
+_RULE_KEYS = {"id", "location", "when", "companion", "once", "group", "text"}
+
+_COMPARISONS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda value, options: value in options,
+    "contains": lambda value, item: item in value,
+}
+
+_FILTERS = {
+    "upper": lambda value: str(value).upper(),
+    "lower": lambda value: str(value).lower(),
+    "capitalize": lambda value: str(value).capitalize(),
+    "title": lambda value: str(value).title(),
+    "int": lambda value: int(value or 0),
+}
+
+_PLACEHOLDER = re.compile(r"\{\{|\}\}|\{([^{}]*)\}")
+
+
+class RuleError(ValueError):
+    """A trigger rule could not be compiled."""
+
+
+def _path_getter(path):
+    first, *rest = str(path).split(".")
+    rest = tuple(rest)
+
+    def get(state):
+        # The state may be a TriggerContext, so only the top level uses get()
+        value = state.get(first)
+        for key in rest:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+    return get
+
+
+def _path_setter(path):
+    keys = tuple(str(path).split("."))
+
+    def set_true(state):
+        for key in keys[:-1]:
+            state = state.setdefault(key, {})
+        state[keys[-1]] = True
+    return set_true
+
+
+# ----------------------------------------------------------------------
+# Location patterns
+# ----------------------------------------------------------------------
+
+def _compile_location(spec, rule_id):
+    """
+    Compile a location pattern.
+
+    Returns:
+        tuple: (test(loc_lower) -> bool, anchors) where anchors is a set of
+        keywords at least one of which occurs in every matching location,
+        or None when the pattern can match without any of them
+    """
+    if isinstance(spec, str):
+        spec = {"contains": spec}
+    if not isinstance(spec, dict) or len(spec) != 1:
+        raise RuleError(f"{rule_id}: location pattern must have exactly one key: {spec!r}")
+    (kind, arg), = spec.items()
+
+    if kind in ("contains", "startswith", "equals"):
+        text = str(arg).lower()
+        if kind == "contains":
+            test = lambda loc: text in loc
+        elif kind == "startswith":
+            test = lambda loc: loc.startswith(text)
+        else:
+            test = lambda loc: loc == text
+        return test, ({text} if text else None)
+
+    if kind in ("all", "any"):
+        if not isinstance(arg, list) or not arg:
+            raise RuleError(f"{rule_id}: '{kind}' needs a non-empty list")
+        parts = [_compile_location(part, rule_id) for part in arg]
+        tests = tuple(test for test, _ in parts)
+        if kind == "all":
+            test = lambda loc: all(t(loc) for t in tests)
+            # Any one child's anchors suffice; the longest keywords are the
+            # rarest, so they make the narrowest candidate set
+            anchored = [anchors for _, anchors in parts if anchors]
+            anchors = max(anchored, key=lambda a: min(len(k) for k in a)) if anchored else None
+        else:
+            test = lambda loc: any(t(loc) for t in tests)
+            anchors = set()
+            for _, child in parts:
+                if child is None:
+                    anchors = None
+                    break
+                anchors |= child
+        return test, anchors
+
+    if kind == "not":
+        inner, _ = _compile_location(arg, rule_id)
+        return (lambda loc: not inner(loc)), None
+
+    raise RuleError(f"{rule_id}: unknown location pattern '{kind}'")
+
+
+# ----------------------------------------------------------------------
+# State predicates
+# ----------------------------------------------------------------------
+
+def _compile_predicate(spec, rule_id, shared, deps):
+    """
+    Compile a state predicate into predicate(campaign_state) -> bool.
+
+    Args:
+        spec: Predicate dictionary (see module docstring)
+        rule_id: Rule being compiled (for error messages)
+        shared: Cache of already compiled predicates, keyed by their
+                canonical JSON, so repeated conditions share one closure
+        deps: Set collecting the state paths the predicate reads
+    """
+    if not isinstance(spec, dict) or not spec:
+        raise RuleError(f"{rule_id}: predicate must be a non-empty object: {spec!r}")
+    key = json.dumps(spec, sort_keys=True)
+    predicate = shared.get(key)
+    if predicate is None:
+        predicate = _build_predicate(spec, rule_id, shared, deps)
+        shared[key] = predicate
+    return predicate
+
+
+def _build_predicate(spec, rule_id, shared, deps):
+    if "path" in spec:
+        deps.add(str(spec["path"]))
+        get = _path_getter(spec["path"])
+        ops = [op for op in spec if op != "path"]
+        if not ops:
+            return lambda state: bool(get(state))
+        if len(ops) != 1:
+            raise RuleError(f"{rule_id}: path predicate takes one operator, got {ops}")
+        op = ops[0]
+        value = spec[op]
+        if op == "exists":
+            return lambda state: (get(state) is not None) == bool(value)
+        compare = _COMPARISONS.get(op)
+        if compare is None:
+            raise RuleError(f"{rule_id}: unknown operator '{op}'")
+
+        def check(state):
+            try:
+                return bool(compare(get(state), value))
+            except TypeError:
+                return False
+        return check
+
+    if len(spec) != 1:
+        raise RuleError(f"{rule_id}: predicate must have exactly one key: {spec!r}")
+    (kind, arg), = spec.items()
+
+    if kind in ("all", "any"):
+        if not isinstance(arg, list) or not arg:
+            raise RuleError(f"{rule_id}: '{kind}' needs a non-empty list")
+        children = tuple(_compile_predicate(child, rule_id, shared, deps) for child in arg)
+        if kind == "all":
+            return lambda state: all(child(state) for child in children)
+        return lambda state: any(child(state) for child in children)
+    if kind == "not":
+        inner = _compile_predicate(arg, rule_id, shared, deps)
+        return lambda state: not inner(state)
+    if kind == "quest":
+        deps.add("quests")
+        return lambda state: is_quest_active(state, arg)
+    if kind == "night":
+        deps.add("time_of_day")
+        return lambda state: is_night_time(state) == bool(arg)
+    if kind == "companion":
+        deps.add("companions.active_companions")
+        return lambda state: is_companion_present(active_companions(state), arg)
+    if kind == "flag":
+        deps.add(f"scene_flags.{arg}")
+        return lambda state: bool(state.get("scene_flags", {}).get(arg))
+    raise RuleError(f"{rule_id}: unknown predicate '{kind}'")
+
+
+# ----------------------------------------------------------------------
+# Text templates
+# ----------------------------------------------------------------------
+
+def _compile_template(text, rule_id, deps):
+    """
+    Compile a text template into render(campaign_state) -> str.
+    """
+    if not isinstance(text, str):
+        raise RuleError(f"{rule_id}: text must be a string")
+    parts = []
+    position = 0
+    for match in _PLACEHOLDER.finditer(text):
+        parts.append(text[position:match.start()])
+        position = match.end()
+        if match.group(1) is None:
+            parts.append(match.group(0)[0])
+            continue
+        path, *filters = [piece.strip() for piece in match.group(1).split("|")]
+        if not path:
+            raise RuleError(f"{rule_id}: empty placeholder in text")
+        deps.add(path)
+        parts.append((_path_getter(path), tuple(_compile_filter(f, rule_id) for f in filters)))
+    parts.append(text[position:])
+    parts = tuple(part for part in parts if part != "")
+
+    if all(isinstance(part, str) for part in parts):
+        literal = "".join(parts)
+        return lambda state: literal
+
+    def render(state):
+        out = []
+        for part in parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            get, filters = part
+            value = get(state)
+            if value is None:
+                value = ""
+            for apply in filters:
+                value = apply(value)
+            out.append(str(value))
+        return "".join(out)
+    return render
+
+
+def _compile_filter(name, rule_id):
+    if name.startswith("default:"):
+        fallback = name[len("default:"):]
+        return lambda value: value if value not in ("", None) else fallback
+    apply = _FILTERS.get(name)
+    if apply is None:
+        raise RuleError(f"{rule_id}: unknown template filter '{name}'")
+    return apply
+
+
+# ----------------------------------------------------------------------
+# Rule sets
+# ----------------------------------------------------------------------
+
+class _Rule:
+    __slots__ = ("id", "location", "anchors", "when", "once", "mark", "group", "render")
+
+    def __init__(self, spec, shared, deps):
+        if not isinstance(spec, dict):
+            raise RuleError(f"rule must be an object: {spec!r}")
+        rule_id = spec.get("id")
+        if not rule_id:
+            raise RuleError(f"rule without an id: {spec!r}")
+        unknown = set(spec) - _RULE_KEYS
+        if unknown:
+            raise RuleError(f"{rule_id}: unknown fields {sorted(unknown)}")
+        if "text" not in spec:
+            raise RuleError(f"{rule_id}: missing text")
+
+        self.id = rule_id
+        self.group = spec.get("group")
+        self.render = _compile_template(spec["text"], rule_id, deps)
+
+        if "location" in spec:
+            self.location, self.anchors = _compile_location(spec["location"], rule_id)
+        else:
+            self.location, self.anchors = None, None
+
+        conditions = []
+        companions = spec.get("companion")
+        if companions:
+            if isinstance(companions, str):
+                companions = [companions]
+            conditions.extend({"companion": name} for name in companions)
+        if "when" in spec:
+            conditions.append(spec["when"])
+        if not conditions:
+            self.when = None
+        elif len(conditions) == 1:
+            self.when = _compile_predicate(conditions[0], rule_id, shared, deps)
+        else:
+            self.when = _compile_predicate({"all": conditions}, rule_id, shared, deps)
+
+        once = spec.get("once")
+        if once:
+            deps.add(str(once))
+        self.once = _path_getter(once) if once else None
+        self.mark = _path_setter(once) if once else None
+
+
+class RuleSet:
+    """A compiled set of trigger rules for one hold (or any rule file)."""
+
+    def __init__(self, rules, name=""):
+        """
+        Args:
+            rules: List of rule dictionaries (see module docstring)
+            name: Label used in error messages and introspection
+
+        Raises:
+            RuleError: If a rule is malformed
+        """
+        self.name = name
+        shared = {}
+        deps = set()
+        self._rules = []
+        seen = set()
+        anchored = []
+        always = []
+        for position, spec in enumerate(rules):
+            try:
+                rule = _Rule(spec, shared, deps)
+            except RuleError as e:
+                raise RuleError(f"{name}: {e}" if name else str(e)) from None
+            if rule.id in seen:
+                raise RuleError(f"{name}: duplicate rule id '{rule.id}'")
+            seen.add(rule.id)
+            self._rules.append(rule)
+            if rule.anchors:
+                anchored.extend((keyword, position) for keyword in rule.anchors)
+            else:
+                always.append(position)
+        self._always = frozenset(always)
+        self._anywhere = tuple(self._rules[position] for position in always)
+        self._automaton = KeywordAutomaton(anchored)
+        self._keywords = frozenset(keyword for keyword, _ in anchored)
+        self._dependencies = frozenset(deps)
+        self._cache = {}
+        self.stats = {"evaluations": 0, "rules_tested": 0}
+
+    def __len__(self):
+        return len(self._rules)
+
+    @property
+    def rule_ids(self):
+        """Rule ids in evaluation order."""
+        return [rule.id for rule in self._rules]
+
+    @property
+    def keywords(self):
+        """Every keyword some rule requires (rules without one always run)."""
+        return self._keywords
+
+    @property
+    def dependencies(self):
+        """Dotted campaign state paths the rules read or set."""
+        return self._dependencies
+
+    def fires_anywhere(self, campaign_state):
+        """
+        True if a rule without a location pattern could fire in this state.
+
+        The dispatcher uses this as the hold's `when` predicate, since such
+        rules have no keywords to be found by.
+        """
+        return any(rule.when is None or rule.when(campaign_state) for rule in self._anywhere)
+
+    def candidates(self, loc):
+        """
+        Positions of the rules that can match loc, in file order.
+
+        Returns:
+            tuple of rule positions
+        """
+        loc_lower = str(loc).lower()
+        found = self._cache.get(loc_lower)
+        if found is None:
+            if len(self._cache) >= _CACHE_LIMIT:
+                self._cache.clear()
+            found = tuple(sorted(self._automaton.search(loc_lower) | self._always))
+            self._cache[loc_lower] = found
+        return found
+
+    def evaluate(self, loc, campaign_state):
+        """
+        Fire every rule that matches loc and the campaign state.
+
+        Args:
+            loc: Current location string
+            campaign_state: Campaign state (rules with `once` set their flag)
+
+        Returns:
+            list: Event strings, in rule order
+        """
+        loc_lower = str(loc).lower()
+        positions = self.candidates(loc_lower)
+        self.stats["evaluations"] += 1
+        self.stats["rules_tested"] += len(positions)
+        if _profiler is not None:
+            return self._evaluate_profiled(_profiler, positions, loc_lower, campaign_state)
+
+        events = []
+        fired_groups = set()
+        rules = self._rules
+        for position in positions:
+            rule = rules[position]
+            if rule.group is not None and rule.group in fired_groups:
+                continue
+            if rule.location is not None and not rule.location(loc_lower):
+                continue
+            if rule.once is not None and rule.once(campaign_state):
+                continue
+            if rule.when is not None and not rule.when(campaign_state):
+                continue
+            if rule.group is not None:
+                fired_groups.add(rule.group)
+            if rule.mark is not None:
+                rule.mark(campaign_state)
+            events.append(rule.render(campaign_state))
+        return events
+
+    def _evaluate_profiled(self, profiler, positions, loc_lower, campaign_state):
+        # Same checks as evaluate(), timed per rule
+        profiler.declared_once(self, (f"rule:{self.name}/{rule.id}" for rule in self._rules))
+        clock = time.perf_counter
+        events = []
+        fired_groups = set()
+        for position in positions:
+            rule = self._rules[position]
+            if rule.group is not None and rule.group in fired_groups:
+                continue
+            start = clock()
+            text = None
+            if ((rule.location is None or rule.location(loc_lower))
+                    and (rule.once is None or not rule.once(campaign_state))
+                    and (rule.when is None or rule.when(campaign_state))):
+                if rule.group is not None:
+                    fired_groups.add(rule.group)
+                if rule.mark is not None:
+                    rule.mark(campaign_state)
+                text = rule.render(campaign_state)
+                events.append(text)
+            profiler.record(f"rule:{self.name}/{rule.id}", loc_lower, clock() - start,
+                            0 if text is None else 1)
+        return events
+
+
+def loaded_rulesets():
+    """Every rule set compiled by get_ruleset() so far."""
+    return [ruleset for _, _, ruleset, _ in _rulesets.values()]
+
+
+def set_profiler(profiler):
+    """Record every rule test in profiler (None to stop)."""
+    global _profiler
+    _profiler = profiler
+
+
+def _parse(path):
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise RuleError(f"{path.name}: PyYAML is required for YAML rule files") from None
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def load_rules(path):
+    """
+    Compile a rule file.
+
+    Args:
+        path: JSON (or YAML) file holding a list of rules or {"rules": [...]}
+
+    Returns:
+        RuleSet: The compiled rules
+
+    Raises:
+        RuleError: If the file is malformed
+    """
+    path = Path(path)
+    try:
+        doc = _parse(path)
+    except (OSError, ValueError) as e:
+        if isinstance(e, RuleError):
+            raise
+        raise RuleError(f"{path.name}: {e}") from None
+    if isinstance(doc, dict):
+        name = doc.get("hold", path.stem)
+        rules = doc.get("rules", [])
+    else:
+        name = path.stem
+        rules = doc
+    if not isinstance(rules, list):
+        raise RuleError(f"{path.name}: 'rules' must be a list")
+    return RuleSet(rules, name=name)
+
+
+_rulesets = {}
+
+
+def get_ruleset(name, rules_dir=None):
+    """
+    The compiled rules in <rules_dir>/<name>.json (or .yaml/.yml).
+
+    Rule sets are compiled once and recompiled when their file changes;
+    the file is checked at most every RELOAD_CHECK_SECONDS, so edits made
+    during play are picked up within a second.
+
+    Args:
+        name: Rule file stem, normally the hold name
+        rules_dir: Directory holding rule files (default: data/triggers)
+
+    Returns:
+        RuleSet: The compiled rules (empty if no file exists)
+    """
+    key = (name, rules_dir)
+    cached = _rulesets.get(key)
+    if cached is not None:
+        path, signature, ruleset, checked = cached
+        now = time.monotonic()
+        if now - checked < RELOAD_CHECK_SECONDS:
+            return ruleset
+        # One stat of the file that was found last time
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is not None and (st.st_mtime_ns, st.st_size) == signature:
+            _rulesets[key] = (path, signature, ruleset, now)
+            return ruleset
+
+    directory = Path(rules_dir) if rules_dir is not None else RULES_DIR
+    for suffix in (".json", ".yaml", ".yml"):
+        path = directory / f"{name}{suffix}"
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        ruleset = load_rules(path)
+        _rulesets[key] = (str(path), (st.st_mtime_ns, st.st_size), ruleset, time.monotonic())
+        return ruleset
+    return RuleSet([], name=name)
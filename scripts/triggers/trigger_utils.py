@@ -4,15 +4,138 @@ Shared utility functions for location trigger modules.
 
 This module provides common helper functions used by location trigger modules
 to reduce code duplication and improve maintainability.
+
+The helpers accept raw campaign state, or a TriggerContext built once per
+evaluation: a thin view of the same state that indexes the party (a prefix
+trie of companion names and ids) and quests (sets of ids), so repeated
+companion and quest checks are lookups instead of list scans.
 """
 
 
+class CompanionIndex:
+    """Lowercase prefix trie of the active companions' names and ids."""
+
+    def __init__(self, active_companions):
+        """
+        Args:
+            active_companions: List of active companions (strings or dicts)
+        """
+        self.companions = active_companions
+        self._trie = {}
+        for companion in active_companions:
+            if isinstance(companion, dict):
+                keys = (companion.get("name", ""), companion.get("npc_id", companion.get("id", "")))
+            else:
+                keys = (companion,)
+            for key in keys:
+                node = self._trie
+                for char in str(key).lower():
+                    node = node.setdefault(char, {})
+        self._found = {}
+
+    def __iter__(self):
+        return iter(self.companions)
+
+    def __len__(self):
+        return len(self.companions)
+
+    def has(self, companion_name):
+        """True if a name or id starts with companion_name (case-insensitive)."""
+        found = self._found.get(companion_name)
+        if found is None:
+            node = self._trie if self.companions else None
+            for char in companion_name.lower():
+                if node is None:
+                    break
+                node = node.get(char)
+            found = node is not None
+            self._found[companion_name] = found
+        return found
+
+
+class TriggerContext:
+    """
+    Campaign state plus indexes for one trigger evaluation.
+
+    Behaves like the state dictionary for reads and writes (get, setdefault,
+    item access), so hold handlers take it in place of raw state; one-shot
+    flags land in the underlying state. Build one per dispatch or route:
+    the indexes assume the party and quest log do not change meanwhile.
+    """
+
+    def __init__(self, campaign_state):
+        self.state = campaign_state
+        self._companions = None
+        self._quests = None
+
+    @classmethod
+    def of(cls, campaign_state):
+        """Return campaign_state if it already is a context, else wrap it."""
+        if isinstance(campaign_state, cls):
+            return campaign_state
+        return cls(campaign_state)
+
+    @property
+    def companions(self):
+        """CompanionIndex of the active party (built on first use)."""
+        if self._companions is None:
+            self._companions = CompanionIndex(
+                self.state.get("companions", {}).get("active_companions", []))
+        return self._companions
+
+    @property
+    def quest_ids(self):
+        """Set of active and completed quest ids (built on first use)."""
+        if self._quests is None:
+            ids = set()
+            quests = self.state.get("quests", {})
+            for quest in list(quests.get("active", [])) + list(quests.get("completed", [])):
+                quest_id = quest.get("id") if isinstance(quest, dict) else quest
+                try:
+                    ids.add(quest_id)
+                except TypeError:
+                    continue
+            self._quests = ids
+        return self._quests
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def setdefault(self, key, default=None):
+        return self.state.setdefault(key, default)
+
+    def __getitem__(self, key):
+        return self.state[key]
+
+    def __setitem__(self, key, value):
+        self.state[key] = value
+
+    def __contains__(self, key):
+        return key in self.state
+
+
+def active_companions(campaign_state):
+    """
+    The active party, for is_companion_present().
+
+    Args:
+        campaign_state: Campaign state dictionary or TriggerContext
+
+    Returns:
+        CompanionIndex for a TriggerContext, otherwise the raw list
+    """
+    if isinstance(campaign_state, TriggerContext):
+        return campaign_state.companions
+    return campaign_state.get("companions", {}).get("active_companions", [])
+
+
 def is_companion_present(active_companions, companion_name):
     """
     Check if a specific companion is present in the active companions list.
     
     Args:
-        active_companions: List of active companions (can be strings or dicts)
+        active_companions: List of active companions (can be strings or dicts),
+                           or a CompanionIndex from a TriggerContext
         companion_name: Name of companion to check for (case-insensitive)
     
     Returns:
@@ -26,6 +149,9 @@ def is_companion_present(active_companions, companion_name):
         >>> is_companion_present([], "lydia")
         False
     """
+    if isinstance(active_companions, CompanionIndex):
+        return active_companions.has(companion_name)
+
     companion_name_lower = companion_name.lower()
     
     for companion in active_companions:
@@ -50,7 +176,8 @@ def is_quest_active(campaign_state, quest_id):
     Check if a quest is currently active or completed.
     
     Args:
-        campaign_state: Dictionary containing campaign state including quests
+        campaign_state: Dictionary containing campaign state including quests,
+                        or a TriggerContext
         quest_id: The ID of the quest to check
     
     Returns:
@@ -64,6 +191,9 @@ def is_quest_active(campaign_state, quest_id):
         >>> is_quest_active({}, "quest3")
         False
     """
+    if isinstance(campaign_state, TriggerContext):
+        return quest_id in campaign_state.quest_ids
+
     quests = campaign_state.get("quests", {})
     active_quests = quests.get("active", [])
     completed_quests = quests.get("completed", [])
@@ -8,9 +8,21 @@ specific to Whiterun Hold.  When the Battle of Whiterun is active, district
 text and companion barks switch to siege context keyed to the current stage.
 """
 
-from .trigger_utils import is_companion_present
-
-
+from .memo import depends_on
+from .rules import get_ruleset
+from .trigger_utils import active_companions, is_companion_present
+
+
+@depends_on(
+    "civil_war_state.battle_of_whiterun_status", "civil_war_state.battle_of_whiterun_stage",
+    "civil_war_state.battle_of_whiterun_faction", "companions.active_companions",
+    "starting_faction", "college_state", "companions_state",
+    "scene_flags.farengar_college_mission_complete", "scene_flags.college_farengar_tie_in_triggered",
+    "scene_flags.college_allegiance_choice_prompted",
+    "scene_flags.jorrvaskr_proving_honor_briefing_done",
+    "scene_flags.jorrvaskr_inner_circle_triggered", "scene_flags.jorrvaskr_kodlak_dying_triggered",
+    "scene_flags.companions_whiterun_deployment_triggered",
+)
 def whiterun_location_triggers(loc, campaign_state):
     """
     Generate location-specific triggers for Whiterun locations.
@@ -38,12 +50,8 @@ def whiterun_location_triggers(loc, campaign_state):
     battle_stage = int(cw_state.get("battle_of_whiterun_stage", 0))
     battle_faction = str(cw_state.get("battle_of_whiterun_faction", "")).lower()
 
-    if siege_active:
-        # Emit the universal siege header
-        faction_label = battle_faction.capitalize() if battle_faction else "Unknown"
-        events.append(
-            f"[Battle of Whiterun | {faction_label} | Stage {battle_stage}/5]"
-        )
+    # Declarative rules (data/triggers/whiterun.json), e.g. the siege header
+    events.extend(get_ruleset("whiterun").evaluate(loc, campaign_state))
 
     # ------------------------------------------------------------------
     # District-specific triggers - siege vs. peacetime text
@@ -124,10 +132,10 @@ def whiterun_location_triggers(loc, campaign_state):
     # ------------------------------------------------------------------
     # Companion barks - siege context for Hadvar and Ralof
     # ------------------------------------------------------------------
-    active_companions = campaign_state.get("companions", {}).get("active_companions", [])
+    party = active_companions(campaign_state)
 
     if siege_active:
-        if is_companion_present(active_companions, "hadvar") and "whiterun" in loc_lower:
+        if is_companion_present(party, "hadvar") and "whiterun" in loc_lower:
             if battle_faction == "imperial":
                 events.append(
                     'Hadvar scans the street and nods grimly. '
@@ -139,7 +147,7 @@ def whiterun_location_triggers(loc, campaign_state):
                     'leaves his sword hilt.'
                 )
 
-        if is_companion_present(active_companions, "ralof") and "whiterun" in loc_lower:
+        if is_companion_present(party, "ralof") and "whiterun" in loc_lower:
             if battle_faction == "stormcloak":
                 events.append(
                     'Ralof grips your arm. "Push forward! Skyrim is watching what we do here."'
@@ -151,7 +159,7 @@ def whiterun_location_triggers(loc, campaign_state):
                 )
     else:
         # Peacetime Lydia commentary
-        if is_companion_present(active_companions, "lydia") and loc_lower.startswith("whiterun"):
+        if is_companion_present(party, "lydia") and loc_lower.startswith("whiterun"):
             events.append(
                 'Lydia smiles fondly as she looks around. '
                 '"It\'s good to be back in Whiterun, my Thane," she says softly.'
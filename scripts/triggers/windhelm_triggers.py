@@ -8,9 +8,16 @@ specific to Windhelm Hold, including quest hooks for Blood on the Ice
 and The White Phial.
 """
 
-from .trigger_utils import is_companion_present, is_quest_active, is_night_time
+from .memo import depends_on
+from .trigger_utils import active_companions, is_companion_present, is_quest_active, is_night_time
 
 
+@depends_on(
+    "companions.active_companions", "quests", "time_of_day", "whiterun_control",
+    "windhelm_heard_whiterun_win", "windhelm_heard_whiterun_loss",
+    "battle_for_windhelm_started", "windhelm_siege_alert", "truce_active",
+    "windhelm_truce_noticed"
+)
 def windhelm_location_triggers(loc, campaign_state):
     """
     Generate location-specific triggers for Windhelm locations.
@@ -28,7 +35,7 @@ def windhelm_location_triggers(loc, campaign_state):
     loc_lower = str(loc).lower()
     
     # Get active companions
-    active_companions = campaign_state.get("companions", {}).get("active_companions", [])
+    party = active_companions(campaign_state)
     
     # District/area-specific triggers
     if ("gray_quarter" in loc_lower or "grey_quarter" in loc_lower) and "windhelm" in loc_lower:
@@ -67,12 +74,12 @@ def windhelm_location_triggers(loc, campaign_state):
             events.append("The city feels tense at night. Shadows seem longer here, and few citizens walk the streets after dark. You overhear whispered conversations about recent murders...")
     
     # Companion commentary for Windhelm-relevant companions
-    if is_companion_present(active_companions, "stenvar"):
+    if is_companion_present(party, "stenvar"):
         if loc_lower.startswith("windhelm"):
             events.append('Stenvar grunts as you enter Windhelm. "Never cared much for this place. Too cold, too many politics. But the mead at Candlehearth Hall isn\'t bad."')
     
     # Companions with Nord heritage might comment on the city's history
-    if is_companion_present(active_companions, "uthgerd"):
+    if is_companion_present(party, "uthgerd"):
         if loc_lower.startswith("windhelm"):
             events.append('Uthgerd looks around appreciatively. "Windhelm... the oldest city in Skyrim. Built by Ysgramor himself. Whatever you think of Ulfric, you can\'t deny this place has history."')
     
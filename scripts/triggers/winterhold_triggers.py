@@ -27,6 +27,8 @@ Location keys (recommended):
 - saarthal_excavation
 """
 
+from .memo import depends_on
+
 
 def _lower(x):
     return (x or "").strip().lower()
@@ -58,6 +60,7 @@ def _has_staff_of_cinders(player: dict) -> bool:
     return False
 
 
+@depends_on("scene_flags", "player", "civil_war_state", "college_state")
 def winterhold_location_triggers(loc: str, campaign_state: dict) -> list[str]:
     """Return a list of narrative events for a Winterhold/College location."""
 
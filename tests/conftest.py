@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the test suite.
+
+pytest loads this module automatically; test modules import the helpers
+directly (from conftest import bump_mtime, write_json).
+"""
+
+import json
+import os
+
+
+def write_json(path, doc):
+    """Write doc to path as JSON, creating parent directories."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(doc), encoding='utf-8')
+
+
+def bump_mtime(path):
+    """Force a visible mtime change even on coarse-grained filesystems."""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
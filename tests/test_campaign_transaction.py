@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for batched multi-manager transactions (campaign.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from campaign import Campaign
+from data_catalog import DataCatalog
+from storage import JsonDirectoryBackend
+
+
+def _setup(tmp):
+    data = tmp / "data"
+    (data / "npcs").mkdir(parents=True)
+    (data / "clocks").mkdir()
+    (tmp / "state").mkdir()
+    (data / "npcs" / "ralof.json").write_text(json.dumps({"id": "ralof", "name": "Ralof", "loyalty": 50}))
+    (data / "clocks" / "civil_war_clocks.json").write_text(json.dumps({
+        "civil_war_clocks": {"clocks": {"stormcloak_momentum": {"current_progress": 2, "total_segments": 8}}}
+    }))
+    (data / "factions.json").write_text(json.dumps({
+        "major_factions": {"stormcloaks": {"name": "Stormcloaks",
+                                           "clocks": [{"name": "war_effort", "progress": 0,
+                                                       "segments": 6, "effect": "Siege"}]}}
+    }))
+    (tmp / "state" / "campaign_state.json").write_text(json.dumps({
+        "branching_decisions": {"civil_war_entry_contact": None},
+        "world_consequences": {"major_choices": []},
+    }))
+    storage = JsonDirectoryBackend({"data": data, "state": tmp / "state"}, catalog=DataCatalog())
+    return Campaign(str(data), str(tmp / "state"), storage=storage)
+
+
+def _mutate(campaign):
+    campaign.story.record_branching_decision("civil_war_entry_contact", "Ralof")
+    campaign.story.track_faction_quest_progress("stormcloaks", "join_the_stormcloaks", "started", 2)
+    campaign.story.advance_clock("civil_war", "stormcloak_momentum", 1)
+    campaign.story.advance_clock("civil_war", "stormcloak_momentum", 1)
+    campaign.npcs.update_loyalty("ralof", 10, "Sided with him")
+    campaign.factions.update_faction_clock("stormcloaks", "war_effort", 1)
+
+
+def _disk(tmp):
+    clocks = json.loads((tmp / "data" / "clocks" / "civil_war_clocks.json").read_text())
+    return {
+        "momentum": clocks["civil_war_clocks"]["clocks"]["stormcloak_momentum"]["current_progress"],
+        "loyalty": json.loads((tmp / "data" / "npcs" / "ralof.json").read_text())["loyalty"],
+        "war_effort": json.loads((tmp / "data" / "factions.json").read_text())
+        ["major_factions"]["stormcloaks"]["clocks"][0]["progress"],
+    }
+
+
+def test_transaction_commits_each_file_once():
+    """Every touched document is written once, when the block exits"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        campaign = _setup(tmp)
+        flushes = campaign.state_store.stats["flushes"]
+
+        with campaign.transaction():
+            _mutate(campaign)
+            # Reads inside the block see the in-memory copies
+            assert campaign.npcs.load_npc("ralof")["loyalty"] == 60
+            assert _disk(tmp) == {"momentum": 2, "loyalty": 50, "war_effort": 0}
+
+        assert _disk(tmp) == {"momentum": 4, "loyalty": 60, "war_effort": 1}
+        assert campaign.state_store.stats["flushes"] == flushes + 1
+        state = campaign.story.load_campaign_state()
+        assert state["branching_decisions"]["civil_war_entry_contact"] == "Ralof"
+        assert state["faction_quests"]["stormcloaks"]["trust_level"] == 2
+        assert not campaign.storage.commit_record_path().exists()
+
+
+def test_failed_transaction_changes_nothing():
+    """An exception anywhere in the block discards every mutation"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        campaign = _setup(tmp)
+        state_before = (tmp / "state" / "campaign_state.json").read_text()
+
+        try:
+            with campaign.transaction():
+                _mutate(campaign)
+                raise RuntimeError("player walked away")
+        except RuntimeError:
+            pass
+
+        assert _disk(tmp) == {"momentum": 2, "loyalty": 50, "war_effort": 0}
+        assert (tmp / "state" / "campaign_state.json").read_text() == state_before
+        state = campaign.story.load_campaign_state()
+        assert state["branching_decisions"]["civil_war_entry_contact"] is None
+        assert "faction_quests" not in state
+
+
+def test_interrupted_commit_is_finished_on_open():
+    """A commit record left by a crash is replayed by the next backend"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        campaign = _setup(tmp)
+        record = campaign.storage.commit_record_path()
+        record.write_text(json.dumps([
+            {"collection": "data/npcs", "key": "ralof", "deleted": False,
+             "doc": {"id": "ralof", "name": "Ralof", "loyalty": 75}},
+            {"collection": "data/npcs", "key": "hadvar", "deleted": True, "doc": None},
+        ]))
+
+        storage = JsonDirectoryBackend({"data": tmp / "data", "state": tmp / "state"},
+                                       catalog=DataCatalog())
+        assert storage.get("data/npcs", "ralof")["loyalty"] == 75
+        assert not record.exists()
+
+
+def test_run_retries_on_conflicting_writer():
+    """A transaction that lost a race is re-run on fresh copies"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        campaign = _setup(tmp)
+        other = JsonDirectoryBackend({"data": tmp / "data", "state": tmp / "state"},
+                                     catalog=DataCatalog())
+        attempts = []
+
+        def _beat(c):
+            attempts.append(1)
+            c.story.advance_clock("civil_war", "stormcloak_momentum", 1)
+            c.npcs.update_loyalty("ralof", 10, "Sided with him")
+            if len(attempts) == 1:
+                # The GM dashboard bumps Ralof's loyalty before we commit
+                npc = other.get("data/npcs", "ralof")
+                npc["loyalty"] = 70
+                other.put("data/npcs", "ralof", npc)
+            return "done"
+
+        assert campaign.run(_beat) == "done"
+        assert len(attempts) == 2
+        assert _disk(tmp) == {"momentum": 3, "loyalty": 80, "war_effort": 0}
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Tests for the unified clock engine (clock_engine.py).
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import bump_mtime, write_json
+from campaign import Campaign
+from clock_engine import ClockEngine, ClockError, HotClocks, get_clock_engine, read_hot_clocks
+from data_catalog import DataCatalog
+from state_store import StateStore
+from story_progression import StoryProgressionManager
+from storage import JsonDirectoryBackend
+
+
+def _setup(tmp):
+    data = tmp / "data"
+    write_json(data / "clocks" / "civil_war_clocks.json", {"civil_war_clocks": {
+        "last_updated": "2026-01-01",
+        "clocks": {"stormcloak_momentum": {"name": "Momentum", "current_progress": 2, "total_segments": 8}}}})
+    write_json(data / "clocks" / "faction_trust_clocks.json", {"faction_trust_clocks": {
+        "clocks": {"companions_trust": {"faction": "The Companions", "current_trust": 9, "max_trust": 10}}}})
+    write_json(data / "clocks" / "ancano_powerplay.json", {
+        "clocks": {"ancano_powerplay": {"name": "Ancano Powerplay", "current": 1, "max": 4}}})
+    write_json(data / "factions.json", {"major_factions": {"thalmor": {"name": "Thalmor", "clocks": [
+        {"name": "Talos Persecution", "progress": 5, "segments": 10, "effect": "Purge"},
+        {"name": "Intelligence Network", "progress": 3, "segments": 8, "effect": "Spies"}]}}})
+    write_json(data / "factions" / "thieves_guild.json", {"name": "Thieves Guild", "clock": {
+        "name": "Guild Restoration", "progress": 0, "segments": 8}})
+    write_json(data / "thalmor_arcs.json", {"thalmor_overarching_arc": {"arcs": [
+        {"arc_id": "perpetual_war", "name": "Perpetual Warfare", "phases": [
+            {"phase": 1, "name": "Intelligence Gathering", "clock_progress": 3, "clock_max": 8}]}]}})
+    write_json(tmp / "state" / "campaign_state.json", {"scene_clocks": {
+        "saarthal": {"name": "Saarthal", "current": 3, "max": 4}}})
+    storage = JsonDirectoryBackend({"data": data, "state": tmp / "state"}, catalog=DataCatalog())
+    return storage, ClockEngine(storage, StateStore(storage))
+
+
+def _read(tmp, *parts):
+    return json.loads(tmp.joinpath(*parts).read_text())
+
+
+def test_every_schema_is_indexed_by_qualified_id():
+    """All clock shapes load into one registry"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _, engine = _setup(Path(tmp))
+        expected = {
+            "civil_war_clocks/stormcloak_momentum": (2, 8),
+            "faction_trust_clocks/companions_trust": (9, 10),
+            "ancano_powerplay/ancano_powerplay": (1, 4),
+            "factions/thalmor/talos_persecution": (5, 10),
+            "factions/thalmor/intelligence_network": (3, 8),
+            "faction_files/thieves_guild": (0, 8),
+            "thalmor_arcs/perpetual_war/phase_1": (3, 8),
+            "scene_clocks/saarthal": (3, 4),
+        }
+        assert {clock.id: (clock.current, clock.maximum) for clock in engine} == expected
+        assert engine["faction_trust_clocks/companions_trust"].name == "The Companions"
+        assert engine["factions/thalmor/intelligence_network"].group_name == "Thalmor"
+        assert [c.id for c in engine.find("Intelligence Network")] == ["factions/thalmor/intelligence_network"]
+        assert [c.key for c in engine.clocks(group="factions/thalmor")] == ["talos_persecution",
+                                                                             "intelligence_network"]
+        assert engine.get("nope") is None
+
+
+def test_batched_advances_write_back_native_shapes():
+    """Each file is written once, in its own schema, clamped to 0..max"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _, engine = _setup(tmp)
+        changes = engine.advance_many([
+            ("civil_war_clocks/stormcloak_momentum", 1),
+            ("civil_war_clocks/stormcloak_momentum", 1),
+            ("faction_trust_clocks/companions_trust", 5),
+            ("factions/thalmor/intelligence_network", -10),
+            ("thalmor_arcs/perpetual_war/phase_1", 2),
+            ("scene_clocks/saarthal", 1),
+        ])
+        assert [(c["old"], c["new"]) for c in changes] == [(2, 3), (3, 4), (9, 10), (3, 0), (3, 5), (3, 4)]
+
+        civil_war = _read(tmp, "data", "clocks", "civil_war_clocks.json")["civil_war_clocks"]
+        assert civil_war["clocks"]["stormcloak_momentum"]["current_progress"] == 4
+        assert civil_war["last_updated"] != "2026-01-01"
+        trust = _read(tmp, "data", "clocks", "faction_trust_clocks.json")["faction_trust_clocks"]
+        assert trust == {"clocks": {"companions_trust": {"faction": "The Companions",
+                                                         "current_trust": 10, "max_trust": 10}}}
+        factions = _read(tmp, "data", "factions.json")["major_factions"]["thalmor"]["clocks"]
+        assert [c["progress"] for c in factions] == [5, 0]
+        arcs = _read(tmp, "data", "thalmor_arcs.json")
+        assert arcs["thalmor_overarching_arc"]["arcs"][0]["phases"][0]["clock_progress"] == 5
+        assert _read(tmp, "state", "campaign_state.json")["scene_clocks"]["saarthal"]["current"] == 4
+        assert not engine.dirty
+
+        try:
+            engine.advance_many({"civil_war_clocks/stormcloak_momentum": 1, "missing/clock": 1})
+            assert False, "expected ClockError"
+        except ClockError:
+            pass
+        assert engine["civil_war_clocks/stormcloak_momentum"].current == 4
+
+
+def test_concurrent_edits_are_merged_not_overwritten():
+    """Advances are replayed on a file another tool saved after loading"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, engine = _setup(tmp)
+        engine.refresh()
+
+        def _edit(doc):
+            faction = doc["major_factions"]["thalmor"]
+            faction["clocks"].reverse()
+            faction["clocks"][0]["progress"] = 6
+            faction["relationships"] = {"blades": -100}
+            return True
+        other = JsonDirectoryBackend({"data": tmp / "data", "state": tmp / "state"}, catalog=DataCatalog())
+        other.update("data", "factions", _edit)
+
+        # The engine still holds the old copy (3/8) until it writes
+        change = engine.advance("factions/thalmor/intelligence_network", 1)
+        assert change["old"] == 3
+        faction = _read(tmp, "data", "factions.json")["major_factions"]["thalmor"]
+        assert faction["clocks"][0] == {"name": "Intelligence Network", "progress": 7,
+                                        "segments": 8, "effect": "Spies"}
+        assert faction["relationships"] == {"blades": -100}
+        assert engine["factions/thalmor/intelligence_network"].current == 7
+
+
+def test_managers_share_the_campaign_engine():
+    """StoryManager and FactionManager advance clocks through one engine"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        campaign = Campaign(str(tmp / "data"), str(tmp / "state"), storage=storage)
+        assert campaign.story.clocks is campaign.clocks is campaign.factions.clocks
+
+        try:
+            with campaign.transaction():
+                campaign.story.advance_clock("civil_war", "stormcloak_momentum", 3)
+                campaign.factions.update_faction_clock("thalmor", "Talos Persecution", 1)
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+        assert campaign.clocks["civil_war_clocks/stormcloak_momentum"].current == 2
+        assert campaign.clocks["factions/thalmor/talos_persecution"].current == 5
+
+        with campaign.transaction():
+            campaign.story.advance_clock("civil_war", "stormcloak_momentum", 3)
+            campaign.factions.update_faction_clock("thalmor", "Talos Persecution", 1)
+        assert _read(tmp, "data", "clocks", "civil_war_clocks.json")[
+            "civil_war_clocks"]["clocks"]["stormcloak_momentum"]["current_progress"] == 5
+        assert _read(tmp, "data", "factions.json")["major_factions"]["thalmor"]["clocks"][0]["progress"] == 6
+        assert campaign.story.advance_clock("civil_war", "missing", 1) is False
+
+
+def test_faction_files_default_to_eight_segments():
+    """Faction file clocks without segments clamp (and rumor) against 8"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        write_json(tmp / "data" / "factions" / "dark_brotherhood.json", {
+            "name": "Dark Brotherhood", "clock": {"name": "Sanctuary", "progress": 3}})
+        write_json(tmp / "data" / "world_state" / "current_state.json", {"in_game_days_passed": 0})
+        manager = StoryProgressionManager(str(tmp / "data"), storage=storage)
+        assert manager.clocks["faction_files/dark_brotherhood"].maximum == 8
+        assert manager.generate_rumors() == []
+
+        assert manager.update_faction_clock("dark_brotherhood", 1.6) is True
+        assert manager.generate_rumors() == ["The Dark Brotherhood are up to something..."]
+        assert manager.update_faction_clock("dark_brotherhood", 20) is True
+        clock = _read(tmp, "data", "factions", "dark_brotherhood.json")["clock"]
+        assert clock == {"name": "Sanctuary", "progress": 8}
+        assert manager.update_faction_clock("dark_brotherhood", "2") is False
+
+
+def test_subscribers_run_once_per_crossing():
+    """Fill, percentage, segment and drop-below thresholds fire on crossing only"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _, engine = _setup(Path(tmp))
+        seen = []
+        clock_id = "factions/thalmor/intelligence_network"
+        engine.subscribe(lambda e: seen.append(("fill", e["id"], e["new"])))
+        engine.subscribe(lambda e: seen.append(("75%", e["new"])), "75%", group="factions/thalmor")
+        engine.subscribe(lambda e: seen.append(("seg4", e["new"])), 4, clock_id=clock_id)
+        engine.subscribe(lambda e: seen.append(("below2", e["new"])), "below:2", source="factions")
+        engine.subscribe(lambda e: seen.append(("once", e["new"])), "fill", clock_id=clock_id, once=True)
+
+        engine.advance(clock_id, 1)            # 3 -> 4
+        engine.advance(clock_id, 1)            # 4 -> 5: nothing new crossed
+        assert seen == [("seg4", 4)]
+        engine.advance(clock_id, 10)           # 5 -> 8: 75% (6) then fill
+        # Lowest threshold first; at the same segment, narrower scopes first
+        assert seen[1:] == [("75%", 8), ("once", 8), ("fill", clock_id, 8)]
+        engine.advance(clock_id, 1)            # already full: no crossing
+        engine.set(clock_id, 0)                # 8 -> 0: drops below 2
+        engine.advance(clock_id, 8)            # fills again
+        assert seen[4:] == [("below2", 0), ("seg4", 8), ("75%", 8), ("fill", clock_id, 8)]
+
+        # Re-subscribing under a name replaces; failing subscribers don't stop others
+        calls = []
+        engine.subscribe(lambda e: calls.append("old"), "fill", name="watch")
+        engine.subscribe(lambda e: 1 / 0, "fill", name="watch")
+        engine.subscribe(lambda e: calls.append("after"), "fill", clock_id="faction_files/thieves_guild")
+        engine.advance("faction_files/thieves_guild", 8)
+        assert calls == ["after"]
+        assert engine.unsubscribe("watch") and not engine.unsubscribe("watch")
+
+        try:
+            engine.subscribe(print, "sometimes")
+            assert False, "expected ClockError"
+        except ClockError:
+            pass
+
+
+def test_filled_clocks_become_world_consequences():
+    """Fills are recorded as world consequences without any manager involved"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        campaign = Campaign(str(tmp / "data"), str(tmp / "state"), storage=storage)
+        with campaign.transaction():
+            campaign.factions.update_faction_clock("thalmor", "Talos Persecution", 5)
+            campaign.factions.update_faction_clock("thalmor", "Talos Persecution", 1)
+        filled = campaign.story.load_campaign_state()["world_consequences"]["clocks_filled"]
+        assert [(f["clock"], f["effect"]) for f in filled] == [("factions/thalmor/talos_persecution", "Purge")]
+
+        engine = get_clock_engine(storage)
+        assert engine is campaign.clocks
+        engine.advance("thalmor_arcs/perpetual_war/phase_1", 5)
+        filled = campaign.state_store.load()["world_consequences"]["clocks_filled"]
+        assert [f["clock"] for f in filled][-1] == "thalmor_arcs/perpetual_war/phase_1"
+
+
+def test_hot_clocks_match_a_full_sort():
+    """The heap-backed view agrees with sorting everything after each change"""
+    rng = random.Random(7)
+    hot = HotClocks(k=5)
+    values = {}
+    order = {}
+    for step in range(2000):
+        clock_id = f"c{rng.randrange(40)}"
+        if rng.random() < 0.1:
+            hot.remove(clock_id)
+            values.pop(clock_id, None)
+        else:
+            maximum = rng.choice((4, 6, 8, 10))
+            current = rng.randint(0, maximum)
+            order.setdefault(clock_id, len(order))
+            values[clock_id] = (current / maximum, current)
+            hot.update(clock_id, current / maximum, current, {"id": clock_id})
+        expected = sorted(values, key=lambda c: (values[c], -order[c]), reverse=True)[:5]
+        assert [c["id"] for c in hot.top()] == expected, step
+    assert len(hot) == len(values)
+    assert len(hot._top) + len(hot._rest) <= 4 * len(values) + 32
+
+
+def test_hot_clocks_are_persisted_and_rebuilt():
+    """Advances keep state/hot_clocks.json current; hand edits make it rebuild"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, engine = _setup(tmp)
+        assert [c["id"] for c in engine.hottest(3)] == ["faction_trust_clocks/companions_trust",
+                                                        "scene_clocks/saarthal",
+                                                        "factions/thalmor/talos_persecution"]
+        engine.advance("faction_files/thieves_guild", 8)
+        saved = _read(tmp, "state", "hot_clocks.json")
+        assert saved["clocks"][0]["id"] == "faction_files/thieves_guild"
+        assert saved["clocks"] == engine.hottest()
+        assert saved["sources"]["faction_files/thieves_guild"] == list(
+            storage.signature("data/factions", "thieves_guild"))
+        assert not (tmp / "data" / "clocks" / "_hot_clocks.json").exists()
+        assert read_hot_clocks(storage, rebuild=False) == saved["clocks"]
+
+        # Unchanged view: no rewrite
+        mtime = (tmp / "state" / "hot_clocks.json").stat().st_mtime_ns
+        engine.advance("ancano_powerplay/ancano_powerplay", 0)
+        assert (tmp / "state" / "hot_clocks.json").stat().st_mtime_ns == mtime
+
+        # Edited by hand: the cache is stale and rebuilt on the next read
+        path = tmp / "data" / "clocks" / "ancano_powerplay.json"
+        write_json(path, {"clocks": {"ancano_powerplay": {"name": "Ancano Powerplay", "current": 4, "max": 4}}})
+        bump_mtime(path)
+        assert read_hot_clocks(storage, rebuild=False) == []
+        rebuilt = read_hot_clocks(storage)
+        # Both full: more segments ranks first
+        assert [c["id"] for c in rebuilt[:2]] == ["faction_files/thieves_guild",
+                                                  "ancano_powerplay/ancano_powerplay"]
+        assert _read(tmp, "state", "hot_clocks.json")["clocks"] == rebuilt
+        assert read_hot_clocks(storage, rebuild=False) == rebuilt
+
+        # Missing file: built on first read
+        (tmp / "state" / "hot_clocks.json").unlink()
+        assert read_hot_clocks(storage) == rebuilt
+
+
+def test_world_turn_runs_many_turns_with_one_commit():
+    """simulate_world_turn advances every faction in memory and writes once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        write_json(tmp / "data" / "world_state" / "current_state.json", {"in_game_days_passed": 7})
+        campaign = Campaign(str(tmp / "data"), str(tmp / "state"), storage=storage)
+        commits = []
+        original = storage._commit
+        storage._commit = lambda: (commits.append(1), original())[1]
+
+        report = campaign.factions.simulate_world_turn(6, days_per_turn=2)
+        assert len(commits) == 1
+        assert report["days"] == {"old": 7, "new": 19}
+        assert report["clocks"]["factions/thalmor/intelligence_network"] == {"old": 3, "new": 8, "max": 8}
+        assert report["clocks"]["faction_files/thieves_guild"] == {"old": 0, "new": 6, "max": 8}
+        assert "civil_war_clocks/stormcloak_momentum" not in report["clocks"]
+        assert [(e["turn"], e["clock"]) for e in report["completed"]] == [
+            (5, "factions/thalmor/talos_persecution"), (5, "factions/thalmor/intelligence_network")]
+
+        faction = _read(tmp, "data", "factions.json")["major_factions"]["thalmor"]
+        assert [c["progress"] for c in faction["clocks"]] == [10, 8]
+        assert _read(tmp, "data", "factions", "thieves_guild.json")["clock"]["progress"] == 6
+        assert _read(tmp, "data", "world_state", "current_state.json")["in_game_days_passed"] == 19
+        # Completion effects reached the story subscribers in firing order
+        filled = campaign.story.load_campaign_state()["world_consequences"]["clocks_filled"]
+        assert [f["clock"] for f in filled] == ["factions/thalmor/talos_persecution",
+                                                "factions/thalmor/intelligence_network"]
+        assert campaign.factions.simulate_world_turn(0) is None
+        assert campaign.factions.simulate_world_turn(True) is None
+        assert campaign.factions.simulate_world_turn(2, days_per_turn=0) is None
+        assert campaign.factions.simulate_world_turn(2, days_per_turn=1.5) is None
+        assert len(commits) == 1
+
+
+def test_failed_world_turn_drops_state_changes():
+    """A world turn that fails leaves clocks and campaign state as stored"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        write_json(tmp / "data" / "world_state" / "current_state.json", {"in_game_days_passed": 7})
+        campaign = Campaign(str(tmp / "data"), str(tmp / "state"), storage=storage)
+
+        def _fail(collection, key, doc):
+            raise OSError("disk full")
+
+        storage.put = _fail
+        try:
+            campaign.factions.simulate_world_turn(6)
+            assert False, "expected OSError"
+        except OSError:
+            pass
+        del storage.put
+
+        assert "world_consequences" not in campaign.state_store.load()
+        assert campaign.clocks["factions/thalmor/talos_persecution"].current == 5
+        assert _read(tmp, "data", "factions.json")["major_factions"]["thalmor"]["clocks"][0]["progress"] == 5
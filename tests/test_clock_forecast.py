@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the Monte Carlo clock forecaster (clock_forecast.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from clock_engine import ClockEngine, ClockError
+from clock_forecast import forecast, format_forecast, plan
+from data_catalog import DataCatalog
+from state_store import StateStore
+from storage import JsonDirectoryBackend
+
+
+def _engine(tmp):
+    data = tmp / "data"
+    (data / "clocks").mkdir(parents=True)
+    (data / "clocks" / "civil_war_clocks.json").write_text(json.dumps({"clocks": {
+        "siege": {"name": "Siege", "current_progress": 7, "total_segments": 8},
+        "won": {"name": "Won", "current_progress": 4, "total_segments": 4}}}))
+    (data / "clocks" / "college_story_clocks.json").write_text(json.dumps({"clocks": {
+        "lecture": {"name": "Lecture", "current": 1, "max": 2}}}))
+    (data / "factions.json").write_text(json.dumps({"major_factions": {
+        "thalmor": {"name": "Thalmor", "relationships": {"blades": -100},
+                    "clocks": [{"name": "Purge", "progress": 6, "segments": 8}]},
+        "blades": {"name": "Blades", "relationships": {"thalmor": -100},
+                   "clocks": [{"name": "Hunt", "progress": 0, "segments": 4}]}}}))
+    (data / "thalmor_arcs.json").write_text(json.dumps({"thalmor_overarching_arc": {"arcs": [
+        {"arc_id": "war", "phases": [
+            {"phase": 1, "name": "One", "clock_progress": 1, "clock_max": 4},
+            {"phase": 2, "name": "Two", "clock_progress": 0, "clock_max": 4}]}]}}))
+    (tmp / "state").mkdir()
+    storage = JsonDirectoryBackend({"data": data, "state": tmp / "state"}, catalog=DataCatalog())
+    return ClockEngine(storage, StateStore(storage))
+
+
+def test_plan_selects_world_clocks():
+    """Full clocks, non-world sources and later arc phases are left out"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(Path(tmp))
+        clocks = {clock["id"]: clock for clock in plan(engine)}
+        assert set(clocks) == {"civil_war_clocks/siege", "factions/thalmor/purge",
+                               "factions/blades/hunt", "thalmor_arcs/war/phase_1"}
+        # One hostile faction at the default 15% interference
+        assert abs(clocks["factions/thalmor/purge"]["block"] - 0.15) < 1e-9
+        assert clocks["civil_war_clocks/siege"]["block"] == 0.0
+
+        try:
+            plan(engine, {"default": {"advance": {"-1": 1}}})
+            assert False, "expected ClockError"
+        except ClockError:
+            pass
+
+
+def test_deterministic_model_gives_exact_fill_turns():
+    """With fixed advances every future agrees"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(Path(tmp))
+        model = {"default": {"advance": {"1": 1}}, "interference": {"chance": 0}}
+        report = forecast(engine, turns=3, trials=200, seed=1, model=model, use_numpy=False)
+        clocks = {clock["id"]: clock for clock in report["clocks"]}
+        assert report["clocks"][0]["id"] == "civil_war_clocks/siege"
+        assert clocks["civil_war_clocks/siege"]["fill_turns"] == {1: 1.0, 2: 0.0, 3: 0.0}
+        assert clocks["civil_war_clocks/siege"]["p_first"] == 1.0
+        assert clocks["factions/thalmor/purge"]["mean_fill_turn"] == 2
+        assert clocks["thalmor_arcs/war/phase_1"]["fill_turns"][3] == 1.0
+        assert clocks["factions/blades/hunt"]["p_fill"] == 0.0
+        assert report["collisions"] == []
+
+        # Full interference stops faction clocks outright
+        model["interference"]["chance"] = 1
+        report = forecast(engine, turns=3, trials=50, seed=1, model=model, use_numpy=False)
+        assert {c["id"]: c["p_fill"] for c in report["clocks"]}["factions/thalmor/purge"] == 0.0
+
+
+def test_stochastic_forecast_is_reproducible_and_finds_collisions():
+    """A seed fixes the result; clocks filling together are reported"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(Path(tmp))
+        model = {"default": {"advance": {"0": 0.5, "2": 0.5}}, "interference": {"chance": 0}}
+        first = forecast(engine, turns=2, trials=2000, seed=5, model=model, use_numpy=False)
+        assert first == forecast(engine, turns=2, trials=2000, seed=5, model=model, use_numpy=False)
+        clocks = {clock["id"]: clock for clock in first["clocks"]}
+        # Siege (7/8) fills on turn 1 half the time, by turn 2 three times in four
+        assert abs(clocks["civil_war_clocks/siege"]["fill_turns"][1] - 0.5) < 0.05
+        assert abs(clocks["civil_war_clocks/siege"]["p_fill"] - 0.75) < 0.05
+        # Something fills unless siege, purge, hunt and the arc phase all stall
+        assert abs(sum(clock["p_first"] for clock in first["clocks"])
+                   - (1 - 0.25 * 0.25 * 0.75 * 0.75)) < 0.02
+        pairs = {tuple(sorted(c["clocks"])): c["probability"] for c in first["collisions"]}
+        assert abs(pairs[("civil_war_clocks/siege", "factions/thalmor/purge")] - 0.3125) < 0.03
+        assert "Likely to fill on the same turn" in format_forecast(first)
+
+
+def test_numpy_and_python_backends_agree():
+    """The vectorized pass gives the same probabilities (needs NumPy)"""
+    pytest.importorskip("numpy")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(Path(tmp))
+        model = {"default": {"advance": {"0": 0.5, "2": 0.5}}, "interference": {"chance": 0.3}}
+        fast = forecast(engine, turns=2, trials=20000, seed=1, model=model, use_numpy=True)
+        slow = forecast(engine, turns=2, trials=20000, seed=1, model=model, use_numpy=False)
+        assert fast["backend"] == "numpy"
+        for a, b in zip(fast["clocks"], slow["clocks"]):
+            assert a["id"] == b["id"]
+            assert abs(a["p_fill"] - b["p_fill"]) < 0.03
+            assert abs(a["p_first"] - b["p_first"]) < 0.03
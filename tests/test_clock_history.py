@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for the clock change history (clock_history.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import write_json
+from campaign import Campaign
+from clock_engine import ClockEngine
+from clock_history import ClockHistory
+from data_catalog import DataCatalog
+from state_store import StateStore
+from storage import JsonDirectoryBackend
+
+
+def _setup(tmp):
+    data = tmp / "data"
+    write_json(data / "clocks" / "thalmor_influence_clocks.json", {"clocks": {
+        "embassy": {"name": "Embassy", "current": 1, "max": 10},
+        "courts": {"name": "Courts", "current": 0, "max": 10}}})
+    write_json(data / "clocks" / "civil_war_clocks.json", {"clocks": {
+        "momentum": {"name": "Momentum", "current": 0, "max": 10}}})
+    write_json(data / "world_state" / "current_state.json", {"in_game_days_passed": 30})
+    write_json(tmp / "state" / "campaign_state.json", {"session_count": 4})
+    storage = JsonDirectoryBackend({"data": data, "state": tmp / "state"}, catalog=DataCatalog())
+    return storage, ClockEngine(storage, StateStore(storage))
+
+
+def _read_clock(tmp, source, key):
+    return json.loads((tmp / "data" / "clocks" / f"{source}.json").read_text())["clocks"][key]["current"]
+
+
+def _session(engine, number):
+    state = engine.state_store.load()
+    state["session_count"] = number
+    engine.state_store.save()
+    engine.history.invalidate()
+
+
+def test_changes_are_logged_with_session_day_and_cause():
+    """Every effective change becomes a persisted row"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, engine = _setup(tmp)
+        engine.advance("thalmor_influence_clocks/embassy", 2, cause="story")
+        engine.advance("thalmor_influence_clocks/embassy", 0)
+        with engine.history.context(day=33, cause="world_turn"):
+            engine.advance_many([("thalmor_influence_clocks/courts", 1),
+                                 ("civil_war_clocks/momentum", -1)])
+
+        rows = engine.history.query()
+        assert [(r["clock"], r["delta"], r["value"], r["session"], r["day"], r["cause"]) for r in rows] == [
+            ("thalmor_influence_clocks/embassy", 2, 3, 4, 30, "story"),
+            ("thalmor_influence_clocks/courts", 1, 1, 4, 33, "world_turn"),
+        ]
+        segments = [json.loads(p.read_text()) for p in sorted((tmp / "state" / "clock_history").glob("*.json"))]
+        assert [seg["columns"]["delta"] for seg in segments] == [[2], [1]]
+        assert [seg["clocks"] for seg in segments] == [
+            ["thalmor_influence_clocks/embassy"], ["thalmor_influence_clocks/courts"]]
+
+        reloaded = ClockHistory(storage)
+        assert reloaded.query() == rows
+        assert [r["clock"] for r in reloaded.query(prefix="thalmor_influence_clocks", days=(31, None))] == [
+            "thalmor_influence_clocks/courts"]
+
+
+def test_aggregates_by_session():
+    """Net change, change counts and end-of-session totals per session"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _, engine = _setup(Path(tmp))
+        engine.advance("thalmor_influence_clocks/embassy", 2)      # session 4: 1 -> 3
+        _session(engine, 5)
+        engine.advance("thalmor_influence_clocks/courts", 4)       # session 5: courts 4
+        engine.advance("civil_war_clocks/momentum", 5)
+        _session(engine, 6)
+        engine.advance("thalmor_influence_clocks/embassy", -1)     # session 6: 3 -> 2
+
+        history = engine.history
+        prefix = "thalmor_influence_clocks"
+        assert history.aggregate("session", prefix=prefix) == {4: 2, 5: 4, 6: -1}
+        assert history.aggregate("session", prefix=prefix, metric="value") == {4: 3, 5: 7, 6: 6}
+        assert history.aggregate("session", prefix=prefix, metric="value", sessions=(6, 6)) == {6: 6}
+        assert history.aggregate("clock", metric="changes") == {
+            "thalmor_influence_clocks/embassy": 2, "thalmor_influence_clocks/courts": 1,
+            "civil_war_clocks/momentum": 1}
+        try:
+            history.aggregate("clock", metric="value")
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+
+def test_compaction_downsamples_old_sessions():
+    """Old sessions keep one row per clock; totals are unchanged"""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage, _ = _setup(Path(tmp))
+        history = ClockHistory(storage, keep_sessions=2)
+        for session in range(1, 6):
+            for value in range(1, 4):
+                history.record("a", 1, value + session, cause="story", session=session, day=session * 10)
+            history.record("b", 2, session, cause=f"cause{session % 2}", session=session)
+        before = history.aggregate("session", metric="value")
+        assert len(history) == 20
+
+        assert history.compact() == 6
+        assert len(history) == 14
+        assert history.aggregate("session", metric="value") == before
+        assert history.aggregate("session", clock="a") == {s: 3 for s in range(1, 6)}
+        first = history.query(sessions=(1, 1))
+        assert [(r["clock"], r["delta"], r["value"], r["count"], r["cause"]) for r in first] == [
+            ("a", 3, 4, 3, "story"), ("b", 2, 1, 1, "cause1")]
+        assert history.compact() == 0
+
+        history.save()
+        assert len(ClockHistory(storage)) == 14
+
+
+def test_save_compacts_past_max_rows():
+    """Checking for compaction changes nothing; the fold downsamples the stored log"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        history = ClockHistory(storage, keep_sessions=1, max_rows=3)
+        for session in (1, 1, 1, 2):
+            history.record("a", 1, 1, session=session)
+        assert history._can_downsample(1) is True
+        assert history._can_downsample(2) is False
+        assert len(history) == 4
+
+        history.save()
+        assert list((tmp / "state" / "clock_history").glob("*.json")) == []
+        assert [(r["session"], r["delta"]) for r in ClockHistory(storage).query()] == [(1, 3), (2, 1)]
+
+
+def test_campaign_transaction_writes_one_segment():
+    """Advances inside one campaign transaction share a single history segment"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        campaign = Campaign(str(tmp / "data"), str(tmp / "state"), storage=storage)
+        with campaign.transaction():
+            campaign.clocks.advance("civil_war_clocks/momentum", 1)
+            campaign.clocks.advance("thalmor_influence_clocks/embassy", 1)
+            campaign.clocks.advance("civil_war_clocks/momentum", 1)
+        segments = list((tmp / "state" / "clock_history").glob("*.json"))
+        assert len(segments) == 1
+        assert json.loads(segments[0].read_text())["columns"]["delta"] == [1, 1, 1]
+        assert _read_clock(tmp, "civil_war_clocks", "momentum") == 2
+
+
+def test_concurrent_writers_keep_each_others_rows():
+    """Two histories saving to the same storage lose no rows; folding merges them"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        first, second = ClockHistory(storage), ClockHistory(storage)
+        first.record("a", 1, 1, session=1)
+        first.record("a", 1, 2, session=1)
+        second.record("b", 2, 2, session=1)
+        first.save()
+        second.save()
+        second.record("b", 1, 3, session=2)
+        second.save()
+        assert sorted((r["clock"], r["value"]) for r in ClockHistory(storage).query()) == [
+            ("a", 1), ("a", 2), ("b", 2), ("b", 3)]
+
+        first.record("a", 1, 3, session=2)
+        first.compact(keep_sessions=1)
+        first.save()
+        assert sorted(r["clock"] for r in first.query()) == ["a", "a", "b", "b"]
+        assert list((tmp / "state" / "clock_history").glob("*.json")) == []
+        base = json.loads((tmp / "state" / "clock_history.json").read_text())
+        assert len(base["segments"]) == 4
+        assert len(ClockHistory(storage)) == 4
+
+
+def test_rolled_back_changes_leave_no_history():
+    """A failed campaign transaction discards its rows"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage, _ = _setup(tmp)
+        campaign = Campaign(str(tmp / "data"), str(tmp / "state"), storage=storage)
+        campaign.clocks.advance("civil_war_clocks/momentum", 1)
+        try:
+            with campaign.transaction():
+                campaign.clocks.advance("civil_war_clocks/momentum", 3)
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+        assert [r["value"] for r in campaign.clocks.history.query()] == [1]
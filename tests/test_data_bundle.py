@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled data bundle (data_bundle.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import bump_mtime
+from data_bundle import build_bundle, bundle_status, load_bundle, read_bundle
+from data_catalog import DataCatalog
+
+
+def _make_repo(tmp):
+    (tmp / "data" / "npcs").mkdir(parents=True)
+    (tmp / "data" / "npcs" / "lydia.json").write_text(json.dumps({"id": "lydia", "loyalty": 60}))
+    (tmp / "data" / "standing_stones.json").write_text(json.dumps({"standing_stones": []}))
+
+
+def test_bundle_serves_catalog_without_parsing():
+    """A fresh bundle answers catalog lookups with zero JSON parses"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        summary = build_bundle(tmp)
+        assert summary["files"] == 2
+
+        catalog = DataCatalog()
+        assert load_bundle(catalog, repo_root=tmp) == 2
+        entries = catalog.load_dir(tmp / "data" / "npcs")
+        assert [e.data for e in entries] == [{"id": "lydia", "loyalty": 60}]
+        assert catalog.load_file(tmp / "data" / "standing_stones.json").ok
+        assert catalog.stats["loads"] == 0
+
+
+def test_stale_files_fall_back_to_source():
+    """Files edited after the build are re-read from disk"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        build_bundle(tmp)
+
+        lydia = tmp / "data" / "npcs" / "lydia.json"
+        lydia.write_text(json.dumps({"id": "lydia", "loyalty": 75}))
+        bump_mtime(lydia)
+        (tmp / "data" / "npcs" / "hadvar.json").write_text(json.dumps({"id": "hadvar"}))
+
+        status = bundle_status(tmp)
+        assert status["changed"] == ["data/npcs/lydia.json"]
+        assert status["added"] == ["data/npcs/hadvar.json"]
+
+        catalog = DataCatalog()
+        load_bundle(catalog, repo_root=tmp)
+        assert catalog.load_file(lydia).data["loyalty"] == 75
+        assert catalog.stats["loads"] == 1
+
+
+def test_content_hash_and_corruption():
+    """Identical data hashes identically; a corrupt bundle is ignored"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        first = build_bundle(tmp)["content_hash"]
+        assert build_bundle(tmp)["content_hash"] == first
+
+        bundle_path = Path(build_bundle(tmp)["path"])
+        blob = bytearray(bundle_path.read_bytes())
+        blob[-1] ^= 0xFF
+        bundle_path.write_bytes(bytes(blob))
+        assert read_bundle(bundle_path) is None
+        assert load_bundle(DataCatalog(), repo_root=tmp) == 0
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the DataCatalog mtime-invalidated JSON cache and its use by
+DataQueryManager.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import bump_mtime, write_json
+from data_catalog import DataCatalog, clone_json
+from query_data import DataQueryManager
+
+
+def test_load_dir_parses_each_file_once():
+    """Unchanged files are served from memory on repeat lookups"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_json(tmp / "a.json", {"id": "a"})
+        write_json(tmp / "b.json", {"id": "b"})
+
+        catalog = DataCatalog()
+        first = catalog.load_dir(tmp)
+        second = catalog.load_dir(tmp)
+
+        assert sorted(e.data["id"] for e in first) == ["a", "b"]
+        assert catalog.stats["loads"] == 2
+        assert catalog.stats["hits"] == 2
+        assert first[0].data is second[0].data
+
+
+def test_changed_file_is_reloaded():
+    """Only the file whose mtime/size changed is re-parsed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_json(tmp / "a.json", {"id": "a", "v": 1})
+        write_json(tmp / "b.json", {"id": "b"})
+
+        catalog = DataCatalog()
+        catalog.load_dir(tmp)
+
+        write_json(tmp / "a.json", {"id": "a", "v": 22})
+        bump_mtime(tmp / "a.json")
+        entries = {e.data["id"]: e.data for e in catalog.load_dir(tmp)}
+
+        assert entries["a"]["v"] == 22
+        assert catalog.stats["loads"] == 3
+
+
+def test_added_and_deleted_files():
+    """New files appear and deleted files vanish from directory lookups"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_json(tmp / "a.json", {"id": "a"})
+
+        catalog = DataCatalog()
+        assert len(catalog.load_dir(tmp)) == 1
+
+        write_json(tmp / "b.json", {"id": "b"})
+        (tmp / "a.json").unlink()
+        ids = [e.data["id"] for e in catalog.load_dir(tmp)]
+
+        assert ids == ["b"]
+        assert catalog.load_file(tmp / "a.json") is None
+
+
+def test_invalid_json_is_reported_not_raised():
+    """Parse errors are kept on the entry so callers can warn as before"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "bad.json").write_text("{not json", encoding='utf-8')
+
+        entries = DataCatalog().load_dir(tmp)
+
+        assert len(entries) == 1
+        assert not entries[0].ok
+        assert entries[0].data is None
+
+
+def test_clone_json_is_deep():
+    """clone_json copies nested containers"""
+    original = {"a": [1, {"b": 2}]}
+    copy = clone_json(original)
+    copy["a"][1]["b"] = 3
+    assert original["a"][1]["b"] == 2
+
+
+def test_query_manager_results_are_isolated_from_cache():
+    """Mutating a query result must not leak into later queries"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sheets = tmp / "npc_stat_sheets"
+        sheets.mkdir()
+        write_json(sheets / "guard.json", {
+            "id": "npc_stat_guard", "name": "Guard",
+            "category": "Friendly NPC", "location": "Whiterun"
+        })
+
+        manager = DataQueryManager(str(tmp), catalog=DataCatalog())
+        first = manager.query_npc_enemy_stats(location="Whiterun")
+        first[0].setdefault("gm_barks", []).append("hello")
+
+        second = manager.query_npc_enemy_stats(location="Whiterun")
+        assert "gm_barks" not in second[0]
+
+
+def test_query_manager_sees_edits():
+    """DataQueryManager picks up edited stat sheets without a restart"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sheets = tmp / "npc_stat_sheets"
+        sheets.mkdir()
+        sheet = sheets / "wolf.json"
+        write_json(sheet, {"id": "wolf", "name": "Wolf", "category": "Enemy",
+                       "location": "Falkreath", "act_context": ["Act 1"]})
+
+        manager = DataQueryManager(str(tmp), catalog=DataCatalog())
+        assert len(manager.get_enemies_by_act("Act 1")) == 1
+
+        write_json(sheet, {"id": "wolf", "name": "Wolf", "category": "Enemy",
+                       "location": "Falkreath", "act_context": ["Act 2"]})
+        bump_mtime(sheet)
+
+        assert manager.get_enemies_by_act("Act 1") == []
+        assert len(manager.get_enemies_by_act("Act 2")) == 1
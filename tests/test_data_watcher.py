@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for hot reload of data files (data_watcher.py).
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import bump_mtime, write_json
+from data_catalog import DataCatalog
+from data_watcher import DataWatcher
+from stat_sheet_index import get_stat_sheet_index
+
+
+def test_watched_catalog_reparses_only_changed_files():
+    """Lookups skip the filesystem; a reported change reloads one file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        npcs = Path(tmp) / "data" / "npcs"
+        for name in ("lydia", "ralof", "hadvar"):
+            write_json(npcs / f"{name}.json", {"id": name, "loyalty": 50})
+
+        catalog = DataCatalog()
+        watcher = DataWatcher(Path(tmp) / "data", catalog=catalog, use_inotify=False)
+        watcher.start(background=False)
+        try:
+            assert len(catalog.load_dir(npcs)) == 3
+            loads = catalog.stats["loads"]
+
+            write_json(npcs / "lydia.json", {"id": "lydia", "loyalty": 75})
+            bump_mtime(npcs / "lydia.json")
+            # Not reported yet: the watched catalog does not stat the files
+            assert catalog.load_file(npcs / "lydia.json").data["loyalty"] == 50
+
+            assert watcher.poll() == [(npcs / "lydia.json").resolve()]
+            by_id = {e.data["id"]: e.data for e in catalog.load_dir(npcs)}
+            assert by_id["lydia"]["loyalty"] == 75
+            assert catalog.stats["loads"] == loads + 1
+
+            write_json(npcs / "ulfric.json", {"id": "ulfric"})
+            watcher.poll()
+            assert len(catalog.load_dir(npcs)) == 4
+        finally:
+            watcher.stop()
+
+        # Stopped watchers hand validation back to stat calls
+        write_json(npcs / "ralof.json", {"id": "ralof", "loyalty": 10, "padding": "x"})
+        by_id = {e.data["id"]: e.data for e in catalog.load_dir(npcs)}
+        assert by_id["ralof"]["loyalty"] == 10
+
+
+def test_stat_sheet_index_is_patched_in_place():
+    """A reloaded sheet is re-indexed without rebuilding the index"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sheets = Path(tmp) / "npc_stat_sheets"
+        write_json(sheets / "bandit.json", {"id": "bandit", "category": "Enemy", "location": "Whiterun Hold"})
+        write_json(sheets / "draugr.json", {"id": "draugr", "category": "Enemy", "location": "Bleak Falls Barrow"})
+
+        catalog = DataCatalog()
+        index = get_stat_sheet_index(sheets, catalog=catalog)
+        assert [s["id"] for s in index.find(location="Whiterun")] == ["bandit"]
+
+        write_json(sheets / "draugr.json", {"id": "draugr", "category": "Enemy", "location": "Whiterun Hold"})
+        catalog.invalidate(sheets / "draugr.json")
+
+        patched = get_stat_sheet_index(sheets, catalog=catalog)
+        assert patched is index
+        assert [s["id"] for s in patched.find(location="Whiterun")] == ["bandit", "draugr"]
+        assert patched.find(location="Bleak Falls") == []
+        assert patched.get("draugr")["location"] == "Whiterun Hold"
+
+        # Adding a file shifts positions, so the index is rebuilt
+        write_json(sheets / "apprentice.json", {"id": "apprentice", "category": "Enemy"})
+        assert get_stat_sheet_index(sheets, catalog=catalog) is not index
+
+
+def test_inotify_reports_new_subdirectories():
+    """inotify picks up files created in directories made after start()"""
+    if not sys.platform.startswith("linux"):
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp) / "data"
+        data.mkdir()
+        watcher = DataWatcher(data, catalog=DataCatalog())
+        watcher.start(background=False)
+        try:
+            if watcher.source.name != "inotify":
+                return
+            (data / "clocks").mkdir()
+            watcher.poll(1.0)
+            write_json(data / "clocks" / "civil_war_clocks.json", {"clocks": {}})
+            changed = set()
+            for _ in range(5):
+                changed.update(watcher.poll(1.0))
+                if (data / "clocks" / "civil_war_clocks.json").resolve() in changed:
+                    break
+            assert (data / "clocks" / "civil_war_clocks.json").resolve() in changed
+        finally:
+            watcher.stop()
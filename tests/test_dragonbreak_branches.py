@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for copy-on-write timeline branches (dragonbreak_manager.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from data_catalog import DataCatalog
+from dragonbreak_manager import DragonbreakManager
+from storage import JsonDirectoryBackend
+
+
+def _manager(tmp):
+    storage = JsonDirectoryBackend({"data": tmp / "data", "state": tmp / "state"}, catalog=DataCatalog())
+    manager = DragonbreakManager(str(tmp / "data"), str(tmp / "state"), storage=storage)
+    manager._log_dragonbreak_event = lambda *args: None
+    return manager
+
+
+def _status(manager, npc_id, branch_id):
+    entry = manager.get_branch_entry("npcs", npc_id, branch_id)
+    return entry and entry["state"]["status"]
+
+
+def test_fork_stores_only_overrides():
+    """A new branch is empty on disk and reads through its parent"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        manager = _manager(tmp)
+        manager.track_npc_across_branches("ulfric", "Ulfric", {"primary": {"status": "alive"}})
+        manager.track_quest_across_branches("battle", "Battle", {"primary": "pending"})
+        branch = manager.create_timeline_fracture("Fork", "A choice", "Trigger")
+
+        saved = json.loads((tmp / "state" / "dragonbreak_state.json").read_text())
+        assert saved["timeline_branches"][branch]["npcs"] == {}
+        assert _status(manager, "ulfric", branch) == "alive"
+
+        manager.track_npc_across_branches("ulfric", "Ulfric", {branch: {"status": "dead"}})
+        assert _status(manager, "ulfric", branch) == "dead"
+        assert _status(manager, "ulfric", "primary") == "alive"
+        view = manager.get_timeline_state(branch)
+        assert set(view["npcs"]) == {"ulfric"} and view["quests"]["battle"]["outcome"] == "pending"
+        assert view["parent_timeline"] == "primary"
+
+        listed = manager.list_all_timelines()
+        assert listed[branch]["quests"]["battle"]["outcome"] == "pending"
+        assert listed[branch]["npcs"]["ulfric"]["state"]["status"] == "dead"
+        listed[branch]["npcs"]["ulfric"]["state"]["status"] = "edited"
+        listed["primary"]["quests"].clear()
+        assert _status(manager, "ulfric", branch) == "dead"
+        assert manager.get_branch_entry("quests", "battle", "primary") is not None
+
+
+def test_parent_changes_after_a_fork_do_not_leak():
+    """Branches keep the state they were forked with, through grandchildren"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _manager(Path(tmp))
+        manager.track_npc_across_branches("ulfric", "Ulfric", {"primary": {"status": "alive"}})
+        child = manager.create_timeline_fracture("Child", "d", "t")
+        manager.switch_timeline(child)
+        grandchild = manager.create_timeline_fracture("Grandchild", "d", "t")
+
+        # Primary changes an entry and adds a new one after both forks
+        manager.track_npc_across_branches("ulfric", "Ulfric", {"primary": {"status": "captured"}})
+        manager.track_npc_across_branches("tullius", "Tullius", {"primary": {"status": "alive"}})
+        assert _status(manager, "ulfric", child) == "alive"
+        assert _status(manager, "ulfric", grandchild) == "alive"
+        assert _status(manager, "tullius", child) is None
+        assert "tullius" not in manager.get_timeline_state(grandchild)["npcs"]
+
+        # The child changing hides it from the grandchild too
+        manager.track_npc_across_branches("ulfric", "Ulfric", {child: {"status": "dead"}})
+        assert _status(manager, "ulfric", grandchild) == "alive"
+        assert _status(manager, "ulfric", "primary") == "captured"
+
+        # Returned views are copies
+        view = manager.get_timeline_state(child)
+        view["npcs"]["ulfric"]["state"]["status"] = "edited"
+        assert _status(manager, "ulfric", child) == "dead"
+
+
+def test_compaction_drops_full_copies():
+    """Branches saved as full copies shrink to their real overrides"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _manager(Path(tmp))
+        manager.track_npc_across_branches("ulfric", "Ulfric", {"primary": {"status": "alive"}})
+        manager.track_npc_across_branches("balgruuf", "Balgruuf", {"primary": {"status": "jarl"}})
+        branch = manager.create_timeline_fracture("Fork", "d", "t")
+        state = manager.load_dragonbreak_state()
+        primary = state["timeline_branches"]["primary"]
+        legacy = state["timeline_branches"][branch]
+        legacy["npcs"] = json.loads(json.dumps(primary["npcs"]))
+        legacy["npcs"]["ulfric"]["state"] = {"status": "dead"}
+        manager.save_dragonbreak_state(state)
+
+        assert manager.compact_timeline_branches() == 1
+        assert list(manager.load_dragonbreak_state()["timeline_branches"][branch]["npcs"]) == ["ulfric"]
+        assert _status(manager, "balgruuf", branch) == "jarl"
+        assert _status(manager, "ulfric", branch) == "dead"
+        assert manager.compact_timeline_branches() == 0
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the inverted StatSheetIndex.
+
+The index must return exactly what the old linear scans returned, so most
+tests compare index results against a brute-force location_matches loop
+over the real data/npc_stat_sheets library.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import bump_mtime
+from data_catalog import DataCatalog
+from stat_sheet_index import get_stat_sheet_index, get_storage_stat_sheet_index
+from query_data import DataQueryManager
+from utils import location_matches
+
+REPO_ROOT = Path(__file__).parent.parent
+STAT_DIR = REPO_ROOT / "data" / "npc_stat_sheets"
+
+SEARCHES = [
+    "Whiterun", "whiterun", "ruins", "Nordic ruins", "Ancient Nordic Ruins",
+    "Riften", "The Rift", "Windhelm", "Eastmarch", "Solitude", "College",
+    "Markarth", "a", "ru", "Roads", "Whiterun Hold - Dragonsreach",
+    "Skyrim", "Nowhere In Particular",
+]
+
+
+def _linear(sheets, location):
+    return [s for s in sheets if location_matches(location, s.get('location', ''))]
+
+
+def test_location_lookup_matches_linear_scan():
+    """Index location lookups agree with location_matches on every search"""
+    index = get_stat_sheet_index(STAT_DIR, DataCatalog())
+    for search in SEARCHES:
+        expected = [s['id'] for s in _linear(index.sheets, search)]
+        actual = [s['id'] for s in index.find(location=search)]
+        assert actual == expected, search
+
+
+def test_combined_filters_are_intersections():
+    """Category + location + type filters intersect"""
+    index = get_stat_sheet_index(STAT_DIR, DataCatalog())
+    for search in SEARCHES:
+        expected = [
+            s['id'] for s in _linear(index.sheets, search)
+            if s.get('category', '').lower() == 'enemy'
+        ]
+        actual = [s['id'] for s in index.find(category="enemy", location=search)]
+        assert actual == expected, search
+
+
+def test_hold_and_act_queries_match_linear_scan():
+    """get_enemies_by_hold / get_enemies_by_act keep their old semantics"""
+    manager = DataQueryManager(str(REPO_ROOT / "data"), catalog=DataCatalog())
+    index = get_storage_stat_sheet_index(manager.storage)
+
+    for hold in ["Eastmarch", "The Rift", "Whiterun", "Falkreath", "Winterhold"]:
+        expected = {"primary": [], "contested": [], "rare": []}
+        for sheet in index.sheets:
+            if sheet.get('category') != 'Enemy':
+                continue
+            hold_context = sheet.get('hold_context', {})
+            if hold in hold_context.get('primary', []):
+                expected['primary'].append(sheet['id'])
+            elif hold in hold_context.get('contested', []):
+                expected['contested'].append(sheet['id'])
+            elif hold in hold_context.get('rare', []):
+                expected['rare'].append(sheet['id'])
+            elif location_matches(hold, sheet.get('location', '')) and not hold_context:
+                expected['primary'].append(sheet['id'])
+
+        actual = manager.get_enemies_by_hold(hold)
+        assert {k: [s['id'] for s in v] for k, v in actual.items()} == expected, hold
+
+    for act in ["Act 1", "Act 2", "Act 3"]:
+        expected = [
+            s['id'] for s in index.sheets
+            if s.get('category') == 'Enemy' and act in (s.get('act_context') or [])
+        ]
+        assert [s['id'] for s in manager.get_enemies_by_act(act)] == expected
+
+
+def test_index_rebuilds_when_sheet_changes():
+    """Editing a sheet's location moves it between location postings"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sheet = tmp / "guard.json"
+        sheet.write_text(json.dumps({
+            "id": "guard", "name": "Guard", "category": "Friendly NPC",
+            "location": "Whiterun"
+        }), encoding='utf-8')
+
+        catalog = DataCatalog()
+        index = get_stat_sheet_index(tmp, catalog)
+        assert [s['id'] for s in index.find(location="Whiterun")] == ["guard"]
+        assert get_stat_sheet_index(tmp, catalog) is index
+
+        sheet.write_text(json.dumps({
+            "id": "guard", "name": "Guard", "category": "Friendly NPC",
+            "location": "Solitude Docks"
+        }), encoding='utf-8')
+        bump_mtime(sheet)
+
+        # The reloaded sheet is patched into the existing index
+        rebuilt = get_stat_sheet_index(tmp, catalog)
+        assert rebuilt is index
+        assert rebuilt.find(location="Whiterun") == []
+        assert [s['id'] for s in rebuilt.find(location="docks")] == ["guard"]
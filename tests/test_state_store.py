@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared campaign StateStore (state_store.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import bump_mtime
+from data_catalog import DataCatalog
+from first_impression import maybe_first_impression
+from state_store import StateStore, get_state_store, get_state_store_for_path
+from storage import JsonDirectoryBackend
+
+
+def _backend(tmp):
+    return JsonDirectoryBackend({"data": tmp / "data", "state": tmp / "state"},
+                                catalog=DataCatalog())
+
+
+def test_one_copy_shared_by_path_and_backend():
+    """Stores for the same document are shared across backend instances"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        backend = _backend(tmp)
+        backend.put("state", "campaign_state", {"session_count": 1})
+
+        store = get_state_store(backend)
+        assert get_state_store(_backend(tmp)) is store
+        assert get_state_store_for_path(tmp / "state" / "campaign_state.json") is store
+        assert store.load() is store.load()
+        assert store.stats["loads"] == 1
+
+
+def test_batch_flushes_once_with_dirty_sections():
+    """Many saves inside batch() become one write of the changed sections"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        backend = _backend(tmp)
+        backend.put("state", "campaign_state", {"flags": {}, "companions": {"lydia": 60}})
+        store = StateStore(backend)
+
+        with store.batch():
+            for i in range(10):
+                state = store.load()
+                state["flags"][f"scene_{i}"] = True
+                store.save(state)
+            assert store._dirty == {"flags"}
+            assert store.stats["flushes"] == 0
+
+        assert store.stats["flushes"] == 1
+        assert not store.dirty
+        assert len(backend.get("state", "campaign_state")["flags"]) == 10
+
+
+def test_failed_batch_drops_its_changes():
+    """A batch whose body raises flushes nothing and reloads from storage"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        backend = _backend(tmp)
+        backend.put("state", "campaign_state", {"flags": {}})
+        store = StateStore(backend)
+
+        try:
+            with store.batch():
+                state = store.load()
+                state["flags"]["half_done"] = True
+                store.save(state)
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+
+        assert store.stats["flushes"] == 0
+        assert backend.get("state", "campaign_state") == {"flags": {}}
+        assert store.load() == {"flags": {}}
+        assert state is not store.load()
+
+
+def test_external_write_is_reloaded():
+    """A clean store picks up writes made by other processes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        backend = _backend(tmp)
+        backend.put("state", "campaign_state", {"session_count": 1})
+        store = StateStore(backend)
+        assert store.load()["session_count"] == 1
+
+        path = tmp / "state" / "campaign_state.json"
+        path.write_text(json.dumps({"session_count": 2}))
+        bump_mtime(path)
+        assert store.load()["session_count"] == 2
+
+
+def test_first_impressions_share_the_store():
+    """maybe_first_impression records into the injected store"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        backend = _backend(tmp)
+        backend.put("state", "campaign_state", {"active_pc_id": "pc_test"})
+        appearance = tmp / "appearance.json"
+        appearance.write_text(json.dumps({
+            "pc_id": "pc_test",
+            "first_impression_lines": {"neutral": ["Who's this, then?"]},
+        }))
+        store = StateStore(backend)
+        state_path = tmp / "state" / "campaign_state.json"
+
+        with store.batch():
+            for npc_id in ("lydia", "hadvar", "ralof"):
+                assert maybe_first_impression(state_path, appearance, npc_id, store=store)
+        assert store.stats["flushes"] == 1
+        saved = backend.get("state", "campaign_state")
+        assert sorted(saved["npc_first_impressions"]) == ["hadvar", "lydia", "ralof"]
+
+
+def test_concurrent_saves_are_rebased_not_lost():
+    """A store that lost a race re-applies its changes on the newer copy"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _backend(tmp).put("state", "campaign_state", {
+            "world_consequences": {"major_choices": ["helgen"]},
+            "session_count": 1,
+        })
+        # Two tools, each with its own backend and copy of the state
+        dashboard = StateStore(_backend(tmp))
+        checkpoint = StateStore(_backend(tmp))
+        state = checkpoint.load()
+        state["world_consequences"]["major_choices"].append("whiterun")
+        state["scene_flags"] = {"met_jarl": True}
+
+        dashboard.load()["session_count"] = 2
+        dashboard.save()
+
+        checkpoint.save(state)
+
+        assert checkpoint.stats["conflicts"] == 1
+        assert StateStore(_backend(tmp)).load() == {
+            "world_consequences": {"major_choices": ["helgen", "whiterun"]},
+            "session_count": 2,
+            "scene_flags": {"met_jarl": True},
+        }
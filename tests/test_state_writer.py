@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tests for crash-safe, incremental state persistence (state_writer.py and
+json_patch.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from json_patch import apply_patch, make_patch
+from state_writer import JournaledStateFile, atomic_write_json
+
+
+def _journal_lines(state_file):
+    return [json.loads(l) for l in state_file.journal_path.read_text().splitlines()]
+
+
+def test_atomic_write_leaves_no_temp_files():
+    """atomic_write_json replaces the file and cleans up its temp file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "state.json"
+        atomic_write_json(path, {"a": 1})
+        atomic_write_json(path, {"a": 2})
+
+        assert json.loads(path.read_text()) == {"a": 2}
+        assert [p.name for p in Path(tmp).iterdir()] == ["state.json"]
+
+
+def test_make_patch_round_trip():
+    """make_patch/apply_patch reproduce the target document"""
+    old = {"a": 1, "list": [1, 2], "nested": {"x": {"y": 1}, "drop": True}, "s/k~": 0}
+    new = {"a": 2, "list": [1, 2, 3, 4], "nested": {"x": {"y": 2}}, "s/k~": 1, "b": [None]}
+
+    patch = make_patch(old, new)
+    assert apply_patch(json.loads(json.dumps(old)), patch) == new
+    assert {"op": "add", "path": "/list/-", "value": 3} in patch
+    assert {"op": "replace", "path": "/s~1k~0", "value": 1} in patch
+
+
+def test_small_change_appends_patch_without_rewriting_snapshot():
+    """A loyalty tweak is logged as one small patch; the snapshot is untouched"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        state = {"history": list(range(2000)), "companions": {"lydia": {"loyalty": 60}}}
+        state_file = JournaledStateFile(path)
+        state_file.save(state)
+        snapshot = path.read_text()
+
+        state["companions"]["lydia"]["loyalty"] = 65
+        state_file.save(state)
+
+        assert path.read_text() == snapshot
+        entries = _journal_lines(state_file)
+        assert entries[1]["patch"] == [
+            {"op": "replace", "path": "/companions/lydia/loyalty", "value": 65}
+        ]
+        assert JournaledStateFile(path).load() == state
+
+
+def test_log_is_compacted_periodically():
+    """After compact_every saves the log is folded into a new snapshot"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        state_file = JournaledStateFile(path, compact_every=3, compact_ratio=1000)
+        state = {"counter": 0, "padding": "x" * 1000}
+        state_file.save(state)
+
+        for i in range(1, 3):
+            state["counter"] = i
+            state_file.save(state)
+        assert state_file.journal_path.exists()
+
+        state["counter"] = 3
+        state_file.save(state)
+        assert not state_file.journal_path.exists()
+        assert json.loads(path.read_text())["counter"] == 3
+
+
+def test_unclean_shutdown_is_replayed_on_load():
+    """Deltas logged before a crash are replayed by the next process"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        writer = JournaledStateFile(path, compact_ratio=1000)
+        writer.save({"scene_flags": {}, "session_count": 1})
+        writer.save({"scene_flags": {"met_jarl": True}, "session_count": 1})
+        # Process dies here: no compaction ran
+
+        assert json.loads(path.read_text())["scene_flags"] == {}
+        recovered = JournaledStateFile(path).load()
+        assert recovered["scene_flags"] == {"met_jarl": True}
+
+
+def test_torn_journal_line_is_ignored():
+    """A half-written log entry is discarded, earlier ones are kept"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        writer = JournaledStateFile(path, compact_ratio=1000)
+        writer.save({"a": 1, "b": 1})
+        writer.save({"a": 2})
+        with open(writer.journal_path, 'a') as f:
+            f.write('{"seq": 9, "patch": [{"op": "replace", "path": "/a", "val')
+
+        reader = JournaledStateFile(path)
+        assert reader.load() == {"a": 2}
+
+        # The torn tail is trimmed so later saves are not hidden behind it
+        reader.save({"a": 3})
+        assert JournaledStateFile(path).load() == {"a": 3}
+
+
+def test_external_rewrite_merges_pending_log():
+    """Pending deltas are replayed onto a rewritten snapshot and the log kept aside"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        writer = JournaledStateFile(path, compact_ratio=1000)
+        writer.save({"a": 1})
+        writer.save({"a": 2})
+        assert writer.journal_path.exists()
+
+        path.write_text(json.dumps({"a": 100, "hand_edited": True}))
+
+        assert JournaledStateFile(path).load() == {"a": 2, "hand_edited": True}
+        assert writer.load() == {"a": 2, "hand_edited": True}
+        assert json.loads(path.read_text()) == {"a": 2, "hand_edited": True}
+        assert not writer.journal_path.exists()
+        assert writer.orphaned_path.exists()
+
+
+def test_hand_edit_keeps_pending_deltas():
+    """A GM edit to the snapshot and unflushed saves both survive the next load"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        writer = JournaledStateFile(path, compact_ratio=1000)
+        state = {"gold": 100, "notes": "", "party": ["Lydia"]}
+        writer.save(state)
+        state["gold"] = 250
+        state["party"].append("Serana")
+        writer.save(state)
+        assert writer.journal_path.exists()
+
+        # The GM edits the (stale) snapshot by hand
+        edited = json.loads(path.read_text())
+        edited["notes"] = "Met Delphine at Kynesgrove"
+        path.write_text(json.dumps(edited))
+
+        loaded = JournaledStateFile(path).load()
+        assert loaded == {"gold": 250, "notes": "Met Delphine at Kynesgrove",
+                          "party": ["Lydia", "Serana"]}
+        assert json.loads(path.read_text()) == loaded
+        assert len(writer.orphaned_path.read_text().splitlines()) == 2
+
+
+def test_bad_entry_truncates_log_but_keeps_earlier_deltas():
+    """Entries before the first one that fails to apply are kept"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        writer = JournaledStateFile(path, compact_ratio=1000)
+        writer.save({"a": 1, "b": 1})
+        writer.save({"a": 2, "b": 1})
+        writer.save({"a": 2, "b": 2})
+        with open(writer.journal_path, 'a') as f:
+            f.write(json.dumps({"seq": 99, "patch": [{"op": "remove", "path": "/missing"}]}) + "\n")
+            f.write(json.dumps({"seq": 100, "patch": [{"op": "replace", "path": "/a", "value": 3}]}) + "\n")
+
+        assert JournaledStateFile(path).load() == {"a": 2, "b": 2}
+        assert [l.get("seq") for l in _journal_lines(writer)][1:] == [1, 2]
+        assert writer.orphaned_path.exists()
+
+
+def test_compact_makes_snapshot_current():
+    """compact() folds pending deltas into the snapshot for direct readers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        writer = JournaledStateFile(path, compact_ratio=1000)
+        writer.save({"a": 1})
+        writer.save({"a": 2})
+        assert writer.journal_path.exists()
+
+        assert writer.compact()
+        assert json.loads(path.read_text()) == {"a": 2}
+        assert not writer.journal_path.exists()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests for the pluggable storage backends (storage.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from data_catalog import DataCatalog
+from npc_manager import NPCManager
+from query_data import DataQueryManager
+from storage import ConflictError, JsonDirectoryBackend, SQLiteBackend, StorageError, migrate
+
+
+NPCS = {
+    "lydia": {"id": "lydia", "name": "Lydia", "location": "Whiterun", "faction": "Whiterun Guard"},
+    "brynjolf": {"id": "brynjolf", "name": "Brynjolf", "location": "Riften", "faction": "Thieves Guild"},
+    "odd": {"id": "odd", "name": "Odd One", "location": ["Whiterun", "Riften"]},
+}
+
+
+def _json_backend(tmp):
+    return JsonDirectoryBackend({"data": tmp / "data", "state": tmp / "state"},
+                                catalog=DataCatalog())
+
+
+def _fill(backend):
+    for key, npc in NPCS.items():
+        backend.put("data/npcs", key, npc)
+    backend.put("data", "factions", {"major_factions": {}})
+    backend.put("state", "campaign_state", {"session_count": 3})
+
+
+def test_json_backend_uses_repository_layout():
+    """Collections map onto the existing data/ and state/ directories"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        backend = _json_backend(tmp)
+        _fill(backend)
+
+        assert json.loads((tmp / "data" / "npcs" / "lydia.json").read_text())["name"] == "Lydia"
+        assert (tmp / "data" / "factions.json").exists()
+        assert json.loads((tmp / "state" / "campaign_state.json").read_text()) == {"session_count": 3}
+        assert sorted(backend.collections()) == ["data", "data/npcs", "state"]
+
+        doc = backend.get("data/npcs", "lydia")
+        doc["name"] = "Changed"
+        assert backend.get("data/npcs", "lydia")["name"] == "Lydia"
+        assert backend.get("data/npcs", "nobody") is None
+
+
+def test_find_matches_across_backends():
+    """Indexed filters behave the same on JSON and SQLite"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        json_backend = _json_backend(tmp)
+        sqlite_backend = SQLiteBackend(tmp / "campaign.sqlite3")
+        for backend in (json_backend, sqlite_backend):
+            _fill(backend)
+            hits = sorted(key for key, _ in backend.find("data/npcs", location="whiterun"))
+            # Non-string locations are never excluded by a location filter
+            assert hits == ["lydia", "odd"]
+            assert [key for key, _ in backend.find("data/npcs", faction="THIEVES GUILD")] == ["brynjolf"]
+        sqlite_backend.close()
+
+
+def test_sqlite_transaction_rolls_back():
+    """A failing transaction leaves no partial multi-document update"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for backend in (_json_backend(tmp), SQLiteBackend(tmp / "campaign.sqlite3")):
+            backend.put("data/npcs", "lydia", NPCS["lydia"])
+            try:
+                with backend.transaction():
+                    backend.put("data/npcs", "lydia", {"id": "lydia", "loyalty": 10})
+                    backend.put("data/npcs", "hadvar", {"id": "hadvar"})
+                    assert backend.get("data/npcs", "hadvar") == {"id": "hadvar"}
+                    raise RuntimeError("abort")
+            except RuntimeError:
+                pass
+            assert backend.get("data/npcs", "lydia") == NPCS["lydia"]
+            assert backend.get("data/npcs", "hadvar") is None
+            backend.close()
+
+
+def test_migration_round_trip():
+    """JSON -> SQLite -> JSON preserves every document"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = _json_backend(tmp)
+        _fill(source)
+        (tmp / "data" / "npcs" / "broken.json").write_text("{not json")
+
+        db = SQLiteBackend(tmp / "campaign.sqlite3")
+        counts = migrate(source, db)
+        assert counts == {"collections": 3, "documents": 5, "skipped": 1}
+        assert db.get("state", "campaign_state") == {"session_count": 3}
+
+        restored = JsonDirectoryBackend({"data": tmp / "out" / "data", "state": tmp / "out" / "state"},
+                                        catalog=DataCatalog())
+        migrate(db, restored)
+        for key, npc in NPCS.items():
+            assert restored.get("data/npcs", key) == npc
+        db.close()
+
+
+def test_managers_run_on_sqlite():
+    """Managers read and write through an injected SQLite backend"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        backend = SQLiteBackend(tmp / "campaign.sqlite3")
+        _fill(backend)
+
+        npc_manager = NPCManager(str(tmp / "data"), str(tmp / "state"), storage=backend)
+        assert npc_manager.update_loyalty("lydia", 5, "Saved her life")
+        assert backend.get("data/npcs", "lydia")["loyalty"] == 55
+        assert not (tmp / "data" / "npcs").exists()
+
+        query = DataQueryManager(str(tmp / "data"), storage=backend)
+        assert [npc["id"] for npc in query.query_npcs(location="Riften")] == ["brynjolf", "odd"]
+        backend.close()
+
+
+def test_invalid_keys_are_rejected():
+    """Keys cannot escape their collection"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = _json_backend(Path(tmp))
+        for key in ("../x", "", ".hidden"):
+            try:
+                backend.put("data/npcs", key, {})
+            except StorageError:
+                continue
+            raise AssertionError(f"key {key!r} was accepted")
+
+
+def test_compare_and_put_detects_lost_updates():
+    """Stale writes are rejected and update() re-applies its mutation"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for first, second in ((_json_backend(tmp), _json_backend(tmp)),
+                              (SQLiteBackend(tmp / "campaign.sqlite3"),
+                               SQLiteBackend(tmp / "campaign.sqlite3"))):
+            first.put("data/clocks", "civil_war_clocks", {"progress": 1})
+            doc, version = first.get_versioned("data/clocks", "civil_war_clocks")
+            second.put("data/clocks", "civil_war_clocks", {"progress": 5})
+
+            doc["progress"] += 1
+            try:
+                first.compare_and_put("data/clocks", "civil_war_clocks", doc, version)
+            except ConflictError:
+                pass
+            else:
+                raise AssertionError("stale write was accepted")
+
+            calls = []
+
+            def _advance(current):
+                calls.append(current["progress"])
+                if len(calls) == 1:
+                    # Another process saves between our read and our write
+                    second.put("data/clocks", "civil_war_clocks", {"progress": current["progress"] + 10})
+                current["progress"] += 1
+                return True
+
+            assert first.update("data/clocks", "civil_war_clocks", _advance)
+            assert calls == [5, 15]
+            assert second.get("data/clocks", "civil_war_clocks") == {"progress": 16}
+            first.close()
+            second.close()
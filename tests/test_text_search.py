@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for the BM25 TextSearchIndex over rules, converted PDFs and logs.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import bump_mtime
+from text_search import TextSearchIndex, default_sources, get_search_index, split_sections
+
+
+RULES = """# Fate Core Rules
+
+## Aspects
+Aspects describe who you are. Invoke an aspect for a bonus.
+
+## Actions
+Four types of actions:
+1. Overcome obstacles
+2. Create Advantage to improve the situation
+3. Attack an enemy
+4. Defend against attacks
+
+## Magic
+Magic uses Lore. Destruction magic can create an advantage on fire.
+"""
+
+LOG = """# Session 1
+The party met a dragon near Whiterun and argued about the advantage of fleeing.
+"""
+
+
+def _make_repo(tmp):
+    (tmp / "data" / "rules").mkdir(parents=True)
+    (tmp / "logs").mkdir()
+    (tmp / "data" / "rules" / "core.md").write_text(RULES, encoding='utf-8')
+    (tmp / "logs" / "session_1.md").write_text(LOG, encoding='utf-8')
+
+
+def test_split_sections_on_headings():
+    """Sections start at each markdown heading"""
+    sections = split_sections(RULES.split('\n'))
+    assert [s['heading'] for s in sections] == ["Fate Core Rules", "Aspects", "Actions", "Magic"]
+
+
+def test_ranked_section_hits():
+    """Most relevant section ranks first and carries context"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        index = TextSearchIndex(tmp)
+        index.refresh()
+
+        hits = index.search("magic lore")
+        assert hits[0]['heading'] == "Magic"
+        assert hits[0]['file'] == "data/rules/core.md"
+        assert any("Lore" in line for line in hits[0]['context'])
+
+
+def test_phrase_query_requires_adjacent_terms():
+    """A quoted phrase only matches sections containing it verbatim"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        index = TextSearchIndex(tmp)
+        index.refresh()
+
+        phrase_hits = index.search('"create advantage"')
+        assert [h['heading'] for h in phrase_hits] == ["Actions"]
+
+        loose_hits = index.search("create advantage")
+        assert {h['heading'] for h in loose_hits} >= {"Actions", "Magic", "Session 1"}
+
+
+def test_source_filter():
+    """Hits can be restricted to one source"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        index = TextSearchIndex(tmp)
+        index.refresh()
+
+        hits = index.search("advantage", sources=["logs"])
+        assert hits and all(h['source'] == "logs" for h in hits)
+
+
+def test_incremental_refresh_and_persistence():
+    """Changed files are re-indexed and the index survives a reload"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        index = TextSearchIndex(tmp)
+        assert index.refresh()
+        assert not index.refresh()
+        assert index.save()
+
+        log = tmp / "logs" / "session_1.md"
+        log.write_text("# Session 1\nA frost troll ambush.\n", encoding='utf-8')
+        bump_mtime(log)
+
+        reloaded = TextSearchIndex(tmp)
+        assert reloaded.search("frost troll") == []
+        assert reloaded.refresh()
+        assert reloaded.search("frost troll")[0]['file'] == "logs/session_1.md"
+        assert reloaded.search("dragon") == []
+
+        log.unlink()
+        assert reloaded.refresh()
+        assert reloaded.search("troll") == []
+
+
+def test_shared_index_is_keyed_by_sources():
+    """get_search_index keeps separate indexes for different source sets"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        default = get_search_index(tmp)
+        assert get_search_index(tmp, sources=default_sources(tmp)) is default
+
+        logs_only = get_search_index(tmp, sources={"logs": (tmp / "logs", "*.md")})
+        assert logs_only is not default
+        assert {h['source'] for h in logs_only.search("advantage")} == {"logs"}
+
+        # Each source set persists to its own file
+        assert default.index_path == tmp.resolve() / "state" / "search_index.json"
+        assert logs_only.index_path.parent == default.index_path.parent
+        assert logs_only.index_path.name.startswith("search_index.")
+        assert logs_only.index_path != default.index_path
+        assert len(TextSearchIndex(tmp)._files) == 2
+
+
+def test_index_built_from_other_sources_is_not_loaded():
+    """A saved index is only reused for the sources it was built from"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _make_repo(tmp)
+        path = tmp / "shared_index.json"
+        index = TextSearchIndex(tmp, index_path=path)
+        index.refresh()
+        assert index.save()
+
+        logs_only = TextSearchIndex(tmp, sources={"logs": (tmp / "logs", "*.md")}, index_path=path)
+        assert logs_only._files == {}
+        assert len(TextSearchIndex(tmp, index_path=path)._files) == 2
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for the cross-hold location trigger dispatcher (triggers/dispatcher.py).
+"""
+
+import copy
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from triggers import dispatch, evaluate_route, get_registry
+from triggers.dispatcher import KeywordAutomaton, TriggerRegistry
+from triggers.hjaalmarch_triggers import hjaalmarch_location_triggers
+from triggers.markarth_triggers import markarth_location_triggers
+from triggers.rift_triggers import rift_location_triggers
+from triggers.solitude_triggers import solitude_location_triggers
+from triggers.whiterun_triggers import whiterun_location_triggers
+from triggers.windhelm_triggers import windhelm_location_triggers
+from triggers.winterhold_triggers import winterhold_location_triggers
+
+
+ALL_HANDLERS = [
+    whiterun_location_triggers, windhelm_location_triggers, solitude_location_triggers,
+    markarth_location_triggers, rift_location_triggers, hjaalmarch_location_triggers,
+    winterhold_location_triggers,
+]
+
+LOCATIONS = [
+    "whiterun", "Whiterun_Plains_District", "whiterun_wind_district", "whiterun_cloud_district",
+    "jorrvaskr", "windhelm", "windhelm_graveyard", "windhelm_gray_quarter", "blue palace",
+    "Solitude Castle Dour", "markarth_understone_keep", "karthspire", "hag rock redoubt",
+    "lost valley redoubt", "nchuand-zel", "markarth abandoned house", "nepos house",
+    "cidhna mine", "riften_marketplace", "the rift forest", "lake honrich", "riften_ratway",
+    "morthal", "morthal_burned_house", "movarths_lair", "winterhold", "college_bridge",
+    "college_arcanaeum", "saarthal_excavation", "labyrinthian", "falkreath", "dawnstar",
+    "helgen", "riverwood", "", "bleak falls barrow",
+]
+
+STATES = [
+    {},
+    {"companions": {"active_companions": ["Lydia", "Iona", "Benor", "Stenvar", "Illisif", "Marcurio"]},
+     "time_of_day": "night"},
+    {"civil_war_state": {"battle_of_whiterun_status": "active", "battle_of_whiterun_stage": 4,
+                         "battle_of_whiterun_faction": "imperial", "player_alliance": "imperial"},
+     "starting_faction": "companions",
+     "companions_state": {"active_quest": "companions_proving_honor"},
+     "companions": {"active_companions": ["Hadvar", "Ralof"]}},
+    {"starting_faction": "college_of_winterhold",
+     "college_state": {"active_quest": "college_staff_of_magnus"},
+     "player": {"college_member": True, "thieves_guild_member": True},
+     "whiterun_control": "stormcloak", "jarl_hjaalmarch": "sorli", "truce_active": True},
+]
+
+
+def _run_all(loc, state):
+    events = []
+    for handler in ALL_HANDLERS:
+        events.extend(handler(loc, state))
+    return events
+
+
+def _normalized(state):
+    # Handlers that never fire may still create an empty scene_flags dict
+    state = dict(state)
+    if state.get("scene_flags") == {}:
+        del state["scene_flags"]
+    return state
+
+
+def test_dispatch_matches_running_every_hold():
+    """dispatch() returns exactly what calling all seven holds returns"""
+    for base in STATES:
+        for loc in LOCATIONS:
+            expected_state = copy.deepcopy(base)
+            expected = _run_all(loc, expected_state)
+            actual_state = copy.deepcopy(base)
+            actual = dispatch(loc, actual_state)
+            assert actual == expected, loc
+            assert _normalized(actual_state) == _normalized(expected_state), loc
+
+
+def test_dispatch_only_runs_matching_holds():
+    """Locations outside every hold run no handler at all"""
+    registry = get_registry()
+    assert registry.candidates("riverwood") == frozenset()
+    holds = registry.holds
+    assert {holds[i] for i in registry.candidates("Riften_Marketplace")} == {"rift"}
+    assert {holds[i] for i in registry.candidates("whiterun_to_windhelm_road")} == {"whiterun", "windhelm"}
+
+
+def test_automaton_finds_overlapping_keywords():
+    """Keywords that overlap or nest are all reported"""
+    automaton = KeywordAutomaton([("rift", 1), ("riften", 2), ("ten", 3), ("he", 4), ("she", 5)])
+    assert automaton.search("riften") == {1, 2, 3}
+    assert automaton.search("ushers") == {4, 5}
+    assert automaton.search("nothing here") == {4}
+
+
+def test_state_predicate_runs_location_independent_triggers():
+    """A `when` predicate runs a hold for any location"""
+    registry = TriggerRegistry()
+    registry.register("alarm", lambda loc, state: ["alarm"], ["bell"],
+                      when=lambda state: state.get("alarm"))
+    assert registry.dispatch("market", {}) == []
+    assert registry.dispatch("market", {"alarm": True}) == ["alarm"]
+    assert registry.dispatch("bell tower", {}) == ["alarm"]
+
+
+def test_route_matches_dispatching_each_stop_in_order():
+    """evaluate_route() equals dispatching every waypoint in travel order"""
+    route = ["riverwood", "whiterun", "whiterun_plains_district", "morthal", "windhelm",
+             "windhelm_gray_quarter", "riften_marketplace"]
+    for base in STATES:
+        expected_state = copy.deepcopy(base)
+        expected = [dispatch(loc, expected_state) for loc in route]
+        actual_state = copy.deepcopy(base)
+        result = evaluate_route(route, actual_state)
+        assert [stop["location"] for stop in result["stops"]] == route
+        assert [stop["events"] for stop in result["stops"]] == expected
+        assert _normalized(actual_state) == _normalized(expected_state)
+        flat = [event for events in expected for event in events]
+        assert result["events"] == list(dict.fromkeys(flat))
+
+
+def test_route_fires_one_shots_once():
+    """A one-shot fires at the first stop that qualifies, not at every stop"""
+    state = {"whiterun_control": "stormcloak",
+             "civil_war_state": {"battle_of_whiterun_status": "active", "battle_of_whiterun_stage": 2}}
+    result = evaluate_route(["windhelm", "windhelm_gray_quarter", "whiterun"], state)
+    news = [i for i, stop in enumerate(result["stops"])
+            if any("Whiterun's fall" in event for event in stop["events"])]
+    assert news == [0]
+    assert state["windhelm_heard_whiterun_win"] is True
+    # The siege header is reported at each stop but merged once
+    header = "[Battle of Whiterun | Unknown | Stage 2/5]"
+    assert all(header in stop["events"] for stop in result["stops"])
+    assert result["events"].count(header) == 1
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for memoized trigger evaluation (triggers/memo.py).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from triggers.memo import MemoizedTrigger, covered, depends_on, trace_dependencies
+from triggers.hjaalmarch_triggers import hjaalmarch_location_triggers
+from triggers.markarth_triggers import markarth_location_triggers
+from triggers.rules import get_ruleset
+from triggers.whiterun_triggers import whiterun_location_triggers
+from triggers.windhelm_triggers import windhelm_location_triggers
+from triggers.winterhold_triggers import winterhold_location_triggers
+
+
+LOCATIONS = [
+    "whiterun", "whiterun_plains_district", "whiterun_wind_district", "jorrvaskr",
+    "windhelm", "windhelm_graveyard", "windhelm_gray_quarter", "windhelm_palace_of_the_kings",
+    "markarth abandoned house", "markarth_understone_keep", "morthal", "morthal_burned_house",
+    "winterhold", "college_bridge", "college_arcanaeum", "labyrinthian", "saarthal",
+]
+
+STATES = [
+    {},
+    {"companions": {"active_companions": ["Lydia", "Hadvar", "Ralof", "Benor", "Illisif"]},
+     "time_of_day": "night", "quests": {"active": ["laid_to_rest"]}},
+    {"civil_war_state": {"battle_of_whiterun_status": "active", "battle_of_whiterun_stage": 4,
+                         "battle_of_whiterun_faction": "imperial", "player_alliance": "imperial"},
+     "starting_faction": "college_of_winterhold",
+     "college_state": {"active_quest": "college_staff_of_magnus"},
+     "player": {"college_member": True, "artifacts": ["staff_of_cinders"]},
+     "whiterun_control": "stormcloak", "jarl_hjaalmarch": "sorli", "truce_active": True,
+     "battle_for_windhelm_started": True, "daedric_princes": {"molag": "done"}},
+    {"starting_faction": "companions",
+     "companions_state": {"active_quest": "companions_proving_honor"},
+     "civil_war_state": {"battle_of_whiterun_status": "active"},
+     "whiterun_control": "imperial", "civil_war_phase": "imperial_victory"},
+]
+
+
+def test_declared_dependencies_cover_what_handlers_touch():
+    """Every state path a hold reads or writes is declared"""
+    handlers = [whiterun_location_triggers, windhelm_location_triggers,
+                markarth_location_triggers, hjaalmarch_location_triggers,
+                winterhold_location_triggers]
+    for handler in handlers:
+        declared = MemoizedTrigger(handler, rules="whiterun" if handler is whiterun_location_triggers
+                                   else None).paths
+        for state in STATES:
+            for loc in LOCATIONS:
+                reads, writes = trace_dependencies(handler, loc, state)
+                for path in reads:
+                    assert covered(path, declared), (handler.__name__, loc, path)
+                for path in writes:
+                    # Creating the scene_flags container is fine when flags
+                    # inside it are declared
+                    assert covered(path, declared) or any(
+                        d.startswith(path + ".") for d in declared), (handler.__name__, loc, path)
+
+
+def test_repeat_calls_hit_the_cache_until_a_dependency_changes():
+    """Relevant state changes miss; unrelated changes still hit"""
+    calls = []
+
+    @depends_on("civil_war_state.battle_of_whiterun_stage", "companions.active_companions")
+    def handler(loc, campaign_state):
+        calls.append(loc)
+        stage = campaign_state.get("civil_war_state", {}).get("battle_of_whiterun_stage", 0)
+        return [f"{loc} at stage {stage}"]
+
+    memo = MemoizedTrigger(handler)
+    state = {"civil_war_state": {"battle_of_whiterun_stage": 2}, "gold": 10}
+    assert memo("Whiterun", state) == ["Whiterun at stage 2"]
+    assert memo("whiterun", state) == ["Whiterun at stage 2"]
+    state["gold"] = 500
+    memo("whiterun", state)
+    assert len(calls) == 1
+
+    state["civil_war_state"]["battle_of_whiterun_stage"] = 3
+    assert memo("whiterun", state) == ["whiterun at stage 3"]
+    state["companions"] = {"active_companions": ["Lydia"]}
+    memo("whiterun", state)
+    assert len(calls) == 3
+    assert memo.stats == {"hits": 2, "misses": 3, "uncacheable": 0}
+
+
+def test_one_shots_are_never_served_from_cache():
+    """A call that sets its own flag is re-run, so the flag is always set"""
+    memo = MemoizedTrigger(windhelm_location_triggers)
+    state = {"whiterun_control": "stormcloak"}
+    first = memo("windhelm", state)
+    assert state["windhelm_heard_whiterun_win"] is True
+    assert memo.stats["uncacheable"] == 1
+
+    again = memo("windhelm", state)
+    assert len(again) == len(first) - 1
+    assert memo("windhelm", state) == again
+    assert memo.stats["hits"] == 1
+
+    fresh = {"whiterun_control": "stormcloak"}
+    assert memo("windhelm", fresh) == first
+    assert fresh["windhelm_heard_whiterun_win"] is True
+
+
+def test_rule_files_infer_their_dependencies():
+    """Rule-backed holds need no declaration"""
+    deps = get_ruleset("whiterun").dependencies
+    assert "civil_war_state.battle_of_whiterun_status" in deps
+    assert "civil_war_state.battle_of_whiterun_stage" in deps
+    assert "companions.active_companions" in get_ruleset("rift").dependencies
+    assert "player.thieves_guild_member" in get_ruleset("rift").dependencies
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for trigger profiling (triggers/profiling.py, trigger_profiler.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from state_writer import JournaledStateFile
+from trigger_profiler import load_routes, load_state, replay
+from triggers.dispatcher import build_default_registry
+from triggers.profiling import TriggerProfiler, profiling
+from triggers.rules import RuleSet
+
+
+def test_profiler_counts_holds_and_rules():
+    """Calls, hits, events per location and dead triggers are reported"""
+    registry = build_default_registry()
+    with profiling(registry=registry) as profiler:
+        for _ in range(3):
+            registry.dispatch("riften_marketplace", {})
+        registry.dispatch("riverwood", {})
+    assert registry.profiler is None
+
+    report = profiler.report()
+    rift = report["triggers"]["hold:rift"]
+    assert rift["calls"] == 3 and rift["hits"] == 3
+    assert rift["events_by_location"] == {"riften_marketplace": 6}
+    assert rift["p95_us"] > 0
+
+    # Repeat visits are memoized, so the rule itself only ran once
+    market = report["triggers"]["rule:rift/riften_marketplace"]
+    assert (market["calls"], market["hits"], market["events"]) == (1, 1, 1)
+    assert registry.cache_stats()["rift"]["hits"] == 2
+    assert "hold:windhelm" in report["dead"]
+    assert "rule:rift/riften_temple_of_mara" in report["dead"]
+    assert "rule:rift/riften_marketplace" not in report["dead"]
+    assert report["locations"]["riften_marketplace"] >= 6
+
+    table = profiler.format_table(top=3, sort="calls")
+    assert table.splitlines()[0].startswith("trigger")
+    assert len(table.splitlines()) == 5
+
+
+def test_rule_group_members_after_a_hit_are_not_counted():
+    """A rule skipped by its if/elif group was never tested"""
+    rules = RuleSet([
+        {"id": "first", "group": "g", "location": "keep", "text": "first"},
+        {"id": "second", "group": "g", "location": "keep", "text": "second"},
+    ], name="test")
+    profiler = TriggerProfiler()
+    with profiling(profiler, registry=build_default_registry()):
+        assert rules.evaluate("keep", {}) == ["first"]
+    assert profiler.stats["rule:test/first"].calls == 1
+    assert profiler.stats["rule:test/second"].calls == 0
+    # Without a profiler nothing is recorded
+    rules.evaluate("keep", {})
+    assert profiler.stats["rule:test/first"].calls == 1
+
+
+def test_p95_uses_nearest_rank():
+    """p95 of 1..100 ms is 95 ms"""
+    profiler = TriggerProfiler()
+    for ms in range(100, 0, -1):
+        profiler.record("hold:test", "x", ms / 1000, 1)
+    assert profiler.report()["triggers"]["hold:test"]["p95_us"] == 95000.0
+
+
+def test_session_replay():
+    """Sessions' locations_visited are replayed as routes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions = Path(tmp)
+        (sessions / "session_001.json").write_text(json.dumps(
+            {"locations_visited": ["Riverwood", "Whiterun", "Riften Marketplace"]}))
+        (sessions / "session_002.json").write_text(json.dumps({"locations_visited": []}))
+        (sessions / "broken.json").write_text("{")
+        routes = load_routes(sessions)
+        assert routes == [("session_001", ["Riverwood", "Whiterun", "Riften Marketplace"])]
+
+        state = {"time_of_day": "day"}
+        profiler = replay(routes, state, repeat=2, use_cache=False,
+                          registry=build_default_registry())
+        assert state == {"time_of_day": "day"}
+        stats = profiler.report()["triggers"]
+        assert stats["hold:whiterun"]["calls"] == 2
+        assert stats["hold:rift"]["hits"] == 2
+
+
+def test_state_includes_journaled_deltas():
+    """The replayed state is the snapshot plus pending journal entries"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "campaign_state.json"
+        writer = JournaledStateFile(path, compact_ratio=1000)
+        writer.save({"time_of_day": "day", "scene_flags": {}})
+        writer.save({"time_of_day": "night", "scene_flags": {}})
+        assert writer.journal_path.exists()
+
+        assert load_state(path) == {"time_of_day": "night", "scene_flags": {}}
+        assert load_state(Path(tmp) / "missing.json") == {}
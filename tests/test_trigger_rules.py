@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for declarative trigger rules (triggers/rules.py).
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from conftest import bump_mtime
+from triggers import rules
+from triggers.rules import RuleError, RuleSet, get_ruleset
+
+
+def test_rule_fields_compile_to_equivalent_checks():
+    """Location patterns, predicates, companions, once flags and templates"""
+    rules = RuleSet([
+        {"id": "market", "group": "district", "location": {"all": ["riften", "market"]},
+         "text": "market"},
+        {"id": "entrance", "group": "district", "location": {"startswith": "riften"},
+         "text": "entrance"},
+        {"id": "forest", "location": {"all": ["forest", {"not": "riften"}]}, "text": "forest"},
+        {"id": "iona", "location": {"startswith": "riften"}, "companion": "iona", "text": "iona"},
+        {"id": "siege", "when": {"all": [{"path": "war.status", "eq": "active"},
+                                         {"path": "war.stage", "gte": 3}]},
+         "text": "[{war.faction|capitalize|default:Unknown} | Stage {war.stage|int}/5]"},
+        {"id": "ambush", "location": "road", "when": {"night": True},
+         "once": "scene_flags.road_ambush", "text": "ambush"},
+    ])
+
+    assert rules.evaluate("Riften_Marketplace", {}) == ["market"]
+    assert rules.evaluate("riften_gate", {}) == ["entrance"]
+    assert rules.evaluate("riften forest", {}) == ["entrance"]
+    assert rules.evaluate("falkreath forest", {}) == ["forest"]
+    party = {"companions": {"active_companions": [{"name": "Iona (Housecarl)"}]}}
+    assert rules.evaluate("riften_gate", party) == ["entrance", "iona"]
+
+    war = {"war": {"status": "active", "stage": 4}}
+    assert rules.evaluate("anywhere", war) == ["[Unknown | Stage 4/5]"]
+    war["war"]["faction"] = "STORMCLOAK"
+    assert rules.evaluate("anywhere", war) == ["[Stormcloak | Stage 4/5]"]
+    war["war"]["stage"] = 2
+    assert rules.evaluate("anywhere", war) == []
+
+    state = {"time_of_day": "night"}
+    assert rules.evaluate("north road", state) == ["ambush"]
+    assert state["scene_flags"] == {"road_ambush": True}
+    assert rules.evaluate("north road", state) == []
+
+
+def test_only_rules_with_matching_keywords_are_tested():
+    """Thousands of rules cost only the handful whose keywords occur"""
+    rules = RuleSet([
+        {"id": f"place_{i}", "location": {"all": [f"place{i:04d}x", "gate"]},
+         "when": {"path": "visited", "ne": True}, "text": f"arrived at {i}"}
+        for i in range(5000)
+    ])
+    assert rules.candidates("riverwood") == ()
+    assert rules.evaluate("PLACE0042X_gate", {}) == ["arrived at 42"]
+    assert rules.stats["rules_tested"] == 1
+
+    start = time.perf_counter()
+    for i in range(1000):
+        rules.evaluate(f"place{i:04d}x_gate", {})
+    assert (time.perf_counter() - start) / 1000 < 0.001
+
+
+def test_malformed_rules_are_rejected():
+    """Errors name the rule and the problem"""
+    bad = [
+        [{"location": "x", "text": "no id"}],
+        [{"id": "a", "text": "t"}, {"id": "a", "text": "t"}],
+        [{"id": "a", "location": {"near": "x"}, "text": "t"}],
+        [{"id": "a", "when": {"path": "x", "gte": 1, "lte": 3}, "text": "t"}],
+        [{"id": "a", "text": "{x|shout}"}],
+        [{"id": "a", "tetx": "typo"}],
+    ]
+    for rules in bad:
+        try:
+            RuleSet(rules, name="test")
+        except RuleError:
+            continue
+        raise AssertionError(f"accepted {rules}")
+
+
+def test_rule_files_recompile_when_edited():
+    """get_ruleset picks up edits to the rule file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "reach.json"
+        path.write_text(json.dumps({"hold": "reach", "rules": [
+            {"id": "markarth", "location": "markarth", "text": "Stone city"}]}))
+        assert get_ruleset("reach", tmp).evaluate("markarth", {}) == ["Stone city"]
+
+        path.write_text(json.dumps({"hold": "reach", "rules": [
+            {"id": "markarth", "location": "markarth", "text": "The Silver-Blood city"},
+            {"id": "karthspire", "location": "karthspire", "text": "Forsworn camp"}]}))
+        bump_mtime(path)
+        # Within the check interval the compiled rules are reused as-is
+        assert get_ruleset("reach", tmp).rule_ids == ["markarth"]
+        rules.RELOAD_CHECK_SECONDS = 0
+        try:
+            ruleset = get_ruleset("reach", tmp)
+        finally:
+            rules.RELOAD_CHECK_SECONDS = 1.0
+        assert ruleset.rule_ids == ["markarth", "karthspire"]
+        assert ruleset.evaluate("markarth", {}) == ["The Silver-Blood city"]
+        assert len(get_ruleset("missing", tmp)) == 0
@@ -11,7 +11,9 @@ import os
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
-from triggers.trigger_utils import is_companion_present, is_quest_active, is_night_time
+from triggers.trigger_utils import (
+    TriggerContext, active_companions, is_companion_present, is_quest_active, is_night_time
+)
 
 
 def test_is_companion_present_string():
@@ -149,6 +151,43 @@ def test_is_night_time_edge_cases():
     print("✓ Edge case handling works")
 
 
+def test_trigger_context_matches_list_helpers():
+    """Test that TriggerContext lookups agree with the list-scanning helpers"""
+    print("\n=== Testing TriggerContext Indexes ===")
+
+    state = {
+        "companions": {"active_companions": ["Lydia the Housecarl", {"name": "Marcurio"},
+                                             {"npc_id": "j_zargo", "name": "J'zargo"}]},
+        "quests": {"active": ["blood_on_the_ice", {"id": "laid_to_rest"}],
+                   "completed": [{"id": "the_white_phial"}, {"name": "no id"}]},
+    }
+    context = TriggerContext(state)
+
+    for name in ["lydia", "Lydia the", "MARC", "j_zar", "J'zargo", "hadvar", "housecarl", "", "lydiax"]:
+        expected = is_companion_present(state["companions"]["active_companions"], name)
+        assert is_companion_present(active_companions(context), name) == expected, name
+    for quest in ["blood_on_the_ice", "laid_to_rest", "the_white_phial", "rising_at_dawn", None]:
+        assert is_quest_active(context, quest) == is_quest_active(state, quest), quest
+
+    print("✓ Context indexes agree with list scans")
+
+
+def test_trigger_context_writes_through():
+    """Test that one-shot flags set through a context land in the state"""
+    print("\n=== Testing TriggerContext Writes ===")
+
+    state = {"time_of_day": "night"}
+    context = TriggerContext.of(state)
+    assert TriggerContext.of(context) is context
+    context.setdefault("scene_flags", {})["seen"] = True
+    context["windhelm_siege_alert"] = True
+    assert state == {"time_of_day": "night", "scene_flags": {"seen": True}, "windhelm_siege_alert": True}
+    assert is_night_time(context)
+    assert len(active_companions(context)) == 0
+
+    print("✓ Context writes reach the campaign state")
+
+
 def run_all_tests():
     """Run all test functions"""
     print("=" * 60)
@@ -165,7 +204,9 @@ def run_all_tests():
         test_is_quest_active_empty,
         test_is_night_time_string,
         test_is_night_time_int,
-        test_is_night_time_edge_cases
+        test_is_night_time_edge_cases,
+        test_trigger_context_matches_list_helpers,
+        test_trigger_context_writes_through
     ]
     
     passed = 0